@@ -0,0 +1 @@
+# audio/__init__.py
@@ -0,0 +1,259 @@
+# audio/key_tempo.py
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+
+class _GrowableBuffer:
+    """(チャンネル数, N) の作業バッファ（必要な時だけ拡張して再利用）"""
+
+    def __init__(self, channels: int, capacity: int):
+        self._data = np.zeros((channels, capacity), dtype=np.float32)
+
+    def get(self, length: int) -> np.ndarray:
+        if length > self._data.shape[1]:
+            grown = np.zeros((self._data.shape[0], max(length, self._data.shape[1] * 2)),
+                             dtype=np.float32)
+            grown[:, :self._data.shape[1]] = self._data
+            self._data = grown
+        return self._data[:, :length]
+
+
+class _StreamingResampler:
+    """ストリーミング線形補間リサンプラー（step > 1 で短く = ピッチが上がる）"""
+
+    def __init__(self, channels: int):
+        self.step = 1.0
+        self._tail = np.zeros((channels, 1), dtype=np.float32)
+        self._pos = 0.0
+        self._work = _GrowableBuffer(channels, 8192)
+        self._out = _GrowableBuffer(channels, 8192)
+
+    def reset(self):
+        self._tail[:] = 0.0
+        self._pos = 0.0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        n = x.shape[1]
+        if n == 0:
+            return x
+        # 直前ブロックの最終サンプル + 今回の入力
+        buf = self._work.get(n + 1)
+        buf[:, :1] = self._tail
+        buf[:, 1:] = x
+        count = max(0, int(np.ceil((n - self._pos) / self.step)))
+        positions = self._pos + self.step * np.arange(count)
+        out = self._out.get(count)
+        base = np.arange(n + 1)
+        for ch in range(buf.shape[0]):
+            out[ch] = np.interp(positions, base, buf[ch])
+        self._pos = self._pos + self.step * count - n
+        self._tail[:, 0] = x[:, -1]
+        return out
+
+
+class KeyTempoProcessor:
+    """キー（半音単位）・テンポ変更のストリーミング処理
+
+    位相ボコーダーで (キー比 / テンポ) 倍に時間伸縮したあと、
+    キー比で線形補間リサンプリングしてピッチを移す。
+    入力・出力はともに (サンプル数, チャンネル数) の float32 配列で、
+    ブロック長は任意。遅延は約 frame_size サンプルで一定。
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 2,
+                 frame_size: int = 2048, synthesis_hop: int = 512):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_size = frame_size
+        self.synthesis_hop = synthesis_hop
+        self.semitones = 0.0
+        self.tempo = 1.0
+
+        bins = frame_size // 2 + 1
+        self._window = np.hanning(frame_size).astype(np.float32)
+        self._omega = (2.0 * np.pi * np.arange(bins) / frame_size).astype(np.float64)
+        # 窓の2乗の重なり和で正規化
+        self._ola_gain = synthesis_hop / float(np.sum(self._window ** 2))
+
+        # 入力FIFO（(チャンネル数, 容量)、読み出し位置を詰めて再利用）
+        self._in = np.zeros((channels, frame_size * 8), dtype=np.float32)
+        self._in_len = 0
+        self._analysis_pos = 0.0
+
+        # 重畳加算バッファ
+        self._ola = np.zeros((channels, frame_size), dtype=np.float32)
+        self._frame = np.zeros((channels, frame_size), dtype=np.float32)
+
+        self._prev_phase = np.zeros((channels, bins), dtype=np.float64)
+        self._synth_phase = np.zeros((channels, bins), dtype=np.float64)
+        self._first_frame = True
+        self._last_start = 0
+
+        self._stretched = _GrowableBuffer(channels, frame_size * 4)
+        self._resampler = _StreamingResampler(channels)
+
+    # ==========================
+    # パラメータ
+    # ==========================
+    def set_key(self, semitones: float):
+        """キーを半音単位で設定（+で高く）"""
+        self.semitones = float(semitones)
+        self._resampler.step = 2.0 ** (self.semitones / 12.0)
+
+    def set_tempo(self, tempo: float):
+        """テンポ倍率を設定（1.0 = 原曲）"""
+        self.tempo = max(0.25, min(4.0, float(tempo)))
+
+    @property
+    def is_bypass(self) -> bool:
+        return self.semitones == 0.0 and self.tempo == 1.0
+
+    @property
+    def latency_samples(self) -> int:
+        return self.frame_size
+
+    def reset(self):
+        """内部状態をクリア（シーク時など）"""
+        self._in_len = 0
+        self._analysis_pos = 0.0
+        self._last_start = 0
+        self._ola[:] = 0.0
+        self._first_frame = True
+        self._resampler.reset()
+
+    # ==========================
+    # 処理
+    # ==========================
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """1ブロックを処理して出力サンプルを返す（長さは入力と異なりうる）"""
+        if self.is_bypass:
+            return block
+        self._push(block.T)
+        stretched = self._stretch()
+        return self._resampler.process(stretched).T
+
+    def flush(self) -> np.ndarray:
+        """入力の終わりに呼び、処理遅延分として内部に残っているサンプルを出し切る"""
+        if self.is_bypass:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        # 無音を 1 フレーム分足すと、最後の入力サンプルを含むフレームまで分析される
+        self._push(np.zeros((self.channels, self.frame_size), dtype=np.float32))
+        stretched = self._stretch()
+        return self._resampler.process(stretched).T
+
+    def _push(self, x: np.ndarray):
+        n = x.shape[1]
+        start = int(self._analysis_pos)
+        if self._in_len + n > self._in.shape[1]:
+            # 読み終えた部分を詰める
+            remaining = self._in_len - start
+            self._in[:, :remaining] = self._in[:, start:self._in_len]
+            self._in_len = remaining
+            self._analysis_pos -= start
+            self._last_start -= start  # 位相差の計算に使う前フレームの位置も詰める
+            if self._in_len + n > self._in.shape[1]:
+                grown = np.zeros((self.channels, (self._in_len + n) * 2), dtype=np.float32)
+                grown[:, :self._in_len] = self._in[:, :self._in_len]
+                self._in = grown
+        self._in[:, self._in_len:self._in_len + n] = x
+        self._in_len += n
+
+    def _stretch(self) -> np.ndarray:
+        n = self.frame_size
+        hs = self.synthesis_hop
+        ha = hs * self.tempo / self._resampler.step  # 分析ホップ（小数）
+
+        frames = 0
+        out = self._stretched.get(0)
+
+        while int(self._analysis_pos) + n <= self._in_len:
+            start = int(self._analysis_pos)
+            np.multiply(self._in[:, start:start + n], self._window, out=self._frame)
+            spectrum = np.fft.rfft(self._frame, axis=1)
+            magnitude = np.abs(spectrum)
+            phase = np.angle(spectrum)
+
+            if self._first_frame:
+                self._synth_phase[:] = phase
+                self._first_frame = False
+                actual_hop = ha
+            else:
+                actual_hop = start - self._last_start or ha
+                delta = phase - self._prev_phase - self._omega * actual_hop
+                delta -= 2.0 * np.pi * np.round(delta / (2.0 * np.pi))
+                self._synth_phase += (self._omega + delta / actual_hop) * hs
+            self._prev_phase[:] = phase
+            self._last_start = start
+
+            frame = np.fft.irfft(magnitude * np.exp(1j * self._synth_phase), n, axis=1)
+            self._ola += (frame * self._window).astype(np.float32)
+
+            # 確定した先頭 hs サンプルを出力し、OLAバッファをずらす
+            out = self._stretched.get((frames + 1) * hs)
+            out[:, frames * hs:(frames + 1) * hs] = self._ola[:, :hs] * self._ola_gain
+            self._ola[:, :-hs] = self._ola[:, hs:]
+            self._ola[:, -hs:] = 0.0
+            frames += 1
+            self._analysis_pos += ha
+
+        return out[:, :frames * hs]
+
+
+def render_file(input_path: str, output_path: str, semitones: float = 0.0,
+                tempo: float = 1.0, block_size: int = 1024) -> Dict[str, Any]:
+    """WAVファイルをブロック単位で処理して書き出し、処理速度を返す（ベンチマーク用）"""
+    from audio.wavfile import read_wav, write_wav
+
+    data, rate = read_wav(input_path, mono=False)
+    processor = KeyTempoProcessor(rate, data.shape[1])
+    processor.set_key(semitones)
+    processor.set_tempo(tempo)
+
+    chunks = []
+    worst_block_ms = 0.0
+    started = time.perf_counter()
+    for offset in range(0, len(data), block_size):
+        t0 = time.perf_counter()
+        out = processor.process(data[offset:offset + block_size])
+        worst_block_ms = max(worst_block_ms, (time.perf_counter() - t0) * 1000.0)
+        chunks.append(out.copy())
+    chunks.append(processor.flush().copy())
+    elapsed = time.perf_counter() - started
+
+    rendered = np.concatenate(chunks) if chunks else np.zeros((0, data.shape[1]), np.float32)
+    write_wav(output_path, rendered, rate)
+
+    audio_seconds = len(data) / rate
+    return {
+        "input_seconds": round(audio_seconds, 3),
+        "output_seconds": round(len(rendered) / rate, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "realtime_factor": round(audio_seconds / elapsed, 1) if elapsed > 0 else None,
+        "block_ms": round(block_size * 1000.0 / rate, 3),
+        "worst_block_ms": round(worst_block_ms, 3),
+        "latency_ms": round(processor.latency_samples * 1000.0 / rate, 1),
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="キー・テンポ変更をWAVファイルに適用します")
+    parser.add_argument("input", help="入力WAVファイル")
+    parser.add_argument("output", help="出力WAVファイル")
+    parser.add_argument("--key", type=float, default=0.0, help="キー（半音単位、例: +2 / -3）")
+    parser.add_argument("--tempo", type=float, default=1.0, help="テンポ倍率（例: 1.1）")
+    parser.add_argument("--block-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    result = render_file(args.input, args.output, args.key, args.tempo, args.block_size)
+    print(f"入力 {result['input_seconds']} 秒 → 出力 {result['output_seconds']} 秒")
+    print(f"処理時間 {result['elapsed_seconds']} 秒（実時間比 x{result['realtime_factor']}）")
+    print(f"ブロック最大処理時間 {result['worst_block_ms']} ms（ブロック長 {result['block_ms']} ms）")
+    print(f"処理遅延 {result['latency_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
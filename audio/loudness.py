@@ -0,0 +1,277 @@
+# audio/loudness.py
+import math
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+ANALYSIS_RATE = 48000
+_FIR_LENGTH = 16384      # K特性フィルタのインパルス応答長
+_FFT_BLOCK = 65536       # 重畳加算のブロック長（_FIR_LENGTH 以上）
+_FFT_BATCH = 32          # 一度にFFTするブロック数（メモリ上限）
+_FLUSH_EVERY = 50        # 解析結果をこの件数ごとに保存（中断しても解析済みの分は残る）
+
+
+def _biquad_response(b, a, w: np.ndarray) -> np.ndarray:
+    """双二次フィルタの周波数応答 H(e^jw)"""
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+    return (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+
+
+def k_weighting_fir(rate: int = ANALYSIS_RATE, length: int = _FIR_LENGTH) -> np.ndarray:
+    """ITU-R BS.1770 の K特性フィルタ（シェルビング + RLB ハイパス）を FIR で近似"""
+    # シェルビングフィルタ
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    # RLB ハイパスフィルタ
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1.0 + k / q + k * k
+    hp_b = [1.0, -2.0, 1.0]
+    hp_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+
+    # 十分長いグリッドで周波数応答を標本化 → インパルス応答を切り出す
+    n = length * 8
+    w = 2.0 * np.pi * np.arange(n // 2 + 1) / n
+    response = _biquad_response(shelf_b, shelf_a, w) * _biquad_response(hp_b, hp_a, w)
+    return np.fft.irfft(response, n)[:length]
+
+
+class LoudnessMeter:
+    """統合ラウドネス (LUFS) の逐次計算（EBU R128 / BS.1770 のゲーティング）
+
+    push() で (サンプル数, チャンネル数) の断片を順に渡す。K特性フィルタは
+    _FFT_BLOCK ごとの重畳加算で適用し、100ms ごとのエネルギーの和だけを残す
+    （400ms ゲーティングブロックはその4つ分の和）。曲の長さによらず、
+    保持するのはフィルタ1ブロック分の信号と 100ms あたり1つの数値だけ。
+    """
+
+    def __init__(self, rate: int = ANALYSIS_RATE, channels: int = 2):
+        self.rate = rate
+        self.channels = channels
+        self.step = int(0.1 * rate)
+        self._spectrum_h = np.fft.rfft(k_weighting_fir(rate), _FFT_BLOCK * 2)
+        self._input: List[np.ndarray] = []       # フィルタ待ちの (チャンネル, サンプル)
+        self._buffered = 0
+        self._carry = np.zeros((channels, _FFT_BLOCK))   # 前のブロックの畳み込みの後半
+        self._remaining = 0                      # 出力してよい残りサンプル数（入力の総数まで）
+        self._energy = np.zeros(0)                # 100ms に満たない端数のエネルギー
+        self._steps: List[np.ndarray] = []        # 100ms ごとのエネルギーの和
+
+    def push(self, samples: np.ndarray):
+        """音声の断片を追加"""
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        if not len(samples):
+            return
+        self._input.append(samples.T.astype(np.float64))
+        self._buffered += len(samples)
+        self._remaining += len(samples)
+        if self._buffered >= _FFT_BLOCK:
+            self._filter(final=False)
+
+    def _filter(self, final: bool):
+        block = _FFT_BLOCK
+        data = np.concatenate(self._input, axis=1) if self._input else np.zeros((self.channels, 0))
+        nblocks = -(-data.shape[1] // block) if final else data.shape[1] // block
+        if final and nblocks * block > data.shape[1]:
+            data = np.pad(data, ((0, 0), (0, nblocks * block - data.shape[1])))
+        rest = data[:, nblocks * block:]
+        self._input = [rest] if rest.shape[1] else []
+        self._buffered = rest.shape[1]
+
+        for start in range(0, nblocks, _FFT_BATCH):
+            stop = min(nblocks, start + _FFT_BATCH)
+            blocks = data[:, start * block:stop * block].reshape(self.channels, stop - start, block)
+            y = np.fft.irfft(np.fft.rfft(blocks, block * 2, axis=2) * self._spectrum_h, block * 2, axis=2)
+            # 各ブロックの前半はそのブロック、後半は次のブロックに加算
+            out = y[:, :, :block].copy()
+            out[:, 1:] += y[:, :-1, block:]
+            out[:, 0] += self._carry
+            self._carry = y[:, -1, block:]
+            self._accumulate(out.reshape(self.channels, -1))
+
+    def _accumulate(self, weighted: np.ndarray):
+        weighted = weighted[:, :self._remaining]
+        self._remaining -= weighted.shape[1]
+        # L/R/C のチャンネル重みは 1.0（サラウンドは対象外）
+        energy = np.concatenate([self._energy, (weighted * weighted).sum(axis=0)])
+        whole = len(energy) // self.step * self.step
+        if whole:
+            self._steps.append(energy[:whole].reshape(-1, self.step).sum(axis=1))
+        self._energy = energy[whole:]
+
+    def result(self) -> Optional[float]:
+        """統合ラウドネス (LUFS)。無音のみ・400ms 未満の場合は None"""
+        self._filter(final=True)
+        steps = np.concatenate(self._steps) if self._steps else np.zeros(0)
+        if len(steps) < 4:
+            return None
+        # 400ms ブロック（75% 重なり = 100ms ステップ）の平均二乗
+        z = np.convolve(steps, np.ones(4), mode="valid") / (4 * self.step)
+
+        with np.errstate(divide='ignore'):
+            block_loudness = -0.691 + 10.0 * np.log10(z)
+
+        # 絶対ゲート -70 LUFS
+        gated = z[block_loudness > -70.0]
+        if gated.size == 0:
+            return None
+        # 相対ゲート（絶対ゲート通過ブロックの平均 -10 LU）
+        relative = -0.691 + 10.0 * math.log10(gated.mean()) - 10.0
+        final = z[(block_loudness > -70.0) & (block_loudness > relative)]
+        if final.size == 0:
+            return None
+        return -0.691 + 10.0 * math.log10(final.mean())
+
+
+def integrated_loudness(samples: np.ndarray, rate: int = ANALYSIS_RATE) -> Optional[float]:
+    """統合ラウドネス (LUFS) を計算
+
+    samples は (サンプル数, チャンネル数) の配列。無音のみの場合は None。
+    """
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+    meter = LoudnessMeter(rate, samples.shape[1])
+    for start in range(0, len(samples), _FFT_BLOCK):
+        meter.push(samples[start:start + _FFT_BLOCK])
+    return meter.result()
+
+
+def decode_audio(path: str, rate: int = ANALYSIS_RATE) -> Iterator[np.ndarray]:
+    """音声を (サンプル数, チャンネル数) の float32 配列の断片として順に返す
+
+    WAV 以外（またはサンプルレートが違う WAV）は ffmpeg で2チャンネルにデコードし、
+    出力を _FFT_BLOCK サンプルずつ読む（曲全体をメモリに置かない）。
+    """
+    if path.lower().endswith(".wav"):
+        from audio.wavfile import read_wav
+        data, file_rate = read_wav(path, mono=False)
+        if file_rate == rate:
+            for start in range(0, len(data), _FFT_BLOCK):
+                yield data[start:start + _FFT_BLOCK]
+            return
+        del data
+    proc = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", path, "-vn", "-ac", "2", "-ar", str(rate),
+         "-f", "f32le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        frame_bytes = 2 * 4
+        while True:
+            chunk = proc.stdout.read(_FFT_BLOCK * frame_bytes)
+            if not chunk:
+                break
+            chunk = chunk[:len(chunk) // frame_bytes * frame_bytes]
+            yield np.frombuffer(chunk, dtype='<f4').reshape(-1, 2)
+        stderr = proc.stderr.read()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, proc.args, stderr=stderr)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def analyze_file(path: str) -> Dict[str, Any]:
+    """1ファイルのラウドネスを解析（ワーカープロセスで実行）"""
+    result: Dict[str, Any] = {"path": path, "integrated_lufs": None, "error": None}
+    try:
+        st = os.stat(path)
+        result["size"] = st.st_size
+        result["mtime"] = st.st_mtime
+        meter = None
+        for chunk in decode_audio(path):
+            if meter is None:
+                meter = LoudnessMeter(ANALYSIS_RATE, chunk.shape[1])
+            meter.push(chunk)
+        result["integrated_lufs"] = meter.result() if meter else None
+    except FileNotFoundError as e:
+        result["error"] = "ffmpeg が見つかりません" if e.filename == "ffmpeg" else str(e)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        result["error"] = str(e)
+    return result
+
+
+def analyze_library(paths: List[str], store, target_lufs: float,
+                    workers: int = 0, progress=None) -> Dict[str, Any]:
+    """未解析・変更のあったファイルを全コアで解析し、再生ゲインを保存する"""
+    todo = [p for p in paths if store.needs_analysis(p)]
+    started = time.monotonic()
+    done = failed = silent = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(todo))) as pool:
+            futures = [pool.submit(analyze_file, path) for path in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["error"] is None:
+                    # 無音・短すぎるファイルもゲインなしで保存し、次回から解析し直さない
+                    lufs = result["integrated_lufs"]
+                    store.set(result["path"], result["size"], result["mtime"],
+                              lufs, None if lufs is None else target_lufs - lufs)
+                    done += 1
+                    if lufs is None:
+                        silent += 1
+                    if done % _FLUSH_EVERY == 0:
+                        store.flush()
+                else:
+                    failed += 1
+                if progress:
+                    progress(done + failed, len(todo), result)
+    store.flush()
+    return {
+        "files": len(paths),
+        "analyzed": done,
+        "silent": silent,
+        "failed": failed,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def main():
+    import argparse
+    from config import Config
+    from storage.gain_store import GainStore
+    from storage.metadata_index import MetadataIndex
+
+    parser = argparse.ArgumentParser(description="ライブラリのラウドネスを解析し、再生ゲインを保存します")
+    parser.add_argument("dirs", nargs="*", help="解析するディレクトリ（省略時は設定のライブラリ）")
+    parser.add_argument("--workers", type=int, default=0, help="解析プロセス数（0 = CPUコア数）")
+    args = parser.parse_args()
+
+    config = Config()
+    store = GainStore(config)
+    target = config.get("loudness.target_lufs", -20.0)
+    index = MetadataIndex(config)
+    paths = sorted(MetadataIndex._walk(args.dirs or index.library_dirs()))
+
+    def progress(count, total, result):
+        if result["error"]:
+            status = f"エラー: {result['error']}"
+        elif result["integrated_lufs"] is None:
+            status = "無音"
+        else:
+            status = f"{result['integrated_lufs']:.1f} LUFS"
+        print(f"[{count}/{total}] {os.path.basename(result['path'])}: {status}")
+
+    summary = analyze_library(paths, store, target, args.workers, progress)
+    print(f"{summary['files']} 件中 {summary['analyzed']} 件を解析（うち無音 {summary['silent']} 件）、"
+          f"{summary['failed']} 件失敗"
+          f"（{summary['seconds']} 秒、目標 {target} LUFS）")
+
+
+if __name__ == "__main__":
+    main()
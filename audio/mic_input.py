@@ -0,0 +1,52 @@
+# audio/mic_input.py
+from typing import Optional
+
+import numpy as np
+from PyQt6.QtCore import QObject
+from PyQt6.QtMultimedia import QAudioFormat, QAudioSource, QMediaDevices
+
+from audio.ring_buffer import RingBuffer
+
+
+class MicrophoneInput(QObject):
+    """マイク入力を RingBuffer に書き込む（Float32 / モノラル）"""
+
+    def __init__(self, buffer: RingBuffer, sample_rate: int = 48000, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.sample_rate = sample_rate
+        self._source: Optional[QAudioSource] = None
+        self._device = None
+
+    def start(self) -> bool:
+        """録音を開始（入力デバイスがなければ False）"""
+        device = QMediaDevices.defaultAudioInput()
+        if device.isNull():
+            print("マイク入力デバイスが見つかりません")
+            return False
+
+        fmt = QAudioFormat()
+        fmt.setSampleRate(self.sample_rate)
+        fmt.setChannelCount(1)
+        fmt.setSampleFormat(QAudioFormat.SampleFormat.Float)
+        if not device.isFormatSupported(fmt):
+            print("マイク入力が Float32 / モノラルに対応していません")
+            return False
+
+        self._source = QAudioSource(device, fmt, self)
+        self._device = self._source.start()
+        self._device.readyRead.connect(self._on_ready_read)
+        return True
+
+    def stop(self):
+        """録音を停止"""
+        if self._source is not None:
+            self._source.stop()
+            self._source = None
+            self._device = None
+
+    def _on_ready_read(self):
+        data = self._device.readAll()
+        if data.isEmpty():
+            return
+        self.buffer.write(np.frombuffer(data.data(), dtype=np.float32))
@@ -0,0 +1,104 @@
+# audio/pitch.py
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+def hz_to_midi(freq: float) -> float:
+    """周波数(Hz)をMIDIノート番号（小数）に変換"""
+    return 69.0 + 12.0 * math.log2(freq / 440.0)
+
+
+def midi_to_hz(note: float) -> float:
+    """MIDIノート番号を周波数(Hz)に変換"""
+    return 440.0 * 2.0 ** ((note - 69.0) / 12.0)
+
+
+class PitchDetector:
+    """YINによる基本周波数推定（NumPyベクトル化）
+
+    差分関数は FFT による自己相関から一括計算するため、
+    ブロックあたりの計算量は O(N log N)。
+    """
+
+    def __init__(self, sample_rate: int, block_size: int = 2048,
+                 fmin: float = 70.0, fmax: float = 1100.0,
+                 threshold: float = 0.15, silence_rms: float = 0.01):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.threshold = threshold
+        self.silence_rms = silence_rms
+
+        self.tau_min = max(2, int(sample_rate / fmax))
+        self.tau_max = min(block_size // 2, int(sample_rate / fmin) + 1)
+        self.window = block_size - self.tau_max
+        if self.window <= self.tau_max:
+            raise ValueError("block_size が fmin に対して短すぎます")
+
+        # FFT長（線形相関になるよう2倍以上の2の冪）
+        self._fft_size = 1 << (block_size + self.window - 1).bit_length()
+
+        # 作業用バッファ（ブロックごとに再利用）
+        self._squares = np.empty(block_size, dtype=np.float64)
+        self._cumsum = np.empty(block_size + 1, dtype=np.float64)
+        self._cumsum[0] = 0.0
+        self._diff = np.empty(self.tau_max, dtype=np.float64)
+        self._cmnd = np.empty(self.tau_max, dtype=np.float64)
+        self._taus = np.arange(1, self.tau_max, dtype=np.float64)
+
+    def detect(self, block: np.ndarray) -> Tuple[float, float]:
+        """1ブロックの基本周波数を推定し (Hz, 信頼度 0～1) を返す（無声は 0.0）"""
+        x = block[:self.block_size].astype(np.float64, copy=False)
+        np.multiply(x, x, out=self._squares)
+        if math.sqrt(self._squares.mean()) < self.silence_rms:
+            return 0.0, 0.0
+
+        w = self.window
+        tau_max = self.tau_max
+
+        # r(tau) = sum_{j<W} x[j] x[j+tau]
+        spec_x = np.fft.rfft(x, self._fft_size)
+        spec_w = np.fft.rfft(x[:w], self._fft_size)
+        corr = np.fft.irfft(spec_x * np.conj(spec_w), self._fft_size)[:tau_max]
+
+        # E(tau) = sum_{j<W} x[j+tau]^2 を累積和から求める
+        np.cumsum(self._squares, out=self._cumsum[1:])
+        energy = self._cumsum[w:w + tau_max] - self._cumsum[:tau_max]
+
+        # d(tau) = E(0) + E(tau) - 2 r(tau)
+        diff = self._diff
+        np.subtract(energy[0] + energy, 2.0 * corr, out=diff)
+        diff[0] = 0.0
+
+        # 累積平均正規化差分 d'(tau)
+        cmnd = self._cmnd
+        running = np.cumsum(diff[1:])
+        np.maximum(running, 1e-12, out=running)
+        cmnd[0] = 1.0
+        np.divide(diff[1:] * self._taus, running, out=cmnd[1:])
+
+        # 閾値を下回る最初の谷
+        search = cmnd[self.tau_min:]
+        below = np.flatnonzero(search < self.threshold)
+        if below.size:
+            tau = int(below[0]) + self.tau_min
+            while tau + 1 < tau_max and cmnd[tau + 1] < cmnd[tau]:
+                tau += 1
+        else:
+            tau = int(np.argmin(search)) + self.tau_min
+            if cmnd[tau] > 0.5:
+                return 0.0, 0.0
+
+        # 放物線補間
+        if 0 < tau < tau_max - 1:
+            s0, s1, s2 = cmnd[tau - 1], cmnd[tau], cmnd[tau + 1]
+            denom = s0 + s2 - 2.0 * s1
+            shift = 0.5 * (s0 - s2) / denom if denom != 0 else 0.0
+        else:
+            shift = 0.0
+        period = tau + shift
+        if period <= 0:
+            return 0.0, 0.0
+        confidence = float(max(0.0, min(1.0, 1.0 - cmnd[tau])))
+        return self.sample_rate / period, confidence
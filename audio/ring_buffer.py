@@ -0,0 +1,90 @@
+# audio/ring_buffer.py
+from threading import Condition
+from typing import Optional
+
+import numpy as np
+
+
+class RingBuffer:
+    """固定長のサンプルリングバッファ（事前確保、スレッドセーフ）
+
+    録音側スレッドが write() で書き込み、解析側スレッドが
+    read_into() で固定サイズのブロックを取り出す。
+    容量を超えた場合は古いサンプルを捨てる。
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.float32):
+        self.capacity = capacity
+        self.channels = channels
+        shape = (capacity,) if channels == 1 else (capacity, channels)
+        self._data = np.zeros(shape, dtype=dtype)
+        self._read_pos = 0
+        self._write_pos = 0
+        self._size = 0
+        self._dropped = 0
+        self._closed = False
+        self._cond = Condition()
+
+    @property
+    def available(self) -> int:
+        """読み出し可能なサンプル数"""
+        with self._cond:
+            return self._size
+
+    @property
+    def dropped(self) -> int:
+        """溢れて捨てたサンプル数（累計）"""
+        with self._cond:
+            return self._dropped
+
+    def write(self, samples: np.ndarray):
+        """サンプルを書き込む"""
+        n = len(samples)
+        if n == 0:
+            return
+        with self._cond:
+            if n > self.capacity:
+                # バッファより長い入力は末尾だけ残す
+                self._dropped += n - self.capacity
+                samples = samples[-self.capacity:]
+                n = self.capacity
+            overflow = self._size + n - self.capacity
+            if overflow > 0:
+                self._read_pos = (self._read_pos + overflow) % self.capacity
+                self._size -= overflow
+                self._dropped += overflow
+
+            first = min(n, self.capacity - self._write_pos)
+            self._data[self._write_pos:self._write_pos + first] = samples[:first]
+            if first < n:
+                self._data[:n - first] = samples[first:]
+            self._write_pos = (self._write_pos + n) % self.capacity
+            self._size += n
+            self._cond.notify_all()
+
+    def read_into(self, out: np.ndarray, timeout: Optional[float] = None) -> bool:
+        """out と同じ長さのサンプルを読み出す（揃わなければ False）"""
+        n = len(out)
+        with self._cond:
+            if timeout is not None and self._size < n and not self._closed:
+                self._cond.wait_for(lambda: self._size >= n or self._closed, timeout)
+            if self._size < n:
+                return False
+            first = min(n, self.capacity - self._read_pos)
+            out[:first] = self._data[self._read_pos:self._read_pos + first]
+            if first < n:
+                out[first:] = self._data[:n - first]
+            self._read_pos = (self._read_pos + n) % self.capacity
+            self._size -= n
+            return True
+
+    def clear(self):
+        """バッファを空にする"""
+        with self._cond:
+            self._read_pos = self._write_pos = self._size = 0
+
+    def close(self):
+        """待機中の読み出しを解除"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
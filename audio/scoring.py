@@ -0,0 +1,269 @@
+# audio/scoring.py
+import json
+import os
+import time
+from bisect import bisect_right
+from threading import Thread, Event, Lock
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from audio.pitch import PitchDetector, hz_to_midi
+from audio.ring_buffer import RingBuffer
+from utils.metrics import metrics
+
+
+MELODY_SUFFIX = ".melody.json"
+
+
+def find_melody_file(media_path: str) -> Optional[str]:
+    """動画ファイルと同名のガイドメロディ（曲名.melody.json）を探す"""
+    candidate = os.path.splitext(media_path)[0] + MELODY_SUFFIX
+    return candidate if os.path.isfile(candidate) else None
+
+
+class ReferenceMelody:
+    """採点用のガイドメロディ（配列ベース）
+
+    ファイル形式(JSON):
+        {"notes": [[開始ms, 終了ms, MIDIノート番号, フレーズ番号], ...]}
+    フレーズ番号を省略した場合は、音符間の休符で自動的に区切る。
+    """
+
+    PHRASE_GAP_MS = 800
+
+    def __init__(self, notes: List[List[float]]):
+        notes = sorted(notes, key=lambda n: n[0])
+        self.start = np.array([n[0] for n in notes], dtype=np.int64)
+        self.end = np.array([n[1] for n in notes], dtype=np.int64)
+        self.note = np.array([n[2] for n in notes], dtype=np.float64)
+
+        if notes and all(len(n) > 3 for n in notes):
+            phrases = [int(n[3]) for n in notes]
+        else:
+            phrases = []
+            phrase = 0
+            for i in range(len(notes)):
+                if i > 0 and self.start[i] - self.end[i - 1] >= self.PHRASE_GAP_MS:
+                    phrase += 1
+                phrases.append(phrase)
+        self.phrase = np.array(phrases, dtype=np.int64)
+        self.phrase_count = int(self.phrase.max()) + 1 if len(notes) else 0
+
+        # bisect 用の Python リスト（ブロックごとの検索を軽くする）
+        self._start_list = self.start.tolist()
+
+    @classmethod
+    def load(cls, path: str) -> "ReferenceMelody":
+        """JSONファイルから読み込む"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        notes = data["notes"] if isinstance(data, dict) else data
+        normalized = []
+        for n in notes:
+            if isinstance(n, dict):
+                row = [n["start"], n["end"], n["note"]]
+                if "phrase" in n:
+                    row.append(n["phrase"])
+                normalized.append(row)
+            else:
+                normalized.append(list(n))
+        return cls(normalized)
+
+    def __len__(self) -> int:
+        return len(self._start_list)
+
+    def note_at(self, position_ms: float) -> int:
+        """再生位置で鳴っている音符のインデックス（休符は -1）"""
+        i = bisect_right(self._start_list, position_ms) - 1
+        if i >= 0 and position_ms < self.end[i]:
+            return i
+        return -1
+
+
+class ScoringEngine:
+    """ブロック単位の音程採点エンジン
+
+    各ブロックの音高を推定し、その時刻のガイドメロディとの
+    音程差（オクターブ違いは同一視）からブロックごとの得点を付け、
+    フレーズ単位・全体で集計する。
+    """
+
+    FULL_CREDIT_SEMITONES = 0.5   # この差以内は満点
+    ZERO_CREDIT_SEMITONES = 2.0   # この差以上は0点
+
+    def __init__(self, melody: ReferenceMelody, sample_rate: int,
+                 block_size: int = 2048, latency_ms: float = 0.0):
+        self.melody = melody
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.latency_ms = latency_ms
+        self.key_offset = 0.0  # キー変更（半音）。ガイドメロディをこの分ずらして比べる
+        self.block_ms = block_size * 1000.0 / sample_rate
+        self.detector = PitchDetector(sample_rate, block_size)
+
+        self._lock = Lock()
+        self._phrase_credit = np.zeros(melody.phrase_count, dtype=np.float64)
+        self._phrase_blocks = np.zeros(melody.phrase_count, dtype=np.int64)
+
+        # ブロック処理時間（ブロック長の1/4を予算とする）
+        self.block_stats = metrics.timing("scoring.block", budget_ms=self.block_ms / 4)
+
+    def process_block(self, block: np.ndarray, position_ms: float) -> Optional[float]:
+        """1ブロックを採点（position_ms はブロック先頭の曲内時刻）
+
+        休符区間なら None、それ以外は 0.0～1.0 の得点を返す。
+        """
+        with self.block_stats.measure():
+            center = position_ms + self.block_ms / 2 - self.latency_ms
+            index = self.melody.note_at(center)
+            if index < 0:
+                return None
+
+            freq, _confidence = self.detector.detect(block)
+            credit = 0.0
+            if freq > 0:
+                error = hz_to_midi(freq) - self.melody.note[index] - self.key_offset
+                error = abs((error + 6.0) % 12.0 - 6.0)
+                if error <= self.FULL_CREDIT_SEMITONES:
+                    credit = 1.0
+                elif error < self.ZERO_CREDIT_SEMITONES:
+                    credit = (self.ZERO_CREDIT_SEMITONES - error) / \
+                             (self.ZERO_CREDIT_SEMITONES - self.FULL_CREDIT_SEMITONES)
+
+            phrase = self.melody.phrase[index]
+            with self._lock:
+                self._phrase_credit[phrase] += credit
+                self._phrase_blocks[phrase] += 1
+            return credit
+
+    def phrase_scores(self) -> List[Optional[float]]:
+        """フレーズごとの得点（0～100、未到達のフレーズは None）"""
+        with self._lock:
+            credit = self._phrase_credit.copy()
+            blocks = self._phrase_blocks.copy()
+        return [round(100.0 * float(c) / int(b), 2) if b else None for c, b in zip(credit, blocks)]
+
+    def total_score(self) -> float:
+        """全体の得点（0～100）"""
+        with self._lock:
+            blocks = int(self._phrase_blocks.sum())
+            credit = float(self._phrase_credit.sum())
+        return round(100.0 * credit / blocks, 2) if blocks else 0.0
+
+    def reset(self):
+        """集計をリセット"""
+        with self._lock:
+            self._phrase_credit[:] = 0.0
+            self._phrase_blocks[:] = 0
+
+
+class LiveScorer:
+    """マイク入力のリングバッファからブロックを取り出して採点するワーカー"""
+
+    def __init__(self, engine: ScoringEngine, buffer_seconds: float = 2.0):
+        self.engine = engine
+        self.buffer = RingBuffer(int(engine.sample_rate * buffer_seconds))
+        self._block = np.zeros(engine.block_size, dtype=np.float32)
+        self._position_ms = 0.0
+        self.rate = 1.0  # テンポ倍率（実時間1ブロックあたりに曲内時刻が進む割合）
+        self._position_lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self, position_ms: float = 0.0):
+        """採点を開始"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.sync(position_ms)
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="scoring", daemon=True)
+        self._thread.start()
+
+    def sync(self, position_ms: float):
+        """曲内時刻を合わせ直す（シーク時など）"""
+        with self._position_lock:
+            self.buffer.clear()
+            self._position_ms = position_ms
+
+    @property
+    def position_ms(self) -> float:
+        """次に採点するブロックの曲内時刻"""
+        with self._position_lock:
+            return self._position_ms
+
+    def stop(self):
+        """採点を停止"""
+        self._stop.set()
+        self.buffer.close()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.buffer.read_into(self._block, timeout=0.1):
+                continue
+            with self._position_lock:
+                position = self._position_ms
+                self._position_ms += self.engine.block_ms * self.rate
+            self.engine.process_block(self._block, position)
+
+
+def score_wav(wav_path: str, melody_path: str, block_size: int = 2048,
+              callback_size: int = 512) -> Dict[str, Any]:
+    """WAVファイルをオフラインで採点し、結果と処理時間を返す
+
+    録音時と同じく callback_size ごとにリングバッファへ書き込み、
+    block_size ごとに取り出して採点する。
+    """
+    from audio.wavfile import read_wav
+
+    samples, rate = read_wav(wav_path)
+    melody = ReferenceMelody.load(melody_path)
+    engine = ScoringEngine(melody, rate, block_size)
+    engine.block_stats.reset()
+    ring = RingBuffer(block_size * 4)
+    block = np.zeros(block_size, dtype=np.float32)
+
+    position_ms = 0.0
+    started = time.perf_counter()
+    for offset in range(0, len(samples), callback_size):
+        ring.write(samples[offset:offset + callback_size])
+        while ring.read_into(block):
+            engine.process_block(block, position_ms)
+            position_ms += engine.block_ms
+    elapsed = time.perf_counter() - started
+
+    audio_seconds = len(samples) / rate
+    return {
+        "phrase_scores": engine.phrase_scores(),
+        "total_score": engine.total_score(),
+        "block_ms": round(engine.block_ms, 3),
+        "block_stats": engine.block_stats.summary(),
+        "audio_seconds": round(audio_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "realtime_factor": round(audio_seconds / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WAVファイルをオフラインで採点します")
+    parser.add_argument("wav", help="歌声のWAVファイル")
+    parser.add_argument("melody", help="ガイドメロディ(JSON)")
+    parser.add_argument("--block-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    result = score_wav(args.wav, args.melody, args.block_size)
+    for i, score in enumerate(result["phrase_scores"]):
+        print(f"フレーズ{i + 1}: {'-' if score is None else f'{score:.2f}'}")
+    print(f"総合得点: {result['total_score']:.2f}")
+    stats = result["block_stats"]
+    print(f"ブロック処理時間: 平均 {stats['avg_ms']:.3f} ms / p95 {stats['p95_ms']:.3f} ms "
+          f"/ 最大 {stats['max_ms']:.3f} ms（ブロック長 {result['block_ms']:.1f} ms）")
+    print(f"実時間比: x{result['realtime_factor']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# audio/wavfile.py
+import wave
+from typing import Tuple
+
+import numpy as np
+
+
+def read_wav(path: str, mono: bool = True) -> Tuple[np.ndarray, int]:
+    """WAVファイルを読み込み、(-1.0～1.0 の float32 配列, サンプルレート) を返す
+
+    mono=False の場合は (サンプル数, チャンネル数) の2次元配列を返す。
+    """
+    with wave.open(path, 'rb') as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        data = ints.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"未対応のサンプル幅です: {width * 8}bit")
+
+    data = data.reshape(-1, channels)
+    if mono:
+        return data.mean(axis=1).astype(np.float32), rate
+    return data, rate
+
+
+def write_wav(path: str, data: np.ndarray, rate: int):
+    """float配列（-1.0～1.0）を16bit PCMのWAVファイルに書き込む"""
+    if data.ndim == 1:
+        data = data[:, np.newaxis]
+    pcm = (np.clip(data, -1.0, 1.0) * 32767.0).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(data.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
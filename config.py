@@ -1,7 +1,46 @@
 # config.py
+import copy
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Set
+
+
+class ChangeSet:
+    """設定の変更点（適用前後の設定の差分）
+
+    変更のあったキーをドット記法（"server.port"）で持ち、設定を使う側は
+    touches() で自分の担当の項目が変わったときだけ反映し直す。
+    """
+
+    def __init__(self, old: Dict[str, Any], new: Dict[str, Any]):
+        self.old = old
+        self.new = new
+        self.keys: Set[str] = set()
+        self._diff(old, new, "")
+
+    def _diff(self, old: Any, new: Any, prefix: str):
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key in set(old) | set(new):
+                self._diff(old.get(key), new.get(key), f"{prefix}{key}.")
+        elif old != new:
+            self.keys.add(prefix[:-1])
+
+    @property
+    def sections(self) -> Set[str]:
+        """変更のあったセクション（"font"、"server" など）"""
+        return {key.split(".", 1)[0] for key in self.keys}
+
+    def touches(self, *prefixes: str) -> bool:
+        """いずれかの項目（またはその下の項目）が変わったかどうか"""
+        return any(key == prefix or key.startswith(prefix + ".")
+                   for key in self.keys for prefix in prefixes)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def __repr__(self) -> str:
+        return f"ChangeSet({sorted(self.keys)})"
+
 
 class Config:
     """設定管理クラス"""
@@ -25,7 +64,14 @@ class Config:
         "server": {
             "port": 8080,
             "host": "0.0.0.0",  # すべてのインターフェースでリッスン
-            "enabled": True
+            "enabled": True,
+            "mode": "thread",   # "thread" = Commander 内で実行、"process" = 別プロセスで実行（GIL を分離）
+            "event_log_size": 1024,  # 再接続時に差分で返せるイベント数（超えたら全体を返す）
+            "record": {
+                "enabled": False,   # APIへのリクエストを記録（python -m server.traffic_replay で再生）
+                "path": "cache/traffic/api-%Y%m%d-%H%M%S.jsonl.gz",  # strftime 形式
+                "max_body_bytes": 65536  # 記録するリクエストボディの上限
+            }
         },
         "debug": {
             "enabled": True,       # デバッグモードを有効化（デフォルトでON）
@@ -42,7 +88,97 @@ class Config:
             "mode": "local",        # "local" or "youtube"
             "local_dir": "videos",  # ローカル再生用ディレクトリ
             "youtube_channel": "",  # YouTubeチャンネル名
-            "volume": 80            # 音量 0～100
+            "volume": 80,           # 音量 0～100
+            "schedule": {
+                "lookahead": 5,     # 先読みするプレイリストの本数
+                "no_repeat": 5,     # 直近この本数と同じ動画は避ける
+                "shop_interval": 0, # 通常動画この本数ごとにshop動画を挟む（0 = 一巡ごと）
+                "weights": {},      # ファイル名 → 重み
+                "segments": []      # 時間帯ごとの対象動画と重み
+            },
+            "state_path": "cache/attract_state.json"  # 再生位置の保存先（再起動後も続きから再生）
+        },
+        "songs": {
+            "local_dir": "songs",   # 曲ファイルのディレクトリ
+            "library_roots": [],    # local_dir のほかに曲ファイルを置くディレクトリ（この外のファイルは再生しない）
+            "volume": 80,           # 音量 0～100
+            "intro_ms": 4000,       # 曲紹介（タイトル表示）の時間
+            "interlude_ms": 1000    # 予約がない場合にアトラクトへ戻るまでの時間
+        },
+        "prefetch": {
+            "enabled": True,
+            "depth": 3,             # 先読みする予約曲数
+            "read_ahead_mb": 64,    # 1曲あたりの先読みサイズ上限 (MB)
+            "read_ahead_seconds": 60,  # ビットレートが分かる場合は先頭この秒数分だけ読む
+            "bandwidth_mb_s": 30    # 先読みの帯域上限 (MB/s)
+        },
+        "preview": {
+            "enabled": True,        # 映像を副画面・MJPEG プレビュー（/api/preview.mjpg）に配る
+            "monitors": 0,          # 起動時に開く副画面（別ウィンドウ）の数
+            "width": 480,           # プレビューの幅 (px)
+            "fps": 5,               # プレビューのフレームレート上限
+            "quality": 70           # JPEG の品質 (0-100)
+        },
+        "glyph_warmup": {
+            "enabled": True,        # 予約曲の曲名・歌詞の文字を表示前に描画しておく
+            "max_glyphs": 20000,    # 温めた (フォント, 文字) を覚えておく上限
+            "budget_ms": 2.0        # UIスレッドの空き時間1回あたりの描画時間の上限 (ms)
+        },
+        "scoring": {
+            "enabled": True,        # 曲名.melody.json がある曲をマイク入力で採点する
+            "block_size": 2048,     # 採点ブロックのサンプル数（48kHz）
+            "latency_ms": 0.0       # マイク入力の遅延の補正 (ms)
+        },
+        "media_cache": {
+            "enabled": False,       # NAS上のライブラリをローカルにキャッシュする
+            "dir": "cache/media",   # キャッシュディレクトリ（ローカルSSD）
+            "budget_gb": 50,        # キャッシュ容量上限 (GB)
+            "policy": "lru"         # 削除方針 "lru" or "lfu"
+        },
+        "catalog": {
+            "dir": "cache/catalog",  # 楽曲カタログ（python -m storage.catalog で取り込み）
+            "keep_versions": 2      # 残しておく版の数（公開中を含む、リモートへの差分はこの範囲で作る）
+        },
+        "remote": {
+            "enabled": True,        # リモート UI（/remote/）を APIサーバーから配る
+            "dir": ""               # UI のファイルのディレクトリ（空 = 同梱の web/）
+        },
+        "history": {
+            "enabled": True,        # 演奏履歴を記録してランキングを集計
+            "dir": "cache/history", # 部屋ごとのログ（共有ディレクトリなら全部屋のランキング）
+            "room": "",             # 部屋名（空 = "default"）
+            "top_n": 100,           # ランキングで保持する曲数
+            "day_start_hour": 5     # 「今日」の区切り（時）
+        },
+        "recommend": {
+            "enabled": True,        # 「次に歌われた曲」のおすすめ（演奏履歴から）
+            "half_life_days": 30,   # 古い組の重みが半分になる日数
+            "session_gap_min": 30,  # これ以上間が空いたら続けて歌われたとみなさない
+            "max_neighbors": 50,    # 1曲あたりに保持するおすすめ候補の数
+            "max_pairs": 2000000    # 保持する組の総数の上限
+        },
+        "metadata": {
+            "enabled": True,        # 起動時にライブラリのメタデータ索引を更新
+            "db_path": "cache/metadata.db",
+            "workers": 0            # 解析プロセス数（0 = CPUコア数）
+        },
+        "watchdog": {
+            "enabled": True,        # UIスレッドの停止を検知してスタックを記録
+            "interval_ms": 100,     # 心拍の間隔
+            "threshold_ms": 500,    # これ以上止まったら停止とみなす
+            "report_interval_s": 30 # スタックの出力は最大この間隔に1回
+        },
+        "loudness": {
+            "enabled": True,        # 解析済みのファイルごとのゲインで音量を揃える
+            "db_path": "cache/loudness.db",
+            "target_lufs": -20.0,   # 目標ラウドネス（python -m audio.loudness で解析）
+            "max_boost_db": 6.0     # 小さいファイルを持ち上げる上限 (dB)
+        },
+        "lyrics": {
+            "font_size": 48,        # 歌詞フォントサイズ (pt)
+            "ruby_size": 20,        # ふりがなフォントサイズ (pt)
+            "outline_width": 4,     # 縁取りの太さ (px)
+            "lead_ms": 3000         # 次の行を先行表示する時間 (ms)
         }
     }
     
@@ -57,15 +193,15 @@ class Config:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                     # デフォルト設定とマージ（不足しているキーを補完）
-                    merged = self._merge_dict(self.DEFAULT_CONFIG.copy(), config)
+                    merged = self._merge_dict(copy.deepcopy(self.DEFAULT_CONFIG), config)
                     return merged
             except Exception as e:
                 print(f"設定ファイルの読み込みエラー: {e}")
-                return self.DEFAULT_CONFIG.copy()
+                return copy.deepcopy(self.DEFAULT_CONFIG)
         else:
             # 設定ファイルが存在しない場合はデフォルト設定を保存
-            self._save_config(self.DEFAULT_CONFIG.copy())
-            return self.DEFAULT_CONFIG.copy()
+            self._save_config(copy.deepcopy(self.DEFAULT_CONFIG))
+            return copy.deepcopy(self.DEFAULT_CONFIG)
     
     def _merge_dict(self, default: Dict, user: Dict) -> Dict:
         """デフォルト設定とユーザー設定をマージ"""
@@ -110,14 +246,24 @@ class Config:
         """現在の設定をファイルに保存"""
         self._save_config(self._config)
     
-    def reset_to_default(self):
-        """デフォルト設定にリセット"""
-        self._config = self.DEFAULT_CONFIG.copy()
+    def apply(self, new_config: Dict[str, Any]) -> ChangeSet:
+        """設定を丸ごと置き換えて保存し、変更点を返す"""
+        changes = ChangeSet(self._config, new_config)
+        self._config = copy.deepcopy(new_config)
+        if changes:
+            self.save()
+        return changes
+    
+    def reset_to_default(self) -> ChangeSet:
+        """デフォルト設定にリセット（変更点を返す）"""
+        changes = ChangeSet(self._config, self.DEFAULT_CONFIG)
+        self._config = copy.deepcopy(self.DEFAULT_CONFIG)
         self.save()
+        return changes
     
     def get_all(self) -> Dict[str, Any]:
-        """全設定を取得"""
-        return self._config.copy()
+        """全設定を取得（複製。書き換えても元の設定には影響しない）"""
+        return copy.deepcopy(self._config)
     
     # -------------------------------
     # ウィンドウサイズ取得用のユーティリティ
@@ -2,25 +2,55 @@
 import sys
 import os
 import traceback
+
+# ヘッドレスモード（--headless）: オフスクリーン描画 + 擬似再生バックエンド + 仮想時計
+# QTimer を仮想時計に差し替えるため、Qt・再生関連のモジュールより先に準備する
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    from utils.headless import prepare_headless
+    prepare_headless()
+
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QMessageBox
 from PyQt6.QtCore import Qt, QTimer, QUrl
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PyQt6.QtMultimediaWidgets import QVideoWidget
 
 from ui.attract import PyKaraAttract
+from ui.glyph_warmer import GlyphWarmer
 from config import Config
+from server.api_process import APIProcess
+from server.api_server import APIServer
+from server.event_log import EventLog
 from server.selection_manager import SelectionManager
+from storage.play_history import PlayHistory
+from player import media_backend
+from player.controller import PlaybackController
+from player.frame_fanout import FrameFanout
+from player.prefetch import MediaPrefetcher
+from player.song_files import resolve_song_file
+from storage.gain_store import GainStore
+from storage.media_cache import MediaCache
+from storage.metadata_index import MetadataIndex
 from utils.logger import DebugLogger
+from utils.watchdog import UiStallWatchdog
 
 
 def main():
     global app
     config = Config()
+    simulation = None
+    if HEADLESS:
+        from utils.headless import HeadlessSimulation
+        simulation = HeadlessSimulation(config)
+        simulation.configure()
     logger = DebugLogger(config)
     logger.info("PyKaraを起動しています...")
 
     app = QApplication(sys.argv)
 
+    # UIスレッドの停止検知
+    if config.get("watchdog.enabled", True):
+        watchdog = UiStallWatchdog(config, logger, app)
+        watchdog.start()
+
     width, height = 1920, 1080
     main_window = QMainWindow()
     main_window.setWindowTitle("PyKara - 16:9 Fixed Window")
@@ -29,6 +59,80 @@ def main():
 
     selection_manager = SelectionManager()
 
+    # 予約・再生状態の変更イベント（リモートの再接続時は差分だけを返す）
+    event_log = EventLog(config)
+    event_log.attach(selection_manager)
+    # 演奏履歴（ランキング）
+    play_history = None
+    if config.get("history.enabled", True):
+        play_history = PlayHistory(config, logger)
+
+    # 映像フレームの配信（副画面・MJPEG プレビュー）
+    frame_fanout = None
+    if config.get("preview.enabled", True):
+        frame_fanout = FrameFanout(config, logger)
+
+    api_server = None
+    server_mode = config.get("server.mode", "thread")
+
+    def create_api_server():
+        if server_mode == "process":
+            return APIProcess(selection_manager, config, event_log, logger)
+        return APIServer(selection_manager, config, event_log, play_history,
+                         preview=frame_fanout.encoder if frame_fanout is not None else None)
+
+    if config.get("server.enabled", True):
+        api_server = create_api_server()
+        api_server.start()
+
+    def apply_server_settings(changes):
+        """設定ダイアログでのサーバー設定の変更を反映（再起動せずに待ち受けをやり直す）"""
+        nonlocal api_server
+        if changes is not None and not changes.touches("server"):
+            return
+        if changes is not None and changes.touches("server.mode"):
+            logger.warning("server.mode の変更は再起動後に反映されます")
+        if not config.get("server.enabled", True):
+            if api_server is not None:
+                api_server.shutdown()
+            return
+        if api_server is None:
+            api_server = create_api_server()
+            api_server.start()
+        elif changes is None or changes.touches("server.enabled", "server.host", "server.port"):
+            api_server.rebind()
+
+    # NAS上のライブラリのローカルキャッシュ
+    media_cache = None
+    if config.get("media_cache.enabled", False):
+        media_cache = MediaCache(config, logger)
+        media_cache.start()
+
+        def cache_reserved_song(event, entry):
+            if event == "reserved":
+                path = resolve_song_file(config, entry)
+                if path:
+                    media_cache.request(path)
+
+        selection_manager.add_listener(cache_reserved_song)
+
+    # メディアのメタデータ索引（変更のあったファイルだけ解析）
+    metadata_index = None
+    if config.get("metadata.enabled", True):
+        metadata_index = MetadataIndex(config, logger)
+        metadata_index.start()
+
+    # ファイルごとの再生ゲイン（python -m audio.loudness で事前解析）
+    gain_store = None
+    if config.get("loudness.enabled", True):
+        gain_store = GainStore(config)
+
+    # 予約曲の先読み
+    prefetcher = None
+    if config.get("prefetch.enabled", True):
+        prefetcher = MediaPrefetcher(config, selection_manager, logger, metadata_index)
+        prefetcher.start()
+
     # ----------------------------
     # 動画再生ユーティリティ（黒画面1秒挿入対応）
     # ----------------------------
@@ -37,6 +141,9 @@ def main():
         if not os.path.exists(file_path):
             on_finished()
             return
+        source_path = file_path
+        if media_cache is not None:
+            file_path = media_cache.resolve(file_path, owner=parent)
 
         def show_black(duration_ms, callback):
             black = QWidget(parent)
@@ -46,18 +153,21 @@ def main():
             QTimer.singleShot(duration_ms, lambda: (black.hide(), black.deleteLater(), callback()))
 
         def start_video():
-            video_widget = QVideoWidget(parent)
+            media = media_backend.get()
+            video_widget = media.VideoWidget(parent)
             video_widget.setGeometry(0, 0, parent.width(), parent.height())
             video_widget.show()
 
-            player = QMediaPlayer(parent)
-            audio_output = QAudioOutput(parent)
+            player = media.MediaPlayer(parent)
+            audio_output = media.AudioOutput(parent)
             volume = config.get_attract_volume()
             if isinstance(volume, str):
                 try:
                     volume = float(volume) / 100.0
                 except:
                     volume = 0.5
+            if gain_store is not None:
+                volume = gain_store.volume_for(source_path, volume)
             audio_output.setVolume(volume)
             player.setAudioOutput(audio_output)
             player.setVideoOutput(video_widget)
@@ -65,9 +175,10 @@ def main():
             player.play()
 
             def handle_status(status):
-                from PyQt6.QtMultimedia import QMediaPlayer
-                if status == QMediaPlayer.MediaStatus.EndOfMedia:
+                if status == media.MediaStatus.EndOfMedia:
                     player.stop()
+                    if media_cache is not None:
+                        media_cache.release(parent)
                     video_widget.hide()
                     video_widget.deleteLater()
                     if post_black:
@@ -87,13 +198,46 @@ def main():
     # ----------------------------
     def show_attract():
         try:
-            attract = PyKaraAttract(config, selection_manager)
+            attract = PyKaraAttract(config, selection_manager, media_cache, gain_store)
             attract.setParent(main_window)
             attract.setGeometry(0, 0, width, height)
             attract.show()
             attract.raise_()
             attract.activateWindow()
 
+            # 予約 → 演奏の再生制御
+            controller = PlaybackController(config, selection_manager, main_window, attract, logger,
+                                            prefetcher=prefetcher, media_cache=media_cache,
+                                            gain_store=gain_store)
+            attract.settings_changed.connect(controller.refresh_settings)
+            attract.settings_changed.connect(apply_server_settings)
+
+            if frame_fanout is not None:
+                if attract.video_widget is not None:
+                    frame_fanout.add_source(attract.video_widget)
+                for video_widget in controller.video_widgets():
+                    frame_fanout.add_source(video_widget)
+                frame_fanout.start()
+
+            # 予約曲の曲名・歌詞のグリフを空き時間に先に描いておく
+            if config.get("glyph_warmup.enabled", True):
+                glyph_warmer = GlyphWarmer(config, selection_manager, logger)
+                attract.overlay.glyph_warmer = glyph_warmer
+                controller.lyrics_layer.glyph_warmer = glyph_warmer
+                attract.settings_changed.connect(glyph_warmer.refresh_settings)
+                glyph_warmer.start()
+
+            def publish_playback(state):
+                status = controller.get_status()
+                event_log.set_playback(state, status["current"])
+
+            controller.state_changed.connect(publish_playback)
+            if play_history is not None:
+                controller.song_finished.connect(play_history.record)
+            publish_playback(controller.state.value)
+            if simulation is not None:
+                simulation.attach(selection_manager, controller, attract)
+
             # 終了時ED動画再生設定
             def play_ed_and_quit():
                 ed_path_mp4 = os.path.join(config.get("attract_video.local_dir", "videos"), "shop", "ed.mp4")
@@ -124,7 +268,13 @@ def main():
         # OP動画がない場合は黒画面1秒 → アトラクト表示
         QTimer.singleShot(1000, show_attract)
 
-    sys.exit(app.exec())
+    try:
+        exit_code = simulation.run(app) if simulation is not None else app.exec()
+    finally:
+        # 待ち受けを止め、APIリクエストの記録を最後まで書き出す
+        if api_server is not None:
+            api_server.stop()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# player/__init__.py
@@ -0,0 +1,303 @@
+# player/attract_scheduler.py
+import fnmatch
+import json
+import os
+import random
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+from utils import clock
+from utils.logger import warn
+
+
+class _AliasTable:
+    """重み付き抽選（Walker のエイリアス法、1回の抽選が O(1)）"""
+
+    def __init__(self, items: Sequence[str], weights: Sequence[float]):
+        self.items = list(items)
+        n = len(self.items)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def pick(self, rng: random.Random) -> str:
+        i = rng.randrange(len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+class AttractScheduler:
+    """アトラクト動画のスケジューラ（先読み用のプレイリストを生成）
+
+    通常動画は重み付きで抽選し、直近 no_repeat 本と同じ動画は避ける。
+    時間帯ごとのセグメントで対象の動画と重みを切り替え、通常動画
+    shop_interval 本ごとに shop 動画を挟む。再生位置（直近の履歴と
+    先読み済みのプレイリスト）はファイルに保存し、再起動後も続きから再生する。
+    保存は next() を呼ぶ UI スレッドではなく書き込みスレッドで行い、
+    書き込み中に進んだ分はまとめて最新の状態だけを書く。
+
+    設定例（attract_video.schedule）:
+        {
+            "lookahead": 5,
+            "no_repeat": 5,
+            "shop_interval": 0,              # 0 = 通常動画を一巡するごと
+            "weights": {"opening.mp4": 2.0},
+            "segments": [
+                {"start": "18:00", "end": "02:00",
+                 "videos": ["night_*"], "weights": {"night_bar.mp4": 3.0}}
+            ]
+        }
+    """
+
+    MAX_RETRIES = 8
+
+    def __init__(self, config: Config, main_videos: List[str], shop_videos: List[str],
+                 logger=None, rng: Optional[random.Random] = None):
+        self.config = config
+        self.logger = logger
+        self.main_videos = list(main_videos)
+        self.shop_videos = list(shop_videos)
+        self.rng = rng or random.Random()
+
+        schedule = config.get("attract_video.schedule", {}) or {}
+        self.lookahead = max(1, int(schedule.get("lookahead", 5)))
+        self.no_repeat = max(0, int(schedule.get("no_repeat", 5)))
+        self.shop_interval = int(schedule.get("shop_interval", 0)) or len(self.main_videos)
+        self.weights: Dict[str, float] = schedule.get("weights", {}) or {}
+        self.segments: List[Dict[str, Any]] = schedule.get("segments", []) or []
+        self.state_path = config.get("attract_video.state_path",
+                                     os.path.join("cache", "attract_state.json"))
+
+        self._tables: Dict[int, Optional[_AliasTable]] = {}
+        self._recent: Deque[str] = deque()
+        self._recent_set: Dict[str, int] = {}  # 動画 → 直近ウィンドウ内の出現回数
+        self._since_shop = 0
+        # (動画, セグメント番号, shop動画か)
+        self._upcoming: Deque[Tuple[str, int, bool]] = deque()
+        self._pending_shop: Deque[str] = deque(self.shop_videos)  # 最初にshop動画を再生
+
+        self._save_lock = Lock()
+        self._save_wake = Event()
+        self._unsaved: Optional[Dict[str, Any]] = None
+        self._save_thread: Optional[Thread] = None
+
+        self._load_state()
+
+    # ==========================
+    # 公開API
+    # ==========================
+    def next(self) -> Optional[str]:
+        """次に再生する動画を取り出す（プレイリストは補充される）"""
+        segment = self._current_segment()
+        # 時間帯が変わった場合は、古いセグメントで抽選した通常動画を捨てる
+        while self._upcoming and not self._upcoming[0][2] and self._upcoming[0][1] != segment:
+            self._upcoming.popleft()
+        self._fill(segment)
+        if not self._upcoming:
+            return None
+        video, _segment, _is_shop = self._upcoming.popleft()
+        self._fill(segment)
+        self._save_state()
+        return video
+
+    def peek(self, n: Optional[int] = None) -> List[str]:
+        """先読み中のプレイリスト（次に再生する順）"""
+        self._fill(self._current_segment())
+        items = [video for video, _segment, _is_shop in self._upcoming]
+        return items[:n] if n is not None else items
+
+    # ==========================
+    # プレイリスト生成
+    # ==========================
+    def _fill(self, segment: int):
+        while len(self._upcoming) < self.lookahead:
+            item = self._generate(segment)
+            if item is None:
+                break
+            self._upcoming.append(item)
+
+    def _generate(self, segment: int) -> Optional[Tuple[str, int, bool]]:
+        if self._pending_shop:
+            return (self._pending_shop.popleft(), segment, True)
+
+        video = self._pick_main(segment)
+        if video is None:
+            # 通常動画がない場合は shop 動画だけを繰り返す
+            if not self.shop_videos:
+                return None
+            self._pending_shop.extend(self.shop_videos)
+            return (self._pending_shop.popleft(), segment, True)
+        self._remember(video)
+        self._since_shop += 1
+        if self._since_shop >= self.shop_interval and self.shop_videos:
+            self._since_shop = 0
+            self._pending_shop.extend(self.shop_videos)
+        return (video, segment, False)
+
+    def _pick_main(self, segment: int) -> Optional[str]:
+        table = self._table(segment)
+        if table is None:
+            return None
+        # 直近の動画を避ける（ウィンドウは対象本数 - 1 まで）
+        window = min(self.no_repeat, len(table.items) - 1)
+        for _ in range(self.MAX_RETRIES):
+            video = table.pick(self.rng)
+            if window <= 0 or not self._recently_played(video, window):
+                return video
+        # 重みが偏っていて抽選で見つからない場合は、直近以外から順に探す
+        start = self.rng.randrange(len(table.items))
+        for i in range(len(table.items)):
+            video = table.items[(start + i) % len(table.items)]
+            if not self._recently_played(video, window):
+                return video
+        return video
+
+    def _recently_played(self, video: str, window: int) -> bool:
+        if window >= len(self._recent):
+            return video in self._recent_set
+        return video in list(self._recent)[-window:]
+
+    def _remember(self, video: str):
+        self._recent.append(video)
+        self._recent_set[video] = self._recent_set.get(video, 0) + 1
+        while len(self._recent) > self.no_repeat:
+            old = self._recent.popleft()
+            self._recent_set[old] -= 1
+            if not self._recent_set[old]:
+                del self._recent_set[old]
+
+    # ==========================
+    # 時間帯セグメント
+    # ==========================
+    @staticmethod
+    def _minutes(value: str) -> int:
+        hour, _, minute = value.partition(":")
+        return int(hour) * 60 + int(minute or 0)
+
+    def _current_segment(self) -> int:
+        """現在の時間帯のセグメント番号（該当なしは -1）"""
+        now = clock.now()
+        minutes = now.hour * 60 + now.minute
+        for i, segment in enumerate(self.segments):
+            try:
+                start = self._minutes(segment.get("start", "00:00"))
+                end = self._minutes(segment.get("end", "24:00"))
+            except ValueError:
+                continue
+            if start <= end:
+                if start <= minutes < end:
+                    return i
+            elif minutes >= start or minutes < end:  # 日付をまたぐ
+                return i
+        return -1
+
+    def _table(self, segment: int) -> Optional[_AliasTable]:
+        """セグメントの抽選表（セグメントごとに一度だけ構築）"""
+        if segment in self._tables:
+            return self._tables[segment]
+
+        weights = dict(self.weights)
+        videos = self.main_videos
+        if segment >= 0:
+            spec = self.segments[segment]
+            patterns = spec.get("videos") or []
+            if patterns:
+                matched = [v for v in videos
+                           if any(fnmatch.fnmatch(os.path.basename(v), p) for p in patterns)]
+                videos = matched or videos
+            weights.update(spec.get("weights", {}) or {})
+
+        items, item_weights = [], []
+        for video in videos:
+            weight = float(weights.get(os.path.basename(video), weights.get(video, 1.0)))
+            if weight > 0:
+                items.append(video)
+                item_weights.append(weight)
+        table = _AliasTable(items, item_weights) if items else None
+        self._tables[segment] = table
+        return table
+
+    # ==========================
+    # 再生位置の保存・復元
+    # ==========================
+    def _save_state(self):
+        """現在の状態を書き込みスレッドに渡す（ファイルへの書き込みは待たない）"""
+        state = {
+            "recent": list(self._recent),
+            "since_shop": self._since_shop,
+            "upcoming": [list(item) for item in self._upcoming],
+            "pending_shop": list(self._pending_shop),
+        }
+        with self._save_lock:
+            self._unsaved = state
+            if self._save_thread is None:
+                self._save_thread = Thread(target=self._save_loop, name="attract-state", daemon=True)
+                self._save_thread.start()
+        self._save_wake.set()
+
+    def _save_loop(self):
+        while True:
+            self._save_wake.wait()
+            self._save_wake.clear()
+            self.flush()
+
+    def flush(self):
+        """未保存の状態があればファイルに書き込む"""
+        with self._save_lock:
+            state, self._unsaved = self._unsaved, None
+            if state is None:
+                return
+            tmp = self.state_path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False)
+                os.replace(tmp, self.state_path)
+            except OSError as e:
+                warn(self.logger, f"アトラクト再生位置の保存エラー: {e}")
+
+    def _load_state(self):
+        """保存した再生位置を復元（壊れていれば最初から）"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            warn(self.logger, f"アトラクト再生位置を読み込めません（最初から再生します）: {e}")
+            return
+
+        main = set(self.main_videos)
+        shop = set(self.shop_videos)
+        try:
+            # 動画の追加・削除があっても、残っている動画だけで続きから再生する
+            recent = [video for video in state["recent"] if video in main]
+            since_shop = min(max(0, int(state["since_shop"])), self.shop_interval)
+            upcoming = []
+            for video, segment, is_shop in state["upcoming"]:
+                if not isinstance(segment, int) or not isinstance(is_shop, bool):
+                    raise ValueError(f"不正な先読みエントリです: {[video, segment, is_shop]}")
+                if video in (shop if is_shop else main):
+                    upcoming.append((video, segment, is_shop))
+            pending_shop = [video for video in state["pending_shop"] if video in shop]
+        except (KeyError, TypeError, ValueError) as e:
+            warn(self.logger, f"アトラクト再生位置を読み込めません（最初から再生します）: {e}")
+            return
+
+        for video in recent:
+            self._remember(video)
+        self._since_shop = since_shop
+        self._upcoming = deque(upcoming)
+        self._pending_shop = deque(pending_shop)
@@ -0,0 +1,252 @@
+# player/audio_pipeline.py
+from collections import deque
+
+import numpy as np
+from PyQt6.QtCore import QObject, QIODevice, QUrl, pyqtSignal
+from PyQt6.QtMultimedia import QAudioDecoder, QAudioFormat, QAudioSink, QMediaDevices
+
+from audio.key_tempo import KeyTempoProcessor
+from audio.ring_buffer import RingBuffer
+from utils.metrics import metrics
+
+
+class _ProcessedStream(QIODevice):
+    """QAudioSink が読み出す PCM ストリーム（pull 型）"""
+
+    def __init__(self, pipeline: "SongAudioPipeline"):
+        super().__init__(pipeline)
+        self._pipeline = pipeline
+
+    def isSequential(self) -> bool:
+        return True
+
+    def bytesAvailable(self) -> int:
+        return self._pipeline._buffered_bytes() + super().bytesAvailable()
+
+    def readData(self, maxlen: int) -> bytes:
+        return self._pipeline._render(maxlen)
+
+    def writeData(self, data) -> int:
+        return -1
+
+
+class SongAudioPipeline(QObject):
+    """曲の音声パイプライン（デコード → キー/テンポ処理 → 音声出力）
+
+    QAudioDecoder でデコードした PCM を保持しておき、QAudioSink から
+    要求された分だけ BLOCK_FRAMES 単位で KeyTempoProcessor に通して渡す。
+    出力側の遅延は「処理ブロック + 位相ボコーダーのフレーム長」で一定。
+    デコード済みの PCM は MAX_DECODED_FRAMES までで、それを超えたら
+    デコーダーからの読み出しを止め、出力で消費した分だけ読み進める。
+    """
+
+    SAMPLE_RATE = 48000
+    CHANNELS = 2
+    BLOCK_FRAMES = 1024
+    PREROLL_FRAMES = 48000 // 2  # 再生開始に必要なデコード済みサンプル数
+    MAX_DECODED_FRAMES = 48000 * 10  # デコード済みサンプルの先読みの上限
+
+    prerolled = pyqtSignal()   # 再生開始に十分なデコードが済んだ
+    finished = pyqtSignal()    # 最後まで出力した
+    error = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.processor = KeyTempoProcessor(self.SAMPLE_RATE, self.CHANNELS)
+
+        # デコーダー（メモリ節約のため Int16 で保持）
+        decode_format = QAudioFormat()
+        decode_format.setSampleRate(self.SAMPLE_RATE)
+        decode_format.setChannelCount(self.CHANNELS)
+        decode_format.setSampleFormat(QAudioFormat.SampleFormat.Int16)
+        self._decoder = QAudioDecoder(self)
+        self._decoder.setAudioFormat(decode_format)
+        self._decoder.bufferReady.connect(self._read_decoded)
+        self._decoder.finished.connect(self._on_decode_finished)
+        self._decoder.error.connect(lambda _e: self.error.emit(self._decoder.errorString()))
+
+        # 出力
+        self._output_format = QAudioFormat()
+        self._output_format.setSampleRate(self.SAMPLE_RATE)
+        self._output_format.setChannelCount(self.CHANNELS)
+        self._output_format.setSampleFormat(QAudioFormat.SampleFormat.Float)
+        self._sink = None
+        self._stream = _ProcessedStream(self)
+        self._volume = 1.0
+
+        # デコード済みPCM（Int16 のチャンク列）
+        self._decoded = deque()
+        self._decoded_head = 0        # 先頭チャンクの読み出し位置（フレーム）
+        self._decoded_frames = 0      # 未消費のフレーム数
+        self._decode_done = False
+        self._prerolled = False
+        self._flushed = False         # 曲の終わりで処理遅延分を出し切った
+
+        # 処理済みサンプルの出力待ちバッファ・処理用ブロック（再利用）
+        self._pending = RingBuffer(self.BLOCK_FRAMES * 16, channels=self.CHANNELS)
+        self._block = np.zeros((self.BLOCK_FRAMES, self.CHANNELS), dtype=np.float32)
+        self._out = np.zeros((self.BLOCK_FRAMES * 8, self.CHANNELS), dtype=np.float32)
+
+        self._consumed_frames = 0     # 処理に回した元音源のフレーム数
+        self._finished_emitted = False
+        self._block_stats = metrics.timing(
+            "audio.key_tempo.block", budget_ms=self.BLOCK_FRAMES * 1000.0 / self.SAMPLE_RATE / 4
+        )
+
+    # ==========================
+    # 操作
+    # ==========================
+    def open(self, file_path: str):
+        """ファイルを開いてデコード（プリロール）を開始"""
+        self.stop()
+        self._decoded.clear()
+        self._decoded_head = 0
+        self._decoded_frames = 0
+        self._decode_done = False
+        self._prerolled = False
+        self._flushed = False
+        self._pending.clear()
+        self.processor.reset()
+        self._consumed_frames = 0
+        self._finished_emitted = False
+        self._decoder.setSource(QUrl.fromLocalFile(file_path))
+        self._decoder.start()
+
+    def is_prerolled(self) -> bool:
+        return self._prerolled
+
+    def play(self):
+        """出力を開始"""
+        if self._sink is None:
+            device = QMediaDevices.defaultAudioOutput()
+            self._sink = QAudioSink(device, self._output_format, self)
+            self._sink.setVolume(self._volume)
+        if not self._stream.isOpen():
+            self._stream.open(QIODevice.OpenModeFlag.ReadOnly)
+        self._sink.start(self._stream)
+
+    def pause(self):
+        if self._sink is not None:
+            self._sink.suspend()
+
+    def resume(self):
+        if self._sink is not None:
+            self._sink.resume()
+
+    def stop(self):
+        """出力とデコードを停止"""
+        self._decoder.stop()
+        if self._sink is not None:
+            self._sink.stop()
+        if self._stream.isOpen():
+            self._stream.close()
+
+    def set_key(self, semitones: float):
+        self.processor.set_key(semitones)
+
+    def set_tempo(self, tempo: float):
+        self.processor.set_tempo(tempo)
+
+    def set_volume(self, volume: float):
+        self._volume = max(0.0, min(1.0, volume))
+        if self._sink is not None:
+            self._sink.setVolume(self._volume)
+
+    def position_ms(self) -> int:
+        """元音源上の、いま聞こえている位置
+
+        処理に回したフレーム数から、出力待ちのサンプル・QAudioSink のバッファに
+        残っているサンプル（テンポ倍率で元音源の長さに換算）と、位相ボコーダーの
+        処理遅延を差し引く。
+        """
+        frame_bytes = self.CHANNELS * 4
+        queued = self._pending.available
+        if self._sink is not None:
+            queued += max(0, self._sink.bufferSize() - self._sink.bytesFree()) // frame_bytes
+        if self.processor.is_bypass:
+            frames = self._consumed_frames - queued
+        else:
+            frames = self._consumed_frames - queued * self.processor.tempo - self.processor.latency_samples
+        return max(0, int(frames * 1000 / self.SAMPLE_RATE))
+
+    # ==========================
+    # デコーダー
+    # ==========================
+    def _read_decoded(self):
+        """デコーダーのバッファを先読みの上限まで読み出す
+
+        FFmpeg のバックエンドは read() されるまで次のバッファをデコードしないので、
+        上限で読み出しを止めればデコードも止まる（再開は _render() から）。
+        """
+        while self._decoded_frames < self.MAX_DECODED_FRAMES and self._decoder.bufferAvailable():
+            buffer = self._decoder.read()
+            if not buffer.isValid():
+                return
+            ptr = buffer.constData()
+            ptr.setsize(buffer.byteCount())
+            pcm = np.frombuffer(ptr, dtype=np.int16).reshape(-1, self.CHANNELS).copy()
+            self._decoded.append(pcm)
+            self._decoded_frames += len(pcm)
+            if not self._prerolled and self._decoded_frames >= self.PREROLL_FRAMES:
+                self._prerolled = True
+                self.prerolled.emit()
+
+    def _on_decode_finished(self):
+        self._decode_done = True
+        if not self._prerolled:
+            self._prerolled = True
+            self.prerolled.emit()
+
+    # ==========================
+    # 出力（QAudioSink から呼ばれる）
+    # ==========================
+    def _buffered_bytes(self) -> int:
+        frames = self._pending.available + self._decoded_frames
+        return frames * self.CHANNELS * 4
+
+    def _take_block(self) -> int:
+        """デコード済みPCMから1ブロック分を self._block に取り出す"""
+        filled = 0
+        while filled < self.BLOCK_FRAMES and self._decoded:
+            chunk = self._decoded[0]
+            n = min(self.BLOCK_FRAMES - filled, len(chunk) - self._decoded_head)
+            np.multiply(chunk[self._decoded_head:self._decoded_head + n], 1.0 / 32768.0,
+                        out=self._block[filled:filled + n], casting='unsafe')
+            filled += n
+            self._decoded_head += n
+            if self._decoded_head >= len(chunk):
+                self._decoded.popleft()
+                self._decoded_head = 0
+        self._decoded_frames -= filled
+        self._consumed_frames += filled
+        return filled
+
+    def _render(self, maxlen: int) -> bytes:
+        frame_bytes = self.CHANNELS * 4
+        # テンポを落とすと1ブロックの出力が増えるため、余裕を残して要求を受ける
+        wanted = min(maxlen // frame_bytes, self._pending.capacity // 2)
+        self._read_decoded()  # 消費して空いた分だけデコードを進める
+        while self._pending.available < wanted:
+            if self._decoded_frames > 0:
+                with self._block_stats.measure():
+                    filled = self._take_block()
+                    processed = self.processor.process(self._block[:filled])
+                self._pending.write(processed)
+            elif self._decode_done and not self._decoder.bufferAvailable() and not self._flushed:
+                # 位相ボコーダー・リサンプラーに残っている曲の終わりを出し切る
+                self._flushed = True
+                self._pending.write(self.processor.flush())
+            else:
+                break
+
+        count = min(wanted, self._pending.available)
+        if count == 0:
+            if self._flushed and not self._finished_emitted:
+                self._finished_emitted = True
+                self.finished.emit()
+            return b""
+        if count > len(self._out):
+            self._out = np.zeros((count, self.CHANNELS), dtype=np.float32)
+        out = self._out[:count]
+        self._pending.read_into(out)
+        return out.tobytes()
@@ -0,0 +1,459 @@
+# player/controller.py
+import time
+from enum import Enum
+from typing import Optional, Dict, Any, List
+
+from PyQt6.QtWidgets import QWidget, QLabel
+from PyQt6.QtCore import QObject, Qt, QTimer, QUrl, pyqtSignal
+from PyQt6.QtGui import QPalette
+
+from audio.scoring import LiveScorer, ReferenceMelody, ScoringEngine, find_melody_file
+from config import ChangeSet, Config
+from server.selection_manager import SelectionManager
+from theme.fonts import FontSet
+from theme.theme import ThemeManager
+from player import media_backend
+from player.lyrics import LyricsCache, find_lyrics_file
+from player.song_files import resolve_song_file
+from ui.lyrics_layer import LyricsLayer
+from utils import clock
+from utils.logger import warn
+from utils.metrics import metrics
+
+class PlaybackState(Enum):
+    ATTRACT = "attract"      # アトラクト（予約待ち）
+    INTRO = "intro"          # 曲紹介（タイトル表示）
+    SONG = "song"            # 演奏中
+    INTERLUDE = "interlude"  # 曲間（次の予約の準備待ち）
+
+
+class _SongSlot:
+    """1曲分の再生資源（動画・音声パイプライン・歌詞）
+
+    再生中の曲と次の曲の2つを用意し、曲の切り替え時に入れ替える。
+    """
+
+    def __init__(self, parent: QWidget):
+        media = media_backend.get()
+        self.video_widget = media.VideoWidget(parent)
+        self.video_widget.setGeometry(0, 0, parent.width(), parent.height())
+        self.video_widget.hide()
+        self.player = media.MediaPlayer(parent)
+        self.player.setVideoOutput(self.video_widget)  # 音声は audio に任せる
+        self.audio = media.SongAudio(parent)
+        self.entry: Optional[Dict[str, Any]] = None
+        self.file_path: Optional[str] = None
+        self.source_path: Optional[str] = None  # キャッシュ前の元ファイル
+        self.lyrics_path: Optional[str] = None
+
+    def load(self, entry: Dict[str, Any], file_path: str, lyrics: LyricsCache,
+             source_path: Optional[str] = None):
+        """次の曲を開いてプリロール（先頭フレーム・音声デコード・歌詞解析）"""
+        self.entry = entry
+        self.file_path = file_path
+        self.source_path = source_path or file_path
+        self.player.setSource(QUrl.fromLocalFile(file_path))
+        self.player.pause()
+        metadata = entry.get("metadata", {})
+        self.audio.set_key(metadata.get("key", 0))
+        self.audio.set_tempo(metadata.get("tempo", 1.0))
+        self.audio.open(file_path)
+        self.lyrics_path = find_lyrics_file(self.source_path)
+        if self.lyrics_path:
+            lyrics.preload(self.lyrics_path)
+
+    def is_ready(self, lyrics: LyricsCache) -> bool:
+        """プリロールが完了しているかどうか"""
+        if self.entry is None:
+            return False
+        status = self.player.mediaStatus()
+        media_status = media_backend.get().MediaStatus
+        video_ready = status in (media_status.LoadedMedia, media_status.BufferedMedia)
+        lyrics_ready = self.lyrics_path is None or lyrics.is_ready(self.lyrics_path)
+        return video_ready and self.audio.is_prerolled() and lyrics_ready
+
+    def unload(self):
+        self.player.stop()
+        self.player.setSource(QUrl())
+        self.audio.stop()
+        self.video_widget.hide()
+        self.entry = None
+        self.file_path = None
+        self.source_path = None
+        self.lyrics_path = None
+
+
+class PlaybackController(QObject):
+    """Commander の再生制御（状態遷移: アトラクト → 曲紹介 → 演奏 → 曲間 → …）
+
+    演奏中に予約キューの次の曲をもう一方のスロットでプリロールしておき、
+    曲の終了から次の曲の先頭フレーム表示までの時間を計測する。
+    """
+
+    state_changed = pyqtSignal(str)
+    transition_measured = pyqtSignal(float)  # 曲終了 → 次の曲の先頭フレーム (ms)
+    song_finished = pyqtSignal(dict)         # 最後まで演奏した予約
+
+    SYNC_TOLERANCE_MS = 80
+    SCORING_TOLERANCE_MS = 150  # 採点の曲内時刻がこれ以上ずれたら合わせ直す
+    MIC_SAMPLE_RATE = 48000
+
+    def __init__(self, config: Config, selection_manager: SelectionManager,
+                 parent_widget: QWidget, attract=None, logger=None, prefetcher=None,
+                 media_cache=None, gain_store=None):
+        super().__init__(parent_widget)
+        self.config = config
+        self.selection_manager = selection_manager
+        self.parent_widget = parent_widget
+        self.attract = attract
+        self.logger = logger
+        self.prefetcher = prefetcher
+        self.media_cache = media_cache
+        self.gain_store = gain_store
+        self.theme_manager = ThemeManager(config)
+        self.state = PlaybackState.ATTRACT
+
+        self.lyrics_cache = LyricsCache()
+        self._current = _SongSlot(parent_widget)
+        self._standby = _SongSlot(parent_widget)
+        for slot in (self._current, self._standby):
+            slot.player.mediaStatusChanged.connect(
+                lambda status, s=slot: self._on_media_status(s, status))
+            slot.audio.prerolled.connect(lambda s=slot: self._on_slot_prerolled(s))
+            slot.video_widget.videoSink().videoFrameChanged.connect(
+                lambda _frame, s=slot: self._on_video_frame(s))
+
+        # 歌詞レイヤー（動画の上）
+        self.lyrics_layer = LyricsLayer(config, parent_widget)
+        self.lyrics_layer.setGeometry(0, 0, parent_widget.width(), parent_widget.height())
+        self.lyrics_layer.hide()
+
+        # 曲紹介（タイトル表示）
+        self.intro_label = QLabel(parent_widget)
+        self.intro_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.intro_label.setGeometry(0, 0, parent_widget.width(), parent_widget.height())
+        self.intro_label.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self._apply_intro_style()
+        self.intro_label.hide()
+
+        self._interlude_deadline = 0.0
+        self._transition_started: Optional[float] = None
+        self._transition_stats = metrics.timing("playback.transition", budget_ms=300.0)
+
+        self.intro_timer = QTimer(self)
+        self.intro_timer.setSingleShot(True)
+        self.intro_timer.timeout.connect(self._end_intro)
+
+        # 予約キュー監視
+        self.queue_timer = QTimer(self)
+        self.queue_timer.timeout.connect(self._check_queue)
+        self.queue_timer.start(500)
+
+        # 音声と動画のずれ補正
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self._sync_video_to_audio)
+
+        # 採点（ガイドメロディのある曲だけ、マイク → LiveScorer）
+        self._scorer: Optional[LiveScorer] = None
+        self._mic = None
+        self.last_score: Optional[Dict[str, Any]] = None
+
+    # ==========================
+    # 曲ファイルの解決
+    # ==========================
+    def resolve_song_file(self, entry: Dict[str, Any]) -> Optional[str]:
+        """予約から曲ファイルを探す"""
+        return resolve_song_file(self.config, entry)
+
+    # ==========================
+    # 予約キュー
+    # ==========================
+    def _check_queue(self):
+        if self.state == PlaybackState.ATTRACT:
+            if self.selection_manager.has_selection():
+                self._start_next()
+        elif self.state == PlaybackState.INTERLUDE:
+            if self.selection_manager.has_selection():
+                self._start_next()
+            elif clock.monotonic() >= self._interlude_deadline:
+                self._to_attract()
+        elif self.state in (PlaybackState.INTRO, PlaybackState.SONG):
+            self._preroll_next()
+
+    def _standby_matches_head(self) -> bool:
+        head = self.selection_manager.get_selection()
+        return (head is not None and self._standby.entry is not None
+                and self._standby.entry["id"] == head["id"])
+
+    def _preroll_next(self):
+        """予約キューの先頭を待機スロットでプリロール"""
+        head = self.selection_manager.get_selection()
+        if head is None:
+            if self._standby.entry is not None:
+                self._unload(self._standby)
+            return
+        if self._standby_matches_head():
+            return
+        file_path = self.resolve_song_file(head)
+        if file_path is None:
+            warn(self.logger, f"曲ファイルが見つかりません: {head.get('title', '')}")
+            self.selection_manager.remove_reservation(head["id"])
+            return
+        self._unload(self._standby)
+        play_path = file_path
+        if self.media_cache is not None:
+            play_path = self.media_cache.resolve(file_path, owner=self._standby)
+        if play_path == file_path and self.prefetcher is not None:
+            self.prefetcher.record_open(file_path)
+        self._standby.load(head, play_path, self.lyrics_cache, source_path=file_path)
+        if self.logger:
+            self.logger.debug(f"次の曲をプリロールしています: {head.get('title', '')}")
+
+    def _unload(self, slot: _SongSlot):
+        """スロットを空ける（キャッシュのファイルを削除の対象に戻す）"""
+        if self.media_cache is not None:
+            self.media_cache.release(slot)
+        slot.unload()
+
+    # ==========================
+    # 状態遷移
+    # ==========================
+    def _set_state(self, state: PlaybackState):
+        if state != self.state:
+            self.state = state
+            if self.logger:
+                self.logger.debug(f"再生状態: {state.value}")
+            self.state_changed.emit(state.value)
+
+    def _start_next(self):
+        """予約キューの先頭を再生する（未プリロールならプリロールを待つ）"""
+        self._preroll_next()
+        if not self._standby_matches_head():
+            return  # 先頭が見つからない曲だった
+        if not self._standby.is_ready(self.lyrics_cache):
+            # プリロール完了を待つ（完了通知で再度呼ばれる）
+            self._set_state(PlaybackState.INTERLUDE)
+            return
+
+        entry = self.selection_manager.take_next()
+        if entry is None or entry["id"] != self._standby.entry["id"]:
+            return
+
+        # スロットを入れ替えて再生開始
+        previous = self._current
+        self._current, self._standby = self._standby, previous
+        self._unload(previous)
+
+        slot = self._current
+        slot.video_widget.show()
+        slot.video_widget.raise_()
+        slot.audio.set_volume(self._song_volume(slot))
+        slot.player.setPlaybackRate(slot.audio.processor.tempo)
+        slot.player.play()
+        slot.audio.play()
+        self.sync_timer.start(1000)
+        self._start_scoring(slot)
+
+        timeline = self.lyrics_cache.get(slot.lyrics_path) if slot.lyrics_path else None
+        self.lyrics_layer.set_timeline(timeline)
+        self.lyrics_layer.attach_player(slot.player)
+        self.lyrics_layer.show()
+        self.lyrics_layer.raise_()
+
+        if self.attract is not None and self.attract.isVisible():
+            self.attract.suspend()
+
+        self._show_intro(entry)
+        self._preroll_next()
+
+    def _show_intro(self, entry: Dict[str, Any]):
+        title = entry.get("title", "")
+        artist = entry.get("artist", "")
+        self.intro_label.setText(f"♪ {title}\n{artist}" if artist else f"♪ {title}")
+        self.intro_label.show()
+        self.intro_label.raise_()
+        self._set_state(PlaybackState.INTRO)
+        self.intro_timer.start(self.config.get("songs.intro_ms", 4000))
+
+    def _end_intro(self):
+        self.intro_label.hide()
+        if self.state == PlaybackState.INTRO:
+            self._set_state(PlaybackState.SONG)
+
+    def _on_song_end(self):
+        self._transition_started = time.perf_counter()
+        if self._current.entry is not None:
+            self.song_finished.emit(dict(self._current.entry))
+        self.intro_timer.stop()
+        self.intro_label.hide()
+        self.sync_timer.stop()
+        self._stop_scoring()
+        self.lyrics_layer.attach_player(None)
+        self.lyrics_layer.set_timeline(None)
+
+        if self.selection_manager.has_selection():
+            self._start_next()
+        else:
+            self._transition_started = None
+            interlude_ms = self.config.get("songs.interlude_ms", 1000)
+            self._interlude_deadline = clock.monotonic() + interlude_ms / 1000.0
+            self._set_state(PlaybackState.INTERLUDE)
+            QTimer.singleShot(interlude_ms, self._check_queue)
+
+    def _to_attract(self):
+        self._unload(self._current)
+        self.lyrics_layer.hide()
+        self._set_state(PlaybackState.ATTRACT)
+        if self.attract is not None:
+            self.attract.resume()
+
+    def stop(self):
+        """演奏中止（アトラクトに戻る）"""
+        self.intro_timer.stop()
+        self.sync_timer.stop()
+        self._stop_scoring()
+        self.intro_label.hide()
+        self.lyrics_layer.attach_player(None)
+        self._unload(self._standby)
+        self._to_attract()
+
+    # ==========================
+    # プレイヤーイベント
+    # ==========================
+    def _on_media_status(self, slot: _SongSlot, status):
+        media_status = media_backend.get().MediaStatus
+        if slot is self._current and status == media_status.EndOfMedia:
+            if self.state in (PlaybackState.INTRO, PlaybackState.SONG):
+                self._on_song_end()
+        elif slot is self._standby and status in (media_status.LoadedMedia,
+                                                  media_status.BufferedMedia):
+            self._on_slot_prerolled(slot)
+
+    def _on_slot_prerolled(self, slot: _SongSlot):
+        if slot is self._standby and self.state == PlaybackState.INTERLUDE:
+            self._check_queue()
+
+    def _on_video_frame(self, slot: _SongSlot):
+        if self._transition_started is None or slot is not self._current:
+            return
+        if slot.player.playbackState() != media_backend.get().PlaybackState.PlayingState:
+            return
+        latency_ms = (time.perf_counter() - self._transition_started) * 1000.0
+        self._transition_started = None
+        self._transition_stats.record(latency_ms)
+        self.transition_measured.emit(latency_ms)
+        message = f"曲間の切り替え時間: {latency_ms:.1f} ms"
+        if latency_ms > self._transition_stats.budget_ms:
+            warn(self.logger, message)
+        elif self.logger:
+            self.logger.debug(message)
+
+    def _sync_video_to_audio(self):
+        """動画の位置を音声パイプラインに合わせる"""
+        slot = self._current
+        if slot.player.playbackState() != media_backend.get().PlaybackState.PlayingState:
+            return
+        audio_ms = slot.audio.position_ms()  # 聞こえている位置（出力バッファ・処理遅延を除く）
+        if abs(slot.player.position() - audio_ms) > self.SYNC_TOLERANCE_MS:
+            slot.player.setPosition(audio_ms)
+        if self._scorer is not None and abs(self._scorer.position_ms - audio_ms) > self.SCORING_TOLERANCE_MS:
+            self._scorer.sync(audio_ms)
+
+    # ==========================
+    # 採点
+    # ==========================
+    def _start_scoring(self, slot: _SongSlot):
+        """ガイドメロディがあればマイク入力の採点を開始"""
+        self._stop_scoring()
+        if not self.config.get("scoring.enabled", True) or not slot.source_path:
+            return
+        melody_path = find_melody_file(slot.source_path)
+        if melody_path is None:
+            return
+        try:
+            melody = ReferenceMelody.load(melody_path)
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            warn(self.logger, f"ガイドメロディを読めません: {melody_path}: {e}")
+            return
+        engine = ScoringEngine(melody, self.MIC_SAMPLE_RATE, self.config.get("scoring.block_size", 2048),
+                               latency_ms=self.config.get("scoring.latency_ms", 0.0))
+        engine.key_offset = slot.audio.processor.semitones
+        scorer = LiveScorer(engine)
+        scorer.rate = slot.audio.processor.tempo
+        # マイクは採点器のリングバッファに直接書き込む
+        mic = media_backend.get().MicrophoneInput(scorer.buffer, engine.sample_rate, self)
+        if not mic.start():
+            return
+        scorer.start(slot.audio.position_ms())
+        self._scorer, self._mic = scorer, mic
+        if self.logger:
+            self.logger.debug(f"採点を開始しました: {melody_path}")
+
+    def _stop_scoring(self):
+        """採点を停止し、結果を last_score に残す"""
+        if self._scorer is None:
+            return
+        self._mic.stop()
+        self._scorer.stop()
+        engine = self._scorer.engine
+        entry = self._current.entry or {}
+        self.last_score = {"id": entry.get("id"), "title": entry.get("title", ""),
+                           "total": engine.total_score(), "phrases": engine.phrase_scores()}
+        if self.logger:
+            self.logger.info(f"採点: {self.last_score['title']} {self.last_score['total']} 点")
+        self._scorer, self._mic = None, None
+
+    # ==========================
+    # キー・テンポ（演奏中の曲）
+    # ==========================
+    def set_key(self, semitones: int):
+        self._current.audio.set_key(semitones)
+        if self._scorer is not None:
+            self._scorer.engine.key_offset = self._current.audio.processor.semitones
+
+    def set_tempo(self, tempo: float):
+        self._current.audio.set_tempo(tempo)
+        self._current.player.setPlaybackRate(self._current.audio.processor.tempo)
+        if self._scorer is not None:
+            self._scorer.rate = self._current.audio.processor.tempo
+
+    def get_status(self) -> Dict[str, Any]:
+        """再生状態を取得"""
+        entry = self._current.entry if self.state != PlaybackState.ATTRACT else None
+        return {
+            "state": self.state.value,
+            "current": entry,
+            "next_prerolled": self._standby.is_ready(self.lyrics_cache),
+            "transition": self._transition_stats.summary(),
+            "score": self._scorer.engine.total_score() if self._scorer is not None else None,
+            "last_score": self.last_score,
+        }
+
+    # ==========================
+    # 表示・ログ
+    # ==========================
+    def _apply_intro_style(self):
+        self.intro_label.setFont(FontSet.title())
+        palette = self.intro_label.palette()
+        palette.setColor(QPalette.ColorRole.WindowText, self.theme_manager.get_text_color())
+        self.intro_label.setPalette(palette)
+
+    def _song_volume(self, slot: _SongSlot) -> float:
+        """曲の再生音量（設定の音量 × 解析済みのファイルごとのゲイン）"""
+        volume = self.config.get("songs.volume", 80) / 100.0
+        if self.gain_store is not None and slot.source_path:
+            volume = self.gain_store.volume_for(slot.source_path, volume)
+        return volume
+
+    def video_widgets(self) -> List[QWidget]:
+        """曲の動画の再生先（2つのスロット）"""
+        return [self._current.video_widget, self._standby.video_widget]
+
+    def refresh_settings(self, changes: Optional[ChangeSet] = None):
+        """設定を反映（changes があれば関係する項目が変わったときだけ）"""
+        if changes is None or changes.touches("font", "theme"):
+            self._apply_intro_style()
+        if changes is None or changes.touches("font", "theme", "lyrics"):
+            self.lyrics_layer.refresh_settings()
+        if changes is None or changes.touches("songs.volume"):
+            self._current.audio.set_volume(self._song_volume(self._current))
@@ -0,0 +1,411 @@
+# player/fake_media.py
+import os
+from enum import Enum
+from typing import Callable, Optional
+
+from PyQt6 import QtCore
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import QObject, QUrl, pyqtSignal
+from PyQt6.QtGui import QColor, QImage
+
+from utils import clock
+
+# ヘッドレスモード用の擬似再生バックエンド
+# ファイルはデコードせず、長さだけを持つメディアとして時計に合わせて進める。
+# タイマーは呼び出し時に QtCore.QTimer を参照する（仮想時計への差し替えに追従）。
+
+DEFAULT_DURATION_MS = 180000
+LOAD_MS = 30      # 読み込み（プリロール）にかかる時間
+TICK_MS = 1000    # 再生位置の通知・フレーム通知の間隔
+
+_duration_provider: Optional[Callable[[str], Optional[int]]] = None
+
+
+def set_duration_provider(provider: Optional[Callable[[str], Optional[int]]]):
+    """ファイルパス → 長さ (ms) を返す関数を設定"""
+    global _duration_provider
+    _duration_provider = provider
+
+
+def duration_for(path: str) -> int:
+    if _duration_provider is not None:
+        duration = _duration_provider(path)
+        if duration:
+            return int(duration)
+    return DEFAULT_DURATION_MS
+
+
+def _now_ms() -> float:
+    return clock.monotonic() * 1000.0
+
+
+class MediaStatus(Enum):
+    NoMedia = 0
+    LoadingMedia = 1
+    LoadedMedia = 2
+    StalledMedia = 3
+    BufferingMedia = 4
+    BufferedMedia = 5
+    EndOfMedia = 6
+    InvalidMedia = 7
+
+
+class PlaybackState(Enum):
+    StoppedState = 0
+    PlayingState = 1
+    PausedState = 2
+
+
+class VideoFrame:
+    def __init__(self, start_us: int, end_us: int):
+        self._start = start_us
+        self._end = end_us
+
+    def isValid(self) -> bool:
+        return True
+
+    def startTime(self) -> int:
+        return self._start
+
+    def endTime(self) -> int:
+        return self._end
+
+    def toImage(self) -> QImage:
+        """中身のない灰色の画像（プレビューの経路の確認用）"""
+        image = QImage(320, 180, QImage.Format.Format_RGB32)
+        image.fill(QColor(64, 64, 64))
+        return image
+
+
+class VideoSink(QObject):
+    videoFrameChanged = pyqtSignal(object)
+
+    def deliver(self, position_ms: int):
+        start = position_ms * 1000
+        self.videoFrameChanged.emit(VideoFrame(start, start + TICK_MS * 1000))
+
+    def setVideoFrame(self, frame):
+        self.videoFrameChanged.emit(frame)
+
+
+class VideoWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._sink = VideoSink(self)
+
+    def videoSink(self) -> VideoSink:
+        return self._sink
+
+
+class AudioOutput(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._volume = 1.0
+        self._muted = False
+
+    def setVolume(self, volume: float):
+        self._volume = max(0.0, min(1.0, float(volume)))
+
+    def volume(self) -> float:
+        return self._volume
+
+    def setMuted(self, muted: bool):
+        self._muted = muted
+
+    def isMuted(self) -> bool:
+        return self._muted
+
+
+class MediaPlayer(QObject):
+    """QMediaPlayer 互換の擬似プレイヤー"""
+
+    mediaStatusChanged = pyqtSignal(object)
+    playbackStateChanged = pyqtSignal(object)
+    positionChanged = pyqtSignal(int)
+    durationChanged = pyqtSignal(int)
+    errorOccurred = pyqtSignal(object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._source = QUrl()
+        self._status = MediaStatus.NoMedia
+        self._state = PlaybackState.StoppedState
+        self._duration = 0
+        self._position = 0                   # 一時停止中の位置、再生中は起点の位置
+        self._anchor: Optional[float] = None  # 再生中の起点（仮想時計 ms）
+        self._rate = 1.0
+        self._video: Optional[VideoWidget] = None
+        self._audio: Optional[AudioOutput] = None
+
+        self._load_timer = QtCore.QTimer(self)
+        self._load_timer.setSingleShot(True)
+        self._load_timer.timeout.connect(self._on_loaded)
+        self._end_timer = QtCore.QTimer(self)
+        self._end_timer.setSingleShot(True)
+        self._end_timer.timeout.connect(self._on_end)
+        self._tick_timer = QtCore.QTimer(self)
+        self._tick_timer.setInterval(TICK_MS)
+        self._tick_timer.timeout.connect(self._on_tick)
+
+    # ==========================
+    # 出力先
+    # ==========================
+    def setVideoOutput(self, widget):
+        self._video = widget
+
+    def setAudioOutput(self, output):
+        self._audio = output
+
+    # ==========================
+    # 状態
+    # ==========================
+    def source(self) -> QUrl:
+        return self._source
+
+    def mediaStatus(self) -> MediaStatus:
+        return self._status
+
+    def playbackState(self) -> PlaybackState:
+        return self._state
+
+    def duration(self) -> int:
+        return self._duration
+
+    def playbackRate(self) -> float:
+        return self._rate
+
+    def isPlaying(self) -> bool:
+        return self._state == PlaybackState.PlayingState
+
+    def position(self) -> int:
+        if self._anchor is None:
+            return self._position
+        elapsed = (_now_ms() - self._anchor) * self._rate
+        return min(self._duration, int(self._position + elapsed))
+
+    def _set_status(self, status: MediaStatus):
+        if status != self._status:
+            self._status = status
+            self.mediaStatusChanged.emit(status)
+
+    def _set_state(self, state: PlaybackState):
+        if state != self._state:
+            self._state = state
+            self.playbackStateChanged.emit(state)
+
+    # ==========================
+    # 操作
+    # ==========================
+    def setSource(self, url: QUrl):
+        self._halt()
+        self._load_timer.stop()
+        self._set_state(PlaybackState.StoppedState)
+        self._source = QUrl(url)
+        self._position = 0
+        if url.isEmpty():
+            self._duration = 0
+            self._set_status(MediaStatus.NoMedia)
+            return
+        path = url.toLocalFile()
+        if not os.path.exists(path):
+            self._set_status(MediaStatus.InvalidMedia)
+            self.errorOccurred.emit(1, f"ファイルが見つかりません: {path}")
+            return
+        self._duration = duration_for(path)
+        self.durationChanged.emit(self._duration)
+        self._set_status(MediaStatus.LoadingMedia)
+        self._load_timer.start(LOAD_MS)
+
+    def play(self):
+        if self._status in (MediaStatus.NoMedia, MediaStatus.InvalidMedia):
+            return
+        if self._status == MediaStatus.EndOfMedia:
+            self._position = 0
+            self._status = MediaStatus.LoadedMedia
+        self._set_state(PlaybackState.PlayingState)
+        if self._status != MediaStatus.LoadingMedia:
+            self._run()
+
+    def pause(self):
+        if self._status in (MediaStatus.NoMedia, MediaStatus.InvalidMedia):
+            return
+        self._halt()
+        self._set_state(PlaybackState.PausedState)
+
+    def stop(self):
+        self._halt()
+        self._position = 0
+        self._set_state(PlaybackState.StoppedState)
+        if self._status in (MediaStatus.BufferedMedia, MediaStatus.EndOfMedia):
+            self._set_status(MediaStatus.LoadedMedia)
+
+    def setPosition(self, position_ms: int):
+        running = self._anchor is not None
+        self._halt()
+        self._position = max(0, min(self._duration, int(position_ms)))
+        if running:
+            self._run()
+        self.positionChanged.emit(self._position)
+
+    def setPlaybackRate(self, rate: float):
+        running = self._anchor is not None
+        self._halt()
+        self._rate = max(0.01, float(rate))
+        if running:
+            self._run()
+
+    # ==========================
+    # 進行
+    # ==========================
+    def _run(self):
+        self._anchor = _now_ms()
+        self._set_status(MediaStatus.BufferedMedia)
+        self._end_timer.start(max(0, int((self._duration - self._position) / self._rate)))
+        self._tick_timer.start()
+        self._emit_frame()
+
+    def _halt(self):
+        """進行を止めて現在位置を確定"""
+        self._position = self.position()
+        self._anchor = None
+        self._end_timer.stop()
+        self._tick_timer.stop()
+
+    def _on_loaded(self):
+        if self._status != MediaStatus.LoadingMedia:
+            return
+        self._set_status(MediaStatus.LoadedMedia)
+        self._emit_frame()  # 先頭フレームを表示
+        if self._state == PlaybackState.PlayingState:
+            self._run()
+
+    def _on_tick(self):
+        self.positionChanged.emit(self.position())
+        self._emit_frame()
+
+    def _on_end(self):
+        self._halt()
+        self._position = self._duration
+        self.positionChanged.emit(self._position)
+        self._set_state(PlaybackState.StoppedState)
+        self._set_status(MediaStatus.EndOfMedia)
+
+    def _emit_frame(self):
+        if self._video is not None:
+            self._video.videoSink().deliver(self.position())
+
+
+class _Processor:
+    """キー・テンポの設定値だけを保持（擬似バックエンドでは処理しない）"""
+
+    def __init__(self):
+        self.semitones = 0.0
+        self.tempo = 1.0
+
+    def set_key(self, semitones: float):
+        self.semitones = float(semitones)
+
+    def set_tempo(self, tempo: float):
+        self.tempo = max(0.25, min(4.0, float(tempo)))
+
+    def reset(self):
+        pass
+
+
+class SongAudio(QObject):
+    """SongAudioPipeline 互換の擬似音声パイプライン"""
+
+    prerolled = pyqtSignal()
+    finished = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.processor = _Processor()
+        self._prerolled = False
+        self._volume = 1.0
+        self._duration = 0
+        self._position = 0
+        self._anchor: Optional[float] = None
+
+        self._preroll_timer = QtCore.QTimer(self)
+        self._preroll_timer.setSingleShot(True)
+        self._preroll_timer.timeout.connect(self._on_prerolled)
+        self._end_timer = QtCore.QTimer(self)
+        self._end_timer.setSingleShot(True)
+        self._end_timer.timeout.connect(self._on_end)
+
+    def open(self, file_path: str):
+        self.stop()
+        self._prerolled = False
+        self._position = 0
+        self._duration = duration_for(file_path)
+        self._preroll_timer.start(LOAD_MS)
+
+    def _on_prerolled(self):
+        self._prerolled = True
+        self.prerolled.emit()
+
+    def is_prerolled(self) -> bool:
+        return self._prerolled
+
+    def play(self):
+        self._position = 0
+        self.resume()
+
+    def pause(self):
+        self._position = self.position_ms()
+        self._anchor = None
+        self._end_timer.stop()
+
+    def resume(self):
+        if self._anchor is not None:
+            return
+        self._anchor = _now_ms()
+        remaining = (self._duration - self._position) / self.processor.tempo
+        self._end_timer.start(max(0, int(remaining)))
+
+    def stop(self):
+        self._anchor = None
+        self._preroll_timer.stop()
+        self._end_timer.stop()
+
+    def set_key(self, semitones: float):
+        self.processor.set_key(semitones)
+
+    def set_tempo(self, tempo: float):
+        position = self.position_ms()
+        self.processor.set_tempo(tempo)
+        if self._anchor is not None:
+            self._position = position
+            self._anchor = None
+            self.resume()
+
+    def set_volume(self, volume: float):
+        self._volume = max(0.0, min(1.0, volume))
+
+    def position_ms(self) -> int:
+        if self._anchor is None:
+            return self._position
+        elapsed = (_now_ms() - self._anchor) * self.processor.tempo
+        return min(self._duration, int(self._position + elapsed))
+
+    def _on_end(self):
+        self._position = self.position_ms()
+        self._anchor = None
+        self.finished.emit()
+
+
+class MicrophoneInput(QObject):
+    """MicrophoneInput 互換（ヘッドレスではマイクがないので常に開始できない）"""
+
+    def __init__(self, buffer, sample_rate: int = 48000, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.sample_rate = sample_rate
+
+    def start(self) -> bool:
+        return False
+
+    def stop(self):
+        pass
@@ -0,0 +1,181 @@
+# player/frame_fanout.py
+import time
+from threading import Condition, Thread
+from typing import Iterator, List, Optional
+
+from PyQt6.QtCore import QBuffer, QIODevice, QObject, Qt
+from PyQt6.QtWidgets import QWidget
+
+from config import Config
+from player import media_backend
+from utils.metrics import metrics
+
+BOUNDARY = "frame"
+
+
+class MjpegEncoder:
+    """プレビュー用の MJPEG エンコード（ワーカースレッド）
+
+    受け取るフレームは常に最新の1枚だけで、エンコードが追いつかない間に
+    届いたフレームは捨てる（遅れを溜めずにフレームレートを落とす）。
+    エンコードはプレビューを見ているクライアントがいる間だけ行う。
+    """
+
+    def __init__(self, config: Config):
+        self.width = config.get("preview.width", 480)
+        self.quality = config.get("preview.quality", 70)
+        self._cond = Condition()
+        self._frame = None            # エンコード待ちのフレーム（最新の1枚）
+        self._jpeg: Optional[bytes] = None
+        self._seq = 0                 # エンコード済みの連番
+        self._clients = 0
+        self._stopped = False
+        self._thread: Optional[Thread] = None
+        self._encode_stats = metrics.timing("preview.encode")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = Thread(target=self._run, name="preview-encoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def has_clients(self) -> bool:
+        return self._clients > 0
+
+    def submit(self, frame):
+        """フレームを渡す（前のフレームが未処理なら捨てて置き換える）"""
+        with self._cond:
+            if self._frame is not None:
+                metrics.increment("preview.dropped")
+            self._frame = frame
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._frame is not None or self._stopped)
+                if self._stopped:
+                    return
+                frame, self._frame = self._frame, None
+            with self._encode_stats.measure():
+                data = self._encode(frame)
+            if data is None:
+                continue
+            with self._cond:
+                self._jpeg = data
+                self._seq += 1
+                self._cond.notify_all()
+            metrics.increment("preview.frames")
+
+    def _encode(self, frame) -> Optional[bytes]:
+        try:
+            image = frame.toImage()
+        except Exception as e:
+            print(f"プレビューの変換エラー: {e}")
+            return None
+        if image.isNull():
+            return None
+        if image.width() > self.width:
+            image = image.scaledToWidth(self.width, Qt.TransformationMode.SmoothTransformation)
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "JPG", self.quality)
+        return bytes(buffer.data())
+
+    def stream(self, timeout: float = 5.0) -> Iterator[bytes]:
+        """multipart/x-mixed-replace の本体（新しい JPEG ができるたびに1枚）"""
+        with self._cond:
+            self._clients += 1
+            seq = 0
+        try:
+            yield b""  # 映像が来る前にヘッダーだけ送る
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != seq or self._stopped, timeout=timeout)
+                    if self._stopped:
+                        return
+                    if self._seq == seq or self._jpeg is None:
+                        continue  # 映像が止まっている（接続は保つ）
+                    seq, data = self._seq, self._jpeg
+                yield (f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                       f"Content-Length: {len(data)}\r\n\r\n").encode("ascii") + data + b"\r\n"
+        finally:
+            with self._cond:
+                self._clients -= 1
+
+
+class FrameFanout(QObject):
+    """デコード済みの映像フレームを複数の出力に配る
+
+    動画は1回だけデコードし（再生中の QVideoWidget の QVideoSink から受け取る）、
+    同じフレームを副画面（別ウィンドウの QVideoWidget）の QVideoSink と、
+    APIサーバーの MJPEG プレビュー（縮小・低フレームレート）に渡す。
+    ソースは複数登録でき（アトラクト動画・曲のスロット）、表示中のものだけを配る。
+    """
+
+    def __init__(self, config: Config, logger=None):
+        super().__init__()
+        self.config = config
+        self.logger = logger
+        self.fps = max(0.1, config.get("preview.fps", 5))
+        self.encoder = MjpegEncoder(config)
+        self._sources: List[QWidget] = []
+        self._outputs = []                  # 副画面の QVideoSink
+        self._monitors: List[QWidget] = []  # 副画面のウィンドウ
+        self._next_encode = 0.0
+
+    def start(self):
+        """エンコードを開始し、設定の数だけ副画面を開く"""
+        self.encoder.start()
+        for _ in range(self.config.get("preview.monitors", 0)):
+            self.open_monitor()
+
+    def stop(self):
+        self.encoder.stop()
+        for monitor in self._monitors:
+            monitor.close()
+
+    # ==========================
+    # 入力・出力
+    # ==========================
+    def add_source(self, video_widget: QWidget):
+        """再生先の QVideoWidget を登録（そのフレームを配る）"""
+        self._sources.append(video_widget)
+        video_widget.videoSink().videoFrameChanged.connect(
+            lambda frame, w=video_widget: self._on_frame(w, frame))
+
+    def add_output(self, sink):
+        """フレームを渡す QVideoSink を登録"""
+        self._outputs.append(sink)
+
+    def open_monitor(self) -> QWidget:
+        """副画面（メイン画面の映像を映す別ウィンドウ）を開く"""
+        monitor = media_backend.get().VideoWidget()
+        monitor.setWindowTitle(f"PyKara - Monitor {len(self._monitors) + 1}")
+        monitor.resize(640, 360)
+        monitor.show()
+        self._monitors.append(monitor)
+        self.add_output(monitor.videoSink())
+        return monitor
+
+    # ==========================
+    # 配信
+    # ==========================
+    def _on_frame(self, source: QWidget, frame):
+        if not source.isVisible():
+            return  # プリロール中・停止中のソース
+        for sink in self._outputs:
+            sink.setVideoFrame(frame)
+        if self.encoder.has_clients():
+            now = time.monotonic()
+            if now >= self._next_encode:
+                self._next_encode = now + 1.0 / self.fps
+                self.encoder.submit(frame)
@@ -0,0 +1,322 @@
+# player/lyrics.py
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# [mm:ss.xx] 形式の行タイムタグ
+_LINE_TAG = re.compile(r"\[(\d+):(\d{1,2}(?:[.:]\d{1,3})?)\]")
+# <mm:ss.xx> 形式の音節タイムタグ（拡張LRC）
+_WORD_TAG = re.compile(r"<(\d+):(\d{1,2}(?:[.:]\d{1,3})?)>")
+# [ti:...] などのメタデータタグ
+_META_TAG = re.compile(r"^\[([a-zA-Z#]+):(.*)\]\s*$")
+# {親文字|ふりがな} 形式のルビ
+_RUBY = re.compile(r"\{([^|{}]*)\|([^{}]*)\}")
+
+LYRICS_EXTENSIONS = (".lrc", ".txt")
+
+
+def _to_ms(minutes: str, seconds: str) -> int:
+    """タイムタグの分・秒をミリ秒に変換"""
+    seconds = seconds.replace(":", ".")
+    return int(round((int(minutes) * 60 + float(seconds)) * 1000))
+
+
+def _extract_ruby(body: str) -> Tuple[str, List[Tuple[int, int, str]]]:
+    """行本文からルビ記法を取り除き、(本文, [(親文字開始, 親文字終了, ルビ)]) を返す
+
+    位置は音節タグを除いた行テキスト上の文字オフセット。
+    """
+    if "{" not in body:
+        return body, []
+
+    ruby: List[Tuple[int, int, str]] = []
+    out = []
+    plain_len = 0
+    last = 0
+    for m in _RUBY.finditer(body):
+        before = body[last:m.start()]
+        out.append(before)
+        plain_len += len(_WORD_TAG.sub("", before))
+        base = m.group(1)
+        out.append(base)
+        base_len = len(_WORD_TAG.sub("", base))
+        ruby_text = _WORD_TAG.sub("", m.group(2)).strip()
+        if base_len and ruby_text:
+            ruby.append((plain_len, plain_len + base_len, ruby_text))
+        plain_len += base_len
+        last = m.end()
+    out.append(body[last:])
+    return "".join(out), ruby
+
+
+class LyricsTimeline:
+    """タイミング付き歌詞（配列ベースのタイムライン）
+
+    行・音節の開始/終了時刻を array('i') に詰めて保持し、
+    再生位置からの検索は二分探索で行う。
+    """
+
+    def __init__(self):
+        self.meta: Dict[str, str] = {}
+
+        # 行
+        self.line_start = array('i')
+        self.line_end = array('i')
+        self.line_first_syllable = array('i')  # 行の先頭音節インデックス
+        self.line_text: List[str] = []
+
+        # 音節
+        self.syllable_start = array('i')
+        self.syllable_end = array('i')
+        self.syllable_text: List[str] = []
+
+        # ルビ（ふりがな）: 行テキスト上の文字範囲
+        self.line_first_ruby = array('i')
+        self.ruby_start = array('i')
+        self.ruby_end = array('i')
+        self.ruby_text: List[str] = []
+
+    # ==========================
+    # 構築
+    # ==========================
+    def _add_line(self, start: int, syllables: List[Tuple[int, int, str]],
+                  ruby: List[Tuple[int, int, str]] = ()):
+        self.line_start.append(start)
+        self.line_end.append(syllables[-1][1] if syllables else start)
+        self.line_first_syllable.append(len(self.syllable_start))
+        self.line_text.append("".join(s[2] for s in syllables))
+        for s_start, s_end, text in syllables:
+            self.syllable_start.append(s_start)
+            self.syllable_end.append(s_end)
+            self.syllable_text.append(text)
+        self.line_first_ruby.append(len(self.ruby_start))
+        for r_start, r_end, text in ruby:
+            self.ruby_start.append(r_start)
+            self.ruby_end.append(r_end)
+            self.ruby_text.append(text)
+
+    @classmethod
+    def parse(cls, text: str) -> "LyricsTimeline":
+        """LRC形式（行タイミング / 音節タイミング / {親文字|ルビ}）の文字列を解析"""
+        timeline = cls()
+        offset = 0
+        entries: List[Tuple[int, str]] = []
+
+        for raw in text.splitlines():
+            raw = raw.strip()
+            if not raw:
+                continue
+
+            meta = _META_TAG.match(raw)
+            if meta and not _LINE_TAG.match(raw):
+                key, value = meta.group(1).lower(), meta.group(2).strip()
+                timeline.meta[key] = value
+                if key == "offset":
+                    try:
+                        offset = int(value)
+                    except ValueError:
+                        pass
+                continue
+
+            # 1行に複数の行タグがある場合（繰り返し行）はそれぞれ展開
+            starts = []
+            pos = 0
+            while True:
+                m = _LINE_TAG.match(raw, pos)
+                if not m:
+                    break
+                starts.append(_to_ms(m.group(1), m.group(2)))
+                pos = m.end()
+            if not starts:
+                continue
+            body = raw[pos:].lstrip()
+            for start in starts:
+                entries.append((start, body))
+
+        # 時刻順に並べる（LRCは順不同で書かれることがある）
+        entries.sort(key=lambda e: e[0])
+
+        # LRCの offset は正の値で歌詞を早める
+        for i, (start, body) in enumerate(entries):
+            start -= offset
+            next_start = entries[i + 1][0] - offset if i + 1 < len(entries) else None
+            body, ruby = _extract_ruby(body)
+            syllables = cls._parse_syllables(start, body, next_start, offset)
+            if syllables:
+                timeline._add_line(start, syllables, ruby)
+
+        return timeline
+
+    @staticmethod
+    def _parse_syllables(line_start: int, body: str, next_start: Optional[int],
+                         offset: int = 0) -> List[Tuple[int, int, str]]:
+        """行本文を音節 (開始, 終了, 文字列) に分解（音節タグにも offset を適用）"""
+        tags = list(_WORD_TAG.finditer(body))
+
+        if not tags:
+            # 行タイミングのみ: 行全体を1音節として扱う
+            text = body.strip()
+            if not text:
+                return []  # 空行は前の行の終端としてのみ機能
+            end = next_start if next_start is not None else line_start
+            return [(line_start, max(end, line_start), text)]
+
+        syllables: List[Tuple[int, int, str]] = []
+        first_tag_ms = _to_ms(tags[0].group(1), tags[0].group(2)) - offset
+        head = body[:tags[0].start()]
+        if head.strip():
+            # 最初の音節タグより前の文字列は行頭から始まる
+            syllables.append((line_start, max(first_tag_ms, line_start), head))
+
+        for i, tag in enumerate(tags):
+            text_end = tags[i + 1].start() if i + 1 < len(tags) else len(body)
+            text = body[tag.end():text_end]
+            if not text:
+                continue  # 終端タグ
+            start = _to_ms(tag.group(1), tag.group(2)) - offset
+            if i + 1 < len(tags):
+                end = _to_ms(tags[i + 1].group(1), tags[i + 1].group(2)) - offset
+            else:
+                end = next_start if next_start is not None else start
+            syllables.append((start, max(end, start), text))
+
+        return syllables
+
+    @classmethod
+    def load(cls, path: str) -> "LyricsTimeline":
+        """歌詞ファイルを読み込んで解析（UTF-8 / Shift_JIS 対応）"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        for encoding in ("utf-8-sig", "cp932"):
+            try:
+                return cls.parse(data.decode(encoding))
+            except UnicodeDecodeError:
+                continue
+        return cls.parse(data.decode("utf-8", errors="replace"))
+
+    # ==========================
+    # 検索
+    # ==========================
+    def __len__(self) -> int:
+        return len(self.line_start)
+
+    @property
+    def syllable_count(self) -> int:
+        return len(self.syllable_start)
+
+    def find_line(self, position_ms: int) -> int:
+        """再生位置で表示中の行インデックスを返す（開始前は -1）"""
+        return bisect_right(self.line_start, position_ms) - 1
+
+    def find_syllable(self, position_ms: int, line: Optional[int] = None) -> int:
+        """再生位置で歌唱中（または直前に歌い終えた）の音節インデックスを返す"""
+        if line is None:
+            line = self.find_line(position_ms)
+        if line < 0:
+            return -1
+        syllables = self.line_syllables(line)
+        return bisect_right(self.syllable_start, position_ms, syllables.start, syllables.stop) - 1
+
+    def locate(self, position_ms: int) -> Tuple[int, int, float]:
+        """再生位置から (行, 音節, 音節内の進捗 0.0～1.0) を返す"""
+        line = self.find_line(position_ms)
+        if line < 0:
+            return -1, -1, 0.0
+        syllable = self.find_syllable(position_ms, line)
+        if syllable < 0:
+            return line, -1, 0.0
+        start = self.syllable_start[syllable]
+        end = self.syllable_end[syllable]
+        if end <= start or position_ms >= end:
+            return line, syllable, 1.0
+        return line, syllable, (position_ms - start) / (end - start)
+
+    def line_syllables(self, line: int) -> range:
+        """行に含まれる音節インデックスの範囲"""
+        lo = self.line_first_syllable[line]
+        hi = (self.line_first_syllable[line + 1]
+              if line + 1 < len(self.line_first_syllable) else len(self.syllable_start))
+        return range(lo, hi)
+
+    def line_ruby(self, line: int) -> range:
+        """行に含まれるルビのインデックス範囲"""
+        lo = self.line_first_ruby[line]
+        hi = (self.line_first_ruby[line + 1]
+              if line + 1 < len(self.line_first_ruby) else len(self.ruby_start))
+        return range(lo, hi)
+
+
+def find_lyrics_file(media_path: str) -> Optional[str]:
+    """動画ファイルと同名の歌詞ファイルを探す"""
+    stem, _ = os.path.splitext(media_path)
+    for ext in LYRICS_EXTENSIONS:
+        candidate = stem + ext
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+class LyricsCache:
+    """歌詞の先読みキャッシュ（スレッドセーフ）
+
+    次に再生する曲の歌詞をバックグラウンドで解析しておき、
+    再生開始時には解析済みのタイムラインを即座に返す。
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self._lock = Lock()
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Future]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lyrics")
+
+    def preload(self, path: str) -> Future:
+        """歌詞ファイルの解析をバックグラウンドで開始"""
+        with self._lock:
+            future = self._entries.get(path)
+            if future is not None:
+                self._entries.move_to_end(path)
+                return future
+            future = self._executor.submit(LyricsTimeline.load, path)
+            self._entries[path] = future
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return future
+
+    def preload_for_media(self, media_path: str) -> Optional[Future]:
+        """動画ファイルに対応する歌詞を先読み"""
+        lyrics_path = find_lyrics_file(media_path)
+        if lyrics_path is None:
+            return None
+        return self.preload(lyrics_path)
+
+    def get(self, path: str, timeout: Optional[float] = None) -> Optional[LyricsTimeline]:
+        """解析済みのタイムラインを取得（未登録なら同期的に解析）
+
+        timeout までに解析が終わらなければ None を返す（解析は続け、次の get で使う）。
+        """
+        future = self.preload(path)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as e:
+            print(f"歌詞の読み込みエラー: {path}: {e}")
+            with self._lock:
+                if self._entries.get(path) is future:
+                    del self._entries[path]
+            return None
+
+    def is_ready(self, path: str) -> bool:
+        """解析が完了しているかどうか"""
+        with self._lock:
+            future = self._entries.get(path)
+            return future is not None and future.done()
+
+    def shutdown(self):
+        """ワーカーを停止"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
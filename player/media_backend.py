@@ -0,0 +1,29 @@
+# player/media_backend.py
+
+# 再生バックエンド（"qt" = Qt Multimedia、"fake" = ヘッドレス用の擬似バックエンド）
+_name = "qt"
+
+
+def use(name: str):
+    """使用するバックエンドを切り替え（再生関連のオブジェクトを作る前に呼ぶ）"""
+    global _name
+    if name not in ("qt", "fake"):
+        raise ValueError(f"不明な再生バックエンドです: {name}")
+    _name = name
+
+
+def name() -> str:
+    return _name
+
+
+def get():
+    """再生バックエンドのモジュール
+
+    MediaPlayer / AudioOutput / VideoWidget / SongAudio / MicrophoneInput と
+    MediaStatus / PlaybackState を提供する。
+    """
+    if _name == "fake":
+        from player import fake_media as backend
+    else:
+        from player import qt_media as backend
+    return backend
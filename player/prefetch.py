@@ -0,0 +1,175 @@
+# player/prefetch.py
+import os
+from collections import OrderedDict
+from threading import Thread, Event, Lock
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from server.selection_manager import SelectionManager
+from player.song_files import resolve_song_file
+from utils.bandwidth import BandwidthLimiter
+from utils.metrics import metrics
+
+
+class MediaPrefetcher:
+    """予約曲の先読み（ページキャッシュへの読み込み）
+
+    予約キューの変更を監視し、先頭から depth 曲分のファイルの
+    先頭 read_ahead_mb をバックグラウンドで読み込んでおく。
+    読み込みは帯域上限（bandwidth_mb_s）内に抑え、再生中のファイルの
+    読み込みを妨げないようにする。
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    MAX_TRACKED_FILES = 64
+
+    def __init__(self, config: Config, selection_manager: SelectionManager, logger=None,
+                 metadata_index=None):
+        self.config = config
+        self.selection_manager = selection_manager
+        self.logger = logger
+        self.metadata_index = metadata_index
+        self.read_ahead_seconds = config.get("prefetch.read_ahead_seconds", 60)
+        self.depth = config.get("prefetch.depth", 3)
+        self.read_ahead_bytes = int(config.get("prefetch.read_ahead_mb", 64) * 1024 * 1024)
+        self.limiter = BandwidthLimiter.shared(config)  # MediaCache のコピーと共有
+
+        self._lock = Lock()
+        self._wake = Event()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        # (パス, サイズ, 更新時刻) → 読み込み済みバイト数
+        self._warmed: "OrderedDict[Tuple[str, int, float], int]" = OrderedDict()
+        self._buffer = bytearray(self.CHUNK_SIZE)
+
+        self._hits = 0
+        self._partial = 0
+        self._misses = 0
+        self._bytes_read = 0
+
+        selection_manager.add_listener(self._on_queue_changed)
+
+    # ==========================
+    # 起動・停止
+    # ==========================
+    def start(self):
+        """先読みスレッドを起動"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="prefetch", daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def stop(self):
+        """先読みスレッドを停止"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _on_queue_changed(self, event: str, data: Dict[str, Any]):
+        self._wake.set()
+
+    # ==========================
+    # 先読み
+    # ==========================
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            for entry in self.selection_manager.peek_queue(self.depth):
+                if self._stop.is_set() or self._wake.is_set():
+                    break  # キューが変わったら先頭からやり直す
+                path = resolve_song_file(self.config, entry)
+                if path:
+                    self._warm(path)
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple[str, int, float]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), st.st_size, st.st_mtime)
+
+    def _target_bytes(self, path: str, size: int) -> int:
+        """先読みするバイト数（ビットレートが分かれば先頭 read_ahead_seconds 秒分）"""
+        target = min(self.read_ahead_bytes, size)
+        if self.metadata_index is not None:
+            record = self.metadata_index.get(path)
+            if record and record.get("bit_rate"):
+                target = min(target, int(record["bit_rate"] / 8 * self.read_ahead_seconds))
+        return target
+
+    def _warm(self, path: str):
+        key = self._file_key(path)
+        if key is None:
+            return
+        target = self._target_bytes(path, key[1])
+        with self._lock:
+            done = self._warmed.get(key, 0)
+        if done >= target:
+            return
+
+        try:
+            with open(path, 'rb', buffering=0) as f:
+                fd = f.fileno()
+                if hasattr(os, "posix_fadvise"):
+                    # カーネルにも先読みを依頼（対応していない環境では無視される）
+                    os.posix_fadvise(fd, done, target - done, os.POSIX_FADV_WILLNEED)
+                f.seek(done)
+                view = memoryview(self._buffer)
+                while done < target:
+                    if self._stop.is_set() or self._wake.is_set():
+                        break
+                    n = f.readinto(view[:min(self.CHUNK_SIZE, target - done)])
+                    if not n:
+                        break
+                    done += n
+                    with self._lock:
+                        self._warmed[key] = done
+                        self._warmed.move_to_end(key)
+                        while len(self._warmed) > self.MAX_TRACKED_FILES:
+                            self._warmed.popitem(last=False)
+                        self._bytes_read += n
+                    # 帯域上限を超えないように待つ
+                    self.limiter.throttle(n, self._stop)
+        except OSError as e:
+            if self.logger:
+                self.logger.warning(f"先読みに失敗しました: {path}: {e}")
+
+    # ==========================
+    # 統計
+    # ==========================
+    def record_open(self, path: str):
+        """再生開始時に呼び、先読みのヒット/ミスを記録する"""
+        key = self._file_key(path)
+        if key is None:
+            return
+        target = self._target_bytes(path, key[1])
+        with self._lock:
+            done = self._warmed.get(key, 0)
+            if done >= target:
+                self._hits += 1
+                name = "prefetch.hit"
+            elif done > 0:
+                self._partial += 1
+                name = "prefetch.partial"
+            else:
+                self._misses += 1
+                name = "prefetch.miss"
+        metrics.increment(name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ヒット/ミスの統計を取得"""
+        with self._lock:
+            total = self._hits + self._partial + self._misses
+            return {
+                "hits": self._hits,
+                "partial": self._partial,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else None,
+                "bytes_read": self._bytes_read,
+                "tracked_files": len(self._warmed),
+            }
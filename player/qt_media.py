@@ -0,0 +1,15 @@
+# player/qt_media.py
+from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+from PyQt6.QtMultimediaWidgets import QVideoWidget
+
+from audio.mic_input import MicrophoneInput
+from player.audio_pipeline import SongAudioPipeline
+
+# Qt Multimedia による再生バックエンド（通常はこちら）
+MediaPlayer = QMediaPlayer
+AudioOutput = QAudioOutput
+VideoWidget = QVideoWidget
+SongAudio = SongAudioPipeline
+MicrophoneInput = MicrophoneInput
+MediaStatus = QMediaPlayer.MediaStatus
+PlaybackState = QMediaPlayer.PlaybackState
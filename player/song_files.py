@@ -0,0 +1,61 @@
+# player/song_files.py
+import os
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi")
+
+
+def library_roots(config: Config) -> List[str]:
+    """曲ファイルを置いてよいディレクトリ（songs.local_dir と songs.library_roots）"""
+    roots = [config.get("songs.local_dir", "songs")] + list(config.get("songs.library_roots", []))
+    return [os.path.realpath(root) for root in roots if root]
+
+
+def is_in_library(path: str, roots: List[str]) -> bool:
+    """path（シンボリックリンクは解決する）がライブラリのディレクトリの中かどうか"""
+    real = os.path.realpath(path)
+    for root in roots:
+        try:
+            if os.path.commonpath([real, root]) == root:
+                return True
+        except ValueError:
+            continue  # ドライブが異なる（Windows）
+    return False
+
+
+def _plain_name(value: Any) -> Optional[str]:
+    """ファイル名としてそのまま使える文字列（区切り文字・".." を含むものは使わない）"""
+    if not value:
+        return None
+    name = str(value)
+    if name in (".", "..") or "/" in name or "\\" in name or (os.altsep and os.altsep in name):
+        return None
+    return name
+
+
+def resolve_song_file(config: Config, entry: Dict[str, Any]) -> Optional[str]:
+    """予約から曲ファイルを探す（metadata.path → song_id → タイトル）
+
+    予約は認証のない /api/select から届くため、ライブラリのディレクトリの外を
+    指すファイル（絶対パス・"../"・シンボリックリンク）は使わない。
+    """
+    metadata = entry.get("metadata", {})
+    songs_dir = config.get("songs.local_dir", "songs")
+    roots = library_roots(config)
+
+    path = metadata.get("path")
+    if path:
+        path = os.path.join(songs_dir, str(path))  # 相対パスは曲のディレクトリから
+        if os.path.isfile(path) and is_in_library(path, roots):
+            return path
+
+    for stem in (_plain_name(metadata.get("song_id")), _plain_name(entry.get("title"))):
+        if not stem:
+            continue
+        for ext in VIDEO_EXTENSIONS:
+            candidate = os.path.join(songs_dir, f"{stem}{ext}")
+            if os.path.isfile(candidate) and is_in_library(candidate, roots):
+                return candidate
+    return None
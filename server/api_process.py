@@ -0,0 +1,112 @@
+# server/api_process.py
+import multiprocessing
+import signal
+import time
+from threading import Thread
+from typing import Any, Dict, Optional
+
+from config import Config
+from server.ipc import RemoteSelectionManager, SelectionHost
+from utils.metrics import metrics
+
+
+class APIProcess:
+    """APIサーバーを別プロセスで起動（server.mode = "process"）
+
+    HTTP の解析や JSON の生成を Commander のプロセスから追い出し、Qt の
+    イベントループと GIL を取り合わないようにする。予約キューは Commander の
+    SelectionManager が正で、APIサーバーのプロセスとはローカルソケット
+    （server.ipc）で操作と変更イベントをやり取りする。
+    APIServer と同じく start() / stop() / get_url() を持つ。
+    """
+
+    def __init__(self, selection_manager, config: Config, event_log, logger=None):
+        self.config = config
+        self.logger = logger
+        self.host = SelectionHost(selection_manager, event_log, logger=logger)
+        self.process: Optional[multiprocessing.Process] = None
+        self._host_started = False
+
+    def start(self):
+        """サーバーを起動（別プロセスで）"""
+        if self.process and self.process.is_alive():
+            return  # 既に起動中
+        if not self._host_started:
+            self.host.start()
+            self._host_started = True
+        # Qt の状態を引き継がないよう spawn で起動する
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(
+            target=run_api_process,
+            args=(self.host.address, self.host.authkey, str(self.config.config_file),
+                  self.config.get("server", {})),
+            name="pykara-api", daemon=True)
+        self.process.start()
+        print(f"APIサーバーを別プロセスで起動しました: {self.get_url()}（pid {self.process.pid}）")
+
+    def rebind(self) -> bool:
+        """設定のホスト・ポートでAPIサーバーのプロセスを起動し直す（Commander 側はそのまま）"""
+        self.shutdown()
+        self.start()
+        return True
+
+    def shutdown(self):
+        """APIサーバーのプロセスだけを止める（start() で再開できる）"""
+        if self.process and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2.0)
+        self.process = None
+
+    def stop(self):
+        """サーバーを停止"""
+        self.shutdown()
+        self.host.stop()
+
+    def get_url(self) -> str:
+        """サーバーのURLを取得"""
+        port = self.config.get("server.port", 8080)
+        host = self.config.get("server.host", "0.0.0.0")
+        if host == "0.0.0.0":
+            host = "localhost"
+        return f"http://{host}:{port}"
+
+
+def run_api_process(address: str, authkey: bytes, config_file: str,
+                    server_settings: Dict[str, Any]):
+    """APIサーバーのプロセスの本体"""
+    from server.api_server import APIServer
+
+    config = Config(config_file)
+    config.set("server", server_settings)  # Commander 側で上書きした設定を引き継ぐ
+    remote = RemoteSelectionManager(address, authkey)
+    if not remote.start():
+        print("[WARNING] Commander からの予約キューの同期を待たずに起動します")
+    api = APIServer(remote, config, event_log=remote)
+    api.mode = "process"
+    Thread(target=_report_requests, args=(remote,), name="api-report", daemon=True).start()
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    # APIProcess.shutdown() の terminate() で SIGTERM が届いたら記録を書き出してから終わる
+    # （Windows の terminate() は TerminateProcess なので捕まえられない）
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        api.run()
+    finally:
+        api.stop()
+
+
+def _report_requests(remote: RemoteSelectionManager, interval_s: float = 1.0):
+    """処理したリクエスト数を定期的に Commander に送る（Commander 側のパフォーマンス HUD 用）"""
+    reported = 0
+    while True:
+        time.sleep(interval_s)
+        count = metrics.counter("api.requests")
+        if count == reported:
+            continue
+        try:
+            remote.report_requests(count - reported)
+        except (ConnectionError, RuntimeError):
+            continue  # 送れなかった分は次の回にまとめて送る
+        reported = count
@@ -1,19 +1,53 @@
 # server/api_server.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from threading import Thread
+from werkzeug.serving import BaseWSGIServer, make_server
+import time
 from typing import Optional
 import logging
 
+from server.event_log import EventLog
+from server.traffic_recorder import TrafficRecorder
+from server.web_assets import ENTRY_FILES, WebAssets, gzip_file_response
+from storage.catalog import Catalog
+from storage.play_history import PlayHistory
+from storage.recommendations import SungNextIndex
+from utils.metrics import metrics
+
 class APIServer:
     """HTTP APIサーバー（Flask）"""
     
-    def __init__(self, selection_manager, config):
+    def __init__(self, selection_manager, config, event_log: Optional[EventLog] = None,
+                 play_history: Optional[PlayHistory] = None, preview=None):
         self.selection_manager = selection_manager
         self.config = config
+        if event_log is None:
+            event_log = EventLog(config)
+            event_log.attach(selection_manager)
+        self.event_log = event_log
+        self.catalog = Catalog(config)
+        if play_history is None and config.get("history.enabled", True):
+            # 別プロセスモードでは Commander が書いたログを追いかけて参照する
+            play_history = PlayHistory(config, writer=False)
+        self.play_history = play_history
+        self.recommendations: Optional[SungNextIndex] = None
+        if play_history is not None and config.get("recommend.enabled", True):
+            self.recommendations = SungNextIndex(config, play_history, self.catalog)
+        self.preview = preview  # MjpegEncoder（Commander 内のスレッドで動くときだけ）
+        self.web_assets: Optional[WebAssets] = None
+        if config.get("remote.enabled", True):
+            self.web_assets = WebAssets(config)
+        self.mode = "thread"  # "thread" = Commander 内のスレッド、"process" = 別プロセス
         self.app = Flask(__name__)
         CORS(self.app)  # CORSを有効化（別UIからのアクセスを許可）
         self.server_thread: Optional[Thread] = None
+        self._server: Optional[BaseWSGIServer] = None
+        self.recorder: Optional[TrafficRecorder] = None
+        if config.get("server.record.enabled", False):
+            # 容量試験用にリクエストを記録（python -m server.traffic_replay で再生）
+            self.recorder = TrafficRecorder(config)
+            self.recorder.install(self.app)
         self._setup_routes()
         
         # Flaskのログを抑制
@@ -23,6 +57,27 @@ class APIServer:
     def _setup_routes(self):
         """ルートを設定"""
         
+        request_stats = metrics.timing("api.request")
+        
+        @self.app.before_request
+        def count_request():
+            """リクエスト数を計測（パフォーマンス HUD 用）"""
+            metrics.increment("api.requests")
+            request.environ["pykara.start"] = time.perf_counter()
+        
+        @self.app.after_request
+        def measure_request(response):
+            """処理時間を計測（スレッド / 別プロセスの比較用）"""
+            started = request.environ.get("pykara.start")
+            if started is not None:
+                request_stats.record((time.perf_counter() - started) * 1000.0)
+            return response
+        
+        @self.app.route('/api/metrics', methods=['GET'])
+        def get_metrics():
+            """APIサーバーのプロセスの計測値を取得"""
+            return jsonify({"success": True, "mode": self.mode, "metrics": metrics.snapshot()})
+        
         @self.app.route('/api/status', methods=['GET'])
         def status():
             """サーバー状態を取得"""
@@ -44,14 +99,18 @@ class APIServer:
                     return jsonify({"error": "titleは必須です"}), 400
                 
                 artist = data.get('artist', '')
-                metadata = data.get('metadata', {})
+                metadata = dict(data.get('metadata') or {})
+                # リモート UI は song_id だけを送るので、ファイルの場所はカタログから引く
+                song = self.catalog.get(str(metadata["song_id"])) if metadata.get("song_id") else None
+                if song and song.get("path"):
+                    metadata["path"] = song["path"]
                 
-                self.selection_manager.set_selection(title, artist, metadata)
+                entry = self.selection_manager.set_selection(title, artist, metadata)
                 
                 return jsonify({
                     "success": True,
                     "message": f"選曲しました: {title}",
-                    "selection": self.selection_manager.get_selection()
+                    "selection": entry
                 })
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
@@ -65,6 +124,62 @@ class APIServer:
             else:
                 return jsonify({"success": True, "selection": None})
         
+        @self.app.route('/api/queue', methods=['GET'])
+        def get_queue():
+            """予約キューを取得"""
+            return jsonify({"success": True, "queue": self.selection_manager.get_queue()})
+        
+        @self.app.route('/api/events', methods=['GET'])
+        def get_events():
+            """since より後の変更イベントを取得（カーソルが古ければスナップショット）"""
+            since = request.args.get('since', type=int)
+            epoch = request.args.get('epoch')
+            return jsonify(self.event_log.since(since, epoch))
+        
+        @self.app.route('/api/rankings', methods=['GET'])
+        def get_rankings():
+            """ランキングを取得（period: daily / weekly、room 省略時は全部屋）"""
+            if self.play_history is None:
+                return jsonify({"error": "演奏履歴が無効です"}), 404
+            period = request.args.get('period', 'daily')
+            if period not in ('daily', 'weekly'):
+                return jsonify({"error": "period は daily または weekly です"}), 400
+            room = request.args.get('room') or None
+            limit = max(1, min(request.args.get('limit', 10, type=int), self.play_history.top_n))
+            return jsonify({
+                "success": True,
+                "period": period,
+                "room": room,
+                "rankings": self.play_history.rankings(period, room, limit),
+            })
+        
+        @self.app.route('/api/recommendations', methods=['GET'])
+        def get_recommendations():
+            """この曲の次に歌われた曲（song_id、または title と artist で指定）"""
+            if self.recommendations is None:
+                return jsonify({"error": "おすすめが無効です"}), 404
+            entry = {key: request.args.get(key, '') for key in ('song_id', 'title', 'artist')}
+            if not entry['song_id'] and not entry['title']:
+                return jsonify({"error": "song_id または title は必須です"}), 400
+            limit = max(1, min(request.args.get('limit', 10, type=int), self.recommendations.max_neighbors))
+            return jsonify({"success": True, "songs": self.recommendations.recommend(entry, limit)})
+        
+        @self.app.route('/api/preview.mjpg', methods=['GET'])
+        def get_preview():
+            """メイン画面の縮小プレビュー（MJPEG）"""
+            if self.preview is None:
+                return jsonify({"error": "プレビューは無効です"}), 404
+            return Response(self.preview.stream(),
+                            mimetype="multipart/x-mixed-replace; boundary=frame",
+                            headers={"Cache-Control": "no-cache"})
+        
+        @self.app.route('/api/queue/<int:reservation_id>', methods=['DELETE'])
+        def cancel_reservation(reservation_id):
+            """予約を取り消す"""
+            if self.selection_manager.remove_reservation(reservation_id):
+                return jsonify({"success": True, "message": "予約を取り消しました"})
+            return jsonify({"error": "予約が見つかりません"}), 404
+        
         @self.app.route('/api/clear', methods=['POST'])
         def clear_selection():
             """選曲をクリア"""
@@ -73,36 +188,167 @@ class APIServer:
         
         @self.app.route('/api/songs', methods=['GET'])
         def list_songs():
-            """楽曲リストを取得（モック）"""
-            # 実際の実装では、データベースから楽曲リストを取得
-            return jsonify({
-                "success": True,
-                "songs": [
-                    {"id": 1, "title": "サンプル曲1", "artist": "アーティスト1"},
-                    {"id": 2, "title": "サンプル曲2", "artist": "アーティスト2"},
-                ]
-            })
+            """楽曲カタログを検索（q: 曲名・歌手名・読みの前方一致）"""
+            result = self.catalog.search(
+                request.args.get('q', ''),
+                limit=request.args.get('limit', 50, type=int),
+                offset=request.args.get('offset', 0, type=int),
+            )
+            return jsonify({"success": True, **result})
+        
+        @self.app.route('/api/songs/<song_id>', methods=['GET'])
+        def get_song(song_id):
+            """楽曲を取得"""
+            song = self.catalog.get(song_id)
+            if song is None:
+                return jsonify({"error": "曲が見つかりません"}), 404
+            return jsonify({"success": True, "song": song})
+        
+        @self.app.route('/api/catalog', methods=['GET'])
+        def get_catalog():
+            """公開中の版と、端末の版（since）から取りに行くスナップショット・差分の URL"""
+            version = self.catalog.version
+            if version is None:
+                return jsonify({"error": "楽曲カタログがありません"}), 404
+            since = request.args.get('since', '')
+            result = {"success": True, "version": version, "snapshot": f"/api/catalog/snapshot/{version}"}
+            if since == version:
+                result["up_to_date"] = True
+            elif since and self.catalog.delta_file(since, version) is not None:
+                result["delta"] = f"/api/catalog/delta/{since}/{version}"
+            response = jsonify(result)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        
+        @self.app.route('/api/catalog/snapshot/<version>', methods=['GET'])
+        def get_catalog_snapshot(version):
+            """版の全件スナップショット（gzip 済み、版ごとに不変）"""
+            path = self.catalog.snapshot_file(version)
+            if path is None:
+                return jsonify({"error": "その版は残っていません"}), 404
+            return gzip_file_response(path, request)
+        
+        @self.app.route('/api/catalog/delta/<base_version>/<version>', methods=['GET'])
+        def get_catalog_delta(base_version, version):
+            """版の差分（追加・変更された行と削除された song_id、gzip 済み）"""
+            path = self.catalog.delta_file(base_version, version)
+            if path is None:
+                return jsonify({"error": "その版の差分は作れません（スナップショットを取得してください）"}), 404
+            return gzip_file_response(path, request)
+        
+        @self.app.route('/remote/', methods=['GET'])
+        @self.app.route('/remote/<any("index.html", "sw.js"):name>', methods=['GET'])
+        def get_remote_entry(name='index.html'):
+            """リモート UI の入口（index.html・Service Worker、毎回再検証）"""
+            return remote_asset(name)
+        
+        @self.app.route('/remote/assets/<name>', methods=['GET'])
+        def get_remote_asset(name):
+            """リモート UI のハッシュ付きのファイル（immutable）"""
+            if name in ENTRY_FILES:
+                return jsonify({"error": "ファイルが見つかりません"}), 404
+            return remote_asset(name)
+        
+        def remote_asset(name):
+            response = self.web_assets.response(name, request) if self.web_assets else None
+            if response is None:
+                return jsonify({"error": "ファイルが見つかりません"}), 404
+            return response
+    
+    def _bind(self, host: Optional[str] = None, port: Optional[int] = None) -> BaseWSGIServer:
+        """設定（または指定）のホスト・ポートで待ち受けるサーバーを作成"""
+        port = self.config.get("server.port", 8080) if port is None else port
+        host = self.config.get("server.host", "0.0.0.0") if host is None else host
+        try:
+            return make_server(host, port, self.app, threaded=True)
+        except SystemExit as e:
+            # werkzeug は待ち受けに失敗すると理由を stderr に出して sys.exit(1) する
+            raise OSError(f"{host}:{port} で待ち受けできません") from e
     
     def start(self):
         """サーバーを起動（別スレッドで）"""
-        if self.server_thread and self.server_thread.is_alive():
+        if self._server is not None:
             return  # 既に起動中
         
         port = self.config.get("server.port", 8080)
         host = self.config.get("server.host", "0.0.0.0")
         
-        def run_server():
-            self.app.run(host=host, port=port, debug=False, use_reloader=False)
-        
-        self.server_thread = Thread(target=run_server, daemon=True)
-        self.server_thread.start()
+        try:
+            server = self._bind()
+        except OSError as e:
+            print(f"[WARNING] APIサーバーを起動できません: http://{host}:{port}: {e}")
+            return
+        self._serve(server)
         print(f"APIサーバーを起動しました: http://{host}:{port}")
     
+    def run(self):
+        """サーバーを実行（戻らない。別プロセスモードではプロセスのメインスレッドで呼ぶ）"""
+        self._server = self._bind()
+        self._server.serve_forever()
+    
+    def rebind(self) -> bool:
+        """設定のホスト・ポートで待ち受け直す（アプリ・予約キューはそのまま）
+
+        ポートが変わる場合は新しいアドレスで待ち受けを始めてから古いサーバーを
+        止めるので、新しいポートが使えないときは元のポートのまま動き続ける。
+        ポートが同じ（ホストだけの変更）なら先に古いサーバーを止めてから待ち受け、
+        失敗したときだけ元のアドレスに戻す。
+        """
+        if self._server is None:
+            self.start()
+            return self._server is not None
+        old = self._server
+        if self.config.get("server.port", 8080) == old.port:
+            self._close(old)
+            if self.server_thread is not None:
+                self.server_thread.join(timeout=2.0)  # ソケットを手放すまで待つ
+            self._server = None
+            try:
+                server = self._bind()
+            except OSError as e:
+                print(f"[WARNING] APIサーバーの待ち受けを変更できません（元のアドレスに戻します）: {e}")
+                try:
+                    server = self._bind(old.host, old.port)
+                except OSError as e:
+                    print(f"[WARNING] APIサーバーを元のアドレスで再開できません: {e}")
+                    return False
+                self._serve(server)
+                return False
+            self._serve(server)
+        else:
+            try:
+                server = self._bind()
+            except OSError as e:
+                print(f"[WARNING] APIサーバーの待ち受けを変更できません: {e}")
+                return False
+            self._serve(server)
+            # 古いサーバーの停止（serve_forever のループが抜けるまで待つ）は UI を止めないよう別スレッドで
+            Thread(target=self._close, args=(old,), daemon=True).start()
+        print(f"APIサーバーの待ち受けを変更しました: {self.get_url()}")
+        return True
+    
+    def _serve(self, server: BaseWSGIServer):
+        """サーバーを現在のものにして別スレッドで待ち受けを始める"""
+        self._server = server
+        self.server_thread = Thread(target=server.serve_forever, name="api-server", daemon=True)
+        self.server_thread.start()
+    
+    @staticmethod
+    def _close(server: BaseWSGIServer):
+        server.shutdown()
+        server.server_close()
+    
+    def shutdown(self):
+        """待ち受けだけを止める（start() で再開できる）"""
+        server, self._server = self._server, None
+        if server is not None:
+            Thread(target=self._close, args=(server,), daemon=True).start()
+    
     def stop(self):
         """サーバーを停止"""
-        # Flaskの開発サーバーは停止が難しいため、daemonスレッドとして実行
-        # アプリケーション終了時に自動的に停止されます
-        pass
+        self.shutdown()
+        if self.recorder:
+            self.recorder.stop()
     
     def get_url(self) -> str:
         """サーバーのURLを取得"""
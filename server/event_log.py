@@ -0,0 +1,105 @@
+# server/event_log.py
+import uuid
+from collections import deque
+from itertools import islice
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import Config
+
+
+class EventLog:
+    """予約キュー・再生状態の変更イベントの連番ログ（再接続したリモート向け）
+
+    変更ごとに単調増加の連番を振り、直近 capacity 件をリングバッファに保持する。
+    リモートは最後に受け取った連番（カーソル）を渡して差分だけを取得し、
+    カーソルがバッファから追い出されていた場合（またはサーバーが再起動して
+    epoch が変わった場合）だけ全体のスナップショットを取り直す。
+
+    差分は冪等に適用できる形にしている（reserved は id で追加・上書き、
+    started / removed は id で削除）。スナップショットは連番を読んでから
+    キューを取得するため、直後の差分と重なっても二重に適用されない。
+    """
+
+    def __init__(self, config: Optional[Config] = None, capacity: Optional[int] = None):
+        if capacity is None:
+            capacity = config.get("server.event_log_size", 1024) if config else 1024
+        self.capacity = max(1, int(capacity))
+        self.epoch = uuid.uuid4().hex[:8]  # サーバー起動ごとに変わる（古いカーソルの検出用）
+        self._lock = Lock()
+        self._seq = 0
+        self._events: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=self.capacity)
+        self._queue_snapshot: Callable[[], List[Dict[str, Any]]] = list
+        self._playback: Dict[str, Any] = {"state": None}
+        self._listeners: List[Callable[[int, str, Dict[str, Any]], None]] = []
+
+    # ==========================
+    # 発行
+    # ==========================
+    def attach(self, selection_manager):
+        """予約キューの変更を購読し、スナップショットの取得元にする"""
+        self._queue_snapshot = selection_manager.get_queue
+        selection_manager.add_listener(self._on_selection)
+
+    def add_listener(self, callback: Callable[[int, str, Dict[str, Any]], None]):
+        """イベントの発行通知を登録（callback(連番, イベント名, データ)）
+
+        連番の順に届くようにロック内で呼ぶため、callback はキューへの追加など
+        すぐに終わる処理だけにすること。
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _on_selection(self, event: str, data: Dict[str, Any]):
+        if event in ("started", "removed"):
+            data = {"id": data.get("id")}
+        self.publish(event, data)
+
+    def set_playback(self, state: str, entry: Optional[Dict[str, Any]] = None) -> int:
+        """再生状態の変更を発行"""
+        playback = {"state": state}
+        if entry is not None:
+            playback.update(id=entry.get("id"), title=entry.get("title", ""),
+                            artist=entry.get("artist", ""))
+        with self._lock:
+            self._playback = playback
+        return self.publish("playback", playback)
+
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        """イベントを追加して連番を返す"""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._events.append((seq, event, data))
+            for callback in self._listeners:
+                try:
+                    callback(seq, event, data)
+                except Exception as e:
+                    print(f"イベント通知エラー: {e}")
+        return seq
+
+    # ==========================
+    # 取得
+    # ==========================
+    @property
+    def seq(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def since(self, cursor: Optional[int], epoch: Optional[str] = None) -> Dict[str, Any]:
+        """cursor より後のイベント（取得できなければスナップショット）
+
+        差分: {"epoch", "seq", "events": [[連番, イベント名, データ], ...]}
+        スナップショット: {"epoch", "seq", "snapshot": {"queue": [...], "playback": {...}}}
+        """
+        with self._lock:
+            latest = self._seq
+            oldest = latest - len(self._events) + 1
+            if (cursor is not None and (epoch is None or epoch == self.epoch)
+                    and oldest - 1 <= cursor <= latest):
+                events = [list(e) for e in islice(self._events, cursor - oldest + 1, None)]
+                return {"epoch": self.epoch, "seq": latest, "events": events}
+            playback = dict(self._playback)
+        # 連番を読んでからキューを取得する（クラス docstring 参照）
+        return {"epoch": self.epoch, "seq": latest,
+                "snapshot": {"queue": self._queue_snapshot(), "playback": playback}}
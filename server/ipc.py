@@ -0,0 +1,301 @@
+# server/ipc.py
+import marshal
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import warn
+from utils.metrics import metrics
+
+# Commander（GUIプロセス）と別プロセスの APIサーバーの間の通信
+#
+# multiprocessing.connection（POSIX は Unix ソケット、Windows は名前付きパイプ）の上で、
+# メッセージを marshal のタプルで送る（JSON より小さく、変換も速い。両端は同じ
+# Python なので互換性の問題はない）。
+#   要求: (操作名, 引数...)          応答: (True, 結果) / (False, エラーメッセージ)
+#   購読: ("subscribe",) → (連番, epoch, キュー, 再生状態) → 以降 (連番, イベント名, データ) を送り続ける
+#   計測: ("requests", 件数) → APIサーバーのプロセスで処理したリクエスト数を Commander の計測値に足す
+
+CALLS = ("set_selection", "remove_reservation", "clear_selection")
+
+
+def encode(message: Any) -> bytes:
+    return marshal.dumps(message)
+
+
+def decode(data: bytes) -> Any:
+    return marshal.loads(data)
+
+
+def default_address() -> str:
+    """このプロセス用の接続先（Unix ソケットのパス / 名前付きパイプ名）"""
+    name = f"pykara-api-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), name + ".sock")
+
+
+class SelectionHost:
+    """Commander 側: 予約キューの操作を受け付け、変更イベントを購読者に送る
+
+    Commander 側の処理は SelectionManager の呼び出しとメッセージの変換だけで、
+    HTTP の解析や JSON の生成は APIサーバーのプロセスで行う。
+    """
+
+    def __init__(self, selection_manager, event_log, address: Optional[str] = None,
+                 authkey: Optional[bytes] = None, logger=None):
+        self.selection_manager = selection_manager
+        self.event_log = event_log
+        self.address = address or default_address()
+        self.authkey = authkey or os.urandom(16)
+        self.logger = logger
+        self._listener: Optional[Listener] = None
+        self._subscribers: List["queue.SimpleQueue"] = []
+        self._subscribers_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._call_stats = metrics.timing("api.host.call")
+        event_log.add_listener(self._on_event)
+
+    def start(self):
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, name="api-host", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._subscribers_lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError) as e:
+                if not self._stopped.is_set():
+                    warn(self.logger, f"APIプロセスからの接続エラー: {e}")
+                    time.sleep(0.1)
+                continue
+            threading.Thread(target=self._serve, args=(conn,), name="api-host-conn", daemon=True).start()
+
+    def _serve(self, conn: Connection):
+        try:
+            while True:
+                request = decode(conn.recv_bytes())
+                if request[0] == "subscribe":
+                    self._stream(conn)
+                    return
+                with self._call_stats.measure():
+                    response = self._handle(request)
+                conn.send_bytes(encode(response))
+        except (OSError, EOFError):
+            pass
+        finally:
+            conn.close()
+
+    def _handle(self, request: Tuple) -> Tuple[bool, Any]:
+        op, args = request[0], request[1:]
+        try:
+            if op in CALLS:
+                result = getattr(self.selection_manager, op)(*args)
+                # 応答後の読み出しで反映済みのミラーを返せるよう、操作後の連番を添える
+                return True, (result, self.event_log.seq)
+            if op == "since":
+                return True, self.event_log.since(*args)
+            if op == "requests":
+                metrics.increment("api.requests", *args)  # パフォーマンス HUD の API リクエスト数
+                return True, None
+            return False, f"不明な操作です: {op}"
+        except Exception as e:
+            return False, str(e)
+
+    # ==========================
+    # イベントの配信
+    # ==========================
+    def _on_event(self, seq: int, event: str, data: Dict[str, Any]):
+        # EventLog のロック内で呼ばれるので、キューに積むだけ
+        with self._subscribers_lock:
+            for subscriber in self._subscribers:
+                subscriber.put((seq, event, data))
+
+    def _stream(self, conn: Connection):
+        events: "queue.SimpleQueue" = queue.SimpleQueue()
+        with self._subscribers_lock:
+            self._subscribers.append(events)
+        try:
+            # 購読を登録してからスナップショットを取る（取りこぼしを防ぐ）
+            snapshot = self.event_log.since(None)
+            seq = snapshot["seq"]
+            conn.send_bytes(encode((seq, snapshot["epoch"], snapshot["snapshot"]["queue"],
+                                    snapshot["snapshot"]["playback"])))
+            while True:
+                message = events.get()
+                if message is None:
+                    return
+                if message[0] > seq:
+                    conn.send_bytes(encode(message))
+        finally:
+            with self._subscribers_lock:
+                self._subscribers.remove(events)
+
+
+class RemoteSelectionManager:
+    """APIサーバー側: Commander の予約キューのミラー（SelectionManager / EventLog 互換）
+
+    読み出しは購読したイベントで更新するローカルのミラーから返し、Commander には
+    問い合わせない。書き込みは Commander に転送し、その変更がミラーに届くまで
+    待ってから返す（直後の読み出しで自分の変更が見える）。
+    """
+
+    SYNC_TIMEOUT_S = 1.0
+    RECONNECT_S = 0.5
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.epoch: Optional[str] = None
+        self._pool: "queue.LifoQueue[Connection]" = queue.LifoQueue()  # 空いている接続
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._queue: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._playback: Dict[str, Any] = {"state": None}
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._ready = threading.Event()
+        self._call_stats = metrics.timing("api.ipc.call")
+
+    def start(self, timeout: float = 10.0) -> bool:
+        """購読を開始（最初のスナップショットを受け取るまで待つ）"""
+        threading.Thread(target=self._subscribe_loop, name="api-mirror", daemon=True).start()
+        return self._ready.wait(timeout)
+
+    # ==========================
+    # 書き込み（Commander に転送）
+    # ==========================
+    def _call(self, *request) -> Any:
+        # リクエストごとにスレッドが変わるため、接続はプールして使い回す
+        with self._call_stats.measure():
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = None
+            try:
+                if conn is None:
+                    conn = Client(self.address, authkey=self.authkey)
+                conn.send_bytes(encode(request))
+                ok, value = decode(conn.recv_bytes())
+            except (OSError, EOFError):
+                if conn is not None:
+                    conn.close()
+                raise ConnectionError("Commander に接続できません")
+            self._pool.put(conn)
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def _write(self, *request) -> Any:
+        result, seq = self._call(*request)
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq >= seq, timeout=self.SYNC_TIMEOUT_S)
+        return result
+
+    def set_selection(self, title: str, artist: str = "", metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        return self._write("set_selection", title, artist, metadata or {})
+
+    def remove_reservation(self, reservation_id: int) -> bool:
+        return self._write("remove_reservation", reservation_id)
+
+    def clear_selection(self):
+        self._write("clear_selection")
+
+    def since(self, cursor: Optional[int], epoch: Optional[str] = None) -> Dict[str, Any]:
+        """EventLog.since（リングバッファは Commander 側にある）"""
+        return self._call("since", cursor, epoch)
+
+    def report_requests(self, count: int):
+        """このプロセスで処理したリクエスト数を Commander に送る（パフォーマンス HUD 用）"""
+        self._call("requests", count)
+
+    # ==========================
+    # 読み出し（ミラー）
+    # ==========================
+    def get_selection(self) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            return dict(next(iter(self._queue.values()))) if self._queue else None
+
+    def has_selection(self) -> bool:
+        with self._cond:
+            return bool(self._queue)
+
+    def get_queue(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [dict(entry) for entry in self._queue.values()]
+
+    def peek_queue(self, count: int = 1) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [dict(entry) for entry in list(self._queue.values())[:count]]
+
+    def get_playback(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._playback)
+
+    def add_listener(self, callback: Callable[[str, Dict[str, Any]], None]):
+        with self._cond:
+            self._listeners.append(callback)
+
+    # ==========================
+    # 購読
+    # ==========================
+    def _subscribe_loop(self):
+        while True:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+            except (OSError, EOFError):
+                time.sleep(self.RECONNECT_S)
+                continue
+            try:
+                conn.send_bytes(encode(("subscribe",)))
+                seq, epoch, entries, playback = decode(conn.recv_bytes())
+                with self._cond:
+                    self.epoch = epoch
+                    self._seq = seq
+                    self._queue = OrderedDict((entry["id"], entry) for entry in entries)
+                    self._playback = playback
+                    self._cond.notify_all()
+                self._ready.set()
+                while True:
+                    self._apply(*decode(conn.recv_bytes()))
+            except (OSError, EOFError):
+                pass
+            finally:
+                conn.close()
+            time.sleep(self.RECONNECT_S)
+
+    def _apply(self, seq: int, event: str, data: Dict[str, Any]):
+        with self._cond:
+            if event == "reserved":
+                self._queue[data["id"]] = data
+            elif event in ("started", "removed"):
+                self._queue.pop(data.get("id"), None)
+            elif event == "cleared":
+                self._queue.clear()
+            elif event == "playback":
+                self._playback = data
+            self._seq = seq
+            listeners = list(self._listeners)
+            self._cond.notify_all()
+        for callback in listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                print(f"選曲通知エラー: {e}")
@@ -1,36 +1,104 @@
 # server/selection_manager.py
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable
 from datetime import datetime
-from threading import Lock
+from threading import Lock, RLock
+from collections import deque
+from itertools import count
 
 class SelectionManager:
-    """選曲管理クラス（スレッドセーフ）"""
-    
+    """選曲管理クラス（スレッドセーフ）
+
+    選曲は予約キューとして保持し、先頭が「次に歌う曲」となる。
+    変更と通知は _notify_lock で直列化し、通知がキューの変更と同じ順に届くようにする
+    （読み出しは _lock だけなので、通知中でも待たされない）。
+    """
+
     def __init__(self):
         self._lock = Lock()
-        self._current_selection: Optional[Dict[str, Any]] = None
-    
-    def set_selection(self, title: str, artist: str = "", metadata: Dict[str, Any] = None):
-        """選曲を設定"""
+        self._notify_lock = RLock()  # 変更〜通知の間（リスナーからの再入は許す）
+        self._queue: deque = deque()
+        self._ids = count(1)
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def add_listener(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """予約キューの変更通知を登録（callback(イベント名, データ)、変更の順に呼ばれる）"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, event: str, data: Dict[str, Any]):
         with self._lock:
-            self._current_selection = {
-                "title": title,
-                "artist": artist,
-                "metadata": metadata or {},
-                "timestamp": datetime.now().isoformat()
-            }
-    
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                print(f"選曲通知エラー: {e}")
+
+    def set_selection(self, title: str, artist: str = "", metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """選曲を設定（予約キューの末尾に追加）"""
+        with self._notify_lock:
+            with self._lock:
+                entry = {
+                    "id": next(self._ids),
+                    "title": title,
+                    "artist": artist,
+                    "metadata": metadata or {},
+                    "timestamp": datetime.now().isoformat()
+                }
+                self._queue.append(entry)
+            self._notify("reserved", entry.copy())
+        return entry.copy()
+
     def get_selection(self) -> Optional[Dict[str, Any]]:
-        """現在の選曲を取得"""
+        """現在の選曲（予約キューの先頭）を取得"""
         with self._lock:
-            return self._current_selection.copy() if self._current_selection else None
-    
+            return self._queue[0].copy() if self._queue else None
+
     def clear_selection(self):
-        """選曲をクリア"""
-        with self._lock:
-            self._current_selection = None
-    
+        """選曲をクリア（予約キューを空にする）"""
+        with self._notify_lock:
+            with self._lock:
+                self._queue.clear()
+            self._notify("cleared", {})
+
     def has_selection(self) -> bool:
         """選曲があるかどうか"""
         with self._lock:
-            return self._current_selection is not None
+            return bool(self._queue)
+
+    # -------------------------------
+    # 予約キュー操作
+    # -------------------------------
+    def get_queue(self) -> List[Dict[str, Any]]:
+        """予約キュー全体を取得"""
+        with self._lock:
+            return [entry.copy() for entry in self._queue]
+
+    def peek_queue(self, count: int = 1) -> List[Dict[str, Any]]:
+        """先頭から count 件の予約を取得（キューからは取り出さない）"""
+        with self._lock:
+            return [self._queue[i].copy() for i in range(min(count, len(self._queue)))]
+
+    def take_next(self) -> Optional[Dict[str, Any]]:
+        """先頭の予約を取り出す（再生開始時）"""
+        with self._notify_lock:
+            with self._lock:
+                entry = self._queue.popleft() if self._queue else None
+            if entry is not None:
+                self._notify("started", entry.copy())
+        return entry
+
+    def remove_reservation(self, reservation_id: int) -> bool:
+        """予約を取り消す"""
+        with self._notify_lock:
+            with self._lock:
+                removed = None
+                for entry in self._queue:
+                    if entry["id"] == reservation_id:
+                        removed = entry
+                        break
+                if removed is None:
+                    return False
+                self._queue.remove(removed)
+            self._notify("removed", removed.copy())
+        return True
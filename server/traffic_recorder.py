@@ -0,0 +1,151 @@
+# server/traffic_recorder.py
+import gzip
+import json
+import os
+import queue
+import time
+from datetime import datetime
+from threading import Thread
+from typing import Any, Dict, Optional
+
+from flask import Flask, g, request
+
+from config import Config
+from utils.logger import warn
+
+FORMAT = "pykara-traffic"
+VERSION = 1
+
+# 1レコード = [開始 (ms, 記録開始から), 所要時間 (ms), クライアント番号,
+#              メソッド, パス（クエリ付き）, ルート, ステータス, ボディ]
+FIELDS = ["start_ms", "duration_ms", "client", "method", "path", "route", "status", "body"]
+
+
+class TrafficRecorder:
+    """APIリクエストの記録（容量試験の再生用）
+
+    Flask の before_request / after_request でリクエストの時刻・所要時間・
+    ルート・ボディを取得し、gzip 圧縮の JSON Lines に書き出す。書き込みは
+    専用スレッドで行い、リクエストの処理時間には影響させない。
+    クライアントの IP アドレスは記録せず、接続元ごとの通し番号に置き換える。
+    """
+
+    FLUSH_EVERY = 200
+
+    def __init__(self, config: Config, logger=None):
+        self.logger = logger
+        pattern = config.get("server.record.path", "cache/traffic/api-%Y%m%d-%H%M%S.jsonl.gz")
+        self.path = datetime.now().strftime(pattern)
+        self.max_body_bytes = config.get("server.record.max_body_bytes", 65536)
+
+        self._origin = time.perf_counter()
+        self._clients: Dict[str, int] = {}
+        self._queue: "queue.SimpleQueue[Optional[list]]" = queue.SimpleQueue()
+        self._thread: Optional[Thread] = None
+        self.recorded = 0
+
+    # ==========================
+    # 組み込み
+    # ==========================
+    def install(self, app: Flask):
+        """Flask アプリにフックを登録して記録を開始"""
+        app.before_request(self._before)
+        app.after_request(self._after)
+        self.start()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = Thread(target=self._write_loop, name="traffic-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """残りを書き出して終了"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+
+    def _before(self):
+        g.traffic_start = time.perf_counter()
+        if request.method in ("POST", "PUT", "PATCH"):
+            request.get_data(cache=True)  # 後で get_json() できるようにキャッシュする
+
+    def _after(self, response):
+        started = g.pop("traffic_start", None)
+        if started is None:
+            return response
+        now = time.perf_counter()
+        body = None
+        if request.method in ("POST", "PUT", "PATCH"):
+            data = request.get_data(cache=True)
+            if data:
+                body = data[:self.max_body_bytes].decode("utf-8", errors="replace")
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        path = request.full_path if request.query_string else request.path
+        self._queue.put([
+            round((started - self._origin) * 1000.0, 2),
+            round((now - started) * 1000.0, 3),
+            self._client_id(request.remote_addr or ""),
+            request.method,
+            path,
+            rule,
+            response.status_code,
+            body,
+        ])
+        return response
+
+    def _client_id(self, address: str) -> int:
+        # 辞書への追加は GIL 下で原子的（番号の重複は記録の用途上問題にならない）
+        client = self._clients.get(address)
+        if client is None:
+            client = self._clients.setdefault(address, len(self._clients))
+        return client
+
+    # ==========================
+    # 書き込み（ワーカースレッド）
+    # ==========================
+    def _write_loop(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6) as f:
+                header = {"format": FORMAT, "version": VERSION, "fields": FIELDS,
+                          "started": datetime.now().isoformat()}
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                pending = 0
+                while True:
+                    try:
+                        record = self._queue.get(timeout=1.0)
+                    except queue.Empty:
+                        if pending:
+                            f.flush()
+                            pending = 0
+                        continue
+                    if record is None:
+                        break
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    self.recorded += 1
+                    pending += 1
+                    if pending >= self.FLUSH_EVERY:
+                        f.flush()
+                        pending = 0
+        except OSError as e:
+            warn(self.logger, f"APIリクエストの記録エラー: {e}")
+
+
+def load_recording(path: str) -> Dict[str, Any]:
+    """記録ファイルを読み込む（{"header": ..., "records": [dict, ...]}、開始時刻順）"""
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != FORMAT:
+            raise ValueError(f"APIリクエストの記録ファイルではありません: {path}")
+        fields = header.get("fields", FIELDS)
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(dict(zip(fields, json.loads(line))))
+        except (EOFError, ValueError):
+            pass  # 記録中に終了したファイル（末尾が欠けている）は読めた分まで使う
+    records.sort(key=lambda r: r["start_ms"])
+    return {"header": header, "records": records}
@@ -0,0 +1,326 @@
+# server/traffic_replay.py
+import http.client
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from server.traffic_recorder import load_recording
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    """最近傍順位法のパーセンタイル（samples は昇順）"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, Any]:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "avg_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+        "p50_ms": round(_percentile(samples, 0.50), 3),
+        "p90_ms": round(_percentile(samples, 0.90), 3),
+        "p99_ms": round(_percentile(samples, 0.99), 3),
+        "max_ms": round(samples[-1], 3) if samples else 0.0,
+    }
+
+
+def peak_concurrency(records: List[Dict[str, Any]]) -> int:
+    """記録時の同時処理数の最大値"""
+    events = []
+    for r in records:
+        events.append((r["start_ms"], 1))
+        events.append((r["start_ms"] + r["duration_ms"], -1))
+    events.sort()
+    current = peak = 0
+    for _t, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+class TrafficReplayer:
+    """記録したAPIリクエストの再生（容量試験）
+
+    記録時の開始時刻を speed 倍に縮めたスケジュールで送信する。送信は
+    スレッドプールで行い、記録時の同時処理数に合わせた並列度で、
+    前のリクエストの完了を待たずに時刻どおりに投げる（サーバーが遅れると
+    同時処理数が増え、記録時と同じ負荷の形になる）。
+    """
+
+    def __init__(self, base_url: str, speed: float = 1.0, workers: int = 0, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.speed = max(0.001, float(speed))
+        self.workers = workers
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _send(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        body = record.get("body")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        payload = body.encode("utf-8") if body is not None else None
+        started = time.perf_counter()
+        status, error = None, None
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(record["method"], record["path"], body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if response.will_close:
+                    conn.close()
+                    self._local.conn = None
+                break
+            except (OSError, http.client.HTTPException) as e:
+                # keep-alive 接続が切られていた場合は1回だけ張り直す
+                conn.close()
+                self._local.conn = None
+                error = str(e)
+                if attempt:
+                    break
+                started = time.perf_counter()
+        return {"status": status, "error": error if status is None else None,
+                "latency_ms": (time.perf_counter() - started) * 1000.0}
+
+    def run(self, records: List[Dict[str, Any]], progress=None) -> Dict[str, Any]:
+        """全リクエストを再生して結果を集計"""
+        workers = self.workers or max(16, peak_concurrency(records) * 4)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(records)
+        origin = records[0]["start_ms"] if records else 0.0
+
+        def task(i: int, scheduled: float):
+            result = self._send(records[i])
+            result["lateness_ms"] = (time.perf_counter() - scheduled) * 1000.0 - result["latency_ms"]
+            results[i] = result
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay") as pool:
+            for i, record in enumerate(records):
+                scheduled = started + (record["start_ms"] - origin) / 1000.0 / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(task, i, scheduled)
+                if progress and (i + 1) % 1000 == 0:
+                    progress(i + 1, len(records))
+        elapsed = time.perf_counter() - started
+        lateness = [r["lateness_ms"] for r in results if r is not None]
+        return self._report(records, results, elapsed, workers, lateness)
+
+    def _report(self, records, results, elapsed: float, workers: int,
+                lateness: List[float]) -> Dict[str, Any]:
+        by_route: Dict[str, List[float]] = defaultdict(list)
+        recorded_by_route: Dict[str, List[float]] = defaultdict(list)
+        errors = mismatched = 0
+        for record, result in zip(records, results):
+            route = f"{record['method']} {record.get('route') or record['path']}"
+            recorded_by_route[route].append(record["duration_ms"])
+            if result is None or result["status"] is None:
+                errors += 1
+                continue
+            by_route[route].append(result["latency_ms"])
+            if result["status"] >= 500:
+                errors += 1
+            if result["status"] != record.get("status"):
+                mismatched += 1
+
+        span_s = (records[-1]["start_ms"] - records[0]["start_ms"]) / 1000.0 if records else 0.0
+        all_latency = [ms for samples in by_route.values() for ms in samples]
+        return {
+            "requests": len(records),
+            "errors": errors,
+            "status_mismatches": mismatched,
+            "speed": self.speed,
+            "workers": workers,
+            "recorded_span_s": round(span_s, 3),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(all_latency) / elapsed, 1) if elapsed > 0 else 0.0,
+            "target_rps": round(len(records) / (span_s / self.speed), 1) if span_s > 0 else None,
+            "latency": _latency_summary(all_latency),
+            "lateness": _latency_summary(lateness),
+            "routes": {
+                route: {"replayed": _latency_summary(by_route.get(route, [])),
+                        "recorded": _latency_summary(samples)}
+                for route, samples in sorted(recorded_by_route.items())
+            },
+        }
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_local_server(mode: str = "thread"):
+    """テスト用にこのツリーの APIServer を空の予約キューで起動（URL と停止用の関数を返す）
+
+    mode = "process" では Commander と同じく APIProcess（別プロセス + ローカルソケット）で起動する。
+    """
+    from config import Config
+    from server.event_log import EventLog
+    from server.selection_manager import SelectionManager
+
+    # 作業ディレクトリの config.json は読み書きしない（別プロセスにはファイルで渡すので一時ファイル）
+    config_dir = tempfile.mkdtemp(prefix="pykara-replay-")
+    config = Config(os.path.join(config_dir, "config.json"))
+    config.set("server.record.enabled", False)
+    config.set("server.host", "127.0.0.1")
+    config.set("server.port", _free_port())
+    selection_manager = SelectionManager()
+    event_log = EventLog(config)
+    event_log.attach(selection_manager)
+    if mode == "process":
+        from server.api_process import APIProcess
+        api = APIProcess(selection_manager, config, event_log)
+    else:
+        from server.api_server import APIServer
+        api = APIServer(selection_manager, config, event_log)
+    api.start()
+    url = api.get_url()
+    _wait_until_ready(url)
+
+    def stop():
+        api.stop()
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+    return url, stop
+
+
+def _wait_until_ready(url: str, timeout: float = 15.0):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1.0)
+            conn.request("GET", "/api/status")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"APIサーバーが起動しません: {url}")
+
+
+def _fetch_metrics(url: str) -> Optional[Dict[str, Any]]:
+    """APIサーバーのプロセスの計測値（/api/metrics、未対応のサーバーなら None）"""
+    parts = urlsplit(url)
+    try:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=5.0)
+        conn.request("GET", "/api/metrics")
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        if response.status != 200:
+            return None
+        data = json.loads(body)
+        return {"mode": data.get("mode"), **data.get("metrics", {})}
+    except (OSError, ValueError):
+        return None
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    latency = report["latency"]
+    lines = [
+        f"リクエスト: {report['requests']} 件 / エラー: {report['errors']} 件"
+        f" / 記録時とステータスが異なる: {report['status_mismatches']} 件",
+        f"速度: {report['speed']}x（記録 {report['recorded_span_s']} 秒 → 再生 {report['elapsed_s']} 秒、"
+        f"並列 {report['workers']}）",
+        f"スループット: {report['throughput_rps']} req/s（目標 {report['target_rps']} req/s）",
+        f"レイテンシ: p50 {latency['p50_ms']} ms / p90 {latency['p90_ms']} ms"
+        f" / p99 {latency['p99_ms']} ms / 最大 {latency['max_ms']} ms",
+        f"送信遅れ: p99 {report['lateness']['p99_ms']} ms / 最大 {report['lateness']['max_ms']} ms",
+    ]
+    if report.get("server_request_ms"):
+        server = report["server_request_ms"]
+        line = (f"サーバー内の処理時間（{report.get('mode')}）: 平均 {server['avg_ms']} ms"
+                f" / p95 {server['p95_ms']} ms / 最大 {server['max_ms']} ms")
+        if report.get("server_ipc_ms"):
+            line += f"（うち Commander との通信 平均 {report['server_ipc_ms']['avg_ms']} ms）"
+        lines.append(line)
+    lines.append("ルート別（再生 p50 / p99、記録 p50 / p99）:")
+    for route, stats in report["routes"].items():
+        replayed, recorded = stats["replayed"], stats["recorded"]
+        lines.append(f"  {route}: {replayed['count']} 件  {replayed['p50_ms']} / {replayed['p99_ms']} ms"
+                     f"  （記録 {recorded['p50_ms']} / {recorded['p99_ms']} ms）")
+    return lines
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="記録したAPIリクエストを再生し、レイテンシ・スループットを計測します")
+    parser.add_argument("recording", help="記録ファイル（server.record で作成した .jsonl.gz）")
+    parser.add_argument("--url", default=None, help="再生先のURL（省略時はこのツリーの APIServer をローカルで起動）")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread",
+                        help="ローカル起動時の APIサーバーの実行方式（--url 省略時）")
+    parser.add_argument("--speed", type=float, default=1.0, help="再生速度（1, 10, 100 など）")
+    parser.add_argument("--workers", type=int, default=0, help="並列数（0 = 記録時の最大同時処理数から決定）")
+    parser.add_argument("--label", default="", help="レポートに付けるラベル（バージョン比較用）")
+    parser.add_argument("--output", default=None, help="レポートを JSON で保存するパス")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    records = recording["records"]
+    if not records:
+        print("記録されたリクエストがありません")
+        return 1
+
+    stop = None
+    url = args.url
+    if url is None:
+        url, stop = _start_local_server(args.mode)
+    print(f"{len(records)} 件のリクエストを {args.speed}x で再生します: {url}")
+
+    replayer = TrafficReplayer(url, speed=args.speed, workers=args.workers)
+    report = replayer.run(records, progress=lambda done, total: print(f"[{done}/{total}]"))
+    server_metrics = _fetch_metrics(url)
+    if stop is not None:
+        stop()
+
+    report = {
+        "label": args.label,
+        "recording": os.path.basename(args.recording),
+        "recorded_at": recording["header"].get("started"),
+        "replayed_at": datetime.now().isoformat(),
+        "target": url,
+        "mode": server_metrics.get("mode") if server_metrics else None,
+        "server_request_ms": server_metrics.get("timings", {}).get("api.request") if server_metrics else None,
+        "server_ipc_ms": server_metrics.get("timings", {}).get("api.ipc.call") if server_metrics else None,
+        "python": platform.python_version(),
+        **report,
+    }
+    for line in format_report(report):
+        print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"レポートを保存しました: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
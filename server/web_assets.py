@@ -0,0 +1,147 @@
+# server/web_assets.py
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from flask import Request, Response
+
+from config import Config
+from utils.logger import warn
+
+try:
+    import brotli  # 任意（入っていれば gzip より小さい br も用意する）
+except ImportError:
+    brotli = None
+
+# URL を固定するファイル（ハッシュを付けず、毎回再検証させる）
+ENTRY_FILES = ("index.html", "sw.js")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web")
+
+
+class _Asset:
+    """圧縮済みの本体と応答ヘッダー"""
+
+    def __init__(self, data: bytes, mimetype: str, etag: str, cache_control: str):
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        self.bodies: Dict[str, bytes] = {"identity": data}
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            self.bodies["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                self.bodies["br"] = compressed
+
+
+class WebAssets:
+    """リモート UI（web/ ディレクトリ）の配信
+
+    起動時に一度だけ全ファイルを読み込み、内容のハッシュを付けた名前
+    （app.3f2a9c1d.js）にして gzip（brotli があれば br も）で圧縮しておく。
+    ハッシュ付きのファイルは immutable で配り、端末は中身が変わるまで取りに来ない。
+    index.html と sw.js（Service Worker）だけは URL を固定して毎回再検証させ、
+    中の参照はハッシュ付きの名前に書き換えて配る。
+    """
+
+    def __init__(self, config: Config, logger=None):
+        self.logger = logger
+        self.dir = config.get("remote.dir", "") or _DEFAULT_DIR
+        self._assets: Dict[str, _Asset] = {}
+        self.load()
+
+    def load(self):
+        """web/ を読み込み直す"""
+        assets: Dict[str, _Asset] = {}
+        renames: Dict[str, str] = {}
+        sources: Dict[str, bytes] = {}
+        try:
+            names = sorted(os.listdir(self.dir))
+        except OSError as e:
+            warn(self.logger, f"リモート UI のディレクトリを読めません: {e}")
+            names = []
+        for name in names:
+            path = os.path.join(self.dir, name)
+            if not os.path.isfile(path) or name.startswith("."):
+                continue
+            with open(path, "rb") as f:
+                sources[name] = f.read()
+
+        for name, data in sources.items():
+            if name in ENTRY_FILES:
+                continue
+            digest = hashlib.sha256(data).hexdigest()[:10]
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{digest}{ext}"
+            renames[name] = hashed
+            assets[hashed] = _Asset(data, self._mimetype(name), f'"{digest}"', IMMUTABLE)
+
+        # 入口のファイルはハッシュ付きの名前を埋め込む（sw.js には先読みする一覧と版も）
+        build = hashlib.sha256("\n".join(sorted(renames.values())).encode("utf-8")).hexdigest()[:10]
+        for name in ENTRY_FILES:
+            if name not in sources:
+                continue
+            text = sources[name].decode("utf-8")
+            for original, hashed in renames.items():
+                text = text.replace(f"assets/{original}", f"assets/{hashed}")
+            text = text.replace("__BUILD__", build)
+            text = text.replace("__PRECACHE__", json.dumps([f"assets/{n}" for n in sorted(renames.values())]))
+            data = text.encode("utf-8")
+            etag = f'"{hashlib.sha256(data).hexdigest()[:10]}"'
+            assets[name] = _Asset(data, self._mimetype(name), etag, REVALIDATE)
+        self._assets = assets
+
+    @staticmethod
+    def _mimetype(name: str) -> str:
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if mimetype.startswith("text/") or mimetype in ("application/javascript", "application/json"):
+            mimetype += "; charset=utf-8"
+        return mimetype
+
+    def names(self):
+        """配信するファイル名（ハッシュ付き）"""
+        return sorted(self._assets)
+
+    def response(self, name: str, request: Request) -> Optional[Response]:
+        """ファイルの応答（Accept-Encoding で圧縮を選ぶ。なければ None）"""
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+        headers = {"Cache-Control": asset.cache_control, "ETag": asset.etag, "Vary": "Accept-Encoding"}
+        if asset.etag in request.headers.get("If-None-Match", ""):
+            return Response(status=304, headers=headers)
+        encoding = negotiate(request, asset.bodies)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], mimetype=asset.mimetype, headers=headers)
+
+
+def negotiate(request: Request, available) -> str:
+    """Accept-Encoding と用意してある圧縮から送る形式を選ぶ（br > gzip > なし）"""
+    for encoding in ("br", "gzip"):
+        if encoding in available and request.accept_encodings.quality(encoding) > 0:
+            return encoding
+    return "identity"
+
+
+def gzip_file_response(path: str, request: Request, cache_control: str = IMMUTABLE) -> Response:
+    """gzip 済みの JSON ファイルをそのまま返す（gzip を受け付けない端末には展開して返す）"""
+    etag = f'"{os.path.basename(path)}"'
+    headers = {"Cache-Control": cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    with open(path, "rb") as f:
+        data = f.read()
+    if negotiate(request, ("gzip",)) == "gzip":
+        headers["Content-Encoding"] = "gzip"
+    else:
+        data = gzip.decompress(data)
+    return Response(data, mimetype="application/json; charset=utf-8", headers=headers)
@@ -0,0 +1 @@
+# storage/__init__.py
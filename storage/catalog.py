@@ -0,0 +1,555 @@
+# storage/catalog.py
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from utils.logger import warn
+from utils.metrics import metrics
+
+_COLUMNS = ("song_id", "title", "artist", "title_reading", "artist_reading", "genre", "path",
+            "title_key", "artist_key")
+
+# リモートに配るスナップショットの列（読みは検索キーに正規化済みのものだけ）
+SNAPSHOT_FIELDS = ("song_id", "title", "artist", "genre", "title_key", "artist_key")
+
+_VERSION_RE = re.compile(r"^[0-9A-Za-z-]+$")
+
+# 入力の列名の別名（CSV の見出し / JSON のキー）
+_ALIASES = {
+    "song_id": ("song_id", "id", "code"),
+    "title": ("title", "name"),
+    "artist": ("artist", "singer"),
+    "title_reading": ("title_reading", "reading", "title_kana", "kana"),
+    "artist_reading": ("artist_reading", "artist_kana"),
+    "genre": ("genre",),
+    "path": ("path", "file"),
+}
+
+# 読みの正規化: カタカナ → ひらがな、空白・記号を除去（NFKC のあとに適用）
+_READING_TABLE = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+_READING_TABLE.update({ord(ch): None for ch in " \t　・･,、.。!！?？'\"()（）[]「」『』-_~〜/／:：;；&＆"})
+
+
+def normalize_reading(text: Optional[str]) -> str:
+    """検索キー用に読み（またはタイトル）を正規化"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", text).lower().translate(_READING_TABLE)
+
+
+def _normalize_batch(rows: List[Dict[str, Any]]) -> List[Tuple]:
+    """入力の行をまとめて正規化し、挿入用のタプルにする（song_id のない行は除く）"""
+    out = []
+    for row in rows:
+        values = {}
+        for column, names in _ALIASES.items():
+            for name in names:
+                value = row.get(name)
+                if value not in (None, ""):
+                    values[column] = str(value).strip()
+                    break
+        if not values.get("song_id"):
+            continue
+        values["title_key"] = normalize_reading(values.get("title_reading") or values.get("title"))
+        values["artist_key"] = normalize_reading(values.get("artist_reading") or values.get("artist"))
+        out.append(tuple(values.get(column) for column in _COLUMNS))
+    return out
+
+
+# ==========================
+# 入力ファイルの逐次読み込み
+# ==========================
+def _iter_json_array(f: io.TextIOBase, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """巨大な JSON 配列を全体を読み込まずに1要素ずつ返す"""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip(chars: str):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip(" \t\r\n")
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("JSON 配列ではありません")
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("JSON 配列が閉じていません")
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        pos = end
+        yield item
+
+
+def iter_rows(f: io.TextIOBase, fmt: str) -> Iterator[Dict[str, Any]]:
+    """入力ファイルの行を逐次返す（fmt: "csv" / "json" / "jsonl"）"""
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+    elif fmt == "jsonl":
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        yield from _iter_json_array(f)
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "json"
+
+
+# ==========================
+# カタログの版の管理
+# ==========================
+def _pointer_path(catalog_dir: str) -> str:
+    return os.path.join(catalog_dir, "current.json")
+
+
+def read_pointer(catalog_dir: str) -> Optional[Dict[str, Any]]:
+    """現在公開中の版（{"version", "file", ...}、なければ None）"""
+    try:
+        with open(_pointer_path(catalog_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _version_file(catalog_dir: str, version: str) -> Optional[str]:
+    """残っている版の SQLite ファイル（不正な版・削除済みなら None）"""
+    if not version or not _VERSION_RE.match(version):
+        return None
+    path = os.path.join(catalog_dir, f"catalog-{version}.db")
+    return path if os.path.exists(path) else None
+
+
+def _open_readonly(path: str) -> sqlite3.Connection:
+    uri = Path(os.path.abspath(path)).as_uri()
+    return sqlite3.connect(f"{uri}?mode=ro", uri=True, check_same_thread=False)
+
+
+class Catalog:
+    """楽曲カタログ（/api/songs の参照側）
+
+    公開中の版の SQLite ファイルを読み取り専用で開いて検索する。取り込みが
+    完了して current.json が差し替わるまでは古い版を返し続け、差し替わったら
+    次の参照で新しい版に切り替える（確認は CHECK_INTERVAL_S に1回の stat のみ）。
+    """
+
+    CHECK_INTERVAL_S = 1.0
+    MAX_LIMIT = 500
+
+    def __init__(self, config: Config, logger=None):
+        self.logger = logger
+        self.dir = config.get("catalog.dir", os.path.join("cache", "catalog"))
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pointer: Optional[Dict[str, Any]] = None
+        self._pointer_mtime: Optional[float] = None
+        self._checked = 0.0
+        self._snapshot_lock = Lock()  # スナップショット・差分の生成は1つずつ
+        self._snapshot_stats = metrics.timing("catalog.snapshot")
+
+    @property
+    def version(self) -> Optional[str]:
+        with self._lock:
+            self._refresh()
+            return self._pointer["version"] if self._pointer else None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.CHECK_INTERVAL_S:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(_pointer_path(self.dir)).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._pointer_mtime:
+            return
+        pointer = read_pointer(self.dir)
+        if pointer is None:
+            return
+        try:
+            conn = _open_readonly(os.path.join(self.dir, pointer["file"]))
+            conn.row_factory = sqlite3.Row
+        except (KeyError, sqlite3.Error) as e:
+            warn(self.logger, f"楽曲カタログを開けません: {e}")
+            return
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = conn
+        self._pointer = pointer
+        self._pointer_mtime = mtime
+
+    def search(self, query: str = "", limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """曲名・歌手名（読み）の前方一致で検索"""
+        limit = max(1, min(self.MAX_LIMIT, int(limit)))
+        offset = max(0, int(offset))
+        key = normalize_reading(query)
+        columns = "song_id, title, artist, title_reading, artist_reading, genre, path"
+        with self._lock:
+            self._refresh()
+            if self._conn is None:
+                return {"version": None, "songs": []}
+            if key:
+                sql = (f"SELECT {columns}, title_key FROM songs WHERE title_key >= :lo AND title_key < :hi "
+                       f"UNION SELECT {columns}, title_key FROM songs WHERE artist_key >= :lo AND artist_key < :hi "
+                       "ORDER BY title_key LIMIT :limit OFFSET :offset")
+                params = {"lo": key, "hi": key + "\uffff", "limit": limit, "offset": offset}
+            else:
+                sql = f"SELECT {columns} FROM songs ORDER BY title_key LIMIT :limit OFFSET :offset"
+                params = {"limit": limit, "offset": offset}
+            rows = self._conn.execute(sql, params).fetchall()
+            version = self._pointer["version"]
+        songs = [{k: row[k] for k in row.keys() if k != "title_key" and row[k] is not None} for row in rows]
+        return {"version": version, "songs": songs}
+
+    def get(self, song_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            if self._conn is None:
+                return None
+            row = self._conn.execute("SELECT * FROM songs WHERE song_id = ?", (song_id,)).fetchone()
+        if row is None:
+            return None
+        return {k: row[k] for k in row.keys() if not k.endswith("_key") and row[k] is not None}
+
+    # ==========================
+    # リモート用のスナップショット・差分
+    # ==========================
+    def snapshot_file(self, version: str) -> Optional[str]:
+        """版の全件スナップショット（gzip 済み JSON）のパス（版が残っていなければ None）
+
+        形式: {"version", "fields": [...], "songs": [[値, ...], ...]}
+        一度作ったら版ごとにカタログのディレクトリに置いておく。
+        """
+        source = _version_file(self.dir, version)
+        if source is None:
+            return None
+        path = os.path.join(self.dir, f"snapshot-{version}.json.gz")
+        with self._snapshot_lock:
+            if not os.path.exists(path):
+                with self._snapshot_stats.measure():
+                    self._write_snapshot(path, source, {"version": version})
+        return path
+
+    def delta_file(self, base_version: str, version: str) -> Optional[str]:
+        """base_version → version の差分（gzip 済み JSON）のパス（どちらかの版がなければ None）
+
+        形式: {"version", "base_version", "fields": [...], "songs": [追加・変更された行], "deleted": [song_id, ...]}
+        """
+        source = _version_file(self.dir, version)
+        base = _version_file(self.dir, base_version)
+        if source is None or base is None or base_version == version:
+            return None
+        path = os.path.join(self.dir, f"delta-{base_version}_{version}.json.gz")
+        with self._snapshot_lock:
+            if not os.path.exists(path):
+                with self._snapshot_stats.measure():
+                    self._write_snapshot(path, source, {"version": version, "base_version": base_version},
+                                         base=base)
+        return path
+
+    @staticmethod
+    def _write_snapshot(path: str, source: str, header: Dict[str, Any], base: Optional[str] = None):
+        columns = ", ".join(SNAPSHOT_FIELDS)
+        conn = _open_readonly(source)
+        tmp = path + ".tmp"
+        try:
+            if base is None:
+                rows = conn.execute(f"SELECT {columns} FROM songs ORDER BY title_key")
+                deleted: List[str] = []
+            else:
+                conn.execute("ATTACH DATABASE ? AS base", (Path(os.path.abspath(base)).as_uri() + "?mode=ro",))
+                deleted = [row[0] for row in conn.execute(
+                    "SELECT song_id FROM base.songs EXCEPT SELECT song_id FROM main.songs")]
+                rows = conn.execute(f"SELECT {columns} FROM main.songs EXCEPT SELECT {columns} FROM base.songs")
+            dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+                head = dict(header, fields=list(SNAPSHOT_FIELDS))
+                if base is not None:
+                    head["deleted"] = deleted
+                f.write(dumps(head)[:-1] + ',"songs":[')
+                first = True
+                while True:
+                    batch = rows.fetchmany(5000)
+                    if not batch:
+                        break
+                    chunk = ",".join(dumps(list(row)) for row in batch)
+                    f.write(chunk if first else "," + chunk)
+                    first = False
+                f.write("]}")
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            conn.close()
+
+
+class CatalogImporter:
+    """楽曲カタログの一括取り込み
+
+    入力（CSV / JSON 配列 / JSON Lines）を全体を読み込まずに逐次読み、
+    BATCH_SIZE 行ずつ読みを正規化して、新しい版の SQLite ファイルに大きな
+    トランザクションで書き込む。完了したら current.json を os.replace で
+    差し替えて公開する（それまで APIサーバーは古い版を返す）。
+
+    差分ファイル（delta=True）は公開中の版を複製し、変更された行だけを適用する。
+    行の "op" が "delete" なら削除、それ以外は追加・上書き。
+    """
+
+    BATCH_SIZE = 5000
+    COMMIT_ROWS = 200000
+
+    def __init__(self, config: Config, logger=None):
+        self.logger = logger
+        self.dir = config.get("catalog.dir", os.path.join("cache", "catalog"))
+        self.keep_versions = max(1, config.get("catalog.keep_versions", 2))
+
+    def run(self, source: str, delta: bool = False, fmt: Optional[str] = None,
+            progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """取り込みを実行して公開（戻り値は集計）"""
+        started = time.monotonic()
+        fmt = fmt or detect_format(source)
+        os.makedirs(self.dir, exist_ok=True)
+        base = read_pointer(self.dir)
+        if delta and base is None:
+            raise ValueError("差分を適用する元のカタログがありません（先に全件を取り込んでください）")
+
+        version = self._new_version()
+        filename = f"catalog-{version}.db"
+        path = os.path.join(self.dir, filename)
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+        conn = sqlite3.connect(tmp, isolation_level=None)
+        stats = {"version": version, "source": os.path.basename(source), "delta": delta,
+                 "rows": 0, "upserted": 0, "deleted": 0, "skipped": 0}
+        try:
+            if delta:
+                src = sqlite3.connect(os.path.join(self.dir, base["file"]))
+                try:
+                    src.backup(conn)
+                finally:
+                    src.close()
+            else:
+                self._create_schema(conn)
+            # 公開前の一時ファイルなので、失敗したら捨てるだけ（ジャーナル不要）
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA cache_size = -65536")
+
+            self._load(conn, source, fmt, delta, stats, started, progress)
+            if not delta:
+                conn.execute("CREATE INDEX songs_title_key ON songs (title_key)")
+                conn.execute("CREATE INDEX songs_artist_key ON songs (artist_key)")
+            total = conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+            meta = {"version": version, "base_version": base["version"] if delta and base else None,
+                    "source": stats["source"], "songs": total, "imported_at": time.time()}
+            conn.execute("DELETE FROM meta")
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [(k, json.dumps(v)) for k, v in meta.items()])
+            conn.execute("ANALYZE")
+            conn.close()
+        except BaseException:
+            conn.close()
+            os.remove(tmp)
+            raise
+
+        os.replace(tmp, path)
+        self._publish({"version": version, "file": filename, "songs": total,
+                       "base_version": meta["base_version"]})
+        self._cleanup(filename)
+        stats["songs"] = total
+        stats["seconds"] = round(time.monotonic() - started, 2)
+        if self.logger:
+            self.logger.info(f"楽曲カタログを公開しました: 版 {version}、{total} 曲（{stats['seconds']} 秒）")
+        return stats
+
+    def _new_version(self) -> str:
+        version = time.strftime("%Y%m%d-%H%M%S")
+        # 同じ秒の版が残っていれば、それより大きい番号を付ける（削除した版の名前は使い回さない）
+        pattern = re.compile(rf"^catalog-{re.escape(version)}(?:-(\d+))?\.db$")
+        suffix = 0
+        for name in os.listdir(self.dir):
+            match = pattern.match(name)
+            if match:
+                suffix = max(suffix, int(match.group(1) or 1))
+        return f"{version}-{suffix + 1}" if suffix else version
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE songs (song_id TEXT PRIMARY KEY, title TEXT, artist TEXT,"
+            "title_reading TEXT, artist_reading TEXT, genre TEXT, path TEXT,"
+            "title_key TEXT, artist_key TEXT)"
+        )
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _load(self, conn: sqlite3.Connection, source: str, fmt: str, delta: bool,
+              stats: Dict[str, Any], started: float, progress):
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        insert = f"INSERT OR REPLACE INTO songs ({', '.join(_COLUMNS)}) VALUES ({placeholders})"
+        total_bytes = os.path.getsize(source)
+        in_transaction = 0
+
+        with open(source, "rb") as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+            batch: List[Dict[str, Any]] = []
+            deletes: List[Tuple[str]] = []
+
+            def flush():
+                nonlocal batch, deletes, in_transaction
+                if not in_transaction:
+                    conn.execute("BEGIN")
+                rows = _normalize_batch(batch)
+                conn.executemany(insert, rows)
+                if deletes:
+                    conn.executemany("DELETE FROM songs WHERE song_id = ?", deletes)
+                stats["upserted"] += len(rows)
+                stats["deleted"] += len(deletes)
+                stats["skipped"] += len(batch) - len(rows)
+                in_transaction += len(batch) + len(deletes)
+                batch, deletes = [], []
+                if in_transaction >= self.COMMIT_ROWS:
+                    conn.execute("COMMIT")
+                    in_transaction = 0
+                if progress:
+                    elapsed = time.monotonic() - started
+                    progress({"rows": stats["rows"], "bytes": raw.tell(), "total_bytes": total_bytes,
+                              "rows_per_s": stats["rows"] / elapsed if elapsed > 0 else 0.0})
+
+            for row in iter_rows(text, fmt):
+                stats["rows"] += 1
+                if not isinstance(row, dict):
+                    stats["skipped"] += 1
+                    continue
+                if str(row.get("op", "")).lower() == "delete":
+                    if delta:
+                        song_id = next((row[n] for n in _ALIASES["song_id"] if row.get(n)), None)
+                        if song_id:
+                            deletes.append((str(song_id).strip(),))
+                            continue
+                    stats["skipped"] += 1
+                    continue
+                batch.append(row)
+                if len(batch) + len(deletes) >= self.BATCH_SIZE:
+                    flush()
+            if batch or deletes:
+                flush()
+        if in_transaction:
+            conn.execute("COMMIT")
+
+    def _publish(self, pointer: Dict[str, Any]):
+        tmp = _pointer_path(self.dir) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(pointer, f, ensure_ascii=False)
+        os.replace(tmp, _pointer_path(self.dir))
+
+    def _cleanup(self, current: str):
+        """古い版を削除（公開中を含めて keep_versions 個を残す）
+
+        同じ秒の取り込みは版に "-2", "-10" などが付き、名前の順では新旧が決まらない
+        ので、ファイルの更新時刻（公開した順）で新しいものから残す。
+        """
+        files = []
+        for name in os.listdir(self.dir):
+            if name.startswith("catalog-") and name.endswith(".db") and name != current:
+                try:
+                    files.append((os.path.getmtime(os.path.join(self.dir, name)), name))
+                except OSError:
+                    continue
+        files.sort(reverse=True)
+        for _, name in files[self.keep_versions - 1:]:
+            try:
+                os.remove(os.path.join(self.dir, name))
+            except OSError:
+                pass  # 参照中のファイル（Windows）は次回に削除
+        # 削除した版のスナップショット・差分（リモート用）も消す
+        kept = {name[len("catalog-"):-len(".db")] for name in os.listdir(self.dir)
+                if name.startswith("catalog-") and name.endswith(".db")}
+        for name in os.listdir(self.dir):
+            if not name.endswith(".json.gz"):
+                continue
+            stem = name[:-len(".json.gz")]
+            if stem.startswith("snapshot-"):
+                versions = [stem[len("snapshot-"):]]
+            elif stem.startswith("delta-"):
+                versions = stem[len("delta-"):].split("_")
+            else:
+                continue
+            if not kept.issuperset(versions):
+                try:
+                    os.remove(os.path.join(self.dir, name))
+                except OSError:
+                    pass
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="楽曲カタログ（/api/songs）を一括で取り込みます")
+    parser.add_argument("source", help="取り込むファイル（CSV / JSON 配列 / JSON Lines）")
+    parser.add_argument("--delta", action="store_true", help="差分ファイルとして公開中の版に適用する")
+    parser.add_argument("--format", choices=("csv", "json", "jsonl"), default=None,
+                        help="入力形式（省略時は拡張子から判定）")
+    args = parser.parse_args()
+
+    last = [0.0]
+
+    def progress(p: Dict[str, Any]):
+        now = time.monotonic()
+        if now - last[0] < 1.0:
+            return
+        last[0] = now
+        percent = p["bytes"] * 100.0 / p["total_bytes"] if p["total_bytes"] else 100.0
+        print(f"[{percent:5.1f}%] {p['rows']:,} 行（{p['rows_per_s']:,.0f} 行/秒）", flush=True)
+
+    importer = CatalogImporter(Config())
+    result = importer.run(args.source, delta=args.delta, fmt=args.format, progress=progress)
+    print(f"版 {result['version']} を公開しました: {result['songs']:,} 曲"
+          f"（{result['rows']:,} 行を読み込み、追加・更新 {result['upserted']:,}、削除 {result['deleted']:,}、"
+          f"スキップ {result['skipped']:,}、{result['seconds']} 秒）")
+
+
+if __name__ == "__main__":
+    main()
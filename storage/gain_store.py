@@ -0,0 +1,82 @@
+# storage/gain_store.py
+import os
+import sqlite3
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+
+class GainStore:
+    """ファイルごとの再生ゲイン（ラウドネス解析結果）
+
+    解析は audio.loudness で事前に行い、再生時はメモリ上の辞書を
+    参照するだけにする（再生中の解析コストはゼロ）。
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.db_path = config.get("loudness.db_path", os.path.join("cache", "loudness.db"))
+        self.max_boost_db = config.get("loudness.max_boost_db", 6.0)
+        self._lock = Lock()
+        # 絶対パス → (サイズ, 更新時刻, 統合ラウドネス, ゲインdB)。無音のファイルは後ろ2つが None
+        self._gains: Dict[str, Tuple[int, float, Optional[float], Optional[float]]] = {}
+        self._pending: List[Tuple[str, int, float, Optional[float], Optional[float]]] = []
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS loudness ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime REAL,"
+                "integrated_lufs REAL, gain_db REAL)"
+            )
+            for path, size, mtime, lufs, gain_db in conn.execute("SELECT * FROM loudness"):
+                self._gains[path] = (size, mtime, lufs, gain_db)
+        finally:
+            conn.close()
+
+    def needs_analysis(self, path: str) -> bool:
+        """未解析、または解析後にファイルが変更されているか"""
+        entry = self._gains.get(os.path.abspath(path))
+        if entry is None:
+            return True
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return entry[0] != st.st_size or entry[1] != st.st_mtime
+
+    def set(self, path: str, size: int, mtime: float,
+            integrated_lufs: Optional[float], gain_db: Optional[float]):
+        """解析結果を登録（flush() でまとめて保存）"""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._gains[path] = (size, mtime, integrated_lufs, gain_db)
+            self._pending.append((path, size, mtime, integrated_lufs, gain_db))
+
+    def flush(self):
+        """登録済みの結果を1トランザクションで保存"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO loudness VALUES (?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+    def get_gain_db(self, path: str) -> Optional[float]:
+        """ファイルの再生ゲイン (dB)。未解析・無音なら None"""
+        entry = self._gains.get(os.path.abspath(path))
+        return entry[3] if entry else None
+
+    def volume_for(self, path: str, base_volume: float) -> float:
+        """基準音量にファイルのゲインを掛けた再生音量（0.0～1.0）"""
+        gain_db = self.get_gain_db(path)
+        if gain_db is None:
+            return base_volume
+        gain_db = min(gain_db, self.max_boost_db)
+        return max(0.0, min(1.0, base_volume * 10.0 ** (gain_db / 20.0)))
@@ -0,0 +1,312 @@
+# storage/media_cache.py
+import hashlib
+import json
+import os
+import re
+import time
+from collections import deque
+from threading import Thread, Event, Lock
+from typing import Any, Dict, Optional
+
+from config import Config
+from utils.bandwidth import BandwidthLimiter
+from utils.logger import warn
+from utils.metrics import metrics
+
+# このクラスが作るファイル名（元パスの SHA-1 先頭 20 桁 + 拡張子、コピー途中は .part）
+_CACHE_NAME = re.compile(r"^[0-9a-f]{20}(\.\w+)?(\.part)?$")
+
+
+class MediaCache:
+    """NAS 上のメディアライブラリのローカルキャッシュ（容量上限付き）
+
+    予約曲やアトラクト動画をバックグラウンドでローカルディレクトリに
+    コピーしておき、再生時はコピー元のサイズ・更新時刻が一致する場合に
+    限りローカルのパスを返す。容量を超える場合は LRU（または LFU）で削除する。
+    コピーは先読みと同じ帯域上限で行い、再生中（resolve で owner を指定して
+    返したもの）のファイルは削除しない。
+    """
+
+    INDEX_FILE = "index.json"
+    COPY_BUFFER = 4 * 1024 * 1024
+    INDEX_SAVE_INTERVAL = 30.0
+
+    def __init__(self, config: Config, logger=None):
+        self.config = config
+        self.logger = logger
+        self.cache_dir = config.get("media_cache.dir", os.path.join("cache", "media"))
+        self.budget_bytes = int(config.get("media_cache.budget_gb", 50) * 1024 ** 3)
+        self.policy = config.get("media_cache.policy", "lru")
+
+        self._lock = Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}  # 元ファイルの絶対パス → エントリ
+        self._used_bytes = 0
+        self._pending = deque()
+        self._pending_set = set()
+        self._in_use: Dict[Any, str] = {}  # 再生中の owner → 元ファイル
+        self.limiter = BandwidthLimiter.shared(config)
+        self._wake = Event()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._dirty = False
+        self._last_saved = 0.0
+
+        self._hits = 0
+        self._misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    # ==========================
+    # インデックス
+    # ==========================
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+
+        # キャッシュファイルが消えているエントリ・壊れたエントリは捨てる
+        for source, entry in entries.items():
+            name = entry.get("file") if isinstance(entry, dict) else None
+            if not isinstance(name, str) or not _CACHE_NAME.match(name) \
+                    or not all(key in entry for key in ("size", "mtime", "last_access", "hits")):
+                warn(self.logger, f"キャッシュインデックスの不正なエントリを無視します: {source}")
+                continue
+            cached = os.path.join(self.cache_dir, name)
+            if os.path.isfile(cached) and os.path.getsize(cached) == entry["size"]:
+                self._entries[source] = entry
+                self._used_bytes += entry["size"]
+
+        # インデックスにないキャッシュファイル（コピー途中で落ちた一時ファイルなど）を削除。
+        # media_cache.dir を誤ってライブラリに向けても消さないよう、このクラスが作る名前だけを対象にする
+        known = {entry["file"] for entry in self._entries.values()}
+        for name in os.listdir(self.cache_dir):
+            if name in known or not (_CACHE_NAME.match(name) or name == self.INDEX_FILE + ".tmp"):
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def _save_index(self, force: bool = False):
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.monotonic() - self._last_saved < self.INDEX_SAVE_INTERVAL:
+                return
+            data = {source: dict(entry) for source, entry in self._entries.items()}
+            self._dirty = False
+            self._last_saved = time.monotonic()
+        tmp = self._index_path() + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self._index_path())
+        except OSError as e:
+            warn(self.logger, f"キャッシュインデックスの保存エラー: {e}")
+
+    # ==========================
+    # 参照
+    # ==========================
+    def resolve(self, path: str, owner: Any = None) -> str:
+        """再生用のパスを返す（有効なローカルコピーがあればそのパス）
+
+        owner（再生先）を指定すると、release(owner) か同じ owner の次の resolve まで
+        そのファイルを削除の対象から外す。
+        """
+        source = os.path.abspath(path)
+        try:
+            st = os.stat(source)
+        except OSError:
+            return path
+
+        with self._lock:
+            if owner is not None:
+                self._in_use[owner] = source
+            entry = self._entries.get(source)
+            if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                entry["last_access"] = time.time()
+                entry["hits"] += 1
+                self._hits += 1
+                self._dirty = True
+                cached = os.path.join(self.cache_dir, entry["file"])
+            else:
+                self._misses += 1
+                cached = None
+
+        if cached is not None:
+            metrics.increment("media_cache.hit")
+            return cached
+        metrics.increment("media_cache.miss")
+        self.request(path)
+        return path
+
+    def release(self, owner: Any):
+        """owner の再生が終わった（ファイルを削除の対象に戻す）"""
+        with self._lock:
+            self._in_use.pop(owner, None)
+
+    def request(self, path: str):
+        """ローカルへのコピーを予約（バックグラウンドで実行）"""
+        source = os.path.abspath(path)
+        with self._lock:
+            if source in self._pending_set:
+                return
+            self._pending_set.add(source)
+            self._pending.append(source)
+        self._wake.set()
+
+    # ==========================
+    # バックグラウンドコピー
+    # ==========================
+    def start(self):
+        """コピースレッドを起動"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="media-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """コピースレッドを停止"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._save_index(force=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.INDEX_SAVE_INTERVAL)
+            self._wake.clear()
+            while not self._stop.is_set():
+                with self._lock:
+                    if not self._pending:
+                        break
+                    source = self._pending.popleft()
+                    self._pending_set.discard(source)
+                self._fill(source)
+            self._save_index()
+
+    def _fill(self, source: str):
+        try:
+            st = os.stat(source)
+        except OSError:
+            return
+        if st.st_size > self.budget_bytes:
+            return
+
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+                return  # 最新のコピーがある
+        if entry and not self._remove(source):
+            return  # 古いコピーが再生中
+        if not self._make_room(st.st_size):
+            return
+
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:20]
+        name = digest + os.path.splitext(source)[1].lower()
+        cached = os.path.join(self.cache_dir, name)
+        tmp = cached + ".part"
+        try:
+            with open(source, 'rb') as src, open(tmp, 'wb') as dst:
+                while not self._stop.is_set():
+                    chunk = src.read(self.COPY_BUFFER)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    self.limiter.throttle(len(chunk), self._stop)  # 再生中の曲の読み込みに帯域を残す
+            if self._stop.is_set():
+                os.remove(tmp)
+                return
+            # コピー中に元ファイルが変わっていないか確認
+            after = os.stat(source)
+            if after.st_size != st.st_size or after.st_mtime != st.st_mtime \
+                    or os.path.getsize(tmp) != st.st_size:
+                os.remove(tmp)
+                return
+            os.replace(tmp, cached)
+        except OSError as e:
+            warn(self.logger, f"キャッシュへのコピーに失敗しました: {source}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        now = time.time()
+        with self._lock:
+            self._entries[source] = {
+                "file": name,
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "cached_at": now,
+                "last_access": now,
+                "hits": 0,
+            }
+            self._used_bytes += st.st_size
+            self._dirty = True
+        metrics.set_gauge("media_cache.used_bytes", self._used_bytes)
+
+    def _make_room(self, size: int) -> bool:
+        """size バイト入るまで古いエントリを削除（再生中・削除できないものは残す）"""
+        skipped = set()
+        while True:
+            with self._lock:
+                if self._used_bytes + size <= self.budget_bytes:
+                    return True
+                in_use = set(self._in_use.values())
+                candidates = [s for s in self._entries if s not in in_use and s not in skipped]
+                if not candidates:
+                    return False
+                if self.policy == "lfu":
+                    victim = min(candidates,
+                                 key=lambda s: (self._entries[s]["hits"], self._entries[s]["last_access"]))
+                else:
+                    victim = min(candidates, key=lambda s: self._entries[s]["last_access"])
+            if not self._remove(victim):
+                skipped.add(victim)
+
+    def _remove(self, source: str) -> bool:
+        """エントリを削除（ファイルを消せたときだけ使用量から引く）"""
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry is None:
+                return True
+            if source in self._in_use.values():
+                return False
+        try:
+            os.remove(os.path.join(self.cache_dir, entry["file"]))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False  # 参照中のファイル（Windows）は次の機会に削除
+        with self._lock:
+            if self._entries.get(source) is entry:
+                del self._entries[source]
+                self._used_bytes -= entry["size"]
+                self._dirty = True
+        return True
+
+    # ==========================
+    # 統計
+    # ==========================
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュの統計を取得"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "files": len(self._entries),
+                "used_bytes": self._used_bytes,
+                "budget_bytes": self.budget_bytes,
+                "pending": len(self._pending),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else None,
+            }
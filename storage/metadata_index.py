@@ -0,0 +1,297 @@
+# storage/metadata_index.py
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threading import Thread, Event, Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import Config
+from utils.logger import warn
+
+MEDIA_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi")
+_NO_FFPROBE = "ffprobe が見つかりません"
+
+_COLUMNS = (
+    "path", "size", "mtime", "duration", "video_codec", "width", "height", "fps",
+    "audio_codec", "channels", "sample_rate", "bit_rate", "probed_at", "error",
+)
+
+
+def _parse_rate(rate: Optional[str]) -> Optional[float]:
+    """ffprobe の "30000/1001" 形式のフレームレートを数値に変換"""
+    if not rate or rate == "0/0":
+        return None
+    try:
+        num, _, den = rate.partition("/")
+        return round(float(num) / float(den or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_file(path: str) -> Dict[str, Any]:
+    """ffprobe で1ファイルのメタデータを取得（ワーカープロセスで実行）"""
+    result: Dict[str, Any] = {"path": path, "probed_at": time.time(), "error": None}
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-print_format", "json",
+             "-show_format", "-show_streams", path],
+            capture_output=True, timeout=60, check=True
+        ).stdout
+        info = json.loads(out.decode("utf-8", errors="replace"))
+    except FileNotFoundError:
+        result["error"] = _NO_FFPROBE
+        return result
+    except (subprocess.SubprocessError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+
+    fmt = info.get("format", {})
+    if fmt.get("duration"):
+        result["duration"] = float(fmt["duration"])
+    if fmt.get("bit_rate"):
+        result["bit_rate"] = int(fmt["bit_rate"])
+
+    for stream in info.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind == "video" and "video_codec" not in result:
+            result["video_codec"] = stream.get("codec_name")
+            result["width"] = stream.get("width")
+            result["height"] = stream.get("height")
+            result["fps"] = _parse_rate(stream.get("avg_frame_rate") or stream.get("r_frame_rate"))
+        elif kind == "audio" and "audio_codec" not in result:
+            result["audio_codec"] = stream.get("codec_name")
+            result["channels"] = stream.get("channels")
+            if stream.get("sample_rate"):
+                result["sample_rate"] = int(stream["sample_rate"])
+    return result
+
+
+class MetadataIndex:
+    """メディアファイルのメタデータ索引
+
+    ライブラリ内の全ファイルをプロセスプールで ffprobe し、
+    (パス, サイズ, 更新時刻) をキーに SQLite に保存する。
+    変更のないファイルは（解析に失敗したものも）再解析しない。
+    参照はメモリ上の辞書から O(1) で行う。ffprobe がなければ索引は作らない。
+    """
+
+    BATCH_SIZE = 100
+
+    def __init__(self, config: Config, logger=None):
+        self.config = config
+        self.logger = logger
+        self.db_path = config.get("metadata.db_path", os.path.join("cache", "metadata.db"))
+        self.workers = config.get("metadata.workers", 0) or os.cpu_count() or 1
+
+        self._lock = Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[Thread] = None
+        self._stop = Event()
+        self._rescan = Event()
+        self._ffprobe: Optional[bool] = None
+        self.last_scan: Dict[str, Any] = {}
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, duration REAL,"
+                "video_codec TEXT, width INTEGER, height INTEGER, fps REAL,"
+                "audio_codec TEXT, channels INTEGER, sample_rate INTEGER, bit_rate INTEGER,"
+                "probed_at REAL, error TEXT)"
+            )
+            conn.row_factory = sqlite3.Row
+            for row in conn.execute("SELECT * FROM media"):
+                self._records[row["path"]] = dict(row)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    # ==========================
+    # 参照（UI / API スレッドから）
+    # ==========================
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """ファイルのメタデータを取得（未解析なら None）"""
+        record = self._records.get(os.path.abspath(path))
+        return dict(record) if record else None
+
+    def get_duration(self, path: str) -> Optional[float]:
+        """再生時間（秒）"""
+        record = self._records.get(os.path.abspath(path))
+        return record.get("duration") if record else None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # ==========================
+    # 走査
+    # ==========================
+    def library_dirs(self) -> List[str]:
+        """走査対象のディレクトリ（アトラクト動画 + 曲）"""
+        dirs = [
+            self.config.get("attract_video.local_dir", "videos"),
+            self.config.get("songs.local_dir", "songs"),
+        ]
+        return [d for d in dict.fromkeys(dirs) if d and os.path.isdir(d)]
+
+    def available(self) -> bool:
+        """ffprobe があるか（最初の1回だけ調べ、なければ警告する）"""
+        if self._ffprobe is None:
+            self._ffprobe = shutil.which("ffprobe") is not None
+            if not self._ffprobe:
+                warn(self.logger, "ffprobe が見つからないため、メタデータ索引を作成しません"
+                                  "（FFmpeg をインストールしてください）")
+        return self._ffprobe
+
+    def start(self):
+        """バックグラウンドで走査を開始（起動時に1回、以降は rescan() で）"""
+        if (self._thread and self._thread.is_alive()) or not self.available():
+            return
+        self._stop.clear()
+        self._rescan.set()
+        self._thread = Thread(target=self._run, name="metadata-index", daemon=True)
+        self._thread.start()
+
+    def rescan(self):
+        """再走査を要求"""
+        self._rescan.set()
+
+    def stop(self):
+        self._stop.set()
+        self._rescan.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._rescan.wait()
+            self._rescan.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.scan(self.library_dirs())
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"メタデータ索引の作成エラー: {e}")
+
+    @staticmethod
+    def _walk(dirs: Iterable[str]) -> Dict[str, os.stat_result]:
+        files = {}
+        for root_dir in dirs:
+            for root, _subdirs, names in os.walk(root_dir):
+                for name in names:
+                    if name.lower().endswith(MEDIA_EXTENSIONS):
+                        path = os.path.abspath(os.path.join(root, name))
+                        try:
+                            files[path] = os.stat(path)
+                        except OSError:
+                            pass
+        return files
+
+    @staticmethod
+    def _is_under(path: str, roots: List[str]) -> bool:
+        for root in roots:
+            try:
+                if os.path.commonpath([path, root]) == root:
+                    return True
+            except ValueError:
+                continue  # ドライブが異なる（Windows）
+        return False
+
+    def scan(self, dirs: Iterable[str]) -> Dict[str, Any]:
+        """ディレクトリを走査し、新規・変更ファイルだけを解析する
+
+        消えたファイルの記録は、走査したディレクトリの中のものだけを削除する。
+        """
+        started = time.monotonic()
+        if not self.available():
+            self.last_scan = {"files": 0, "probed": 0, "removed": 0, "seconds": 0.0}
+            return self.last_scan
+        roots = [os.path.abspath(d) for d in dirs]
+        files = self._walk(roots)
+
+        changed = []
+        for path, st in files.items():
+            record = self._records.get(path)
+            if record is None or record["size"] != st.st_size or record["mtime"] != st.st_mtime:
+                changed.append(path)
+        removed = [path for path in self._records if path not in files and self._is_under(path, roots)]
+
+        conn = self._connect()
+        try:
+            if removed:
+                with conn:
+                    conn.executemany("DELETE FROM media WHERE path = ?", [(p,) for p in removed])
+                with self._lock:
+                    for path in removed:
+                        self._records.pop(path, None)
+
+            batch: List[Dict[str, Any]] = []
+            if changed:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(changed))) as pool:
+                    futures = {pool.submit(probe_file, path): path for path in changed}
+                    for future in as_completed(futures):
+                        if self._stop.is_set():
+                            pool.shutdown(wait=False, cancel_futures=True)
+                            break
+                        path = futures[future]
+                        record = future.result()
+                        if record["error"] == _NO_FFPROBE:
+                            continue  # ファイルの問題ではないので記録しない（次回また解析する）
+                        st = files[path]
+                        record["size"] = st.st_size
+                        record["mtime"] = st.st_mtime
+                        batch.append({col: record.get(col) for col in _COLUMNS})
+                        if len(batch) >= self.BATCH_SIZE:
+                            self._commit(conn, batch)
+                            batch = []
+            if batch:
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+        self.last_scan = {
+            "files": len(files),
+            "probed": len(changed),
+            "removed": len(removed),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        if self.logger:
+            self.logger.debug(
+                f"メタデータ索引を更新しました: {len(files)} 件中 {len(changed)} 件を解析"
+                f"（{self.last_scan['seconds']} 秒）"
+            )
+        return self.last_scan
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Dict[str, Any]]):
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO media ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                [tuple(row[col] for col in _COLUMNS) for row in batch]
+            )
+        with self._lock:
+            for row in batch:
+                self._records[row["path"]] = row
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="メディアファイルのメタデータ索引を作成します")
+    parser.add_argument("dirs", nargs="*", help="走査するディレクトリ（省略時は設定のライブラリ）")
+    args = parser.parse_args()
+
+    index = MetadataIndex(Config())
+    result = index.scan(args.dirs or index.library_dirs())
+    print(f"{result['files']} 件中 {result['probed']} 件を解析、{result['removed']} 件を削除"
+          f"（{result['seconds']} 秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# storage/play_history.py
+import heapq
+import json
+import os
+import re
+import struct
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from utils import clock
+from utils.logger import warn
+
+# 演奏履歴のログ（部屋ごとに1組、追記のみ）
+#   plays-<部屋>.bin  : 1演奏 8 バイト（演奏終了時刻 uint32 秒, 曲番号 uint32）
+#   plays-<部屋>.keys : 曲番号 → 曲情報（JSON 1行ずつ、番号は行番号）
+_RECORD = struct.Struct("<II")
+ALL_ROOMS = "*"
+WEEK_DAYS = 7
+
+
+class _TopN:
+    """件数の上位 N 件を逐次更新で保持（参照は O(k)）"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.counts: Counter = Counter()
+        self._top: List[int] = []  # 件数の降順
+
+    def add(self, key: int, amount: int = 1):
+        counts = self.counts
+        counts[key] += amount
+        count = counts[key]
+        top = self._top
+        if key in top:
+            i = top.index(key)
+        elif len(top) < self.n:
+            top.append(key)
+            i = len(top) - 1
+        elif count > counts[top[-1]]:
+            top[-1] = key
+            i = len(top) - 1
+        else:
+            return
+        # 件数が増えた分だけ前に移動（多くの場合は数個）
+        while i > 0 and counts[top[i - 1]] < count:
+            top[i - 1], top[i] = top[i], top[i - 1]
+            i -= 1
+
+    def subtract(self, other: Counter):
+        """件数を減らす（週間の窓から日が外れたとき）。上位は作り直す"""
+        self.counts.subtract(other)
+        self.counts = +self.counts  # 0 以下を除く
+        self.rebuild()
+
+    def rebuild(self):
+        self._top = [key for key, _count in
+                     heapq.nlargest(self.n, self.counts.items(), key=lambda kv: kv[1])]
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        return [(key, self.counts[key]) for key in self._top[:k]]
+
+
+class PlayHistory:
+    """演奏履歴とランキング（今日・今週、部屋ごと・全体）
+
+    演奏が終わるたびに部屋ごとのログ（固定長のバイナリ）に追記し、メモリ上では
+    列ごとの array（時刻・曲・部屋）で保持する。ランキングは演奏のたびに
+    上位 N 件を逐次更新するため、参照は上位 k 件を読むだけで O(k)。
+    「今日」は day_start_hour 時（深夜営業向け、既定 5 時）で区切り、
+    「今週」は直近 7 日の合計（日の切り替わりで外れた日を引いて作り直す）。
+
+    ログは追記のみなので、別プロセス（APIサーバー）や同じディレクトリを共有する
+    他の部屋のログも、前回読んだ位置から追いかけて取り込める（follow()）。
+    """
+
+    FOLLOW_INTERVAL_S = 1.0
+
+    def __init__(self, config: Config, logger=None, writer: bool = True):
+        self.logger = logger
+        self.dir = config.get("history.dir", os.path.join("cache", "history"))
+        self.room = config.get("history.room", "") or "default"
+        self.top_n = max(1, config.get("history.top_n", 100))
+        self.day_start_hour = config.get("history.day_start_hour", 5)
+        self.writer = writer
+
+        self._lock = Lock()
+        # 列ごとの履歴
+        self.times = array("I")
+        self.songs = array("I")
+        self.rooms = array("H")
+        # 曲・部屋の番号付け
+        self._song_ids: Dict[str, int] = {}
+        self._song_info: List[Dict[str, Any]] = []
+        self._room_ids: Dict[str, int] = {}
+        self._room_names: List[str] = []
+        # ログの読み込み位置（部屋 → [bin の位置, keys の位置, ファイル内の曲番号 → 曲番号]）
+        self._offsets: Dict[str, list] = {}
+        self._followed = 0.0
+
+        # ランキング
+        self._day: Optional[int] = None
+        self._week_start = 0  # 今週の窓の開始時刻（これより古い演奏はランキングに入れない）
+        self._daily: Dict[str, _TopN] = {}
+        self._weekly: Dict[str, _TopN] = {}
+        self._days: Dict[Tuple[str, int], Counter] = {}  # (部屋, 日) → 件数（直近 7 日分）
+
+        self._listeners: List[Callable[[int, int, int], None]] = []
+
+        self._bin = None
+        self._keys = None
+        self._local_ids: Dict[int, int] = {}  # 曲番号 → 自分のログ内の曲番号
+        os.makedirs(self.dir, exist_ok=True)
+        with self._lock:
+            self._follow_locked()
+            if writer:
+                self._open_writer()
+
+    # ==========================
+    # 記録（Commander）
+    # ==========================
+    @staticmethod
+    def song_key(entry: Dict[str, Any]) -> str:
+        metadata = entry.get("metadata") or {}
+        if metadata.get("song_id"):
+            return str(metadata["song_id"])
+        return f"{entry.get('title', '')}\t{entry.get('artist', '')}"
+
+    def record(self, entry: Dict[str, Any], when: Optional[datetime] = None):
+        """演奏が終わった予約を記録"""
+        if not self.writer:
+            return
+        key = self.song_key(entry)
+        timestamp = int((when or clock.now()).timestamp())
+        with self._lock:
+            self._follow_locked()  # 他の部屋の追記を先に取り込む（ファイル位置を合わせる）
+            song = self._intern_song(key, entry)
+            local = self._local_ids.get(song)
+            try:
+                if local is None:
+                    info = self._song_info[song]
+                    self._keys.write((json.dumps(info, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self._keys.flush()
+                    local = len(self._local_ids)
+                    self._local_ids[song] = local
+                self._bin.write(_RECORD.pack(timestamp, local))
+                self._bin.flush()
+            except OSError as e:
+                warn(self.logger, f"演奏履歴の保存エラー: {e}")
+            state = self._offsets[self.room]
+            state[0] = self._bin.tell()
+            state[1] = self._keys.tell()
+            state[2][local] = song
+            self._roll()
+            self._append(timestamp, song, self._intern_room(self.room))
+
+    def _open_writer(self):
+        name = self._file_stem(self.room)
+        self._bin = open(os.path.join(self.dir, name + ".bin"), "ab")
+        self._keys = open(os.path.join(self.dir, name + ".keys"), "ab")
+        state = self._offsets.setdefault(self.room, [0, 0, {}])
+        self._local_ids = {song: local for local, song in state[2].items()}
+
+    def close(self):
+        with self._lock:
+            for f in (self._bin, self._keys):
+                if f is not None:
+                    f.close()
+            self._bin = self._keys = None
+
+    @staticmethod
+    def _file_stem(room: str) -> str:
+        return "plays-" + re.sub(r"[^\w.-]", "_", room)
+
+    # ==========================
+    # 取り込み
+    # ==========================
+    def follow(self):
+        """ログの追記分を取り込む（参照側で FOLLOW_INTERVAL_S に1回まで）"""
+        now = time.monotonic()
+        if now - self._followed < self.FOLLOW_INTERVAL_S:
+            return
+        with self._lock:
+            self._follow_locked()
+
+    def _follow_locked(self):
+        self._followed = time.monotonic()
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return
+        for name in sorted(names):
+            if not (name.startswith("plays-") and name.endswith(".bin")):
+                continue
+            stem = name[:-4]
+            room = self._room_from_stem(stem)
+            state = self._offsets.setdefault(room, [0, 0, {}])
+            try:
+                self._read_log(stem, room, state)
+            except OSError as e:
+                warn(self.logger, f"演奏履歴の読み込みエラー ({name}): {e}")
+
+    def _room_from_stem(self, stem: str) -> str:
+        if stem == self._file_stem(self.room):
+            return self.room
+        return stem[len("plays-"):]
+
+    def _read_log(self, stem: str, room: str, state: list):
+        keys_path = os.path.join(self.dir, stem + ".keys")
+        bin_path = os.path.join(self.dir, stem + ".bin")
+        if os.path.exists(keys_path) and os.path.getsize(keys_path) > state[1]:
+            with open(keys_path, "rb") as f:
+                f.seek(state[1])
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # 書き込み途中の行は次回
+                    state[1] += len(line)
+                    info = json.loads(line)
+                    key = info.get("song_id") or f"{info.get('title', '')}\t{info.get('artist', '')}"
+                    state[2][len(state[2])] = self._intern_song(key, info)
+        size = os.path.getsize(bin_path)
+        usable = (size - state[0]) // _RECORD.size * _RECORD.size
+        if usable <= 0:
+            return
+        with open(bin_path, "rb") as f:
+            f.seek(state[0])
+            data = f.read(usable)
+        room_id = self._intern_room(room)
+        mapping = state[2]
+        self._roll()
+        for timestamp, local in _RECORD.iter_unpack(data):
+            song = mapping.get(local)
+            if song is not None:
+                self._append(timestamp, song, room_id)
+        state[0] += usable
+
+    def _intern_song(self, key: str, entry: Dict[str, Any]) -> int:
+        song = self._song_ids.get(key)
+        if song is None:
+            song = len(self._song_info)
+            self._song_ids[key] = song
+            metadata = entry.get("metadata") or {}
+            info = {"title": entry.get("title", ""), "artist": entry.get("artist", "")}
+            song_id = entry.get("song_id") or metadata.get("song_id")
+            if song_id:
+                info["song_id"] = str(song_id)
+            self._song_info.append(info)
+        return song
+
+    def _intern_room(self, room: str) -> int:
+        room_id = self._room_ids.get(room)
+        if room_id is None:
+            room_id = len(self._room_names)
+            self._room_ids[room] = room_id
+            self._room_names.append(room)
+        return room_id
+
+    # ==========================
+    # ランキング
+    # ==========================
+    def _day_of(self, timestamp: float) -> int:
+        shifted = datetime.fromtimestamp(timestamp) - timedelta(hours=self.day_start_hour)
+        return shifted.toordinal()
+
+    def _roll(self):
+        """日の切り替わりで今日のランキングを空にし、今週から外れた日を引く"""
+        today = self._day_of(clock.now().timestamp())
+        if self._day == today:
+            return
+        self._day = today
+        week_start = datetime.fromordinal(today - WEEK_DAYS + 1) + timedelta(hours=self.day_start_hour)
+        self._week_start = int(week_start.timestamp())
+        self._daily.clear()
+        for (room, day) in list(self._days):
+            if day <= today - WEEK_DAYS:
+                counts = self._days.pop((room, day))
+                if room in self._weekly:
+                    self._weekly[room].subtract(counts)
+            elif day == today:
+                ranking = self._daily.setdefault(room, _TopN(self.top_n))
+                ranking.counts.update(self._days[(room, day)])
+                ranking.rebuild()
+
+    def _append(self, timestamp: int, song: int, room_id: int):
+        self.times.append(timestamp)
+        self.songs.append(song)
+        self.rooms.append(room_id)
+        for callback in self._listeners:
+            callback(timestamp, song, room_id)
+        if timestamp < self._week_start:
+            return
+        day = self._day_of(timestamp)
+        if day > self._day:
+            return
+        room = self._room_names[room_id]
+        for name in (room, ALL_ROOMS):
+            self._days.setdefault((name, day), Counter())[song] += 1
+            self._weekly.setdefault(name, _TopN(self.top_n)).add(song)
+            if day == self._day:
+                self._daily.setdefault(name, _TopN(self.top_n)).add(song)
+
+    def rankings(self, period: str = "daily", room: Optional[str] = None, k: int = 10) -> List[Dict[str, Any]]:
+        """上位 k 曲（period: "daily" / "weekly"、room 省略時は全部屋）"""
+        self.follow()
+        with self._lock:
+            self._roll()
+            table = self._weekly if period == "weekly" else self._daily
+            ranking = table.get(room or ALL_ROOMS)
+            top = ranking.top(k) if ranking else []
+            return [dict(self._song_info[song], rank=i + 1, count=count)
+                    for i, (song, count) in enumerate(top)]
+
+    # ==========================
+    # 他の集計への提供
+    # ==========================
+    def subscribe(self, callback: Callable[[int, int, int], None]) -> Tuple[array, array, array]:
+        """演奏の通知を登録（callback(時刻, 曲番号, 部屋番号)、ロック内で呼ばれる）
+
+        登録時点までの履歴の列（時刻, 曲番号, 部屋番号）の複製を返す。以降の演奏は
+        callback で届くので、まとめて集計してから逐次更新に切り替えられる。
+        """
+        with self._lock:
+            self._listeners.append(callback)
+            return array("I", self.times), array("I", self.songs), array("H", self.rooms)
+
+    def song_number(self, entry: Dict[str, Any]) -> Optional[int]:
+        """予約・曲情報（song_id または title / artist）の曲番号（履歴になければ None）"""
+        key = str(entry["song_id"]) if entry.get("song_id") else self.song_key(entry)
+        with self._lock:
+            return self._song_ids.get(key)
+
+    def song_info(self, song: int) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._song_info[song])
+
+    def rooms_list(self) -> List[str]:
+        with self._lock:
+            return list(self._room_names)
+
+    def __len__(self) -> int:
+        return len(self.times)
@@ -0,0 +1,180 @@
+# storage/recommendations.py
+import heapq
+import math
+from array import array
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from storage.play_history import PlayHistory
+
+
+class SungNextIndex:
+    """「この曲の次に歌われた曲」のおすすめ（連続して歌われた曲の共起行列）
+
+    演奏履歴で同じ部屋で続けて歌われた曲の組（session_gap_min 分以内）を数え、
+    曲ごとの疎な行（次の曲 → 重み）として保持する。重みは半減期
+    half_life_days で古い組ほど小さくなるが、全体を毎回減衰させる代わりに、
+    新しい組ほど大きな値（exp(λ·(t - t0))）を足す遅延減衰で扱う（比較の順位は同じ）。
+
+    メモリは、1行あたり max_neighbors 件（超えたら重みの小さい組を削除）と
+    全体で max_pairs 件（超えたら現時点の重みの小さい組から削除）で抑える。
+
+    起動時のこれまでの履歴は numpy でまとめて集計し、以降の演奏だけを逐次反映する。
+    """
+
+    RESCALE_AT = 1e50
+
+    def __init__(self, config: Config, play_history: PlayHistory, catalog=None, logger=None):
+        self.history = play_history
+        self.catalog = catalog
+        self.logger = logger
+        half_life_s = config.get("recommend.half_life_days", 30) * 86400.0
+        self.decay = math.log(2) / half_life_s
+        self.session_gap_s = config.get("recommend.session_gap_min", 30) * 60
+        self.max_neighbors = max(1, config.get("recommend.max_neighbors", 50))
+        self.max_pairs = max(self.max_neighbors, config.get("recommend.max_pairs", 2000000))
+
+        self._lock = Lock()
+        self._rows: Dict[int, Dict[int, float]] = {}
+        self._pairs = 0
+        self._t0: Optional[int] = None
+        self._scale = 1.0            # 現時点の重み = 保存値 / scale
+        self._last: Dict[int, Tuple[int, int]] = {}  # 部屋 → (直前の曲, 時刻)
+        with self._lock:
+            # 構築が終わるまで、その間の演奏の通知はロックで待たせる
+            self._build(*play_history.subscribe(self._on_play))
+
+    # ==========================
+    # 構築（これまでの履歴から一括）
+    # ==========================
+    def _build(self, times: array, songs: array, rooms: array):
+        if not times:
+            return
+        t = np.frombuffer(times, dtype=np.dtype(times.typecode)).astype(np.int64)
+        s = np.frombuffer(songs, dtype=np.dtype(songs.typecode)).astype(np.int64)
+        r = np.frombuffer(rooms, dtype=np.dtype(rooms.typecode))
+        # 部屋ごとにまとめる（部屋の中の順序は保つ）
+        order = np.argsort(r, kind="stable")
+        t, s, r = t[order], s[order], r[order]
+        for i in np.nonzero(np.append(r[1:] != r[:-1], True))[0]:
+            self._last[int(r[i])] = (int(s[i]), int(t[i]))
+
+        gap = t[1:] - t[:-1]
+        valid = (r[1:] == r[:-1]) & (gap >= 0) & (gap <= self.session_gap_s) & (s[1:] != s[:-1])
+        previous, following, when = s[:-1][valid], s[1:][valid], t[1:][valid]
+        if not len(previous):
+            return
+
+        # 最新の演奏を基準にした重み（<= 1）を組ごとに合計
+        self._t0 = int(when.max())
+        pairs, inverse = np.unique((previous << 32) | following, return_inverse=True)
+        weights = np.bincount(inverse, weights=np.exp(self.decay * (when - self._t0)))
+        rows, cols = pairs >> 32, pairs & 0xFFFFFFFF
+
+        # 行ごとに重みの大きい max_neighbors 件、全体で max_pairs 件まで残す
+        order = np.lexsort((-weights, rows))
+        rows, cols, weights = rows[order], cols[order], weights[order]
+        starts = np.r_[0, np.nonzero(rows[1:] != rows[:-1])[0] + 1]
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        keep = rank < self.max_neighbors
+        if keep.sum() > self.max_pairs:
+            threshold = np.partition(weights[keep], -self.max_pairs)[-self.max_pairs]
+            keep &= weights >= threshold
+        for row, col, weight in zip(rows[keep].tolist(), cols[keep].tolist(), weights[keep].tolist()):
+            self._rows.setdefault(row, {})[col] = weight
+        self._pairs = int(keep.sum())
+        self._scale = 1.0
+
+    # ==========================
+    # 更新（演奏履歴から）
+    # ==========================
+    def _on_play(self, timestamp: int, song: int, room_id: int):
+        with self._lock:
+            last = self._last.get(room_id)
+            self._last[room_id] = (song, timestamp)
+            if last is None or last[0] == song or not 0 <= timestamp - last[1] <= self.session_gap_s:
+                return
+            self._add(last[0], song, timestamp)
+
+    def _add(self, previous: int, song: int, timestamp: int):
+        if self._t0 is None:
+            self._t0 = timestamp
+        gain = math.exp(self.decay * (timestamp - self._t0))
+        if gain > self.RESCALE_AT:
+            self._rescale(gain)
+            gain = 1.0
+        self._scale = max(self._scale, gain)
+        row = self._rows.setdefault(previous, {})
+        if song not in row:
+            self._pairs += 1
+        row[song] = row.get(song, 0.0) + gain
+        if len(row) > self.max_neighbors * 2:
+            self._prune_row(row, self.max_neighbors)
+        if self._pairs > self.max_pairs:
+            self._prune_all()
+
+    def _rescale(self, gain: float):
+        """保存値が大きくなりすぎる前に、今を基準に正規化する"""
+        for row in self._rows.values():
+            for song in row:
+                row[song] /= gain
+        self._t0 = None
+        self._scale = 1.0
+
+    def _prune_row(self, row: Dict[int, float], keep: int):
+        drop = len(row) - keep
+        if drop <= 0:
+            return
+        for song, _weight in heapq.nsmallest(drop, row.items(), key=lambda kv: kv[1]):
+            del row[song]
+        self._pairs -= drop
+
+    def _prune_all(self):
+        """全体の上限を超えたら、重みの大きい max_pairs の 9 割を残して削除"""
+        target = max(1, int(self.max_pairs * 0.9))
+        # 削除の基準はその時点の重みの分布から毎回決める（_build と同じく target 番目の重み）
+        weights = np.fromiter((w for row in self._rows.values() for w in row.values()), dtype=np.float64)
+        threshold = np.partition(weights, -target)[-target]
+        for previous in list(self._rows):
+            row = self._rows[previous]
+            for song in [s for s, w in row.items() if w < threshold]:
+                del row[song]
+                self._pairs -= 1
+            if not row:
+                del self._rows[previous]
+        if self.logger:
+            self.logger.debug(f"おすすめの共起行列を整理しました: {self._pairs} 組")
+
+    # ==========================
+    # 参照
+    # ==========================
+    def top(self, song: int, k: int = 10) -> List[Tuple[int, float]]:
+        """song の次に歌われた曲の上位 k 件（曲番号, 現時点の重み）"""
+        with self._lock:
+            row = self._rows.get(song)
+            if not row:
+                return []
+            best = heapq.nlargest(k, row.items(), key=lambda kv: kv[1])
+            scale = self._scale
+        return [(other, weight / scale) for other, weight in best]
+
+    def recommend(self, entry: Dict[str, Any], k: int = 10) -> List[Dict[str, Any]]:
+        """曲（song_id または title / artist）のおすすめ（カタログにあればカタログの情報で返す）"""
+        self.history.follow()
+        song = self.history.song_number(entry)
+        if song is None:
+            return []
+        results = []
+        for other, weight in self.top(song, k):
+            info = self.history.song_info(other)
+            if self.catalog is not None and info.get("song_id"):
+                info = self.catalog.get(info["song_id"]) or info
+            results.append(dict(info, score=round(weight, 4)))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"songs": len(self._rows), "pairs": self._pairs, "max_pairs": self.max_pairs}
@@ -0,0 +1,21 @@
+# tests/conftest.py
+import os
+
+import pytest
+
+from config import Config
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """一時ディレクトリで動く設定（cache/ などの相対パスもその下になる）"""
+    monkeypatch.chdir(tmp_path)
+    return Config(str(tmp_path / "config.json"))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """ウィジェット・タイマーの試験用の QApplication（画面なしで動かす）"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
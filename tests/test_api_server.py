@@ -0,0 +1,76 @@
+# tests/test_api_server.py
+import pytest
+
+from server.api_server import APIServer
+from server.selection_manager import SelectionManager
+
+
+@pytest.fixture
+def client(config):
+    config.set("history.enabled", False)
+    server = APIServer(SelectionManager(), config)
+    return server.app.test_client()
+
+
+def test_select_returns_the_reserved_entry(client):
+    titles = []
+    for title in ("A", "B", "C"):
+        response = client.post("/api/select", json={"title": title, "artist": "X"})
+        assert response.status_code == 200
+        titles.append(response.json["selection"]["title"])
+    assert titles == ["A", "B", "C"]
+    queue = client.get("/api/queue").json["queue"]
+    assert [entry["title"] for entry in queue] == ["A", "B", "C"]
+
+
+def test_select_requires_title(client):
+    assert client.post("/api/select", json={"artist": "X"}).status_code == 400
+
+
+def test_select_takes_the_file_path_from_the_catalog(config, tmp_path):
+    from storage.catalog import CatalogImporter
+
+    config.set("history.enabled", False)
+    source = tmp_path / "songs.csv"
+    source.write_text("song_id,title,artist,path\n1001,A,X,anime/a.mp4\n1002,B,Y,\n", encoding="utf-8")
+    CatalogImporter(config).run(str(source))
+    client = APIServer(SelectionManager(), config).app.test_client()
+
+    entry = client.post("/api/select", json={"title": "A", "metadata": {"song_id": "1001"}}).json["selection"]
+    assert entry["metadata"] == {"song_id": "1001", "path": "anime/a.mp4"}
+    entry = client.post("/api/select", json={"title": "B", "metadata": {"song_id": "1002"}}).json["selection"]
+    assert entry["metadata"] == {"song_id": "1002"}
+
+
+def _free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(host, port):
+    import urllib.request
+    with urllib.request.urlopen(f"http://{host}:{port}/api/status", timeout=5) as response:
+        return response.status
+
+
+def test_rebind_host_on_the_same_port(config):
+    config.set("history.enabled", False)
+    config.set("server.host", "0.0.0.0")
+    config.set("server.port", _free_port())
+    server = APIServer(SelectionManager(), config)
+    server.start()
+    try:
+        config.set("server.host", "127.0.0.1")
+        assert server.rebind()
+        assert server._server.host == "127.0.0.1"
+        assert _get("127.0.0.1", config.get("server.port")) == 200
+
+        # 待ち受けられないアドレスなら元のアドレスに戻る
+        config.set("server.host", "192.0.2.1")
+        assert not server.rebind()
+        assert server._server.host == "127.0.0.1"
+        assert _get("127.0.0.1", config.get("server.port")) == 200
+    finally:
+        server.stop()
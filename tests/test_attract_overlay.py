@@ -0,0 +1,49 @@
+# tests/test_attract_overlay.py
+import pytest
+
+from theme.theme import ThemeManager
+from ui.attract_overlay import AttractOverlay
+
+
+@pytest.fixture
+def overlay(config, qapp):
+    overlay = AttractOverlay(ThemeManager(config))
+    overlay.resize(1280, 720)
+    return overlay
+
+
+def test_text_is_rendered_once_per_content(overlay):
+    waiting = overlay._message_images()
+    overlay.show_waiting()  # 内容が同じなら描き直さない
+    assert overlay._message_images() is waiting
+
+    overlay.show_selection("春の歌", "歌手A")
+    selected = overlay._message_images()
+    banner = overlay._banner_image()
+    assert selected is not waiting and banner is not None
+    assert overlay._banner_rect().top() > overlay._message_rect().bottom()
+    overlay.show_selection("春の歌", "歌手A")
+    assert overlay._message_images() is selected and overlay._banner_image() is banner
+
+    overlay.show_waiting()
+    assert overlay._banner_image() is None
+    assert overlay._message_images() is not selected
+
+
+def test_flashing_repaints_only_the_message(overlay, monkeypatch):
+    updates = []
+    monkeypatch.setattr(overlay, "update", lambda *args: updates.append(args))
+    overlay.flash = 0.5
+    assert overlay.flash == 0.5
+    assert updates == [(overlay._message_rect(),)]
+    assert overlay._message_rect().width() < overlay.width()
+
+
+def test_selection_stops_flashing_at_the_accent_color(overlay):
+    overlay.show()
+    assert overlay._animation.state() == overlay._animation.State.Running
+    overlay.show_selection("春の歌")
+    assert overlay._animation.state() == overlay._animation.State.Stopped
+    assert overlay.flash == 1.0
+    assert overlay._banner == "♪ 春の歌"
+    overlay.hide()
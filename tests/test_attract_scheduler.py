@@ -0,0 +1,58 @@
+# tests/test_attract_scheduler.py
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from player.attract_scheduler import AttractScheduler, _AliasTable
+
+MAIN = ["a.mp4", "b.mp4", "c.mp4", "d.mp4"]
+SHOP = ["shop.mp4"]
+
+
+def test_alias_table_follows_weights():
+    table = _AliasTable(["a", "b", "c"], [1.0, 2.0, 7.0])
+    rng = random.Random(1)
+    counts = Counter(table.pick(rng) for _ in range(100000))
+    assert counts["a"] / 100000 == pytest.approx(0.1, abs=0.01)
+    assert counts["b"] / 100000 == pytest.approx(0.2, abs=0.01)
+    assert counts["c"] / 100000 == pytest.approx(0.7, abs=0.01)
+
+
+def test_no_repeat_and_shop_interval(config):
+    config.set("attract_video.schedule", {"no_repeat": 3, "shop_interval": 4})
+    scheduler = AttractScheduler(config, MAIN, SHOP, rng=random.Random(2))
+    played = [scheduler.next() for _ in range(41)]
+    assert played[0] == "shop.mp4"
+    mains = [v for v in played if v != "shop.mp4"]
+    for i in range(3, len(mains)):
+        assert mains[i] not in mains[i - 3:i]
+    # shop 動画は通常動画 4 本ごと
+    assert [i for i, v in enumerate(played) if v == "shop.mp4"] == list(range(0, 41, 5))
+
+
+def test_state_survives_restart(config):
+    scheduler = AttractScheduler(config, MAIN, SHOP, rng=random.Random(3))
+    for _ in range(6):
+        scheduler.next()
+    upcoming = scheduler.peek()
+    scheduler.flush()
+    assert AttractScheduler(config, MAIN, SHOP).peek() == upcoming
+
+
+@pytest.mark.parametrize("state", [
+    [],
+    {"recent": [], "since_shop": 0, "upcoming": [["a.mp4", "x", False]], "pending_shop": []},
+    {"recent": [], "since_shop": 0, "upcoming": [["a.mp4"]], "pending_shop": []},
+    {"recent": [["a.mp4"]], "since_shop": 0, "upcoming": [], "pending_shop": []},
+    {"recent": []},
+])
+def test_broken_state_starts_a_fresh_schedule(config, tmp_path, state, capsys):
+    path = str(tmp_path / "attract_state.json")
+    config.set("attract_video.state_path", path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    scheduler = AttractScheduler(config, MAIN, SHOP, rng=random.Random(4))
+    assert scheduler.next() == "shop.mp4"
+    assert "[WARNING]" in capsys.readouterr().out
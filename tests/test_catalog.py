@@ -0,0 +1,94 @@
+# tests/test_catalog.py
+import gzip
+import json
+
+import pytest
+
+from storage.catalog import Catalog, CatalogImporter, normalize_reading
+
+
+@pytest.fixture
+def importer(config):
+    return CatalogImporter(config)
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _read_gzip_json(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_normalize_reading():
+    assert normalize_reading("ハルノ・ウタ！") == "はるのうた"
+    assert normalize_reading("ＡＢＣ Song") == "abcsong"
+    assert normalize_reading(None) == ""
+
+
+def test_import_csv_and_search(config, importer, tmp_path):
+    source = _write(tmp_path / "songs.csv",
+                    "code,name,singer,kana,artist_kana\n"
+                    "1,春の歌,歌手A,ハルノウタ,カシュエー\n"
+                    "2,夏の歌,歌手B,ナツノウタ,カシュビー\n"
+                    ",ID のない行,X,,\n")
+    stats = importer.run(source)
+    assert (stats["upserted"], stats["skipped"], stats["songs"]) == (2, 1, 2)
+
+    catalog = Catalog(config)
+    assert catalog.version == stats["version"]
+    assert [s["song_id"] for s in catalog.search("はる")["songs"]] == ["1"]
+    # 歌手名の読みでも一致し、曲名の読み順（なつ → はる）に並ぶ
+    assert [s["song_id"] for s in catalog.search("カシュ")["songs"]] == ["2", "1"]
+    assert catalog.get("2") == {"song_id": "2", "title": "夏の歌", "artist": "歌手B",
+                                "title_reading": "ナツノウタ", "artist_reading": "カシュビー"}
+
+
+@pytest.mark.parametrize("name, text", [
+    ("songs.json", '[{"id": 1, "title": "A"}, {"id": 2, "title": "B"}]'),
+    ("songs.jsonl", '{"id": 1, "title": "A"}\n\n{"id": 2, "title": "B"}\n'),
+])
+def test_import_json_formats(config, importer, tmp_path, name, text):
+    assert importer.run(_write(tmp_path / name, text))["songs"] == 2
+    assert Catalog(config).get("1")["title"] == "A"
+
+
+def test_delta_import_and_remote_delta(config, importer, tmp_path):
+    base = importer.run(_write(tmp_path / "full.jsonl",
+                               '{"id": "1", "title": "A"}\n{"id": "2", "title": "B"}\n{"id": "3", "title": "C"}\n'))
+    stats = importer.run(_write(tmp_path / "delta.jsonl",
+                                '{"id": "2", "title": "B2"}\n{"id": "3", "op": "delete"}\n{"id": "4", "title": "D"}\n'),
+                         delta=True)
+    assert (stats["upserted"], stats["deleted"], stats["songs"]) == (2, 1, 3)
+
+    catalog = Catalog(config)
+    assert catalog.get("2")["title"] == "B2"
+    assert catalog.get("3") is None
+
+    delta = _read_gzip_json(catalog.delta_file(base["version"], stats["version"]))
+    assert delta["base_version"] == base["version"]
+    assert delta["deleted"] == ["3"]
+    song_id = delta["fields"].index("song_id")
+    assert sorted(row[song_id] for row in delta["songs"]) == ["2", "4"]
+
+    snapshot = _read_gzip_json(catalog.snapshot_file(stats["version"]))
+    assert sorted(row[song_id] for row in snapshot["songs"]) == ["1", "2", "4"]
+    assert catalog.delta_file("missing", stats["version"]) is None
+
+
+def test_delta_requires_a_published_catalog(importer, tmp_path):
+    with pytest.raises(ValueError):
+        importer.run(_write(tmp_path / "delta.jsonl", '{"id": "1", "title": "A"}\n'), delta=True)
+
+
+def test_cleanup_keeps_the_newest_versions(config, importer, tmp_path, monkeypatch):
+    # 同じ秒に取り込むと版は "-2" ... "-11" と続く（名前の順では "-9" が "-10" より新しく見える）
+    monkeypatch.setattr("storage.catalog.time.strftime", lambda fmt: "20260101-000000")
+    source = _write(tmp_path / "songs.csv", "code,name,singer\n1,春の歌,歌手A\n")
+    for _ in range(11):
+        version = importer.run(source)["version"]
+    assert version == "20260101-000000-11"
+    remaining = sorted(p.name for p in (tmp_path / "cache" / "catalog").glob("catalog-*.db"))
+    assert remaining == ["catalog-20260101-000000-10.db", "catalog-20260101-000000-11.db"]
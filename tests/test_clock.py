@@ -0,0 +1,61 @@
+# tests/test_clock.py
+from datetime import datetime, timedelta
+
+from PyQt6 import sip
+from PyQt6.QtCore import QObject
+
+from utils.clock import VirtualClock, VirtualTimer
+
+START = datetime(2024, 6, 1, 20, 0)
+
+
+def _clock(monkeypatch):
+    # install() は QtCore.QTimer を差し替えてしまうので、仮想タイマーの時計だけ設定する
+    clock = VirtualClock(START)
+    monkeypatch.setattr(VirtualTimer, "_clock", clock)
+    return clock
+
+
+def test_timers_fire_in_deadline_order(qapp, monkeypatch):
+    clock = _clock(monkeypatch)
+    fired = []
+
+    def record(name):
+        return lambda: fired.append((name, round(clock.monotonic(), 3)))
+
+    repeating = VirtualTimer()
+    repeating.setInterval(300)
+    repeating.timeout.connect(record("repeat"))
+    repeating.start()
+    once = VirtualTimer()
+    once.setSingleShot(True)
+    once.timeout.connect(record("once"))
+    once.start(500)
+    cancelled = VirtualTimer()
+    cancelled.setSingleShot(True)
+    cancelled.timeout.connect(record("cancelled"))
+    cancelled.start(100)
+    cancelled.stop()
+
+    result = clock.run(qapp, 1.0)
+    assert fired == [("repeat", 0.3), ("once", 0.5), ("repeat", 0.6), ("repeat", 0.9)]
+    assert result["timers_fired"] == 4
+    assert clock.monotonic() == 1.0
+    assert clock.now() == START + timedelta(seconds=1)
+    assert repeating.isActive() and repeating.remainingTime() == 200
+    assert not once.isActive() and once.remainingTime() == -1
+
+
+def test_single_shot_keeps_order_and_skips_deleted_context(qapp, monkeypatch):
+    clock = _clock(monkeypatch)
+    fired = []
+    context = QObject()
+    VirtualTimer.singleShot(200, lambda: fired.append("b"))
+    VirtualTimer.singleShot(100, lambda: fired.append("a"))
+    VirtualTimer.singleShot(200, lambda: fired.append("c"))  # 同じ期限なら登録順
+    VirtualTimer.singleShot(150, context, lambda: fired.append("deleted"))
+    sip.delete(context)
+
+    clock.run(qapp, 10.0, stop_when=lambda: len(fired) >= 3)
+    assert fired == ["a", "b", "c"]
+    assert clock.monotonic() == 0.2  # 止まった時点で時計も止まる
@@ -0,0 +1,37 @@
+# tests/test_config.py
+from config import ChangeSet, Config
+
+
+def test_change_set_lists_changed_leaves():
+    old = {"server": {"host": "0.0.0.0", "port": 5000}, "font": {"family": "", "size": 40}}
+    new = {"server": {"host": "0.0.0.0", "port": 5001}, "font": {"family": "Noto", "size": 40},
+           "debug": {"enabled": True}}
+    changes = ChangeSet(old, new)
+    # 片方にしかないセクションはセクション名で記録される
+    assert changes.keys == {"server.port", "font.family", "debug"}
+    assert changes.sections == {"server", "font", "debug"}
+    assert changes.touches("server")
+    assert changes.touches("font.family", "font.size")
+    assert not changes.touches("font.size")
+    assert not changes.touches("serv")
+
+
+def test_change_set_handles_type_changes_and_no_changes():
+    assert ChangeSet({"a": {"b": 1}}, {"a": 2}).keys == {"a"}
+    assert ChangeSet({"a": [1, 2]}, {"a": [1, 3]}).keys == {"a"}
+    unchanged = ChangeSet({"a": {"b": 1}}, {"a": {"b": 1}})
+    assert not unchanged
+    assert repr(unchanged) == "ChangeSet([])"
+
+
+def test_apply_returns_changes_and_saves(config, tmp_path):
+    settings = config.get_all()
+    settings["server"]["port"] = 6000
+    settings["font"]["family"] = "Noto Sans JP"
+    assert config.get("server.port") != 6000    # get_all() は複製
+
+    changes = config.apply(settings)
+    assert changes.keys == {"server.port", "font.family"}
+    assert config.get("server.port") == 6000
+    assert Config(str(tmp_path / "config.json")).get("server.port") == 6000
+    assert not config.apply(config.get_all())
@@ -0,0 +1,73 @@
+# tests/test_event_log.py
+import threading
+import time
+
+from server.event_log import EventLog
+from server.selection_manager import SelectionManager
+
+
+def test_reserved_events_follow_queue_order():
+    manager = SelectionManager()
+
+    def slow_listener(event, data):
+        if event == "reserved" and data["title"] == "A":
+            time.sleep(0.1)  # A の通知中に B の予約が割り込む
+
+    manager.add_listener(slow_listener)
+    log = EventLog(capacity=16)
+    log.attach(manager)
+
+    first = threading.Thread(target=manager.set_selection, args=("A",))
+    first.start()
+    time.sleep(0.02)
+    manager.set_selection("B")
+    first.join()
+
+    events = log.since(0)["events"]
+    assert [data["title"] for _seq, _event, data in events] == ["A", "B"]
+    assert [entry["title"] for entry in manager.get_queue()] == ["A", "B"]
+
+
+def test_listener_can_read_the_queue():
+    manager = SelectionManager()
+    seen = []
+    manager.add_listener(lambda event, data: seen.append(len(manager.get_queue())))
+    manager.set_selection("A")
+    manager.set_selection("B")
+    assert seen == [1, 2]
+
+
+def test_since_returns_delta_then_snapshot_for_stale_cursor():
+    manager = SelectionManager()
+    log = EventLog(capacity=2)
+    log.attach(manager)
+    for title in ("A", "B", "C"):
+        manager.set_selection(title)
+
+    delta = log.since(2, log.epoch)
+    assert delta["seq"] == 3
+    assert [e[2]["title"] for e in delta["events"]] == ["C"]
+
+    stale = log.since(0, log.epoch)  # 連番 1 はリングバッファから追い出されている
+    assert [entry["title"] for entry in stale["snapshot"]["queue"]] == ["A", "B", "C"]
+
+
+def test_since_returns_snapshot_for_another_epoch():
+    log = EventLog(capacity=8)
+    log.set_playback("song")
+    result = log.since(1, "other")
+    assert "snapshot" in result
+    assert result["snapshot"]["playback"] == {"state": "song"}
+    assert log.since(1, log.epoch)["events"] == []
+
+
+def test_started_and_removed_events_carry_only_the_id():
+    manager = SelectionManager()
+    log = EventLog(capacity=8)
+    log.attach(manager)
+    first = manager.set_selection("A")
+    second = manager.set_selection("B")
+    manager.take_next()
+    manager.remove_reservation(second["id"])
+    events = log.since(2)["events"]
+    assert [(e[1], e[2]) for e in events] == [("started", {"id": first["id"]}), ("removed", {"id": second["id"]})]
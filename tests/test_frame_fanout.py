@@ -0,0 +1,54 @@
+# tests/test_frame_fanout.py
+from PyQt6.QtGui import QColor, QImage
+
+from player.frame_fanout import MjpegEncoder
+from utils.metrics import metrics
+
+
+class _Frame:
+    """QVideoFrame の代わり（toImage() だけ）"""
+
+    def __init__(self, width, color):
+        self.image = QImage(width, width * 9 // 16, QImage.Format.Format_RGB32)
+        self.image.fill(QColor(color))
+
+    def toImage(self):
+        return self.image
+
+
+def test_clients_are_counted_while_streaming(config):
+    encoder = MjpegEncoder(config)
+    first, second = encoder.stream(timeout=0.01), encoder.stream(timeout=0.01)
+    assert not encoder.has_clients()
+    assert next(first) == b"" and next(second) == b""
+    assert encoder._clients == 2
+    first.close()
+    assert encoder._clients == 1 and encoder.has_clients()
+    second.close()
+    assert not encoder.has_clients()
+
+
+def test_only_the_latest_frame_is_encoded(config):
+    config.set("preview.width", 320)
+    encoder = MjpegEncoder(config)
+    dropped = metrics.counter("preview.dropped")
+    # エンコーダーが止まっている間に届いたフレームは最新の1枚だけが残る
+    encoder.submit(_Frame(640, "red"))
+    encoder.submit(_Frame(640, "blue"))
+    assert metrics.counter("preview.dropped") == dropped + 1
+
+    stream = encoder.stream(timeout=5.0)
+    assert next(stream) == b""
+    encoder.start()
+    try:
+        part = next(stream)
+    finally:
+        stream.close()
+        encoder.stop()
+    header, _, body = part.partition(b"\r\n\r\n")
+    assert header.startswith(b"--frame\r\nContent-Type: image/jpeg")
+    image = QImage.fromData(body[:-2], "JPG")
+    assert image.width() == 320  # preview.width まで縮小
+    color = image.pixelColor(160, 90)
+    assert color.blue() > 200 and color.red() < 50
+    assert encoder._seq == 1
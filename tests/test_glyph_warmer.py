@@ -0,0 +1,47 @@
+# tests/test_glyph_warmer.py
+import pytest
+
+from server.selection_manager import SelectionManager
+from ui.glyph_warmer import GlyphWarmer
+
+
+@pytest.fixture
+def warmer(config, qapp):
+    config.set("glyph_warmup.max_glyphs", 4)
+    warmer = GlyphWarmer(config, SelectionManager())
+    yield warmer
+    warmer.stop()
+
+
+def _chunks(warmer):
+    return [chars for _method, _font, chars in warmer._pending]
+
+
+def test_expand_queues_each_new_character_once(warmer):
+    warmer._submit("lyrics", "あいうえお かきくけこ あいう")
+    warmer._expand()
+    assert _chunks(warmer) == ["あいうえおかきく", "けこ"]  # 空白・重複を除いて CHUNK 文字ずつ
+    # 描画待ちの文字はもう一度届いても積まない
+    warmer._submit("lyrics", "こさ")
+    warmer._expand()
+    assert _chunks(warmer)[2:] == ["さ"]
+
+
+def test_warmed_glyphs_are_an_lru_of_max_glyphs(warmer):
+    warmer._submit("lyrics", "abcdef")
+    warmer._expand()
+    while warmer._pending:
+        warmer._tick()
+    font = warmer._fonts["lyrics"][0][1]
+    key = font.key()
+    assert list(warmer._warm) == [(key, c) for c in "cdef"]
+
+    warmer.record_display("c x", font)  # c は温まっている、x は表示で初めて描く
+    assert list(warmer._warm) == [(key, c) for c in "efcx"]
+    stats = warmer.stats()
+    assert (stats["cached"], stats["warmed"], stats["hits"], stats["misses"]) == (4, 6, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+    warmer._submit("lyrics", "fx")
+    warmer._expand()
+    assert not warmer._pending
@@ -0,0 +1,60 @@
+# tests/test_ipc.py
+import time
+
+import pytest
+
+from server.event_log import EventLog
+from server.ipc import RemoteSelectionManager, SelectionHost
+from server.selection_manager import SelectionManager
+
+
+def _titles(manager):
+    return [entry["title"] for entry in manager.get_queue()]
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "ミラーに変更が届かない"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def commander(config):
+    selection_manager = SelectionManager()
+    event_log = EventLog(config)
+    event_log.attach(selection_manager)
+    host = SelectionHost(selection_manager, event_log)
+    host.start()
+    yield selection_manager, host
+    host.stop()
+
+
+def test_remote_writes_are_visible_in_the_mirror_on_return(commander):
+    selection_manager, host = commander
+    selection_manager.set_selection("A", "X")
+    remote = RemoteSelectionManager(host.address, host.authkey)
+    assert remote.start(timeout=5.0)
+    assert _titles(remote) == ["A"]  # 購読開始時のスナップショット
+
+    entry = remote.set_selection("B", "Y", {"song_id": "1"})
+    assert entry["title"] == "B"
+    assert _titles(selection_manager) == ["A", "B"]
+    assert _titles(remote) == ["A", "B"]
+    assert remote.remove_reservation(entry["id"])
+    assert _titles(remote) == ["A"]
+
+
+def test_commander_changes_reach_the_mirror_and_listeners(commander):
+    selection_manager, host = commander
+    remote = RemoteSelectionManager(host.address, host.authkey)
+    assert remote.start(timeout=5.0)
+    events = []
+    remote.add_listener(lambda event, data: events.append((event, data.get("title"))))
+
+    selection_manager.set_selection("C", "Z")
+    _wait_for(lambda: _titles(remote) == ["C"])
+    selection_manager.clear_selection()
+    _wait_for(lambda: _titles(remote) == [])
+    assert events == [("reserved", "C"), ("cleared", None)]
+    assert remote.since(None)["seq"] == remote._seq
@@ -0,0 +1,65 @@
+# tests/test_key_tempo.py
+import numpy as np
+
+from audio.key_tempo import KeyTempoProcessor
+
+
+def _stream(processor, signal, block_size=1024):
+    out = [processor.process(signal[i:i + block_size]) for i in range(0, len(signal), block_size)]
+    return np.concatenate(out)
+
+
+def test_envelope_survives_fifo_compaction():
+    rate = 44100
+    t = np.arange(rate * 3) / rate
+    sine = (0.5 * np.sin(2 * np.pi * 441.0 * t)).astype(np.float32)
+    signal = np.stack([sine, sine], axis=1)
+
+    processor = KeyTempoProcessor(rate, channels=2)
+    processor.set_tempo(1.1)
+    compactions = []
+    original_push = processor._push
+
+    def push(x):
+        before = processor._in_len
+        original_push(x)
+        if processor._in_len < before + x.shape[1]:
+            compactions.append(before)
+
+    processor._push = push
+    out = _stream(processor, signal)
+    assert compactions, "入力FIFOが一度も詰められていない（試験の前提が崩れている）"
+
+    # 立ち上がりを除き、2048 サンプルごとの最大振幅が入力と同じ 0.5 付近で一定
+    body = out[processor.frame_size * 2:-processor.frame_size * 2, 0]
+    peaks = [np.max(np.abs(body[i:i + 2048])) for i in range(0, len(body) - 2048, 2048)]
+    assert min(peaks) > 0.45
+    assert max(peaks) < 0.55
+
+
+def test_output_length_follows_tempo():
+    rate = 44100
+    signal = np.zeros((rate * 2, 1), dtype=np.float32)
+    processor = KeyTempoProcessor(rate, channels=1)
+    processor.set_tempo(2.0)
+    out = _stream(processor, signal)
+    assert abs(len(out) - len(signal) / 2) < processor.frame_size * 2
+
+
+def test_bypass_returns_input():
+    processor = KeyTempoProcessor(44100, channels=2)
+    block = np.ones((256, 2), dtype=np.float32)
+    assert processor.process(block) is block
+
+
+def test_flush_emits_the_tail():
+    rate = 44100
+    signal = np.zeros((rate, 1), dtype=np.float32)
+    signal[-200:] = 0.5
+    processor = KeyTempoProcessor(rate, channels=1)
+    processor.set_tempo(1.25)
+    out = _stream(processor, signal)
+    assert np.max(np.abs(out)) < 0.05  # 最後の 200 サンプルはまだ処理遅延の中
+    tail = processor.flush()
+    assert np.max(np.abs(tail)) > 0.1
+    assert abs(len(out) + len(tail) - len(signal) / 1.25) < processor.synthesis_hop * 2
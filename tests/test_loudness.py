@@ -0,0 +1,62 @@
+# tests/test_loudness.py
+import numpy as np
+import pytest
+
+from audio.loudness import ANALYSIS_RATE, LoudnessMeter, analyze_library, integrated_loudness
+from audio.wavfile import write_wav
+from storage.gain_store import GainStore
+
+
+def _sine(seconds, dbfs=-20.0, freq=997.0, rate=ANALYSIS_RATE):
+    t = np.arange(int(seconds * rate)) / rate
+    return (10.0 ** (dbfs / 20.0) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_reference_sine():
+    # BS.1770: 1kHz 付近の -20 dBFS 正弦波は1チャンネルで -23 LUFS、2チャンネルで +3 dB
+    sine = _sine(10)
+    assert integrated_loudness(sine) == pytest.approx(-23.0, abs=0.1)
+    assert integrated_loudness(np.stack([sine, sine], axis=1)) == pytest.approx(-20.0, abs=0.1)
+
+
+def test_silence_and_short_input():
+    assert integrated_loudness(np.zeros((ANALYSIS_RATE * 2, 2), dtype=np.float32)) is None
+    assert integrated_loudness(_sine(0.3)) is None
+
+
+def test_relative_gate_ignores_quiet_passages():
+    loud = _sine(5, -20.0)
+    quiet = _sine(5, -45.0)
+    assert integrated_loudness(np.concatenate([loud, quiet])) == pytest.approx(-23.0, abs=0.2)
+
+
+def test_streaming_matches_whole_signal():
+    rng = np.random.default_rng(0)
+    n = ANALYSIS_RATE * 4 + 123
+    signal = (rng.standard_normal((n, 2)) * np.linspace(0.01, 0.5, n)[:, np.newaxis]).astype(np.float32)
+    meter = LoudnessMeter(ANALYSIS_RATE, 2)
+    for start in range(0, n, 7001):
+        meter.push(signal[start:start + 7001])
+    assert meter.result() == pytest.approx(integrated_loudness(signal), abs=1e-9)
+
+
+def test_analyze_library_stores_gain(config, tmp_path):
+    path = str(tmp_path / "tone.wav")
+    write_wav(path, np.stack([_sine(3), _sine(3)], axis=1), ANALYSIS_RATE)
+    store = GainStore(config)
+    summary = analyze_library([path], store, target_lufs=-23.0, workers=1)
+    assert summary["analyzed"] == 1
+    assert GainStore(config).get_gain_db(path) == pytest.approx(-3.0, abs=0.1)
+
+
+def test_analyze_library_remembers_silent_files(config, tmp_path):
+    path = str(tmp_path / "silence.wav")
+    write_wav(path, np.zeros((ANALYSIS_RATE * 2, 2), dtype=np.float32), ANALYSIS_RATE)
+    store = GainStore(config)
+    summary = analyze_library([path], store, target_lufs=-23.0, workers=1)
+    assert summary["silent"] == 1
+    assert summary["failed"] == 0
+    store = GainStore(config)
+    assert not store.needs_analysis(path)
+    assert store.get_gain_db(path) is None
+    assert store.volume_for(path, 0.5) == 0.5
@@ -0,0 +1,72 @@
+# tests/test_lyrics.py
+from threading import Event
+
+from player.lyrics import LyricsCache, LyricsTimeline
+
+
+def test_line_timing_and_offset():
+    timeline = LyricsTimeline.parse(
+        "[ti:Song]\n"
+        "[offset:500]\n"
+        "[00:12.00]second\n"
+        "[00:02.50][00:20.00]repeat\n"
+        "[00:30.00]\n"
+    )
+    assert timeline.meta["ti"] == "Song"
+    assert list(timeline.line_text) == ["repeat", "second", "repeat"]
+    assert list(timeline.line_start) == [2000, 11500, 19500]
+    # 行タイミングのみの行は次の行（空行を含む）の開始で終わる
+    assert list(timeline.line_end) == [11500, 19500, 29500]
+    assert timeline.find_line(1999) == -1
+    assert timeline.find_line(11500) == 1
+
+
+def test_syllable_timing():
+    timeline = LyricsTimeline.parse("[00:01.00]<00:01.00>ka<00:01.50>ra<00:02.00>oke<00:03.00>\n")
+    assert list(timeline.syllable_text) == ["ka", "ra", "oke"]
+    assert list(timeline.syllable_start) == [1000, 1500, 2000]
+    assert list(timeline.syllable_end) == [1500, 2000, 3000]
+    assert timeline.locate(2500) == (0, 2, 0.5)
+    assert timeline.locate(3500) == (0, 2, 1.0)
+
+
+def test_offset_applies_to_syllable_tags():
+    timeline = LyricsTimeline.parse(
+        "[offset:500]\n"
+        "[00:10.00]<00:10.00>ka<00:10.50>ra<00:11.00>\n"
+        "[00:12.00]oke\n"
+    )
+    assert list(timeline.line_start) == [9500, 11500]
+    assert list(timeline.syllable_start) == [9500, 10000, 11500]
+    assert list(timeline.syllable_end) == [10000, 10500, 11500]
+    assert timeline.locate(9600) == (0, 0, 0.2)
+
+
+def test_ruby_positions_ignore_syllable_tags():
+    timeline = LyricsTimeline.parse("[00:01.00]<00:01.00>{空|そら}<00:02.00>を<00:03.00>\n")
+    assert timeline.line_text[0] == "空を"
+    assert list(timeline.line_ruby(0)) == [0]
+    assert (timeline.ruby_start[0], timeline.ruby_end[0], timeline.ruby_text[0]) == (0, 1, "そら")
+
+
+def test_get_timeout_keeps_the_pending_parse(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "song.lrc")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[00:01.00]hello\n")
+    release = Event()
+    original_load = LyricsTimeline.load
+
+    def slow_load(p):
+        release.wait(5)
+        return original_load(p)
+
+    monkeypatch.setattr(LyricsTimeline, "load", slow_load)
+    cache = LyricsCache()
+    try:
+        assert cache.get(path, timeout=0.01) is None
+        assert capsys.readouterr().out == ""
+        assert path in cache._entries
+        release.set()
+        assert cache.get(path, timeout=5).line_text == ["hello"]
+    finally:
+        cache.shutdown()
@@ -0,0 +1,54 @@
+# tests/test_lyrics_layer.py
+import pytest
+
+from player.lyrics import LyricsTimeline
+from ui.lyrics_layer import LyricsLayer
+
+LRC = "".join(f"[00:{10 * i + 1:02d}.00]<00:{10 * i + 1:02d}.00>ka<00:{10 * i + 2:02d}.00>ra"
+              f"<00:{10 * i + 3:02d}.00>oke<00:{10 * i + 4:02d}.00>\n" for i in range(8))
+
+
+@pytest.fixture
+def layer(config, qapp):
+    config.set("lyrics.lead_ms", 3000)
+    layer = LyricsLayer(config)
+    layer.resize(1280, 720)
+    layer.set_timeline(LyricsTimeline.parse(LRC))
+    return layer
+
+
+def test_wipe_follows_syllables(layer):
+    layout = layer._layout(0)
+    (ka_start, ka_end), (ra_start, ra_end), (_oke_start, oke_end) = layout.syllable_x
+    assert ka_end == ra_start and oke_end < layout.width
+    assert layer._compute_wipe(0, 500) == 0.0
+    assert layer._compute_wipe(0, 1500) == pytest.approx((ka_start + ka_end) / 2)
+    assert layer._compute_wipe(0, 2000) == pytest.approx(ra_start)
+    assert layer._compute_wipe(0, 4000) == layout.width
+
+
+def test_lines_are_laid_out_once_and_cached_up_to_the_limit(layer):
+    first = layer._layout(0)
+    assert layer._layout(0) is first
+    assert first.unsung.size() == first.sung.size()
+    for line in range(1, 8):
+        layer._layout(line)
+    assert list(layer._layouts) == list(range(8 - LyricsLayer.MAX_CACHED_LINES, 8))
+    assert layer._layout(0) is not first  # 追い出された行は作り直す
+
+
+def test_rows_alternate_and_only_the_wipe_strip_is_repainted(layer, monkeypatch):
+    rows = []
+    for position in (500, 1500, 5000, 8000, 11500):
+        layer.set_position(position)
+        rows.append(list(layer._rows))
+    # 行 i は i % 2 段目。次の行は前の行を歌い終えてから出し、歌い終えた行は lead_ms 後に消す
+    assert rows == [[0, -1], [0, -1], [0, 1], [-1, 1], [-1, 1]]
+
+    updates = []
+    monkeypatch.setattr(layer, "update", lambda *args: updates.append(args))
+    layer.set_position(11600)
+    (rect,), = updates
+    row = layer._row_rect(1, 1)
+    assert rect.height() == row.height()
+    assert rect.width() < row.width() // 4
@@ -0,0 +1,74 @@
+# tests/test_media_cache.py
+import os
+
+import pytest
+
+from storage.media_cache import MediaCache
+
+
+@pytest.fixture
+def cache(config, tmp_path):
+    config.set("media_cache.dir", str(tmp_path / "cache"))
+    config.set("media_cache.budget_gb", 250 / 1024 ** 3)  # 100 バイトのファイル2つまで
+    return MediaCache(config)
+
+
+def _source(tmp_path, name, size=100):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_copies_and_resolves(cache, tmp_path):
+    a = _source(tmp_path, "a.mp4")
+    cache._fill(a)
+    resolved = cache.resolve(a)
+    assert resolved != a and os.path.dirname(resolved) == cache.cache_dir
+    assert cache.get_stats()["used_bytes"] == 100
+
+
+def test_does_not_evict_files_in_use(cache, tmp_path):
+    a, b, c = (_source(tmp_path, f"{n}.mp4") for n in "abc")
+    cache._fill(a)
+    cache._fill(b)
+    cache.resolve(a, owner="player")  # a は最も古いが再生中
+    cache.resolve(b)
+    cache._fill(c)
+    assert cache.resolve(a) != a
+    assert cache.resolve(b) == b  # b が追い出された
+    cache.release("player")
+    cache._in_use["other"] = os.path.abspath(c)  # 今度は c を再生中にする
+    cache._fill(b)
+    assert cache.resolve(a) == a  # 再生が終わった a は追い出せる
+
+
+def test_failed_delete_keeps_usage(cache, tmp_path, monkeypatch):
+    a, b, c = (_source(tmp_path, f"{n}.mp4") for n in "abc")
+    cache._fill(a)
+    cache._fill(b)
+
+    def remove(path):
+        raise PermissionError(path)  # Windows で開かれているファイル
+
+    monkeypatch.setattr("storage.media_cache.os.remove", remove)
+    cache._fill(c)
+    stats = cache.get_stats()
+    assert stats["files"] == 2
+    assert stats["used_bytes"] == 200
+    assert cache.resolve(c) == c  # 空きが作れなかったのでコピーしない
+
+
+def test_startup_removes_only_its_own_stray_files(config, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "my song.mp4").write_bytes(b"user media")
+    (cache_dir / "0123456789abcdef0123.mp4.part").write_bytes(b"partial")
+    (cache_dir / "abcdefabcdefabcdefab.mp4").write_bytes(b"orphan")
+    (cache_dir / "index.json").write_text(
+        '{"/nas/a.mp4": {"size": 1}, "/nas/b.mp4": {"file": "../x", "size": 1, "mtime": 0, "last_access": 0, "hits": 0}, "/nas/c.mp4": 3}',
+        encoding="utf-8")
+    config.set("media_cache.dir", str(cache_dir))
+
+    cache = MediaCache(config)
+    assert cache.get_stats()["files"] == 0
+    assert sorted(os.listdir(cache_dir)) == ["index.json", "my song.mp4"]
@@ -0,0 +1,43 @@
+# tests/test_metadata_index.py
+import os
+
+from storage.metadata_index import MetadataIndex
+
+
+def _record(path, size=0, mtime=0.0, error=None):
+    return {"path": path, "size": size, "mtime": mtime, "error": error}
+
+
+def test_missing_ffprobe_disables_index_with_one_warning(config, monkeypatch, capsys):
+    monkeypatch.setattr("storage.metadata_index.shutil.which", lambda name: None)
+    index = MetadataIndex(config)
+    index.start()
+    assert index._thread is None
+    assert index.scan([str(config.get("songs.local_dir", "songs"))])["files"] == 0
+    assert capsys.readouterr().out.count("ffprobe") == 1
+
+
+def test_scan_removes_records_only_under_scanned_roots(config, tmp_path, monkeypatch):
+    index = MetadataIndex(config)
+    monkeypatch.setattr(index, "available", lambda: True)
+    songs, videos = tmp_path / "songs", tmp_path / "videos"
+    songs.mkdir()
+    videos.mkdir()
+    gone_song = str(songs / "gone.mp4")
+    gone_video = str(videos / "gone.mp4")
+    index._records = {gone_song: _record(gone_song), gone_video: _record(gone_video)}
+
+    result = index.scan([str(songs)])
+    assert result["removed"] == 1
+    assert set(index._records) == {gone_video}
+
+
+def test_failed_files_are_not_reprobed_until_they_change(config, tmp_path, monkeypatch):
+    index = MetadataIndex(config)
+    monkeypatch.setattr(index, "available", lambda: True)
+    path = tmp_path / "broken.mp4"
+    path.write_bytes(b"not a video")
+    st = os.stat(path)
+    index._records = {str(path): _record(str(path), st.st_size, st.st_mtime, error="Invalid data")}
+
+    assert index.scan([str(tmp_path)])["probed"] == 0
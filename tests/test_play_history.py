@@ -0,0 +1,80 @@
+# tests/test_play_history.py
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage.play_history import PlayHistory, _TopN
+from utils import clock
+
+
+@pytest.fixture
+def now(monkeypatch):
+    current = [datetime(2024, 6, 10, 21, 0)]
+    monkeypatch.setattr(clock, "now", lambda: current[0])
+    return current
+
+
+def _song(n):
+    return {"title": f"Song {n}", "artist": "X", "metadata": {"song_id": str(n)}}
+
+
+def _ranking(history, period="daily", room=None, k=10):
+    return [(r["song_id"], r["count"]) for r in history.rankings(period, room, k)]
+
+
+def test_top_n_matches_a_full_count():
+    rng = random.Random(5)
+    top = _TopN(10)
+    counts = Counter()
+    for _ in range(5000):
+        key = int(rng.paretovariate(1.2)) % 200
+        top.add(key)
+        counts[key] += 1
+    expected = sorted(counts.values(), reverse=True)[:10]
+    assert [count for _key, count in top.top(10)] == expected
+    assert all(counts[key] == count for key, count in top.top(10))
+
+
+def test_daily_and_weekly_rankings(config, now):
+    history = PlayHistory(config)
+    base = now[0]
+    for days_ago, song, plays in [(0, 1, 2), (0, 2, 3), (3, 1, 4), (8, 3, 10)]:
+        for _ in range(plays):
+            history.record(_song(song), when=base - timedelta(days=days_ago))
+
+    assert _ranking(history, "daily") == [("2", 3), ("1", 2)]
+    # 8 日前の演奏は今週に入らない
+    assert _ranking(history, "weekly") == [("1", 6), ("2", 3)]
+    assert _ranking(history, "weekly", k=1) == [("1", 6)]
+
+
+def test_day_starts_at_day_start_hour(config, now):
+    history = PlayHistory(config)
+    history.record(_song(1), when=datetime(2024, 6, 10, 4, 0))   # 前日の深夜営業
+    history.record(_song(2), when=datetime(2024, 6, 10, 6, 0))
+    assert _ranking(history, "daily") == [("2", 1)]
+
+    now[0] = datetime(2024, 6, 11, 5, 30)
+    assert _ranking(history, "daily") == []
+    assert _ranking(history, "weekly") == [("1", 1), ("2", 1)]
+
+
+def test_rooms_share_the_history_directory(config, now):
+    config.set("history.room", "room1")
+    room1 = PlayHistory(config)
+    config.set("history.room", "room2")
+    room2 = PlayHistory(config)
+    room1.record(_song(1))
+    room2.record(_song(1))
+    room2.record(_song(2))
+
+    room1._followed = 0.0  # follow() の間隔制限を外す
+    assert _ranking(room1, room="room1") == [("1", 1)]
+    assert _ranking(room1, room="room2") == [("1", 1), ("2", 1)]
+    assert _ranking(room1) == [("1", 2), ("2", 1)]
+
+    reader = PlayHistory(config, writer=False)
+    assert _ranking(reader) == [("1", 2), ("2", 1)]
+    assert len(reader) == 3
@@ -0,0 +1,104 @@
+# tests/test_recommendations.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage.play_history import PlayHistory
+from storage.recommendations import SungNextIndex
+
+START = datetime(2024, 6, 1, 20, 0)
+
+
+def _song(n):
+    return {"title": f"Song {n}", "artist": "X", "metadata": {"song_id": str(n)}}
+
+
+def _play(history, sequence):
+    """(分, 曲) の並びを記録"""
+    for minute, song in sequence:
+        history.record(_song(song), when=START + timedelta(minutes=minute))
+
+
+def _top(index, history, song, k=10):
+    return [(history.song_info(other)["song_id"], round(weight, 6))
+            for other, weight in index.top(history.song_number(_song(song)), k)]
+
+
+SEQUENCE = [(0, 1), (5, 2), (10, 3), (15, 1), (20, 2),
+            (100, 1), (104, 1), (108, 3),              # 間が空く・同じ曲の連続
+            (60 * 24 * 30, 1), (60 * 24 * 30 + 5, 3)]  # 30 日後（半減期）
+
+
+def test_batch_build_matches_incremental_updates(config):
+    config.set("history.room", "room1")
+    incremental_history = PlayHistory(config)
+    incremental = SungNextIndex(config, incremental_history)
+    _play(incremental_history, SEQUENCE)
+
+    batch = SungNextIndex(config, PlayHistory(config, writer=False))
+    for song in (1, 2, 3):
+        assert _top(batch, incremental_history, song) == _top(incremental, incremental_history, song)
+
+
+def test_pairs_are_weighted_by_recency(config):
+    history = PlayHistory(config)
+    _play(history, SEQUENCE)
+    index = SungNextIndex(config, history)
+    top = dict(_top(index, history, 1))
+    # 1 → 2 は 30 日前に 2 回、1 → 3 は 30 日前に 1 回と今 1 回
+    # （20 → 100 分は間が空きすぎ、100 → 104 分は同じ曲なので数えない）
+    assert top["2"] == pytest.approx(2 * 0.5, rel=1e-3)
+    assert top["3"] == pytest.approx(0.5 + 1.0, rel=1e-3)
+    assert [song for song, _weight in _top(index, history, 1)] == ["3", "2"]
+    assert _top(index, history, 2) == [("3", pytest.approx(0.5, rel=1e-3))]
+    assert _top(index, history, 3) == [("1", pytest.approx(0.5, rel=1e-3))]
+
+
+def test_rooms_are_separate_sessions(config):
+    config.set("history.room", "room1")
+    room1 = PlayHistory(config)
+    config.set("history.room", "room2")
+    room2 = PlayHistory(config)
+    index = SungNextIndex(config, room1)
+    _play(room1, [(0, 1)])
+    _play(room2, [(1, 2)])
+    _play(room1, [(2, 3)])
+    room1._followed = 0.0
+    room1.follow()
+    assert [song for song, _weight in _top(index, room1, 1)] == ["3"]
+    assert _top(index, room1, 2) == []
+
+
+def test_rows_are_pruned_to_max_neighbors(config):
+    config.set("recommend.max_neighbors", 3)
+    history = PlayHistory(config)
+    index = SungNextIndex(config, history)
+    minute = 0
+    for other in range(2, 12):
+        for _ in range(other):   # 後の曲ほど多く続けて歌われる
+            _play(history, [(minute, 1), (minute + 1, other)])
+            minute += 60
+    top = [song for song, _weight in _top(index, history, 1)]
+    assert len(index._rows[history.song_number(_song(1))]) <= 6
+    assert top[:3] == ["11", "10", "9"]
+
+
+def test_prune_all_keeps_the_heaviest_pairs(config):
+    config.set("recommend.max_neighbors", 1)
+    config.set("recommend.max_pairs", 10)
+    history = PlayHistory(config)
+    index = SungNextIndex(config, history)
+    # 曲 n → n + 1000 を n 回（後の組ほど重い）。上限を超えるたびに 9 組まで減らす
+    minute = 0
+    for n in range(1, 31):
+        for _ in range(n):
+            _play(history, [(minute, n), (minute + 1, n + 1000)])
+            minute += 60
+    assert index.stats()["pairs"] <= 10
+    kept = sorted(int(_top(index, history, n)[0][0]) - 1000
+                  for n in range(1, 31) if _top(index, history, n))
+    assert kept[-9:] == list(range(22, 31))
+
+    # 古い組が減衰しきっても、削除の基準が上がり続けて新しい組まで消えることはない
+    _play(history, [(minute + 60 * 24 * 365, 31), (minute + 60 * 24 * 365 + 1, 1031)])
+    assert _top(index, history, 31) == [("1031", pytest.approx(1.0, rel=1e-3))]
@@ -0,0 +1,85 @@
+# tests/test_scoring.py
+import time
+
+import numpy as np
+
+from audio.pitch import PitchDetector, hz_to_midi
+from audio.scoring import LiveScorer, ReferenceMelody, ScoringEngine, find_melody_file
+
+RATE = 48000
+
+
+def _sine(freq, seconds, rate=RATE):
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_pitch_detector_finds_a4():
+    detector = PitchDetector(RATE, 2048)
+    freq, confidence = detector.detect(_sine(440.0, 2048 / RATE))
+    assert abs(hz_to_midi(freq) - 69.0) < 0.1
+    assert confidence > 0.5
+
+
+def test_pitch_detector_tracks_the_vocal_range():
+    detector = PitchDetector(RATE, 2048)
+    for note in (45, 57, 64, 72, 81):   # A2 ～ A5
+        t = np.arange(2048) / RATE
+        freq = 440.0 * 2.0 ** ((note - 69) / 12.0)
+        # 倍音を含む声に近い波形（基音より第2倍音が強い）
+        block = 0.2 * np.sin(2 * np.pi * freq * t) + 0.3 * np.sin(4 * np.pi * freq * t)
+        detected, _confidence = detector.detect(block.astype(np.float32))
+        assert abs(hz_to_midi(detected) - note) < 0.2, note
+
+
+def test_pitch_detector_rejects_silence_and_noise():
+    detector = PitchDetector(RATE, 2048)
+    assert detector.detect(np.zeros(2048, dtype=np.float32)) == (0.0, 0.0)
+    noise = np.random.default_rng(0).standard_normal(2048).astype(np.float32) * 0.3
+    freq, confidence = detector.detect(noise)
+    assert freq == 0.0 or confidence < 0.5
+
+
+def test_reference_melody_splits_phrases_on_rests():
+    melody = ReferenceMelody([[0, 500, 60], [500, 1000, 62], [2000, 2500, 64]])
+    assert melody.phrase.tolist() == [0, 0, 1]
+    assert melody.note_at(700) == 1
+    assert melody.note_at(1500) == -1
+
+
+def _wait_scored(engine, blocks, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if int(engine._phrase_blocks.sum()) >= blocks:
+            return
+        time.sleep(0.01)
+
+
+def test_live_scorer_scores_samples_written_by_the_microphone():
+    engine = ScoringEngine(ReferenceMelody([[0, 10000, 69]]), RATE, 2048)
+    scorer = LiveScorer(engine)
+    scorer.start(0.0)
+    try:
+        signal = _sine(440.0, 1.0)
+        for offset in range(0, len(signal), 512):  # MicrophoneInput と同じく小さく書き込む
+            scorer.buffer.write(signal[offset:offset + 512])
+        _wait_scored(engine, len(signal) // 2048)
+    finally:
+        scorer.stop()
+    assert engine.total_score() > 95.0
+    assert scorer.position_ms > 900.0
+
+
+def test_key_offset_shifts_the_reference():
+    engine = ScoringEngine(ReferenceMelody([[0, 10000, 69]]), RATE, 2048)
+    engine.key_offset = 2.0
+    block = _sine(440.0 * 2 ** (2 / 12), 2048 / RATE)
+    assert engine.process_block(block, 0.0) == 1.0
+
+
+def test_find_melody_file(tmp_path):
+    video = tmp_path / "song.mp4"
+    video.write_bytes(b"")
+    assert find_melody_file(str(video)) is None
+    (tmp_path / "song.melody.json").write_text('{"notes": []}', encoding="utf-8")
+    assert find_melody_file(str(video)) == str(tmp_path / "song.melody.json")
@@ -0,0 +1,56 @@
+# tests/test_settings.py
+import pytest
+
+from ui.settings import FontFamilies, SettingsDialog
+
+
+@pytest.fixture
+def families(qapp, monkeypatch):
+    """フォントの列挙を数える（キャッシュは試験ごとに作り直す）"""
+    calls = []
+    monkeypatch.setattr(FontFamilies, "_instance", None)
+    monkeypatch.setattr("ui.settings.QFontDatabase.families",
+                        staticmethod(lambda: calls.append(1) or ["Noto Sans", "IPAGothic", "Noto Sans"]))
+    monkeypatch.setattr("ui.settings.QMessageBox.information", lambda *args: None)
+    return calls
+
+
+def _items(combo):
+    return [combo.itemText(i) for i in range(combo.count())]
+
+
+def test_tabs_are_built_when_first_shown(config, families):
+    dialog = SettingsDialog(config)
+    assert dialog._built == {0: True}
+    assert not hasattr(dialog, "server_port")
+    dialog.tabs.setCurrentIndex(2)
+    assert dialog._built == {0: True, 2: True}
+    assert dialog.server_port.value() == config.get("server.port", 8080)
+
+
+def test_apply_keeps_unbuilt_tabs_and_reports_changes(config, families):
+    config.set("debug.log_file", "custom.log")
+    dialog = SettingsDialog(config)
+    changes = []
+    dialog.settings_changed.connect(changes.append)
+    dialog.tabs.setCurrentIndex(2)
+    dialog.server_port.setValue(9090)
+    dialog._apply_settings()
+
+    assert config.get("server.port") == 9090
+    assert config.get("debug.log_file") == "custom.log"  # デバッグタブは作っていない
+    (change,) = changes
+    assert change.touches("server.port") and not change.touches("debug", "font")
+
+
+def test_font_families_are_listed_once_in_the_background(config, families, qapp):
+    config.set("font.family", "IPAGothic")
+    first = SettingsDialog(config)
+    FontFamilies.instance()._thread.join(timeout=5.0)
+    qapp.processEvents()  # 列挙の完了はキュー接続で届く
+    assert _items(first.font_combo) == ["IPAGothic", "Noto Sans"]
+    assert first.font_combo.currentText() == "IPAGothic"
+
+    second = SettingsDialog(config)
+    assert _items(second.font_combo) == ["IPAGothic", "Noto Sans"]
+    assert families == [1]
@@ -0,0 +1,56 @@
+# tests/test_song_files.py
+import os
+
+import pytest
+
+from player.song_files import resolve_song_file
+
+
+@pytest.fixture
+def library(config, tmp_path):
+    songs = tmp_path / "songs"
+    songs.mkdir()
+    (songs / "S001.mp4").write_bytes(b"")
+    (songs / "曲名.mkv").write_bytes(b"")
+    (songs / "sub").mkdir()
+    (songs / "sub" / "other.mp4").write_bytes(b"")
+    (tmp_path / "secret.mp4").write_bytes(b"")
+    config.set("songs.local_dir", str(songs))
+    return songs
+
+
+def test_resolves_song_id_then_title(config, library):
+    assert resolve_song_file(config, {"metadata": {"song_id": "S001"}}) == str(library / "S001.mp4")
+    assert resolve_song_file(config, {"title": "曲名"}) == str(library / "曲名.mkv")
+
+
+def test_resolves_metadata_path_inside_library(config, library):
+    entry = {"metadata": {"path": "sub/other.mp4"}}
+    assert resolve_song_file(config, entry) == str(library / "sub" / "other.mp4")
+    entry = {"metadata": {"path": str(library / "S001.mp4")}}
+    assert resolve_song_file(config, entry) == str(library / "S001.mp4")
+
+
+def test_rejects_files_outside_library(config, library, tmp_path):
+    assert resolve_song_file(config, {"metadata": {"path": str(tmp_path / "secret.mp4")}}) is None
+    assert resolve_song_file(config, {"metadata": {"path": "../secret.mp4"}}) is None
+    assert resolve_song_file(config, {"metadata": {"song_id": "../secret"}}) is None
+    assert resolve_song_file(config, {"title": "../secret"}) is None
+
+
+def test_rejects_symlink_out_of_library(config, library, tmp_path):
+    try:
+        os.symlink(tmp_path / "secret.mp4", library / "link.mp4")
+    except (OSError, NotImplementedError):
+        pytest.skip("シンボリックリンクを作れない環境")
+    assert resolve_song_file(config, {"metadata": {"song_id": "link"}}) is None
+
+
+def test_library_roots_extend_allowed_directories(config, library, tmp_path):
+    nas = tmp_path / "nas"
+    nas.mkdir()
+    (nas / "x.mp4").write_bytes(b"")
+    entry = {"metadata": {"path": str(nas / "x.mp4")}}
+    assert resolve_song_file(config, entry) is None
+    config.set("songs.library_roots", [str(nas)])
+    assert resolve_song_file(config, entry) == str(nas / "x.mp4")
@@ -0,0 +1,46 @@
+# tests/test_traffic.py
+import json
+import threading
+
+from werkzeug.serving import make_server
+
+from server.api_server import APIServer
+from server.selection_manager import SelectionManager
+from server.traffic_recorder import load_recording
+from server.traffic_replay import TrafficReplayer
+
+
+def test_recorded_requests_replay_against_a_live_server(config, tmp_path):
+    path = tmp_path / "api.jsonl.gz"
+    config.set("history.enabled", False)
+    config.set("server.record.enabled", True)
+    config.set("server.record.path", str(path))
+    recorded = APIServer(SelectionManager(), config)
+    client = recorded.app.test_client()
+    client.post("/api/select", json={"title": "A", "artist": "X"})
+    client.get("/api/queue?limit=5")
+    client.delete("/api/queue/999")
+    recorded.stop()
+
+    records = load_recording(str(path))["records"]
+    assert [(r["method"], r["path"], r["route"], r["status"]) for r in records] == [
+        ("POST", "/api/select", "/api/select", 200),
+        ("GET", "/api/queue?limit=5", "/api/queue", 200),
+        ("DELETE", "/api/queue/999", "/api/queue/<int:reservation_id>", 404),
+    ]
+    assert json.loads(records[0]["body"]) == {"title": "A", "artist": "X"}
+    assert records[1]["body"] is None
+
+    config.set("server.record.enabled", False)
+    selection_manager = SelectionManager()
+    target = make_server("127.0.0.1", 0, APIServer(selection_manager, config).app, threaded=True)
+    threading.Thread(target=target.serve_forever, daemon=True).start()
+    try:
+        report = TrafficReplayer(f"http://127.0.0.1:{target.server_port}", speed=100).run(records)
+    finally:
+        target.shutdown()
+        target.server_close()
+    assert (report["requests"], report["errors"], report["status_mismatches"]) == (3, 0, 0)
+    assert set(report["routes"]) == {"POST /api/select", "GET /api/queue",
+                                     "DELETE /api/queue/<int:reservation_id>"}
+    assert [entry["title"] for entry in selection_manager.get_queue()] == ["A"]
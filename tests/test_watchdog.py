@@ -0,0 +1,26 @@
+# tests/test_watchdog.py
+import time
+
+from utils.watchdog import UiStallWatchdog
+
+
+def test_stall_is_detected_and_cleared_by_the_next_beat(config, capsys):
+    config.set("watchdog.interval_ms", 10)
+    config.set("watchdog.threshold_ms", 30)
+    watchdog = UiStallWatchdog(config)
+    watchdog.start()   # イベントループがないので心拍は来ない = 停止
+    try:
+        deadline = time.monotonic() + 2.0
+        while watchdog._stall_started is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert watchdog._stall_started is not None
+        while not watchdog._stall_reported and time.monotonic() < deadline:
+            time.sleep(0.01)
+        watchdog._beat()
+        assert watchdog._stall_started is None
+        assert not watchdog._stall_reported
+    finally:
+        watchdog.stop()
+    out = capsys.readouterr().out
+    assert "応答していません" in out
+    assert "停止していました" in out
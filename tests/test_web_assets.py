@@ -0,0 +1,79 @@
+# tests/test_web_assets.py
+import gzip
+
+import pytest
+from flask import Request
+from werkzeug.test import EnvironBuilder
+
+from server.web_assets import IMMUTABLE, REVALIDATE, WebAssets, gzip_file_response
+
+APP_JS = "console.log('pykara');\n" * 200
+
+
+def _request(**headers):
+    return Request(EnvironBuilder(headers=headers).get_environ())
+
+
+@pytest.fixture
+def assets(config, tmp_path):
+    web = tmp_path / "web"
+    web.mkdir()
+    (web / "index.html").write_text('<script src="assets/app.js"></script>', encoding="utf-8")
+    (web / "sw.js").write_text('const BUILD = "__BUILD__";\nconst FILES = __PRECACHE__;\n', encoding="utf-8")
+    (web / "app.js").write_text(APP_JS, encoding="utf-8")
+    config.set("remote.dir", str(web))
+    return WebAssets(config)
+
+
+def test_assets_are_hashed_and_entry_files_rewritten(assets):
+    names = assets.names()
+    hashed = next(name for name in names if name.startswith("app."))
+    assert hashed != "app.js" and hashed.endswith(".js")
+    assert set(names) == {hashed, "index.html", "sw.js"}
+
+    index = assets.response("index.html", _request())
+    assert index.headers["Cache-Control"] == REVALIDATE
+    assert index.get_data(as_text=True) == f'<script src="assets/{hashed}"></script>'
+    sw = assets.response("sw.js", _request()).get_data(as_text=True)
+    assert "__BUILD__" not in sw
+    assert f'["assets/{hashed}"]' in sw
+
+    script = assets.response(hashed, _request())
+    assert script.headers["Cache-Control"] == IMMUTABLE
+    assert script.get_data(as_text=True) == APP_JS
+    assert assets.response("app.js", _request()) is None
+
+
+def test_if_none_match_returns_not_modified(assets):
+    first = assets.response("index.html", _request())
+    again = assets.response("index.html", _request(**{"If-None-Match": first.headers["ETag"]}))
+    assert again.status_code == 304
+    assert again.get_data() == b""
+
+
+def test_encoding_follows_accept_encoding(assets):
+    hashed = next(name for name in assets.names() if name.startswith("app."))
+    compressed = assets.response(hashed, _request(**{"Accept-Encoding": "gzip"}))
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed.get_data()).decode("utf-8") == APP_JS
+
+    refused = assets.response(hashed, _request(**{"Accept-Encoding": "gzip;q=0"}))
+    assert "Content-Encoding" not in refused.headers
+    assert refused.get_data(as_text=True) == APP_JS
+
+
+def test_gzip_file_response_falls_back_to_identity(tmp_path):
+    path = tmp_path / "snapshot-1.json.gz"
+    path.write_bytes(gzip.compress(b'{"songs": []}'))
+
+    compressed = gzip_file_response(str(path), _request(**{"Accept-Encoding": "gzip, deflate"}))
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.get_data() == path.read_bytes()
+
+    plain = gzip_file_response(str(path), _request())
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data() == b'{"songs": []}'
+
+    cached = gzip_file_response(str(path), _request(**{"If-None-Match": plain.headers["ETag"]}))
+    assert cached.status_code == 304
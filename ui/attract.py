@@ -1,28 +1,32 @@
 # ui/attract.py
 import os
-import random
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel
-from PyQt6.QtCore import Qt, QTimer, QUrl
+from typing import Optional
+from PyQt6.QtWidgets import QMainWindow
+from PyQt6.QtCore import Qt, QTimer, QUrl, pyqtSignal
 from PyQt6.QtGui import QKeyEvent
 
-from theme.fonts import FontSet
 from theme.theme import ThemeManager
-from config import Config
+from config import ChangeSet, Config
 from server.selection_manager import SelectionManager
+from player.attract_scheduler import AttractScheduler
+from ui.attract_overlay import AttractOverlay
+from ui.perf_hud import PerfHud
 
-# 動画再生用
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PyQt6.QtMultimediaWidgets import QVideoWidget
-
-# YouTube再生用
-from PyQt6.QtWebEngineWidgets import QWebEngineView
+# 動画再生用（Qt Multimedia またはヘッドレス用の擬似バックエンド）
+from player import media_backend
 
 
 class PyKaraAttract(QMainWindow):
-    def __init__(self, config: Config, selection_manager: SelectionManager):
+    settings_changed = pyqtSignal(object)  # 設定ダイアログで設定が適用された（ChangeSet）
+
+    def __init__(self, config: Config, selection_manager: SelectionManager, media_cache=None,
+                 gain_store=None):
         super().__init__()
         self.config = config
         self.selection_manager = selection_manager
+        self.media_cache = media_cache
+        self.gain_store = gain_store
+        self.current_video: Optional[str] = None
         self.theme_manager = ThemeManager(config)
 
         self.setWindowTitle("PyKara - Attract Mode")
@@ -51,13 +55,10 @@ class PyKaraAttract(QMainWindow):
         self.selection_timer.timeout.connect(self._check_selection)
         self.selection_timer.start(500)
 
-        # --------------------------
-        # 点滅タイマー
-        # --------------------------
-        self._flash_state = False
-        self.flash_timer = QTimer(self)
-        self.flash_timer.timeout.connect(self._toggle_flash)
-        self.flash_timer.start(800)
+        # 設定ダイアログ（F1 で初めて開いたときに作り、以降は使い回す）
+        self._settings_dialog = None
+        # フォント一覧は表示が落ち着いてからバックグラウンドで列挙しておく
+        QTimer.singleShot(3000, self._preload_font_families)
 
     # ==========================
     # ローカル動画再生（通常 + shop動画）
@@ -81,53 +82,46 @@ class PyKaraAttract(QMainWindow):
             and os.path.isfile(os.path.join(shop_dir, f))
         ]
 
-        # ランダムシャッフル
-        random.shuffle(self.main_videos)
-        self.main_loop = self.main_videos.copy()
-        self.video_queue = self.shop_videos.copy()  # 最初にshop動画を再生
-        self.main_cycle_count = 0
+        # 重み・時間帯・shop動画の挿入間隔に従って先読みプレイリストを生成
+        self.scheduler = AttractScheduler(self.config, self.main_videos, self.shop_videos)
 
-        self.audio_output = QAudioOutput()
-        self.audio_output.setVolume(self.config.get("attract_video.volume", 0.5))
-        self.player = QMediaPlayer()
+        # ローテーション中の動画はローカルキャッシュへ（次に再生する順に）
+        if self.media_cache is not None:
+            for path in self.scheduler.peek() + self.shop_videos + self.main_videos:
+                self.media_cache.request(path)
+
+        media = media_backend.get()
+        self.audio_output = media.AudioOutput()
+        self.audio_output.setVolume(self.config.get_attract_volume())
+        self.player = media.MediaPlayer()
         self.player.setAudioOutput(self.audio_output)
-        self.video_widget = QVideoWidget(self)
+        self.video_widget = media.VideoWidget(self)
         self.setCentralWidget(self.video_widget)
         self.player.setVideoOutput(self.video_widget)
 
         # 最初の動画再生
-        if self.video_queue or self.main_loop:
+        if self.main_videos or self.shop_videos:
             self._play_next_video()
 
         self.player.mediaStatusChanged.connect(self._handle_media_status)
 
     def _play_next_video(self):
-        next_video = None
-
-        # shop動画を優先
-        if self.video_queue:
-            next_video = self.video_queue.pop(0)
-        else:
-            # 通常動画を消費
-            if self.main_loop:
-                next_video = self.main_loop.pop(0)
-            else:
-                # 通常動画1周終了
-                self.main_cycle_count += 1
-                # shop動画を挟む
-                self.video_queue = self.shop_videos.copy()
-                random.shuffle(self.main_videos)
-                self.main_loop = self.main_videos.copy()
-                if self.video_queue:
-                    next_video = self.video_queue.pop(0)
+        next_video = self.scheduler.next()
 
         if next_video:
+            self.current_video = next_video
+            self._apply_volume()
+            if self.media_cache is not None:
+                next_video = self.media_cache.resolve(next_video, owner=self)
             self.player.setSource(QUrl.fromLocalFile(next_video))
             self.player.play()
+            # 先読みプレイリストの動画を優先してキャッシュへ
+            if self.media_cache is not None:
+                for path in self.scheduler.peek():
+                    self.media_cache.request(path)
 
     def _handle_media_status(self, status):
-        from PyQt6.QtMultimedia import QMediaPlayer
-        if status == QMediaPlayer.MediaStatus.EndOfMedia:
+        if status == media_backend.get().MediaStatus.EndOfMedia:
             self._play_next_video()
 
     # ==========================
@@ -138,6 +132,8 @@ class PyKaraAttract(QMainWindow):
         if not channel_name:
             return
 
+        # YouTube再生用
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
         self.web_view = QWebEngineView(self)
         self.setCentralWidget(self.web_view)
 
@@ -148,40 +144,20 @@ class PyKaraAttract(QMainWindow):
     # UIオーバーレイ（メッセージ表示など）
     # ==========================
     def _setup_ui_overlay(self):
-        overlay = QWidget(self)
-        overlay.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
-        overlay.setStyleSheet("background: transparent;")
-        overlay.setGeometry(0, 0, self.width(), self.height())
-        self.overlay_layout = QVBoxLayout(overlay)
-        self.overlay_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        # 選曲待ちメッセージ
-        self.msg = QLabel("Sing Your Soul.\n\n[ 選曲をお待ちしています ]", self)
-        self.msg.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self._update_font()
-        self._update_text_color()
-        self.overlay_layout.addWidget(self.msg)
-
-        # 選曲情報ラベル
-        self.selection_label = QLabel("", self)
-        self.selection_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.selection_label.setFont(FontSet.normal())
-        self._update_text_color_label(self.selection_label)
-        self.overlay_layout.addWidget(self.selection_label)
+        # メッセージ・選曲情報は事前描画したピクスマップで描画（点滅はアニメーション）
+        self.overlay = AttractOverlay(self.theme_manager, self)
+        self.overlay.setGeometry(0, 0, self.width(), self.height())
 
-    # ==========================
-    # テーマ・フォント更新
-    # ==========================
-    def _update_font(self):
-        self.msg.setFont(FontSet.title())
-
-    def _update_text_color(self):
-        rgb = self.theme_manager.get_text_color_rgb()
-        self.msg.setStyleSheet(f"color: rgb({rgb[0]}, {rgb[1]}, {rgb[2]});")
+        # パフォーマンス HUD（F2 で表示）
+        self.perf_hud = PerfHud(self)
+        if self.video_widget is not None:
+            self.perf_hud.attach_video_sink(self.video_widget.videoSink())
 
-    def _update_text_color_label(self, label):
-        rgb = self.theme_manager.get_text_color_rgb()
-        label.setStyleSheet(f"color: rgb({rgb[0]}, {rgb[1]}, {rgb[2]});")
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.overlay.setGeometry(0, 0, self.width(), self.height())
+        self.overlay.raise_()
+        self.perf_hud.raise_()
 
     # ==========================
     # 選曲監視
@@ -189,43 +165,53 @@ class PyKaraAttract(QMainWindow):
     def _check_selection(self):
         selection = self.selection_manager.get_selection()
         if selection:
-            title = selection.get("title", "")
-            artist = selection.get("artist", "")
-            if artist:
-                self.selection_label.setText(f"♪ {title}\n{artist}")
-            else:
-                self.selection_label.setText(f"♪ {title}")
-            self.selection_label.show()
-            self.flash_timer.stop()
-            rgb = self.theme_manager.get_accent_color_rgb()
-            self.msg.setStyleSheet(f"color: rgb({rgb[0]}, {rgb[1]}, {rgb[2]});")
-            self.msg.setText("選曲が完了しました！\n\n準備中...")
+            self.overlay.show_selection(selection.get("title", ""), selection.get("artist", ""))
         else:
-            self.selection_label.setText("")
-            self.selection_label.hide()
-            if not self.flash_timer.isActive():
-                self.flash_timer.start(800)
-            self.msg.setText("Sing Your Soul.\n\n[ 選曲をお待ちしています ]")
+            self.overlay.show_waiting()
 
     # ==========================
-    # 点滅
+    # 演奏中の一時停止・再開
     # ==========================
-    def _toggle_flash(self):
-        if self._flash_state:
-            rgb = self.theme_manager.get_text_color_rgb()
-        else:
-            rgb = self.theme_manager.get_accent_color_rgb()
-        self.msg.setStyleSheet(f"color: rgb({rgb[0]}, {rgb[1]}, {rgb[2]});")
-        self._flash_state = not self._flash_state
+    def suspend(self):
+        """曲の演奏中はアトラクトを止めて隠す"""
+        self.selection_timer.stop()
+        if hasattr(self, "player"):
+            self.player.pause()
+        self.hide()
+
+    def resume(self):
+        """アトラクトに戻る"""
+        if not self.isVisible():
+            self.show()
+            self.raise_()
+        if hasattr(self, "player") and \
+                self.player.playbackState() != media_backend.get().PlaybackState.PlayingState:
+            self.player.play()
+        if not self.selection_timer.isActive():
+            self.selection_timer.start(500)
+        self._check_selection()
 
     # ==========================
     # 設定変更対応
     # ==========================
-    def refresh_settings(self):
-        self._update_font()
-        self._update_text_color()
-        if hasattr(self, "audio_output"):
-            self.audio_output.setVolume(self.config.get("attract_video.volume", 0.5))
+    def refresh_settings(self, changes: Optional[ChangeSet] = None):
+        """設定を反映（changes があれば関係する項目が変わったときだけ）"""
+        if changes is None or changes.touches("font", "theme"):
+            self.overlay.refresh_style()
+        if hasattr(self, "audio_output") and (changes is None or changes.touches("attract_video.volume")):
+            self._apply_volume()
+        self.settings_changed.emit(changes)
+
+    def _apply_volume(self):
+        """設定の音量に再生中の動画のゲイン（事前解析済み）を掛けて適用"""
+        volume = self.config.get_attract_volume()
+        if self.gain_store is not None and self.current_video:
+            volume = self.gain_store.volume_for(self.current_video, volume)
+        self.audio_output.setVolume(volume)
+
+    def _preload_font_families(self):
+        from ui.settings import FontFamilies
+        FontFamilies.instance().load()
 
     # ==========================
     # キー操作
@@ -237,12 +223,18 @@ class PyKaraAttract(QMainWindow):
                 was_fullscreen = self.isFullScreen()
                 if was_fullscreen:
                     self.showNormal()
-                dialog = SettingsDialog(self.config, self)
-                dialog.settings_changed.connect(self.refresh_settings)
-                dialog.exec()
+                # 一度作ったダイアログを使い回す（開くたびに作り直さない）
+                if self._settings_dialog is None:
+                    self._settings_dialog = SettingsDialog(self.config, self)
+                    self._settings_dialog.settings_changed.connect(self.refresh_settings)
+                else:
+                    self._settings_dialog.reload()
+                self._settings_dialog.exec()
                 if was_fullscreen and self.config.get("display.fullscreen", False):
                     self.showFullScreen()
             except Exception as e:
                 print(f"設定画面表示エラー: {e}")
+        elif event.key() == Qt.Key.Key_F2:
+            self.perf_hud.toggle()
         else:
             super().keyPressEvent(event)
@@ -0,0 +1,214 @@
+# ui/attract_overlay.py
+import math
+from typing import Optional
+
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QRect, QPropertyAnimation, QEasingCurve, pyqtProperty
+from PyQt6.QtGui import QPainter, QPixmap, QColor, QFont, QFontMetrics, QGuiApplication
+
+from theme.fonts import FontSet
+from theme.theme import ThemeManager
+from utils.metrics import metrics
+
+WAITING_MESSAGE = "Sing Your Soul.\n\n[ 選曲をお待ちしています ]"
+SELECTED_MESSAGE = "選曲が完了しました！\n\n準備中..."
+
+
+class AttractOverlay(QWidget):
+    """アトラクト画面のメッセージ・選曲情報の描画レイヤー
+
+    文字列は変更時に一度だけテキスト色・アクセント色の2枚のピクスマップに
+    描画しておき、点滅はその2枚のクロスフェード（QPropertyAnimation）で行う。
+    再描画はメッセージの矩形だけに限定する。
+    """
+
+    FLASH_MS = 800
+    SPACING = 24
+
+    def __init__(self, theme_manager: ThemeManager, parent=None):
+        super().__init__(parent)
+        self.theme_manager = theme_manager
+
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+
+        self._message = WAITING_MESSAGE
+        self._banner = ""
+        self._flash = 0.0  # 0.0 = テキスト色、1.0 = アクセント色
+        self._message_pixmaps: Optional[tuple] = None
+        self._banner_pixmap: Optional[QPixmap] = None
+
+        # 0 → 1 → 0 を FLASH_MS ごとに往復
+        self._animation = QPropertyAnimation(self, b"flash", self)
+        self._animation.setDuration(self.FLASH_MS * 2)
+        self._animation.setStartValue(0.0)
+        self._animation.setKeyValueAt(0.5, 1.0)
+        self._animation.setEndValue(0.0)
+        self._animation.setEasingCurve(QEasingCurve.Type.InOutSine)
+        self._animation.setLoopCount(-1)
+
+        self._paint_stats = metrics.timing("attract.overlay.paint", budget_ms=2.0)
+        self.glyph_warmer = None  # GlyphWarmer（表示した文字のヒット率を記録）
+
+        self.refresh_style()
+
+    # ==========================
+    # 点滅（アニメーション用プロパティ）
+    # ==========================
+    def _get_flash(self) -> float:
+        return self._flash
+
+    def _set_flash(self, value: float):
+        self._flash = value
+        self.update(self._message_rect())
+
+    flash = pyqtProperty(float, fget=_get_flash, fset=_set_flash)
+
+    # ==========================
+    # 表示内容
+    # ==========================
+    def show_waiting(self):
+        """選曲待ち（メッセージを点滅）"""
+        self._set_content(WAITING_MESSAGE, "")
+        if self.isVisible() and self._animation.state() != QPropertyAnimation.State.Running:
+            self._animation.start()
+
+    def show_selection(self, title: str, artist: str = ""):
+        """選曲完了（アクセント色で固定表示し、曲名を表示）"""
+        self._animation.stop()
+        banner = f"♪ {title}\n{artist}" if artist else f"♪ {title}"
+        self._set_content(SELECTED_MESSAGE, banner)
+        if self._flash != 1.0:
+            self._set_flash(1.0)
+
+    def _set_content(self, message: str, banner: str):
+        if message == self._message and banner == self._banner:
+            return  # 変化がなければ何もしない
+        old = self._message_rect().united(self._banner_rect())
+        if message != self._message:
+            self._message = message
+            self._message_pixmaps = None
+        if banner != self._banner:
+            self._banner = banner
+            self._banner_pixmap = None
+        self.update(old.united(self._message_rect()).united(self._banner_rect()))
+
+    def refresh_style(self):
+        """フォント・色を再読み込み（ピクスマップは作り直し）"""
+        self._message_font = FontSet.title()
+        self._banner_font = FontSet.normal()
+        self._text_color = self.theme_manager.get_text_color()
+        self._accent_color = self.theme_manager.get_accent_color()
+        self._message_pixmaps = None
+        self._banner_pixmap = None
+        self.update()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._message == WAITING_MESSAGE:
+            self._animation.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._animation.stop()
+
+    # ==========================
+    # ピクスマップ
+    # ==========================
+    def _render_text(self, text: str, font: QFont, color: QColor) -> QPixmap:
+        fm = QFontMetrics(font)
+        bounds = fm.boundingRect(QRect(0, 0, 0, 0), Qt.AlignmentFlag.AlignCenter, text)
+        width, height = max(1, bounds.width()), max(1, bounds.height())
+        ratio = self.devicePixelRatioF() or QGuiApplication.primaryScreen().devicePixelRatio()
+        pixmap = QPixmap(math.ceil(width * ratio), math.ceil(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        painter.setFont(font)
+        painter.setPen(color)
+        painter.drawText(QRect(0, 0, width, height), Qt.AlignmentFlag.AlignCenter, text)
+        painter.end()
+        return pixmap
+
+    def _message_images(self) -> tuple:
+        if self._message_pixmaps is None:
+            if self.glyph_warmer is not None:
+                self.glyph_warmer.record_display(self._message, self._message_font)
+            self._message_pixmaps = (
+                self._render_text(self._message, self._message_font, self._text_color),
+                self._render_text(self._message, self._message_font, self._accent_color),
+            )
+        return self._message_pixmaps
+
+    def _banner_image(self) -> Optional[QPixmap]:
+        if not self._banner:
+            return None
+        if self._banner_pixmap is None:
+            if self.glyph_warmer is not None:
+                self.glyph_warmer.record_display(self._banner, self._banner_font)
+            self._banner_pixmap = self._render_text(self._banner, self._banner_font, self._text_color)
+        return self._banner_pixmap
+
+    # ==========================
+    # レイアウト（メッセージと選曲情報を中央に縦並び）
+    # ==========================
+    @staticmethod
+    def _logical_size(pixmap: Optional[QPixmap]) -> tuple:
+        if pixmap is None:
+            return 0, 0
+        ratio = pixmap.devicePixelRatio()
+        return math.ceil(pixmap.width() / ratio), math.ceil(pixmap.height() / ratio)
+
+    def _content_top(self) -> int:
+        _w, message_h = self._logical_size(self._message_images()[0])
+        _w, banner_h = self._logical_size(self._banner_image())
+        total = message_h + (self.SPACING + banner_h if banner_h else 0)
+        return (self.height() - total) // 2
+
+    def _message_rect(self) -> QRect:
+        width, height = self._logical_size(self._message_images()[0])
+        return QRect((self.width() - width) // 2, self._content_top(), width, height)
+
+    def _banner_rect(self) -> QRect:
+        pixmap = self._banner_image()
+        if pixmap is None:
+            return QRect()
+        width, height = self._logical_size(pixmap)
+        top = self._message_rect().bottom() + 1 + self.SPACING
+        return QRect((self.width() - width) // 2, top, width, height)
+
+    # ==========================
+    # 描画
+    # ==========================
+    def paintEvent(self, event):
+        with self._paint_stats.measure():
+            painter = QPainter(self)
+            dirty = event.rect()
+
+            rect = self._message_rect()
+            if rect.intersects(dirty):
+                normal, accent = self._message_images()
+                # テキスト色の上にアクセント色を重ねて色を補間
+                if self._flash < 1.0:
+                    painter.drawPixmap(rect, normal)
+                if self._flash > 0.0:
+                    painter.setOpacity(self._flash)
+                    painter.drawPixmap(rect, accent)
+                painter.setOpacity(1.0)
+
+            banner = self._banner_image()
+            if banner is not None:
+                rect = self._banner_rect()
+                if rect.intersects(dirty):
+                    painter.drawPixmap(rect, banner)
+            painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update()
+
+    def paint_stats(self) -> dict:
+        """描画時間の統計（ms）"""
+        return self._paint_stats.summary()
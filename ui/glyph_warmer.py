@@ -0,0 +1,270 @@
+# ui/glyph_warmer.py
+import time
+from collections import OrderedDict, deque
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QPointF, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QGuiApplication, QImage, QPainter, QPainterPath
+
+from config import ChangeSet, Config
+from player.lyrics import LyricsTimeline, find_lyrics_file
+from player.song_files import resolve_song_file
+from theme.fonts import FontSet
+from ui.lyrics_layer import LyricsLayer
+from utils.metrics import metrics
+
+# 常に表示する文言（アトラクト画面のメッセージ）
+FIXED_TEXTS = ("Sing Your Soul.\n\n[ 選曲をお待ちしています ]", "選曲が完了しました！\n\n準備中...")
+
+
+class GlyphWarmer(QObject):
+    """CJK グリフの先行ラスタライズ（予約曲の曲名・歌詞）
+
+    初めて表示する漢字は、表示した瞬間に UI スレッドでフォントの読み込み
+    （フォールバックの解決）とラスタライズが走り、フレームが落ちる。
+    起動時と予約のたびに、これから表示する曲名・歌詞の文字を FontSet の
+    フォント・サイズで小さな画像に描いておき、Qt のグリフキャッシュを温める。
+
+    曲ファイル・歌詞の解決と解析はバックグラウンドスレッドで行い、描画だけを
+    UI スレッドの空き時間（0ms タイマー、1回あたり budget_ms まで）に行う。
+    温めた文字は (フォント, 文字) 単位で max_glyphs 件まで覚えておき（LRU）、
+    表示時に温まっていたかどうかでヒット率を数える。
+    """
+
+    CHUNK = 8  # 1回の描画で描く文字数（1文字目のフォント読み込みが重いので小さく）
+
+    _wake = pyqtSignal()
+
+    def __init__(self, config: Config, selection_manager, logger=None):
+        super().__init__()
+        self.config = config
+        self.selection_manager = selection_manager
+        self.logger = logger
+        self.max_glyphs = config.get("glyph_warmup.max_glyphs", 20000)
+        self.budget_ms = config.get("glyph_warmup.budget_ms", 2.0)
+
+        # バックグラウンド → UI スレッド: (種類, 文字列)
+        self._lock = Lock()
+        self._texts: "deque[Tuple[str, str]]" = deque()
+        # 予約 → バックグラウンド（曲ファイル・歌詞の解決）
+        self._entries: "deque[Dict[str, Any]]" = deque()
+        self._entries_wake = Event()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+        # UI スレッドのみ
+        self._warm: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._pending: "deque[Tuple[str, QFont, str]]" = deque()  # (描き方, フォント, 文字列)
+        self._queued = set()  # 描画待ちの (フォント, 文字)
+        self._fonts: Dict[str, List[Tuple[str, QFont]]] = {}
+        self._image: Optional[QImage] = None
+
+        self._display_hits = 0
+        self._display_misses = 0
+        self._warmed = 0
+        self._tick_stats = metrics.timing("glyphs.warmup", budget_ms=self.budget_ms)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._tick)
+        self._wake.connect(self._on_wake)
+
+        self.refresh_settings()
+        selection_manager.add_listener(self._on_selection_event)
+
+    # ==========================
+    # 起動・停止
+    # ==========================
+    def start(self):
+        """解決スレッドを起動し、固定の文言と予約済みの曲を温める"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="glyph-warmup", daemon=True)
+        self._thread.start()
+        for text in FIXED_TEXTS:
+            self._submit("title", text)
+        for entry in self.selection_manager.get_queue():
+            self._request(entry)
+
+    def stop(self):
+        """解決スレッドと描画を停止"""
+        self._stop.set()
+        self._entries_wake.set()
+        self._timer.stop()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def refresh_settings(self, changes: Optional[ChangeSet] = None):
+        """フォントを読み直す（温めた記録は捨てて、予約済みの曲を温め直す）"""
+        if changes is not None and not changes.touches("font", "lyrics"):
+            return
+        lyrics_font, ruby_font = LyricsLayer.fonts(self.config)
+        # 曲名は選曲完了のメッセージ（タイトル）と曲名の帯（通常）、歌詞は本文とルビ
+        self._fonts = {
+            "title": [("text", FontSet.title()), ("text", FontSet.normal())],
+            "lyrics": [("path", lyrics_font)],
+            "ruby": [("path", ruby_font)],
+        }
+        self._warm.clear()
+        self._pending.clear()
+        self._queued.clear()
+        if self._thread and self._thread.is_alive():
+            for text in FIXED_TEXTS:
+                self._submit("title", text)
+            for entry in self.selection_manager.get_queue():
+                self._request(entry)
+
+    # ==========================
+    # 要求（任意のスレッドから）
+    # ==========================
+    def _on_selection_event(self, event: str, data: Dict[str, Any]):
+        if event == "reserved":
+            self._request(data)
+
+    def _request(self, entry: Dict[str, Any]):
+        title = entry.get("title", "")
+        artist = entry.get("artist", "")
+        self._submit("title", f"♪ {title}\n{artist}")
+        with self._lock:
+            self._entries.append(entry)
+        self._entries_wake.set()
+
+    def _submit(self, kind: str, text: str):
+        if not text:
+            return
+        with self._lock:
+            self._texts.append((kind, text))
+        self._wake.emit()  # UI スレッドのタイマーを起こす（キュー接続）
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._entries_wake.wait()
+            self._entries_wake.clear()
+            while not self._stop.is_set():
+                with self._lock:
+                    if not self._entries:
+                        break
+                    entry = self._entries.popleft()
+                self._load_lyrics(entry)
+
+    def _load_lyrics(self, entry: Dict[str, Any]):
+        try:
+            path = resolve_song_file(self.config, entry)
+            lyrics_path = find_lyrics_file(path) if path else None
+            if lyrics_path is None:
+                return
+            timeline = LyricsTimeline.load(lyrics_path)
+        except Exception as e:
+            if self.logger:
+                self.logger.debug(f"グリフの先行描画用の歌詞を読めません: {entry.get('title', '')}: {e}")
+            return
+        self._submit("lyrics", "".join(timeline.line_text))
+        self._submit("ruby", "".join(timeline.ruby_text))
+
+    # ==========================
+    # 描画（UI スレッドの空き時間）
+    # ==========================
+    def _on_wake(self):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _tick(self):
+        with self._tick_stats.measure():
+            deadline = time.perf_counter() + self.budget_ms / 1000.0
+            self._expand()
+            while self._pending and time.perf_counter() < deadline:
+                method, font, chars = self._pending.popleft()
+                self._draw(method, font, chars)
+            if not self._pending and not self._has_texts():
+                self._timer.stop()
+        metrics.set_gauge("glyphs.cached", len(self._warm))
+
+    def _has_texts(self) -> bool:
+        with self._lock:
+            return bool(self._texts)
+
+    def _expand(self):
+        """届いた文字列を、まだ温めていない文字の描画単位に分ける"""
+        with self._lock:
+            texts = list(self._texts)
+            self._texts.clear()
+        for kind, text in texts:
+            for method, font in self._fonts.get(kind, ()):
+                key = font.key()
+                chars = []
+                for char in dict.fromkeys(text):
+                    if char.isspace() or (key, char) in self._warm or (key, char) in self._queued:
+                        continue
+                    self._queued.add((key, char))
+                    chars.append(char)
+                for i in range(0, len(chars), self.CHUNK):
+                    self._pending.append((method, font, "".join(chars[i:i + self.CHUNK])))
+
+    def _remember(self, key: str, char: str):
+        self._warm[(key, char)] = None
+        self._warm.move_to_end((key, char))
+        while len(self._warm) > self.max_glyphs:
+            self._warm.popitem(last=False)
+
+    def _draw(self, method: str, font: QFont, chars: str):
+        if self._image is None:
+            screen = QGuiApplication.primaryScreen()
+            ratio = screen.devicePixelRatio() if screen is not None else 1.0
+            self._image = QImage(64, 64, QImage.Format.Format_ARGB32_Premultiplied)
+            self._image.setDevicePixelRatio(ratio)
+        painter = QPainter(self._image)
+        if method == "path":
+            # 歌詞はアウトライン（QPainterPath）で描くので、同じ経路でグリフを読み込む
+            path = QPainterPath()
+            path.addText(QPointF(0, 48), font, chars)
+            painter.fillPath(path, QColor(255, 255, 255))
+        else:
+            painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+            painter.setFont(font)
+            painter.drawText(0, 48, chars)
+        painter.end()
+        key = font.key()
+        for char in chars:
+            self._queued.discard((key, char))
+            self._remember(key, char)
+        self._warmed += len(chars)
+
+    # ==========================
+    # 表示時の記録・統計
+    # ==========================
+    def record_display(self, text: str, font: QFont):
+        """実際に描画する文字列を記録（温まっていたかどうかでヒット率を数える）"""
+        key = font.key()
+        hits = misses = 0
+        for char in dict.fromkeys(text):
+            if char.isspace():
+                continue
+            if (key, char) in self._warm:
+                self._warm.move_to_end((key, char))
+                hits += 1
+            else:
+                self._remember(key, char)  # この描画で Qt のキャッシュに載る
+                misses += 1
+        self._display_hits += hits
+        self._display_misses += misses
+        metrics.increment("glyphs.hit", hits)
+        metrics.increment("glyphs.miss", misses)
+        total = self._display_hits + self._display_misses
+        if total:
+            metrics.set_gauge("glyphs.hit_rate", round(self._display_hits / total, 4))
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計"""
+        total = self._display_hits + self._display_misses
+        return {
+            "cached": len(self._warm),
+            "max_glyphs": self.max_glyphs,
+            "warmed": self._warmed,
+            "pending": len(self._pending),
+            "hits": self._display_hits,
+            "misses": self._display_misses,
+            "hit_rate": round(self._display_hits / total, 4) if total else None,
+            "tick_ms": self._tick_stats.summary(),
+        }
@@ -0,0 +1,332 @@
+# ui/lyrics_layer.py
+import math
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QTimer, QElapsedTimer, QRect, QRectF, QPointF
+from PyQt6.QtGui import (
+    QPainter, QPainterPath, QPixmap, QPen, QColor, QFont, QFontMetricsF, QGuiApplication
+)
+
+from config import Config
+from theme.fonts import FontSet
+from theme.theme import ThemeManager
+from player.lyrics import LyricsTimeline
+from utils.metrics import metrics
+
+
+class _LineLayout:
+    """1行分のレイアウト（歌唱前/歌唱後の2枚を事前描画したピクスマップ）"""
+
+    def __init__(self, unsung: QPixmap, sung: QPixmap, width: float, height: float,
+                 syllable_x: List[Tuple[float, float]], first_syllable: int):
+        self.unsung = unsung
+        self.sung = sung
+        self.width = width
+        self.height = height
+        self.syllable_x = syllable_x          # 音節ごとの (開始x, 終了x)
+        self.first_syllable = first_syllable  # 行の先頭音節インデックス
+
+
+class LyricsLayer(QWidget):
+    """歌詞テロップ描画レイヤー
+
+    各行は表示前に一度だけレイアウトしてピクスマップに描画しておき、
+    フレームごとにはワイプ位置（クリップ矩形）だけを更新する。
+    """
+
+    ROW_COUNT = 2
+    MAX_CACHED_LINES = 6
+
+    def __init__(self, config: Config, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.theme_manager = ThemeManager(config)
+
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+
+        self._timeline: Optional[LyricsTimeline] = None
+        self._layouts: "OrderedDict[int, _LineLayout]" = OrderedDict()
+        self._rows: List[int] = [-1] * self.ROW_COUNT      # 各段に表示中の行
+        self._wipe_x: List[float] = [0.0] * self.ROW_COUNT  # 各段のワイプ位置
+        self._position_ms = 0
+
+        # 再生位置の補間（positionChanged は毎フレームは来ない）
+        self._player = None
+        self._anchor_ms = 0
+        self._anchor_clock = QElapsedTimer()
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._frame_timer.setInterval(16)
+        self._frame_timer.timeout.connect(self._on_frame)
+
+        self._paint_stats = metrics.timing("lyrics.paint", budget_ms=4.0)
+        self.glyph_warmer = None  # GlyphWarmer（表示した文字のヒット率を記録）
+
+        self.refresh_settings()
+
+    # ==========================
+    # 設定
+    # ==========================
+    @staticmethod
+    def fonts(config: Config) -> Tuple[QFont, QFont]:
+        """歌詞の本文・ルビのフォント"""
+        font = FontSet.title()
+        font.setPointSize(config.get("lyrics.font_size", 48))
+        ruby_font = QFont(font)
+        ruby_font.setPointSize(config.get("lyrics.ruby_size", 20))
+        return font, ruby_font
+
+    def refresh_settings(self):
+        """フォント・色を再読み込み（レイアウトは作り直し）"""
+        self._font, self._ruby_font = self.fonts(self.config)
+        self._outline_width = self.config.get("lyrics.outline_width", 4)
+        self._lead_ms = self.config.get("lyrics.lead_ms", 3000)
+        self._sung_color = self.theme_manager.get_accent_color()
+        self._unsung_color = self.theme_manager.get_text_color()
+        self._outline_color = QColor(0, 0, 0)
+        self._layouts.clear()
+        self._rows = [-1] * self.ROW_COUNT
+        self.update()
+
+    # ==========================
+    # 歌詞・再生位置
+    # ==========================
+    def set_timeline(self, timeline: Optional[LyricsTimeline]):
+        """表示する歌詞を設定"""
+        self._timeline = timeline
+        self._layouts.clear()
+        self._rows = [-1] * self.ROW_COUNT
+        self._wipe_x = [0.0] * self.ROW_COUNT
+        if self._player is not None:
+            self._on_playback_state(self._player.playbackState())  # 歌詞がなければ毎フレームの更新は不要
+        self.update()
+
+    def attach_player(self, player):
+        """QMediaPlayer の再生位置に追従する"""
+        if self._player is not None:
+            self._player.positionChanged.disconnect(self.sync_position)
+            self._player.playbackStateChanged.disconnect(self._on_playback_state)
+        self._player = player
+        if player is None:
+            self._frame_timer.stop()
+            return
+        player.positionChanged.connect(self.sync_position)
+        player.playbackStateChanged.connect(self._on_playback_state)
+        self._on_playback_state(player.playbackState())
+
+    def sync_position(self, position_ms: int):
+        """プレイヤーの位置で補間の基準を更新"""
+        self._anchor_ms = position_ms
+        self._anchor_clock.restart()
+        self.set_position(position_ms)
+
+    def _on_playback_state(self, state):
+        from player import media_backend
+        if state == media_backend.get().PlaybackState.PlayingState and self._timeline is not None:
+            self._anchor_clock.restart()
+            self._frame_timer.start()
+        else:
+            self._frame_timer.stop()
+
+    def _on_frame(self):
+        rate = self._player.playbackRate() if self._player is not None else 1.0
+        self.set_position(self._anchor_ms + int(self._anchor_clock.elapsed() * rate))
+
+    def set_position(self, position_ms: int):
+        """再生位置を反映（変化した領域だけ再描画を要求）"""
+        self._position_ms = position_ms
+        timeline = self._timeline
+        if timeline is None or len(timeline) == 0:
+            return
+
+        rows = self._visible_lines(position_ms)
+        for row in range(self.ROW_COUNT):
+            line = rows[row]
+            if line != self._rows[row]:
+                old_rect = self._row_rect(row, self._rows[row])
+                self._rows[row] = line
+                self._wipe_x[row] = self._compute_wipe(line, position_ms)
+                self.update(old_rect.united(self._row_rect(row, line)))
+                continue
+            if line < 0:
+                continue
+            wipe = self._compute_wipe(line, position_ms)
+            old = self._wipe_x[row]
+            if wipe != old:
+                self._wipe_x[row] = wipe
+                rect = self._row_rect(row, line)
+                left = rect.x() + math.floor(min(old, wipe)) - 1
+                right = rect.x() + math.ceil(max(old, wipe)) + 1
+                self.update(QRect(left, rect.y(), right - left, rect.height()))
+
+    def _visible_lines(self, position_ms: int) -> List[int]:
+        """各段に表示する行を決める（行 i は i % 2 段目）"""
+        timeline = self._timeline
+        rows = [-1] * self.ROW_COUNT
+        current = timeline.find_line(position_ms)
+        if current < 0:
+            if position_ms < timeline.line_start[0] - self._lead_ms:
+                return rows
+            current = 0
+        for line in (current, current + 1):
+            if line >= len(timeline):
+                continue
+            if line > current and timeline.line_start[line] - position_ms > self._lead_ms \
+                    and position_ms < timeline.line_end[current]:
+                # 次の行は前の行を歌い終えるか、先行表示時間に入ってから出す
+                continue
+            if line == current and position_ms > timeline.line_end[line] + self._lead_ms:
+                continue
+            rows[line % self.ROW_COUNT] = line
+        return rows
+
+    def _compute_wipe(self, line: int, position_ms: int) -> float:
+        if line < 0:
+            return 0.0
+        timeline = self._timeline
+        if position_ms < timeline.line_start[line]:
+            return 0.0
+        layout = self._layout(line)
+        if position_ms >= timeline.line_end[line]:
+            return layout.width
+        syllable = timeline.find_syllable(position_ms, line)
+        if syllable < 0:
+            return 0.0
+        x_start, x_end = layout.syllable_x[syllable - layout.first_syllable]
+        start = timeline.syllable_start[syllable]
+        end = timeline.syllable_end[syllable]
+        if end <= start or position_ms >= end:
+            return x_end
+        return x_start + (x_end - x_start) * (position_ms - start) / (end - start)
+
+    # ==========================
+    # レイアウト（行ごとに一度だけ）
+    # ==========================
+    def _layout(self, line: int) -> _LineLayout:
+        layout = self._layouts.get(line)
+        if layout is not None:
+            self._layouts.move_to_end(line)
+            return layout
+        layout = self._build_layout(line)
+        self._layouts[line] = layout
+        while len(self._layouts) > self.MAX_CACHED_LINES:
+            self._layouts.popitem(last=False)
+        return layout
+
+    def _build_layout(self, line: int) -> _LineLayout:
+        timeline = self._timeline
+        text = timeline.line_text[line]
+        fm = QFontMetricsF(self._font)
+        rfm = QFontMetricsF(self._ruby_font)
+        margin = float(self._outline_width)
+        ruby_height = rfm.height()
+
+        width = math.ceil(fm.horizontalAdvance(text) + margin * 2)
+        height = math.ceil(ruby_height + fm.height() + margin * 2)
+        baseline = margin + ruby_height + fm.ascent()
+
+        # 音節ごとのx範囲
+        syllable_x = []
+        offset = 0
+        x = margin
+        for index in timeline.line_syllables(line):
+            offset += len(timeline.syllable_text[index])
+            x_end = margin + fm.horizontalAdvance(text[:offset])
+            syllable_x.append((x, x_end))
+            x = x_end
+
+        # 本文 + ルビのアウトライン
+        path = QPainterPath()
+        path.addText(QPointF(margin, baseline), self._font, text)
+        for index in timeline.line_ruby(line):
+            r_start = timeline.ruby_start[index]
+            r_end = timeline.ruby_end[index]
+            base_left = margin + fm.horizontalAdvance(text[:r_start])
+            base_right = margin + fm.horizontalAdvance(text[:r_end])
+            ruby = timeline.ruby_text[index]
+            ruby_x = (base_left + base_right - rfm.horizontalAdvance(ruby)) / 2
+            path.addText(QPointF(ruby_x, margin + rfm.ascent()), self._ruby_font, ruby)
+
+        if self.glyph_warmer is not None:
+            self.glyph_warmer.record_display(text, self._font)
+            ruby_texts = [timeline.ruby_text[index] for index in timeline.line_ruby(line)]
+            self.glyph_warmer.record_display("".join(ruby_texts), self._ruby_font)
+
+        first = timeline.line_syllables(line).start
+        return _LineLayout(
+            self._render_path(path, width, height, self._unsung_color),
+            self._render_path(path, width, height, self._sung_color),
+            width, height, syllable_x, first
+        )
+
+    def _render_path(self, path: QPainterPath, width: int, height: int, fill: QColor) -> QPixmap:
+        ratio = self.devicePixelRatioF() or QGuiApplication.primaryScreen().devicePixelRatio()
+        pixmap = QPixmap(math.ceil(width * ratio), math.ceil(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        pen = QPen(self._outline_color, self._outline_width * 2)
+        pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+        painter.strokePath(path, pen)
+        painter.fillPath(path, fill)
+        painter.end()
+        return pixmap
+
+    # ==========================
+    # 描画
+    # ==========================
+    def _row_rect(self, row: int, line: int) -> QRect:
+        """段に表示する行の矩形（1段目は左寄せ、2段目は右寄せ）"""
+        if line < 0 or self._timeline is None:
+            return QRect()
+        layout = self._layout(line)
+        side_margin = self.width() // 16
+        bottom_margin = self.height() // 12
+        row_height = math.ceil(layout.height)
+        y = self.height() - bottom_margin - row_height * (self.ROW_COUNT - row)
+        if row % 2 == 0:
+            x = side_margin
+        else:
+            x = self.width() - side_margin - math.ceil(layout.width)
+        return QRect(x, y, math.ceil(layout.width), row_height)
+
+    def paintEvent(self, event):
+        with self._paint_stats.measure():
+            painter = QPainter(self)
+            dirty = event.rect()
+            for row in range(self.ROW_COUNT):
+                line = self._rows[row]
+                if line < 0:
+                    continue
+                rect = self._row_rect(row, line)
+                if not rect.intersects(dirty):
+                    continue
+                layout = self._layout(line)
+                ratio = layout.sung.devicePixelRatio()
+                wipe = self._wipe_x[row]
+                if wipe > 0:
+                    painter.drawPixmap(
+                        QRectF(rect.x(), rect.y(), wipe, layout.height),
+                        layout.sung,
+                        QRectF(0, 0, wipe * ratio, layout.height * ratio)
+                    )
+                if wipe < layout.width:
+                    painter.drawPixmap(
+                        QRectF(rect.x() + wipe, rect.y(), layout.width - wipe, layout.height),
+                        layout.unsung,
+                        QRectF(wipe * ratio, 0, (layout.width - wipe) * ratio, layout.height * ratio)
+                    )
+            painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update()
+
+    def paint_stats(self) -> dict:
+        """描画時間の統計（ms）"""
+        return self._paint_stats.summary()
@@ -0,0 +1,158 @@
+# ui/perf_hud.py
+import time
+from typing import List
+
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QTimer, QRect
+from PyQt6.QtGui import QPainter, QColor, QFont, QFontMetrics
+
+from utils.metrics import metrics
+from utils.perf import FrameStats, ProcessSampler
+
+
+class PerfHud(QWidget):
+    """パフォーマンス HUD（F2 で表示切り替え）
+
+    映像フレームの FPS・欠落・遅延、イベントループの遅延、API リクエスト数、
+    CPU 使用率・常駐メモリを1秒ごとに表示する。非表示の間は計測も止める。
+    """
+
+    SAMPLE_MS = 1000
+    PROBE_MS = 50
+    MARGIN = 12
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+
+        self._sink = None
+        self._frames = FrameStats()
+        self._process = ProcessSampler()
+        self._loop_lag = metrics.timing("ui.event_loop_lag", budget_ms=16.0)
+        self._lines: List[str] = []
+        self._last_frames = 0
+        self._last_requests = 0
+        self._last_sample = time.monotonic()
+
+        self._font = QFont("monospace")
+        self._font.setStyleHint(QFont.StyleHint.Monospace)
+        self._font.setPointSize(11)
+
+        # イベントループの遅延計測（期待した間隔からのずれ）
+        self._probe_timer = QTimer(self)
+        self._probe_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._probe_timer.setInterval(self.PROBE_MS)
+        self._probe_timer.timeout.connect(self._on_probe)
+        self._last_probe = 0.0
+
+        self._sample_timer = QTimer(self)
+        self._sample_timer.setInterval(self.SAMPLE_MS)
+        self._sample_timer.timeout.connect(self._sample)
+
+        self.hide()
+
+    # ==========================
+    # 計測対象
+    # ==========================
+    def attach_video_sink(self, sink):
+        """計測する QVideoSink を設定（動画ウィジェットの videoSink()）"""
+        if self._sink is not None and self.isVisible():
+            self._sink.videoFrameChanged.disconnect(self._on_frame)
+        self._sink = sink
+        self._frames.reset()
+        self._last_frames = 0
+        if sink is not None and self.isVisible():
+            sink.videoFrameChanged.connect(self._on_frame)
+
+    def toggle(self):
+        """表示・非表示を切り替え"""
+        self.setVisible(not self.isVisible())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.raise_()
+        if self._sink is not None:
+            self._sink.videoFrameChanged.connect(self._on_frame)
+        self._last_probe = time.perf_counter()
+        self._last_sample = time.monotonic()
+        self._last_requests = self._request_count()
+        self._process.sample()
+        self._probe_timer.start()
+        self._sample_timer.start()
+        self._sample()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._probe_timer.stop()
+        self._sample_timer.stop()
+        if self._sink is not None:
+            try:
+                self._sink.videoFrameChanged.disconnect(self._on_frame)
+            except TypeError:
+                pass
+
+    # ==========================
+    # 計測
+    # ==========================
+    def _on_frame(self, frame):
+        self._frames.on_frame(frame.startTime(), frame.endTime())
+
+    def _on_probe(self):
+        now = time.perf_counter()
+        lag = (now - self._last_probe) * 1000.0 - self.PROBE_MS
+        self._last_probe = now
+        self._loop_lag.record(max(0.0, lag))
+
+    @staticmethod
+    def _request_count() -> int:
+        # 別プロセスモードでは APIサーバーのプロセスから1秒ごとにまとめて届く（server.ipc）
+        return metrics.counter("api.requests")
+
+    def _sample(self):
+        now = time.monotonic()
+        elapsed = max(now - self._last_sample, 1e-6)
+        self._last_sample = now
+
+        fps = (self._frames.frames - self._last_frames) / elapsed
+        self._last_frames = self._frames.frames
+        requests = self._request_count()
+        request_rate = (requests - self._last_requests) / elapsed
+        self._last_requests = requests
+        lag = self._loop_lag.summary()
+        process = self._process.sample()
+        rss = process["rss_bytes"]
+
+        self._lines = [
+            f"FPS      {fps:5.1f}" if self._sink is not None else "FPS         -",
+            f"dropped  {self._frames.dropped:5d}   late {self._frames.late:5d}",
+            f"loop lag avg {lag['avg_ms']:.1f} / p95 {lag['p95_ms']:.1f} / max {lag['max_ms']:.1f} ms",
+            f"API      {request_rate:5.1f} req/s",
+            f"CPU      {process['cpu_percent']:5.1f} %   RSS "
+            + (f"{rss / 1024 / 1024:.0f} MB" if rss is not None else "-"),
+        ]
+        metrics.set_gauge("ui.fps", round(fps, 1))
+        metrics.set_gauge("ui.frames_dropped", self._frames.dropped)
+        metrics.set_gauge("ui.frames_late", self._frames.late)
+        self._resize_to_content()
+        self.update()
+
+    # ==========================
+    # 描画
+    # ==========================
+    def _resize_to_content(self):
+        fm = QFontMetrics(self._font)
+        width = max((fm.horizontalAdvance(line) for line in self._lines), default=0)
+        height = fm.height() * len(self._lines)
+        self.setGeometry(self.MARGIN, self.MARGIN, width + self.MARGIN * 2, height + self.MARGIN * 2)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 170))
+        painter.setFont(self._font)
+        painter.setPen(QColor(0, 255, 128))
+        fm = QFontMetrics(self._font)
+        for i, line in enumerate(self._lines):
+            rect = QRect(self.MARGIN, self.MARGIN + i * fm.height(), self.width(), fm.height())
+            painter.drawText(rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, line)
+        painter.end()
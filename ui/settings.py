@@ -1,19 +1,73 @@
 # ui/settings.py
 
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Optional, Tuple
+
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QSpinBox, QCheckBox, QFontComboBox, QColorDialog, QGroupBox,
+    QSpinBox, QCheckBox, QComboBox, QColorDialog, QGroupBox,
     QFormLayout, QMessageBox, QTabWidget, QWidget, QLineEdit
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QColor, QPalette
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
+from PyQt6.QtGui import QColor, QPalette, QFontDatabase
 from config import Config
 from theme.theme import ThemeManager
 
+
+class FontFamilies(QObject):
+    """システムのフォントファミリー一覧（初回だけバックグラウンドで列挙してキャッシュ）
+
+    CJK フォントが多い環境では列挙に時間がかかるため、QFontComboBox のように
+    ダイアログの生成時に列挙せず、起動後の空き時間に別スレッドで一度だけ列挙する。
+    """
+
+    ready = pyqtSignal(list)  # 列挙が終わった（ファミリー名の一覧）
+
+    _instance: Optional["FontFamilies"] = None
+
+    @classmethod
+    def instance(cls) -> "FontFamilies":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        super().__init__()
+        self._families: Optional[List[str]] = None
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def families(self) -> Optional[List[str]]:
+        """キャッシュ済みの一覧（まだ列挙中なら None）"""
+        return self._families
+
+    def load(self):
+        """列挙を開始（済んでいるか列挙中なら何もしない）"""
+        with self._lock:
+            if self._families is not None or self._thread is not None:
+                return
+            self._thread = Thread(target=self._run, name="font-families", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            families = sorted(set(QFontDatabase.families()))
+        except Exception as e:
+            print(f"フォント一覧の取得エラー: {e}")
+            families = []
+        self._families = families
+        self.ready.emit(families)
+
+
 class SettingsDialog(QDialog):
-    """設定ダイアログ"""
+    """設定ダイアログ
+
+    タブの中身は最初に表示したときに作る（開いた直後に作るのは最初のタブだけ）。
+    作っていないタブの設定は、適用時に元の値のまま保存する。
+    ダイアログは使い回せるよう、reload() で表示前に設定を読み直す。
+    """
     
-    settings_changed = pyqtSignal()  # 設定変更時に発火
+    settings_changed = pyqtSignal(object)  # 設定変更時に発火（ChangeSet: 変更のあった項目）
     
     def __init__(self, config: Config, parent=None):
         super().__init__(parent)
@@ -27,6 +81,15 @@ class SettingsDialog(QDialog):
             # 一時的な設定（適用ボタンで保存）
             self._temp_config = config.get_all()
             
+            # タブ: (タイトル, 作成, 読み込み, 一時設定への反映)
+            self._tab_specs: List[Tuple[str, Callable[[], QWidget], Callable[[], None], Callable[[], None]]] = [
+                ("フォント", self._create_font_tab, self._load_font_tab, self._collect_font_tab),
+                ("テーマ", self._create_theme_tab, self._load_theme_tab, self._collect_theme_tab),
+                ("サーバー", self._create_server_tab, self._load_server_tab, self._collect_server_tab),
+                ("デバッグ", self._create_debug_tab, self._load_debug_tab, self._collect_debug_tab),
+            ]
+            self._built: Dict[int, bool] = {}
+            
             self._init_ui()
             self._load_settings()
         except Exception as e:
@@ -42,50 +105,16 @@ class SettingsDialog(QDialog):
         try:
             layout = QVBoxLayout(self)
             
-            # タブウィジェット
-            tabs = QTabWidget()
+            # タブウィジェット（中身は最初に表示したときに作る）
+            self.tabs = QTabWidget()
+            for title, _create, _load, _collect in self._tab_specs:
+                page = QWidget()
+                QVBoxLayout(page).setContentsMargins(0, 0, 0, 0)
+                self.tabs.addTab(page, title)
+            self.tabs.currentChanged.connect(self._ensure_tab)
+            self._ensure_tab(self.tabs.currentIndex())
             
-            # フォントタブ
-            try:
-                font_tab = self._create_font_tab()
-                tabs.addTab(font_tab, "フォント")
-            except Exception as e:
-                import traceback
-                print(f"フォントタブの作成エラー: {e}")
-                if self.config.get("debug.show_traceback", True):
-                    traceback.print_exc()
-            
-            # テーマタブ
-            try:
-                theme_tab = self._create_theme_tab()
-                tabs.addTab(theme_tab, "テーマ")
-            except Exception as e:
-                import traceback
-                print(f"テーマタブの作成エラー: {e}")
-                if self.config.get("debug.show_traceback", True):
-                    traceback.print_exc()
-            
-            # サーバータブ
-            try:
-                server_tab = self._create_server_tab()
-                tabs.addTab(server_tab, "サーバー")
-            except Exception as e:
-                import traceback
-                print(f"サーバータブの作成エラー: {e}")
-                if self.config.get("debug.show_traceback", True):
-                    traceback.print_exc()
-            
-            # デバッグタブ
-            try:
-                debug_tab = self._create_debug_tab()
-                tabs.addTab(debug_tab, "デバッグ")
-            except Exception as e:
-                import traceback
-                print(f"デバッグタブの作成エラー: {e}")
-                if self.config.get("debug.show_traceback", True):
-                    traceback.print_exc()
-            
-            layout.addWidget(tabs)
+            layout.addWidget(self.tabs)
             
             # ボタン
             button_layout = QHBoxLayout()
@@ -117,6 +146,25 @@ class SettingsDialog(QDialog):
             print(error_msg)
             raise
     
+    def _ensure_tab(self, index: int):
+        """タブの中身を作って設定を読み込む（作成済みなら何もしない）"""
+        if index < 0 or self._built.get(index):
+            return
+        title, create, load, _collect = self._tab_specs[index]
+        self._built[index] = True
+        try:
+            self.tabs.widget(index).layout().addWidget(create())
+            load()
+        except Exception as e:
+            import traceback
+            print(f"{title}タブの作成エラー: {e}")
+            if self.config.get("debug.show_traceback", True):
+                traceback.print_exc()
+    
+    def reload(self):
+        """表示前に現在の設定を読み直す（ダイアログを使い回すとき）"""
+        self._load_settings()
+    
     def _create_font_tab(self) -> QWidget:
         """フォント設定タブを作成"""
         widget = QWidget()
@@ -126,7 +174,17 @@ class SettingsDialog(QDialog):
         font_group = QGroupBox("フォントファミリー")
         font_layout = QVBoxLayout()
         
-        self.font_combo = QFontComboBox()
+        # 一覧はキャッシュから（列挙中なら終わり次第入れる）。それまでは現在の設定だけを表示
+        self.font_combo = QComboBox()
+        self.font_combo.setEditable(True)
+        self.font_combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.font_combo.setMaxVisibleItems(20)
+        font_families = FontFamilies.instance()
+        font_families.ready.connect(self._set_font_families)
+        if font_families.families() is not None:
+            self._set_font_families(font_families.families())
+        else:
+            font_families.load()
         font_layout.addWidget(QLabel("フォント:"))
         font_layout.addWidget(self.font_combo)
         font_group.setLayout(font_layout)
@@ -289,6 +347,15 @@ class SettingsDialog(QDialog):
         layout.addStretch()
         return widget
     
+    def _set_font_families(self, families: List[str]):
+        """フォントファミリーの一覧をコンボボックスに入れる（入力中の値は保つ）"""
+        current = self.font_combo.currentText()
+        self.font_combo.blockSignals(True)
+        self.font_combo.clear()
+        self.font_combo.addItems(families)
+        self.font_combo.blockSignals(False)
+        self.font_combo.setCurrentText(current)
+    
     def _pick_color(self, color_key: str, button: QPushButton):
         """色選択ダイアログを表示"""
         current_rgb = self._temp_config["theme"][color_key]
@@ -305,59 +372,13 @@ class SettingsDialog(QDialog):
         button.setStyleSheet(f"background-color: rgb({color.red()}, {color.green()}, {color.blue()});")
     
     def _load_settings(self):
-        """設定を読み込んでUIに反映"""
+        """設定を読み込んでUIに反映（作成済みのタブだけ）"""
         try:
-            # フォント設定
-            font_family = self.config.get("font.family", "")
-            if font_family:
-                index = self.font_combo.findText(font_family)
-                if index >= 0:
-                    self.font_combo.setCurrentIndex(index)
-            
-            self.title_size.setValue(self.config.get("font.title_size", 36))
-            self.normal_size.setValue(self.config.get("font.normal_size", 20))
-            self.small_size.setValue(self.config.get("font.small_size", 14))
-            
-            self.title_bold.setChecked(self.config.get("font.title_bold", True))
-            self.normal_bold.setChecked(self.config.get("font.normal_bold", False))
-            self.small_bold.setChecked(self.config.get("font.small_bold", False))
-            
-            # テーマ設定
-            bg_rgb = self.config.get("theme.background_color", [10, 10, 30])
-            bg_color = QColor(bg_rgb[0], bg_rgb[1], bg_rgb[2])
-            self._update_color_button(self.bg_color_btn, bg_color)
-            
-            text_rgb = self.config.get("theme.text_color", [255, 255, 255])
-            text_color = QColor(text_rgb[0], text_rgb[1], text_rgb[2])
-            self._update_color_button(self.text_color_btn, text_color)
-            
-            accent_rgb = self.config.get("theme.accent_color", [0, 255, 204])
-            accent_color = QColor(accent_rgb[0], accent_rgb[1], accent_rgb[2])
-            self._update_color_button(self.accent_color_btn, accent_color)
-            
-            splash_bg_rgb = self.config.get("theme.splash_bg_color", [0, 0, 0])
-            splash_bg_color = QColor(splash_bg_rgb[0], splash_bg_rgb[1], splash_bg_rgb[2])
-            self._update_color_button(self.splash_bg_color_btn, splash_bg_color)
-            
-            # 表示設定
-            if hasattr(self, 'fullscreen_check'):
-                self.fullscreen_check.setChecked(self.config.get("display.fullscreen", False))
-            
-            # サーバー設定
-            if hasattr(self, 'server_enabled'):
-                self.server_enabled.setChecked(self.config.get("server.enabled", True))
-                self.server_port.setValue(self.config.get("server.port", 8080))
-                self.server_host.setText(self.config.get("server.host", "0.0.0.0"))
-            
-            # デバッグ設定
-            if hasattr(self, 'debug_enabled'):
-                self.debug_enabled.setChecked(self.config.get("debug.enabled", False))
-                self.show_traceback.setChecked(self.config.get("debug.show_traceback", True))
-                self.log_to_file.setChecked(self.config.get("debug.log_to_file", False))
-                self.log_file.setText(self.config.get("debug.log_file", "pykara_debug.log"))
-            
             # 一時設定も更新
             self._temp_config = self.config.get_all()
+            for index, (_title, _create, load, _collect) in enumerate(self._tab_specs):
+                if self._built.get(index):
+                    load()
         except Exception as e:
             import traceback
             error_msg = f"設定の読み込みに失敗しました:\n{str(e)}"
@@ -370,9 +391,54 @@ class SettingsDialog(QDialog):
                 pass
             raise
     
-    def _apply_settings(self):
-        """設定を適用"""
-        # フォント設定を一時設定に反映
+    def _load_font_tab(self):
+        """フォント設定を読み込む"""
+        self.font_combo.setCurrentText(self.config.get("font.family", ""))
+        
+        self.title_size.setValue(self.config.get("font.title_size", 36))
+        self.normal_size.setValue(self.config.get("font.normal_size", 20))
+        self.small_size.setValue(self.config.get("font.small_size", 14))
+        
+        self.title_bold.setChecked(self.config.get("font.title_bold", True))
+        self.normal_bold.setChecked(self.config.get("font.normal_bold", False))
+        self.small_bold.setChecked(self.config.get("font.small_bold", False))
+    
+    def _load_theme_tab(self):
+        """テーマ設定を読み込む"""
+        bg_rgb = self.config.get("theme.background_color", [10, 10, 30])
+        bg_color = QColor(bg_rgb[0], bg_rgb[1], bg_rgb[2])
+        self._update_color_button(self.bg_color_btn, bg_color)
+        
+        text_rgb = self.config.get("theme.text_color", [255, 255, 255])
+        text_color = QColor(text_rgb[0], text_rgb[1], text_rgb[2])
+        self._update_color_button(self.text_color_btn, text_color)
+        
+        accent_rgb = self.config.get("theme.accent_color", [0, 255, 204])
+        accent_color = QColor(accent_rgb[0], accent_rgb[1], accent_rgb[2])
+        self._update_color_button(self.accent_color_btn, accent_color)
+        
+        splash_bg_rgb = self.config.get("theme.splash_bg_color", [0, 0, 0])
+        splash_bg_color = QColor(splash_bg_rgb[0], splash_bg_rgb[1], splash_bg_rgb[2])
+        self._update_color_button(self.splash_bg_color_btn, splash_bg_color)
+        
+        # 表示設定
+        self.fullscreen_check.setChecked(self.config.get("display.fullscreen", False))
+    
+    def _load_server_tab(self):
+        """サーバー設定を読み込む"""
+        self.server_enabled.setChecked(self.config.get("server.enabled", True))
+        self.server_port.setValue(self.config.get("server.port", 8080))
+        self.server_host.setText(self.config.get("server.host", "0.0.0.0"))
+    
+    def _load_debug_tab(self):
+        """デバッグ設定を読み込む"""
+        self.debug_enabled.setChecked(self.config.get("debug.enabled", False))
+        self.show_traceback.setChecked(self.config.get("debug.show_traceback", True))
+        self.log_to_file.setChecked(self.config.get("debug.log_to_file", False))
+        self.log_file.setText(self.config.get("debug.log_file", "pykara_debug.log"))
+    
+    def _collect_font_tab(self):
+        """フォント設定を一時設定に反映"""
         self._temp_config["font"]["family"] = self.font_combo.currentText()
         self._temp_config["font"]["title_size"] = self.title_size.value()
         self._temp_config["font"]["normal_size"] = self.normal_size.value()
@@ -380,33 +446,43 @@ class SettingsDialog(QDialog):
         self._temp_config["font"]["title_bold"] = self.title_bold.isChecked()
         self._temp_config["font"]["normal_bold"] = self.normal_bold.isChecked()
         self._temp_config["font"]["small_bold"] = self.small_bold.isChecked()
-        
-        # 表示設定を一時設定に反映
+    
+    def _collect_theme_tab(self):
+        """表示設定を一時設定に反映（色は選択時に反映済み）"""
         if "display" not in self._temp_config:
             self._temp_config["display"] = {}
         self._temp_config["display"]["fullscreen"] = self.fullscreen_check.isChecked()
-        
-        # サーバー設定を一時設定に反映
+    
+    def _collect_server_tab(self):
+        """サーバー設定を一時設定に反映"""
         if "server" not in self._temp_config:
             self._temp_config["server"] = {}
         self._temp_config["server"]["enabled"] = self.server_enabled.isChecked()
         self._temp_config["server"]["port"] = self.server_port.value()
         self._temp_config["server"]["host"] = self.server_host.text()
-        
-        # デバッグ設定を一時設定に反映
+    
+    def _collect_debug_tab(self):
+        """デバッグ設定を一時設定に反映"""
         if "debug" not in self._temp_config:
             self._temp_config["debug"] = {}
         self._temp_config["debug"]["enabled"] = self.debug_enabled.isChecked()
         self._temp_config["debug"]["show_traceback"] = self.show_traceback.isChecked()
         self._temp_config["debug"]["log_to_file"] = self.log_to_file.isChecked()
         self._temp_config["debug"]["log_file"] = self.log_file.text()
+    
+    def _apply_settings(self):
+        """設定を適用（作成していないタブの設定は元の値のまま）"""
+        for index, (_title, _create, _load, collect) in enumerate(self._tab_specs):
+            if self._built.get(index):
+                collect()
         
-        # 設定を保存
-        self.config._config = self._temp_config.copy()
-        self.config.save()
+        # 設定を保存（変更のあった項目だけを通知）
+        changes = self.config.apply(self._temp_config)
+        self._temp_config = self.config.get_all()
         
         # 変更通知
-        self.settings_changed.emit()
+        if changes:
+            self.settings_changed.emit(changes)
         
         QMessageBox.information(self, "設定", "設定を適用しました。")
     
@@ -423,6 +499,8 @@ class SettingsDialog(QDialog):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            self.config.reset_to_default()
+            changes = self.config.reset_to_default()
             self._load_settings()
+            if changes:
+                self.settings_changed.emit(changes)
             QMessageBox.information(self, "設定", "デフォルト設定に戻しました。")
@@ -0,0 +1,43 @@
+# utils/bandwidth.py
+import time
+from threading import Event, Lock
+from typing import Optional
+
+from config import Config
+
+
+class BandwidthLimiter:
+    """ライブラリ（NAS）からの読み込み帯域の上限（スレッド間で共有）
+
+    読み込んだバイト数ごとに次に読んでよい時刻を進め、それまで待たせる。
+    先読み（MediaPrefetcher）とローカルキャッシュへのコピー（MediaCache）が
+    同じインスタンスを使い、合計で prefetch.bandwidth_mb_s を超えないようにする
+    （再生中の曲の読み込みに帯域を残す）。
+    """
+
+    _shared: Optional["BandwidthLimiter"] = None
+    _shared_lock = Lock()
+
+    def __init__(self, bytes_per_s: float):
+        self.bytes_per_s = max(1.0, float(bytes_per_s))
+        self._lock = Lock()
+        self._next = 0.0
+
+    @classmethod
+    def shared(cls, config: Config) -> "BandwidthLimiter":
+        """プロセス共通のインスタンス（最初の呼び出しの設定で作る）"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(config.get("prefetch.bandwidth_mb_s", 30) * 1024 * 1024)
+            return cls._shared
+
+    def throttle(self, nbytes: int, stop: Optional[Event] = None):
+        """nbytes を読んだあとに呼び、上限を超えないだけ待つ（stop が立てばすぐ戻る）"""
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(now, self._next) + nbytes / self.bytes_per_s
+            delay = self._next - now
+        if stop is not None:
+            stop.wait(delay)
+        else:
+            time.sleep(delay)
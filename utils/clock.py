@@ -0,0 +1,185 @@
+# utils/clock.py
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from PyQt6 import QtCore, sip
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+# 仮想時計（ヘッドレスモードで install() されるまでは実時間）
+_virtual: Optional["VirtualClock"] = None
+
+
+def monotonic() -> float:
+    """単調増加の時刻（秒）"""
+    return _virtual.monotonic() if _virtual is not None else time.monotonic()
+
+
+def now() -> datetime:
+    """現在時刻"""
+    return _virtual.now() if _virtual is not None else datetime.now()
+
+
+def installed() -> Optional["VirtualClock"]:
+    """インストール済みの仮想時計（実時間なら None）"""
+    return _virtual
+
+
+def install(clock: "VirtualClock"):
+    """仮想時計に切り替え、QTimer を仮想タイマーに差し替える
+
+    `from PyQt6.QtCore import QTimer` より前（アプリのモジュールを
+    import する前）に呼ぶこと。
+    """
+    global _virtual
+    _virtual = clock
+    VirtualTimer._clock = clock
+    QtCore.QTimer = VirtualTimer
+
+
+class VirtualClock:
+    """タイマーを早送りする仮想時計
+
+    次に期限が来るタイマーの時刻まで時計を進めて発火させ、その間に
+    Qt のイベントを処理する。実時間を待たないので、一晩分の状態遷移を
+    数秒でシミュレーションできる。
+    """
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._start = start or datetime.now()
+        self._elapsed_ms = 0.0
+        self._heap: List[list] = []
+        self._seq = itertools.count()
+        self.fired = 0
+
+    def monotonic(self) -> float:
+        return self._elapsed_ms / 1000.0
+
+    def now(self) -> datetime:
+        return self._start + timedelta(milliseconds=self._elapsed_ms)
+
+    def schedule(self, delay_ms: float, callback: Callable[[], Any]) -> list:
+        """delay_ms 後に callback を呼ぶ（戻り値は cancel() 用のハンドル）"""
+        entry = [self._elapsed_ms + max(0.0, delay_ms), next(self._seq), callback, True]
+        heapq.heappush(self._heap, entry)
+        return entry
+
+    @staticmethod
+    def cancel(entry: list):
+        entry[3] = False
+
+    def _next_entry(self) -> Optional[list]:
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def run(self, app, duration_s: float,
+            stop_when: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """duration_s 秒分（仮想時間）タイマーを発火させる"""
+        started = time.perf_counter()
+        start_ms = self._elapsed_ms
+        end_ms = self._elapsed_ms + duration_s * 1000.0
+        fired_before = self.fired
+        while True:
+            app.processEvents()
+            if stop_when is not None and stop_when():
+                break
+            entry = self._next_entry()
+            if entry is None or entry[0] > end_ms:
+                self._elapsed_ms = end_ms
+                break
+            heapq.heappop(self._heap)
+            self._elapsed_ms = max(self._elapsed_ms, entry[0])
+            self.fired += 1
+            try:
+                entry[2]()
+            except RuntimeError:
+                pass  # 削除済みの Qt オブジェクト宛てのタイマー
+        app.processEvents()
+        real_s = time.perf_counter() - started
+        virtual_s = (self._elapsed_ms - start_ms) / 1000.0
+        return {
+            "virtual_s": round(virtual_s, 1),
+            "real_s": round(real_s, 2),
+            "speedup": round(virtual_s / real_s, 1) if real_s > 0 else None,
+            "timers_fired": self.fired - fired_before,
+        }
+
+
+class VirtualTimer(QObject):
+    """QTimer 互換の仮想タイマー（VirtualClock で発火する）"""
+
+    timeout = pyqtSignal()
+    _clock: Optional[VirtualClock] = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._interval = 0
+        self._single_shot = False
+        self._timer_type = Qt.TimerType.CoarseTimer
+        self._entry: Optional[list] = None
+
+    def setInterval(self, msec: int):
+        self._interval = int(msec)
+        if self._entry is not None:
+            self.start()
+
+    def interval(self) -> int:
+        return self._interval
+
+    def setSingleShot(self, single_shot: bool):
+        self._single_shot = single_shot
+
+    def isSingleShot(self) -> bool:
+        return self._single_shot
+
+    def setTimerType(self, timer_type):
+        self._timer_type = timer_type
+
+    def timerType(self):
+        return self._timer_type
+
+    def start(self, msec: Optional[int] = None):
+        if msec is not None:
+            self._interval = int(msec)
+        self.stop()
+        self._entry = self._clock.schedule(self._interval, self._fire)
+
+    def stop(self):
+        if self._entry is not None:
+            VirtualClock.cancel(self._entry)
+            self._entry = None
+
+    def isActive(self) -> bool:
+        return self._entry is not None
+
+    def remainingTime(self) -> int:
+        if self._entry is None:
+            return -1
+        return max(0, int(self._entry[0] - self._clock.monotonic() * 1000.0))
+
+    def _fire(self):
+        if sip.isdeleted(self):
+            return
+        if self._single_shot:
+            self._entry = None
+        else:
+            # 0ms の繰り返しタイマーで時計が止まらないよう最低 1ms 進める
+            self._entry = self._clock.schedule(max(self._interval, 1), self._fire)
+        self.timeout.emit()
+
+    @staticmethod
+    def singleShot(msec: int, *args):
+        """QTimer.singleShot(msec, callback) / singleShot(msec, context, callback)"""
+        context = args[0] if len(args) == 2 else None
+        target = args[-1]
+        callback = target.emit if hasattr(target, "emit") else target
+
+        def fire():
+            if context is not None and sip.isdeleted(context):
+                return
+            callback()
+
+        VirtualTimer._clock.schedule(msec, fire)
@@ -0,0 +1,164 @@
+# utils/headless.py
+import argparse
+import os
+import random
+import sys
+import tempfile
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+
+def prepare_headless():
+    """ヘッドレスモードの準備（Qt・再生関連のモジュールを import する前に呼ぶ）
+
+    オフスクリーン描画、擬似再生バックエンド、仮想時計に切り替える。
+    """
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from player import media_backend
+    from utils import clock
+    media_backend.use("fake")
+    clock.install(clock.VirtualClock())
+
+
+class HeadlessSimulation:
+    """ヘッドレスモードのシミュレーション
+
+    擬似ライブラリ（空のファイル）を一時ディレクトリに作り、仮想時計で
+    起動（黒画面 → OP → アトラクト）から予約・演奏までを早送りで実行して、
+    状態遷移の回数や曲間の切り替え時間を集計する。
+
+    python main.py --headless [--hours 8] [--reserve-every 420] [--seed 1]
+    """
+
+    VIDEO_SECONDS = (60, 120)
+    SHOP_SECONDS = (15, 30)
+    SONG_SECONDS = (180, 300)
+
+    def __init__(self, config: Config, argv: Optional[List[str]] = None):
+        parser = argparse.ArgumentParser(description="PyKara ヘッドレスモード")
+        parser.add_argument("--headless", action="store_true")
+        parser.add_argument("--hours", type=float, default=8.0, help="シミュレーションする時間（仮想時間）")
+        parser.add_argument("--reserve-every", type=float, default=420.0,
+                            help="予約の平均間隔（秒、仮想時間）")
+        parser.add_argument("--videos", type=int, default=8, help="擬似アトラクト動画の本数")
+        parser.add_argument("--songs", type=int, default=40, help="擬似曲ファイルの数")
+        parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+        self.args, _unknown = parser.parse_known_args(argv if argv is not None else sys.argv[1:])
+
+        self.config = config
+        self.rng = random.Random(self.args.seed)
+        self.root = tempfile.mkdtemp(prefix="pykara-headless-")
+        self.songs: List[str] = []
+        self.selection_manager = None
+        self.controller = None
+        self.states: Counter = Counter()
+        self.attract_videos = 0
+        self.reservations = 0
+        self.transitions: List[float] = []
+
+    # ==========================
+    # 準備
+    # ==========================
+    def configure(self):
+        """擬似ライブラリを作り、設定をヘッドレス用に上書き（ファイルには保存しない）"""
+        videos_dir = os.path.join(self.root, "videos")
+        shop_dir = os.path.join(videos_dir, "shop")
+        songs_dir = os.path.join(self.root, "songs")
+        for path in (shop_dir, songs_dir):
+            os.makedirs(path, exist_ok=True)
+
+        names = [os.path.join(videos_dir, f"attract_{i:02d}.mp4") for i in range(self.args.videos)]
+        names += [os.path.join(shop_dir, name) for name in ("op.mp4", "shop_01.mp4", "shop_02.mp4")]
+        self.songs = [os.path.join(songs_dir, f"song_{i:03d}.mp4") for i in range(self.args.songs)]
+        for path in names + self.songs:
+            open(path, 'wb').close()
+
+        overrides = {
+            "attract_video.mode": "local",
+            "attract_video.local_dir": videos_dir,
+            "attract_video.state_path": os.path.join(self.root, "attract_state.json"),
+            "songs.local_dir": songs_dir,
+            "history.dir": os.path.join(self.root, "history"),
+            "media_cache.enabled": False,
+            "metadata.enabled": False,
+            "prefetch.enabled": False,
+            "loudness.enabled": False,
+            "server.enabled": False,
+            "watchdog.enabled": False,  # 仮想時計では実時間の心拍が取れない
+        }
+        for key, value in overrides.items():
+            self.config.set(key, value)
+
+        from player import fake_media
+        fake_media.set_duration_provider(self._duration_ms)
+
+    def _duration_ms(self, path: str) -> int:
+        """ファイル名から決まる擬似的な長さ（実行ごとに同じ）"""
+        if path.startswith(os.path.join(self.root, "songs")):
+            low, high = self.SONG_SECONDS
+        elif os.sep + "shop" + os.sep in path:
+            low, high = self.SHOP_SECONDS
+        else:
+            low, high = self.VIDEO_SECONDS
+        seed = zlib.crc32(os.path.basename(path).encode("utf-8"))
+        return (low + seed % (high - low + 1)) * 1000
+
+    # ==========================
+    # 実行
+    # ==========================
+    def attach(self, selection_manager, controller, attract):
+        """アトラクト表示後に呼ぶ（予約の投入と集計を開始）"""
+        self.selection_manager = selection_manager
+        self.controller = controller
+        controller.state_changed.connect(lambda state: self.states.update([state]))
+        controller.transition_measured.connect(self.transitions.append)
+        if getattr(attract, "player", None) is not None:
+            from player import media_backend
+            end = media_backend.get().MediaStatus.EndOfMedia
+            attract.player.mediaStatusChanged.connect(
+                lambda status: self._count_attract(status == end))
+        self._schedule_reservation()
+
+    def _count_attract(self, ended: bool):
+        if ended:
+            self.attract_videos += 1
+
+    def _schedule_reservation(self):
+        from PyQt6.QtCore import QTimer
+        delay_s = self.rng.expovariate(1.0 / self.args.reserve_every)
+        QTimer.singleShot(int(delay_s * 1000), self._reserve)
+
+    def _reserve(self):
+        path = self.rng.choice(self.songs)
+        title = os.path.splitext(os.path.basename(path))[0]
+        self.selection_manager.set_selection(title, "", {"path": path})
+        self.reservations += 1
+        self._schedule_reservation()
+
+    def run(self, app) -> int:
+        """仮想時計で --hours 分を実行して結果を表示"""
+        from utils import clock
+        from utils.metrics import metrics
+        result = clock.installed().run(app, self.args.hours * 3600.0)
+        report = self.report(result, metrics.snapshot())
+        for line in report:
+            print(line)
+        return 0
+
+    def report(self, result: Dict[str, Any], snapshot: Dict[str, Any]) -> List[str]:
+        transition = snapshot["timings"].get("playback.transition", {})
+        queue_left = len(self.selection_manager.get_queue()) if self.selection_manager else 0
+        return [
+            "=== ヘッドレス実行結果 ===",
+            f"仮想時間: {result['virtual_s'] / 3600:.2f} 時間 / 実時間: {result['real_s']} 秒"
+            f"（{result['speedup']} 倍速、タイマー {result['timers_fired']} 回）",
+            f"予約: {self.reservations} 件 / 演奏開始: {self.states.get('intro', 0)} 曲"
+            f" / 未演奏の予約: {queue_left} 件",
+            f"アトラクト動画: {self.attract_videos} 本",
+            "状態遷移: " + ", ".join(f"{state}={count}" for state, count in sorted(self.states.items())),
+            f"曲間の切り替え: {transition.get('count', 0)} 回"
+            f" / 平均 {transition.get('avg_ms', 0.0)} ms / 最大 {transition.get('max_ms', 0.0)} ms",
+        ]
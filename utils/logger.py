@@ -5,6 +5,15 @@ from pathlib import Path
 from datetime import datetime
 from config import Config
 
+
+def warn(logger, message: str):
+    """警告を出力（logger がなければ標準出力へ）"""
+    if logger:
+        logger.warning(message)
+    else:
+        print(f"[WARNING] {message}")
+
+
 class DebugLogger:
     """デバッグロガー"""
     
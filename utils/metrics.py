@@ -0,0 +1,127 @@
+# utils/metrics.py
+import time
+from collections import deque
+from threading import Lock
+from typing import Dict, Any
+
+
+class TimingStats:
+    """処理時間の統計（直近N件のリングバッファ、スレッドセーフ）"""
+
+    def __init__(self, name: str, budget_ms: float = 0.0, window: int = 600):
+        self.name = name
+        self.budget_ms = budget_ms
+        self._lock = Lock()
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._over_budget = 0
+        self._max_ms = 0.0
+
+    def record(self, elapsed_ms: float):
+        """計測値を記録"""
+        with self._lock:
+            self._samples.append(elapsed_ms)
+            self._count += 1
+            if elapsed_ms > self._max_ms:
+                self._max_ms = elapsed_ms
+            if self.budget_ms and elapsed_ms > self.budget_ms:
+                self._over_budget += 1
+
+    def measure(self) -> "_Measure":
+        """with文で処理時間を計測"""
+        return _Measure(self)
+
+    def summary(self) -> Dict[str, Any]:
+        """統計を取得（平均・p95 は直近ウィンドウ、max・超過数は累計）"""
+        with self._lock:
+            last = self._samples[-1] if self._samples else 0.0
+            samples = sorted(self._samples)
+            count = self._count
+            over_budget = self._over_budget
+            max_ms = self._max_ms
+        if samples:
+            avg = sum(samples) / len(samples)
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        else:
+            avg = p95 = 0.0
+        return {
+            "count": count,
+            "last_ms": round(last, 3),
+            "avg_ms": round(avg, 3),
+            "p95_ms": round(p95, 3),
+            "max_ms": round(max_ms, 3),
+            "budget_ms": self.budget_ms,
+            "over_budget": over_budget,
+        }
+
+    def reset(self):
+        """統計をリセット"""
+        with self._lock:
+            self._samples.clear()
+            self._count = 0
+            self._over_budget = 0
+            self._max_ms = 0.0
+
+
+class _Measure:
+    def __init__(self, stats: TimingStats):
+        self._stats = stats
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stats.record((time.perf_counter() - self._start) * 1000.0)
+        return False
+
+
+class MetricsRegistry:
+    """計測値の登録先（プロセス内で共有）"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._timings: Dict[str, TimingStats] = {}
+        self._gauges: Dict[str, Any] = {}
+        self._counters: Dict[str, int] = {}
+
+    def timing(self, name: str, budget_ms: float = 0.0) -> TimingStats:
+        """名前付きの TimingStats を取得（なければ作成）"""
+        with self._lock:
+            stats = self._timings.get(name)
+            if stats is None:
+                stats = TimingStats(name, budget_ms)
+                self._timings[name] = stats
+            return stats
+
+    def set_gauge(self, name: str, value: Any):
+        """現在値を設定"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def increment(self, name: str, amount: int = 1):
+        """カウンターを加算"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counter(self, name: str) -> int:
+        """カウンターの現在値"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """全計測値を取得"""
+        with self._lock:
+            timings = list(self._timings.values())
+            gauges = dict(self._gauges)
+            counters = dict(self._counters)
+        return {
+            "timings": {t.name: t.summary() for t in timings},
+            "gauges": gauges,
+            "counters": counters,
+        }
+
+
+# アプリ全体で共有するレジストリ
+metrics = MetricsRegistry()
@@ -0,0 +1,101 @@
+# utils/perf.py
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class ProcessSampler:
+    """プロセスの CPU 使用率・常駐メモリを取得（標準ライブラリのみ）"""
+
+    def __init__(self):
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+        self._statm = "/proc/self/statm" if os.path.exists("/proc/self/statm") else None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if self._statm else 0
+
+    def rss_bytes(self) -> Optional[int]:
+        """常駐メモリ (bytes)。取得できない環境では最大常駐メモリ、それもなければ None"""
+        if self._statm:
+            try:
+                with open(self._statm, 'rb') as f:
+                    return int(f.read().split()[1]) * self._page_size
+            except (OSError, ValueError, IndexError):
+                pass
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+        return None
+
+    def sample(self) -> Dict[str, Any]:
+        """前回の呼び出しからの CPU 使用率 (%、1コア = 100) と現在の常駐メモリ"""
+        wall = time.monotonic()
+        cpu = time.process_time()
+        elapsed = wall - self._last_wall
+        cpu_percent = (cpu - self._last_cpu) / elapsed * 100.0 if elapsed > 0 else 0.0
+        self._last_wall = wall
+        self._last_cpu = cpu
+        return {"cpu_percent": round(cpu_percent, 1), "rss_bytes": self.rss_bytes()}
+
+
+class FrameStats:
+    """映像フレームの到着からフレームレート・欠落・遅延を推定
+
+    フレームのタイムスタンプ（メディア時刻）の飛びを欠落、
+    到着時刻とメディア時刻のずれの増加を遅延として数える。
+    """
+
+    LATE_TOLERANCE = 1.5  # フレーム間隔の何倍遅れたら遅延とみなすか
+    PAUSE_GAP_S = 1.0     # これ以上フレームが来なければ一時停止とみなして基準を取り直す
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.dropped = 0
+        self.late = 0
+        self._prev_start: Optional[int] = None
+        self._prev_wall = 0.0
+        self._interval_us = 0.0
+        self._base_offset: Optional[float] = None
+
+    def on_frame(self, start_us: int, end_us: int = -1, wall: Optional[float] = None):
+        """フレーム到着時に呼ぶ（start_us/end_us はメディア時刻 µs、不明なら -1）"""
+        wall = time.perf_counter() if wall is None else wall
+        self.frames += 1
+        if start_us < 0:
+            return
+        paused = wall - self._prev_wall > self.PAUSE_GAP_S
+        self._prev_wall = wall
+        if self._prev_start is None or start_us <= self._prev_start or paused:
+            # 最初のフレーム、シーク・動画の切り替え、または一時停止からの再開
+            self._prev_start = start_us
+            self._base_offset = None
+            return
+
+        delta = start_us - self._prev_start
+        self._prev_start = start_us
+        if end_us > start_us:
+            self._interval_us = float(end_us - start_us)
+        elif not self._interval_us:
+            self._interval_us = float(delta)
+        else:
+            self._interval_us = min(self._interval_us, float(delta))
+        interval = self._interval_us
+
+        # タイムスタンプの飛び = 表示されなかったフレーム
+        if interval > 0 and delta > interval * self.LATE_TOLERANCE:
+            self.dropped += int(round(delta / interval)) - 1
+
+        # 到着時刻 - メディア時刻 の最小値を基準に、遅れて届いたフレームを数える
+        offset = wall * 1e6 - start_us
+        if self._base_offset is None or offset < self._base_offset:
+            self._base_offset = offset
+        elif interval > 0 and offset - self._base_offset > interval * self.LATE_TOLERANCE:
+            self.late += 1
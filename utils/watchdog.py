@@ -0,0 +1,123 @@
+# utils/watchdog.py
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+from config import Config
+from utils.logger import warn
+from utils.metrics import metrics
+
+
+class UiStallWatchdog(QObject):
+    """UI スレッドの停止検知
+
+    メインループ上のタイマーで心拍を刻み、別スレッドで心拍の途絶を監視する。
+    threshold_ms を超えて止まったら、その時点のメインスレッドのスタックを
+    sys._current_frames() で取得してログとメトリクスに記録する
+    （スタックの出力は report_interval_s に1回まで）。
+    心拍と停止の状態は両方のスレッドが更新するので _lock で守る。
+    """
+
+    def __init__(self, config: Config, logger=None, parent=None):
+        super().__init__(parent)
+        self.logger = logger
+        self.interval_ms = config.get("watchdog.interval_ms", 100)
+        self.threshold_ms = config.get("watchdog.threshold_ms", 500)
+        self.report_interval_s = config.get("watchdog.report_interval_s", 30)
+
+        self._main_thread_id = threading.main_thread().ident
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._stall_started: Optional[float] = None  # 停止前の最後の心拍
+        self._stall_reported = False
+        self._last_report = 0.0
+        self._suppressed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stall_stats = metrics.timing("ui.stall", budget_ms=self.threshold_ms)
+
+        self._heartbeat = QTimer(self)
+        self._heartbeat.setTimerType(Qt.TimerType.PreciseTimer)
+        self._heartbeat.setInterval(self.interval_ms)
+        self._heartbeat.timeout.connect(self._beat)
+
+    # ==========================
+    # 起動・停止
+    # ==========================
+    def start(self):
+        """監視を開始（メインスレッドから呼ぶ）"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            self._last_beat = time.monotonic()
+            self._stall_started = None
+        self._heartbeat.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ui-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """監視を停止"""
+        self._heartbeat.stop()
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    # ==========================
+    # 心拍（メインスレッド）
+    # ==========================
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            started, self._stall_started = self._stall_started, None
+            reported, self._stall_reported = self._stall_reported, False
+            self._last_beat = now
+        if started is not None:
+            # 停止から復帰: 停止時間を記録
+            duration_ms = (now - started) * 1000.0 - self.interval_ms
+            self._stall_stats.record(duration_ms)
+            if reported:
+                warn(self.logger, f"UIスレッドが {duration_ms:.0f} ms 停止していました")
+
+    # ==========================
+    # 監視（ワーカースレッド）
+    # ==========================
+    def _run(self):
+        poll = self.interval_ms / 2000.0
+        while not self._stop.wait(poll):
+            with self._lock:
+                started = self._last_beat
+                silent_ms = (time.monotonic() - started) * 1000.0 - self.interval_ms
+                if silent_ms < self.threshold_ms or self._stall_started is not None:
+                    continue
+                self._stall_started = started
+            metrics.increment("ui.stalls")
+            reported = self._report(silent_ms)
+            with self._lock:
+                # 報告中に復帰していたら、その停止はもう記録済み
+                if self._stall_started == started:
+                    self._stall_reported = reported
+
+    def _report(self, silent_ms: float) -> bool:
+        """スタックを記録（レート制限で省略した場合は False）"""
+        now = time.monotonic()
+        if self._last_report and now - self._last_report < self.report_interval_s:
+            self._suppressed += 1
+            metrics.increment("ui.stalls_suppressed")
+            return False
+
+        frame = sys._current_frames().get(self._main_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "（取得できません）"
+        suppressed, self._suppressed = self._suppressed, 0
+        self._last_report = now
+        metrics.set_gauge("ui.last_stall_stack", stack)
+
+        message = f"UIスレッドが {silent_ms:.0f} ms 以上応答していません"
+        if suppressed:
+            message += f"（前回の報告以降に {suppressed} 件の停止を省略）"
+        warn(self.logger, f"{message}\nメインスレッドのスタック:\n{stack}")
+        return True
@@ -0,0 +1,348 @@
+// PyKara リモート UI
+// 楽曲カタログは版ごとのスナップショットを IndexedDB に保存し、以降は差分だけを取りに行く。
+// 検索は端末内で行い（読みの前方一致、/api/songs と同じ規則）、キー入力ごとにサーバーへは問い合わせない。
+
+const API_BASE_URL = '/api';
+const RESULT_LIMIT = 50;
+const CATALOG_CHECK_MS = 5 * 60 * 1000;
+const EVENTS_POLL_MS = 3000;
+
+// ==========================
+// 読みの正規化（storage/catalog.py の normalize_reading と同じ）
+// ==========================
+const STRIP_CHARS = new Set(" \t　・･,、.。!！?？'\"()（）[]「」『』-_~〜/／:：;；&＆");
+
+function normalizeReading(text) {
+    if (!text) {
+        return '';
+    }
+    let out = '';
+    for (const ch of text.normalize('NFKC').toLowerCase()) {
+        const code = ch.codePointAt(0);
+        if (STRIP_CHARS.has(ch)) {
+            continue;
+        }
+        // カタカナ → ひらがな
+        out += (code >= 0x30A1 && code <= 0x30F6) ? String.fromCodePoint(code - 0x60) : ch;
+    }
+    return out;
+}
+
+// ==========================
+// IndexedDB（songs: song_id → 行、meta: 版と列名）
+// ==========================
+function openDatabase() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open('pykara-remote', 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore('songs');
+            request.result.createObjectStore('meta');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function requestPromise(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function transactionDone(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+        tx.onabort = () => reject(tx.error);
+    });
+}
+
+// ==========================
+// 端末内のカタログ
+// ==========================
+const catalog = {
+    db: null,
+    version: null,
+    fields: null,
+    songs: new Map(),   // song_id → 行（配列）
+    byTitle: [],        // title_key 順の行
+    byArtist: [],       // artist_key 順の行
+
+    column(name) {
+        return this.fields.indexOf(name);
+    },
+
+    async load() {
+        this.db = await openDatabase();
+        const tx = this.db.transaction(['songs', 'meta'], 'readonly');
+        const [version, fields, rows] = await Promise.all([
+            requestPromise(tx.objectStore('meta').get('version')),
+            requestPromise(tx.objectStore('meta').get('fields')),
+            requestPromise(tx.objectStore('songs').getAll()),
+        ]);
+        if (version && fields) {
+            this.version = version;
+            this.fields = fields;
+            this.songs = new Map(rows.map((row) => [row[0], row]));
+            this.reindex();
+        }
+    },
+
+    async sync() {
+        const since = encodeURIComponent(this.version || '');
+        const manifest = await (await fetch(`${API_BASE_URL}/catalog?since=${since}`)).json();
+        if (!manifest.success || manifest.up_to_date) {
+            return false;
+        }
+        if (manifest.delta) {
+            const delta = await (await fetch(manifest.delta)).json();
+            if (this.fields && delta.fields.join() === this.fields.join()) {
+                await this.applyDelta(delta);
+                return true;
+            }
+        }
+        await this.applySnapshot(await (await fetch(manifest.snapshot)).json());
+        return true;
+    },
+
+    async applySnapshot(snapshot) {
+        const tx = this.db.transaction(['songs', 'meta'], 'readwrite');
+        const store = tx.objectStore('songs');
+        store.clear();
+        for (const row of snapshot.songs) {
+            store.put(row, row[0]);
+        }
+        tx.objectStore('meta').put(snapshot.fields, 'fields');
+        tx.objectStore('meta').put(snapshot.version, 'version');
+        await transactionDone(tx);
+        this.version = snapshot.version;
+        this.fields = snapshot.fields;
+        this.songs = new Map(snapshot.songs.map((row) => [row[0], row]));
+        this.reindex();
+    },
+
+    async applyDelta(delta) {
+        const tx = this.db.transaction(['songs', 'meta'], 'readwrite');
+        const store = tx.objectStore('songs');
+        for (const songId of delta.deleted) {
+            store.delete(songId);
+            this.songs.delete(songId);
+        }
+        for (const row of delta.songs) {
+            store.put(row, row[0]);
+            this.songs.set(row[0], row);
+        }
+        tx.objectStore('meta').put(delta.version, 'version');
+        await transactionDone(tx);
+        this.version = delta.version;
+        this.reindex();
+    },
+
+    reindex() {
+        const titleKey = this.column('title_key');
+        const artistKey = this.column('artist_key');
+        const rows = Array.from(this.songs.values());
+        const byKey = (index) => (a, b) => {
+            const x = a[index] || '';
+            const y = b[index] || '';
+            return x < y ? -1 : x > y ? 1 : 0;
+        };
+        this.byTitle = rows.slice().sort(byKey(titleKey));
+        this.byArtist = rows.sort(byKey(artistKey));
+    },
+
+    // key で始まる行（sorted は index の列で並んでいる）
+    prefix(sorted, index, key, limit) {
+        let lo = 0;
+        let hi = sorted.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if ((sorted[mid][index] || '') < key) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        const out = [];
+        for (let i = lo; i < sorted.length && out.length < limit; i++) {
+            if (!(sorted[i][index] || '').startsWith(key)) {
+                break;
+            }
+            out.push(sorted[i]);
+        }
+        return out;
+    },
+
+    search(query) {
+        if (!this.fields) {
+            return [];
+        }
+        const titleKey = this.column('title_key');
+        const key = normalizeReading(query);
+        if (!key) {
+            return this.byTitle.slice(0, RESULT_LIMIT);
+        }
+        // 曲名の一致は title_key 順に先頭から、歌手名の一致は全部集めて曲名順に混ぜる
+        const matches = new Set(this.prefix(this.byTitle, titleKey, key, RESULT_LIMIT));
+        for (const row of this.prefix(this.byArtist, this.column('artist_key'), key, Infinity)) {
+            matches.add(row);
+        }
+        return Array.from(matches)
+            .sort((a, b) => ((a[titleKey] || '') < (b[titleKey] || '') ? -1 : 1))
+            .slice(0, RESULT_LIMIT);
+    },
+};
+
+// ==========================
+// 画面
+// ==========================
+function renderResults() {
+    const list = document.getElementById('results');
+    list.textContent = '';
+    if (!catalog.fields) {
+        return;
+    }
+    const title = catalog.column('title');
+    const artist = catalog.column('artist');
+    for (const row of catalog.search(document.getElementById('query').value)) {
+        const item = document.createElement('li');
+        const song = document.createElement('span');
+        song.className = 'song';
+        song.textContent = row[title] || '';
+        const artistLabel = document.createElement('span');
+        artistLabel.className = 'artist';
+        artistLabel.textContent = row[artist] || '';
+        song.appendChild(artistLabel);
+        const button = document.createElement('button');
+        button.textContent = '予約';
+        button.addEventListener('click', () => reserve(row));
+        item.append(song, button);
+        list.appendChild(item);
+    }
+}
+
+function renderCatalogStatus(message) {
+    const count = catalog.songs.size.toLocaleString();
+    document.getElementById('catalogStatus').textContent =
+        catalog.version ? `${count} 曲（版 ${catalog.version}）${message || ''}` : (message || '');
+}
+
+function renderQueue(queue) {
+    const list = document.getElementById('queue');
+    list.textContent = '';
+    for (const entry of queue) {
+        const item = document.createElement('li');
+        item.textContent = entry.artist ? `${entry.title} / ${entry.artist}` : entry.title;
+        list.appendChild(item);
+    }
+}
+
+function showStatus(message, type) {
+    const statusDiv = document.getElementById('status');
+    statusDiv.textContent = message;
+    statusDiv.className = `status ${type}`;
+    statusDiv.style.display = 'block';
+
+    setTimeout(() => {
+        statusDiv.style.display = 'none';
+    }, 3000);
+}
+
+// ==========================
+// 予約・予約キュー
+// ==========================
+async function reserve(row) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/select`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                title: row[catalog.column('title')],
+                artist: row[catalog.column('artist')] || '',
+                metadata: { song_id: row[catalog.column('song_id')] },
+            })
+        });
+        const data = await response.json();
+        if (response.ok) {
+            showStatus(data.message, 'success');
+        } else {
+            showStatus(`エラー: ${data.error}`, 'error');
+        }
+    } catch (error) {
+        showStatus(`接続エラー: ${error.message}`, 'error');
+    }
+}
+
+// 予約キューは端末側に持ち、イベントを順に当てる（server/ipc.py の RemoteSelectionManager と同じ規則）。
+// /api/queue を取り直すのはサーバーがスナップショットを返したとき（初回・取りこぼし・再起動）だけ。
+const events = { seq: null, epoch: null, queue: new Map() };   // queue: 予約 ID → 予約
+
+function applyEvent(event, data) {
+    if (event === 'reserved') {
+        events.queue.set(data.id, data);
+    } else if (event === 'started' || event === 'removed') {
+        events.queue.delete(data.id);
+    } else if (event === 'cleared') {
+        events.queue.clear();
+    } else {
+        return false;
+    }
+    return true;
+}
+
+async function pollEvents() {
+    try {
+        const params = events.seq === null ? '' : `?since=${events.seq}&epoch=${encodeURIComponent(events.epoch)}`;
+        const data = await (await fetch(`${API_BASE_URL}/events${params}`)).json();
+        events.seq = data.seq;
+        events.epoch = data.epoch;
+        if (data.snapshot) {
+            events.queue = new Map(data.snapshot.queue.map((entry) => [entry.id, entry]));
+            renderQueue(events.queue.values());
+            return;
+        }
+        let changed = false;
+        for (const [, event, payload] of data.events) {
+            changed = applyEvent(event, payload) || changed;
+        }
+        if (changed) {
+            renderQueue(events.queue.values());
+        }
+    } catch (error) {
+        console.error('予約キューの取得エラー:', error);
+    }
+}
+
+async function syncCatalog() {
+    try {
+        if (await catalog.sync()) {
+            renderResults();
+        }
+        renderCatalogStatus();
+    } catch (error) {
+        renderCatalogStatus(catalog.version ? '（オフライン）' : `カタログを取得できません: ${error.message}`);
+    }
+}
+
+async function main() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('sw.js').catch((error) => console.error('Service Worker の登録エラー:', error));
+    }
+    document.getElementById('query').addEventListener('input', renderResults);
+    try {
+        await catalog.load();
+        renderCatalogStatus();
+        renderResults();
+    } catch (error) {
+        console.error('IndexedDB の読み込みエラー:', error);
+    }
+    await syncCatalog();
+    setInterval(syncCatalog, CATALOG_CHECK_MS);
+    pollEvents();
+    setInterval(pollEvents, EVENTS_POLL_MS);
+}
+
+main();
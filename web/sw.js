@@ -0,0 +1,36 @@
+// PyKara リモート UI の Service Worker
+// ハッシュ付きのファイル（assets/）は中身が変わらないので、キャッシュにあればそれを使う。
+// 入口（./）はネットワーク優先で、つながらないときだけキャッシュを返す（オフラインでも検索できる）。
+// 楽曲カタログはページ側が IndexedDB に持つので、ここでは API を扱わない。
+
+const CACHE = 'pykara-remote-__BUILD__';
+const PRECACHE = ['./'].concat(__PRECACHE__);
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(caches.open(CACHE).then((cache) => cache.addAll(PRECACHE)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    // 古い版のキャッシュを捨てる
+    event.waitUntil(caches.keys().then((names) => Promise.all(
+        names.filter((name) => name.startsWith('pykara-remote-') && name !== CACHE)
+             .map((name) => caches.delete(name))
+    )).then(() => self.clients.claim()));
+});
+
+self.addEventListener('fetch', (event) => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== location.origin) {
+        return;
+    }
+    const scope = new URL(self.registration.scope);
+    if (url.pathname.startsWith(scope.pathname + 'assets/')) {
+        event.respondWith(caches.match(event.request).then((hit) => hit || fetch(event.request)));
+    } else if (event.request.mode === 'navigate') {
+        event.respondWith(fetch(event.request).then((response) => {
+            const copy = response.clone();
+            caches.open(CACHE).then((cache) => cache.put('./', copy));
+            return response;
+        }).catch(() => caches.match('./')));
+    }
+});